@@ -21,23 +21,12 @@ observes the output until it can answer the user's question.
 """
 
 from google.adk.agents import Agent
-from google.adk.models import Gemini
 from google.adk.tools import google_search
-from google.genai import types
-
-retry_options = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
+from shared.model_clients import get_model
 
 root_agent = Agent(
     name="BasicReactAgent",
-    model=Gemini(
-      model="gemini-2.5-flash-lite",
-      retry_options=retry_options,
-    ),
+    model=get_model(),
     tools=[google_search],
     description="A simple react agent that can answer questions using a search tool",
     instruction="""You are a helpful assistant that can search for information.
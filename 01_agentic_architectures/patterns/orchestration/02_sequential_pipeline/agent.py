@@ -18,26 +18,21 @@ This module demonstrates a sequential orchestration pattern, where the output of
 one agent is passed as the input to the next. This is useful for deterministic
 business processes where the steps are known and must be executed in a specific
 order.
+
+`app` wraps the pipeline with `TokenAccountingPlugin`, so each stage's prompt,
+completion and cached tokens (and their estimated cost) are tracked per
+session and exported through `shared.metrics_registry`.
 """
 
 from google.adk.agents import Agent, SequentialAgent
-from google.adk.models import Gemini
-from google.genai import types
-
-retry_options = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
+from google.adk.apps.app import App
+from shared.model_clients import get_model
+from shared.token_accounting import TokenAccountingPlugin
 
 outline_agent = Agent(
     name="OutlineAgent",
     description="Creates an outline for a blog post.",
-    model=Gemini(
-      model="gemini-2.5-flash-lite",
-      retry_options=retry_options,
-    ),
+    model=get_model(),
     instruction="""You are a blog post outliner. You will be given a topic and
         you will create an outline for a blog post on that topic.""",
     output_key="outline",
@@ -46,10 +41,7 @@ outline_agent = Agent(
 writer_agent = Agent(
     name="WriterAgent",
     description="Writes a blog post based on an outline.",
-    model=Gemini(
-      model="gemini-2.5-flash-lite",
-      retry_options=retry_options,
-    ),
+    model=get_model(),
     instruction="""You are a blog post writer. You will be given an outline in the 'outline' state variable and
         you will write a blog post based on that outline.""",
     output_key="draft",
@@ -58,10 +50,7 @@ writer_agent = Agent(
 editor_agent = Agent(
     name="EditorAgent",
     description="Edits a blog post for grammar, spelling, and clarity.",
-    model=Gemini(
-      model="gemini-2.5-flash-lite",
-      retry_options=retry_options,
-    ),
+    model=get_model(),
     instruction="""You are a blog post editor. You will be given a blog post in the 'draft' state variable and
         you will edit it for grammar, spelling, and clarity.""",
     output_key="final_draft",
@@ -70,4 +59,10 @@ editor_agent = Agent(
 root_agent = SequentialAgent(
     name="BlogPipeline",
     sub_agents=[outline_agent, writer_agent, editor_agent]
-)
\ No newline at end of file
+)
+
+token_accounting = TokenAccountingPlugin()
+
+# `adk run` and `adk web` create sessions under the package directory's name,
+# so the App must carry the same name.
+app = App(name="02_sequential_pipeline", root_agent=root_agent, plugins=[token_accounting])
@@ -17,36 +17,38 @@
 This module demonstrates a parallel orchestration pattern, where multiple agents
 run concurrently to perform a task. This is useful for reducing latency by
 running independent tasks in parallel.
+
+Because the team waits for its slowest researcher, latency is set by the tail of
+the model-call distribution. Set `HEDGE_REQUESTS=true` to hedge the
+researchers' calls: a call still outstanding past the p95 of recent latency is
+duplicated and the first response wins. `researcher_model.stats` reports the
+hedge rate and how often the duplicate won.
 """
 
+import os
+
 from google.adk.agents import Agent, ParallelAgent, SequentialAgent
-from google.adk.models import Gemini
-from google.genai import types
+from shared.hedging import HedgedModel, HedgePolicy
+from shared.model_clients import get_model
+
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "false").lower() == "true"
 
-retry_options = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
+# The researchers share one model, so the hedge threshold is learned from both.
+researcher_model = (
+    HedgedModel.wrap(get_model(), HedgePolicy(percentile=95)) if HEDGE_REQUESTS else get_model()
 )
 
 researcher_agent_1 = Agent(
     name="ResearcherAgent1",
     description="Researches a topic and provides a summary of findings.",
-    model=Gemini(
-      model="gemini-2.5-flash-lite",
-      retry_options=retry_options,
-    ),
+    model=researcher_model,
     instruction="""You are a researcher. You will be given a topic and you
         will research it and provide a summary of your findings.""",
 )
 
 researcher_agent_2 = Agent(
     name="ResearcherAgent2",
-    model=Gemini(
-      model="gemini-2.5-flash-lite",
-      retry_options=retry_options,
-    ),
+    model=researcher_model,
     instruction="""You are a researcher. You will be given a topic and you
         will research it and provide a summary of your findings.""",
 )
@@ -54,10 +56,7 @@ researcher_agent_2 = Agent(
 aggregator_agent = Agent(
     name="AggregatorAgent",
     description="Aggregates a list of research summaries into a single summary.",
-    model=Gemini(
-      model="gemini-2.5-flash-lite",
-      retry_options=retry_options,
-    ),
+    model=get_model(),
     instruction="""You are an aggregator. You will be given a list of research
         summaries and you will aggregate them into a single summary.""",
 )
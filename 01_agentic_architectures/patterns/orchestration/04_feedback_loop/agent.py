@@ -17,19 +17,25 @@
 This module demonstrates a feedback loop pattern, where a critic agent provides
 feedback to a worker agent, which then refines its work. This is useful for
 iteratively improving the quality of an agent's output.
+
+Every refinement round resends the growing story, so `app` adds a
+`TokenAccountingPlugin` with a per-session budget: once it is spent, further
+model calls are answered with a `TOKEN_BUDGET_EXCEEDED` error instead of
+running another round. The error carries no text, so `current_story` keeps
+the last real draft; `{critique?}` is optional because a refused critic
+leaves no critique behind.
 """
 
+import os
+
 from google.adk.agents import Agent, LoopAgent, SequentialAgent
-from google.adk.models import Gemini
+from google.adk.apps.app import App
 from google.adk.tools import FunctionTool
-from google.genai import types
+from shared.model_clients import get_model
+from shared.token_accounting import TokenAccountingPlugin, TokenBudget
 
-retry_options = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
+# Total tokens one session may spend across the writer, critic and refiner.
+SESSION_TOKEN_BUDGET = int(os.environ.get("STORY_SESSION_TOKEN_BUDGET", "60000"))
 
 def exit_loop():
     """Call this function ONLY when the critique is 'APPROVED', indicating the story is finished and no more changes are needed."""
@@ -39,10 +45,7 @@ def exit_loop():
 initial_writer_agent = Agent(
     name="InitialWriterAgent",
     description="Writes the first draft of a short story.",
-    model=Gemini(
-      model="gemini-2.5-flash-lite",
-      retry_options=retry_options,
-    ),
+    model=get_model(),
     instruction="""You are a writer. You will be given a topic and you will
         write a short story on that topic.""",
     output_key="current_story",
@@ -51,10 +54,7 @@ initial_writer_agent = Agent(
 critic_agent = Agent(
     name="CriticAgent",
     description="Provides feedback on a short story.",
-    model=Gemini(
-      model="gemini-2.5-flash-lite",
-      retry_options=retry_options,
-    ),
+    model=get_model(),
     instruction="""You are a critic. You will be given a short story and you
         will provide feedback on it. If the story is good enough, you will
         say 'APPROVED'. Otherwise, you will provide feedback on how to improve
@@ -65,14 +65,11 @@ critic_agent = Agent(
 refiner_agent = Agent(
     name="RefinerAgent",
     description="Refines a short story based on critique.",
-    model=Gemini(
-      model="gemini-2.5-flash-lite",
-      retry_options=retry_options,
-    ),
+    model=get_model(),
     instruction="""You are a story refiner. You have a story draft and critique.
     
     Story Draft: {current_story}
-    Critique: {critique}
+    Critique: {critique?}
     
     Your task is to analyze the critique.
     - IF the critique is EXACTLY "APPROVED", you MUST call the `exit_loop` function and nothing else.
@@ -93,3 +90,11 @@ root_agent = SequentialAgent(
     name="StoryPipeline",
     sub_agents=[initial_writer_agent, story_refinement_loop],
 )
+
+token_accounting = TokenAccountingPlugin(
+    budget=TokenBudget(max_tokens_per_session=SESSION_TOKEN_BUDGET)
+)
+
+# `adk run` and `adk web` create sessions under the package directory's name,
+# so the App must carry the same name.
+app = App(name="04_feedback_loop", root_agent=root_agent, plugins=[token_accounting])
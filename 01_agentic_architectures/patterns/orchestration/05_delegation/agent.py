@@ -16,15 +16,7 @@
 
 from google.adk.agents import LlmAgent
 from google.adk.tools import AgentTool
-from google.adk.models import Gemini
-from google.genai import types
-
-retry_options = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
+from shared.model_clients import get_model
 
 def create_jira_ticket(title: str, description: str, priority: str) -> dict:
     """Creates a Jira ticket with the given title, description, and priority.
@@ -53,7 +45,7 @@ def create_jira_ticket(title: str, description: str, priority: str) -> dict:
 
 jira_agent = LlmAgent(
     name="JiraAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_options),
+    model=get_model(),
     instruction="""You are a Jira specialist agent. Your sole purpose is to create Jira tickets using the `create_jira_ticket` tool.
 You will be given the title, description, and priority for the ticket.
 You must call the `create_jira_ticket` tool with the provided information.
@@ -64,7 +56,7 @@ Do not add any conversational text or explanations.
 
 root_agent = LlmAgent(
     name="CustomerSupportAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_options),
+    model=get_model(),
     instruction="""You are a customer support agent. Your goal is to help users by creating a Jira ticket for their issues.
 
 1.  First, understand the user's issue.
@@ -12,21 +12,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""A human-in-the-loop pattern for long-running operations requiring approval."""
+"""A human-in-the-loop pattern for long-running operations requiring approval.
+
+Posts waiting for approval pause their invocation. Run the app with
+`session_service` so paused sessions are parked as compact snapshots
+(spilled to disk past a memory budget) until the confirmation resumes them:
+
+    runner = Runner(app=root_agent, session_service=session_service)
+"""
 
 from google.adk.agents import LlmAgent
-from google.adk.models import Gemini
 from google.adk.tools import FunctionTool, ToolContext
 from google.adk.apps import App, ResumabilityConfig
-from google.genai import types
 import re
-
-retry_options = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
+from shared.model_clients import get_model
+from shared.paused_sessions import ParkPausedSessionsPlugin, SpillingSessionService
 
 def post_to_social_media(
     content: str, tool_context: ToolContext
@@ -77,7 +77,7 @@ def post_to_social_media(
 
 social_media_agent = LlmAgent(
     name="SocialMediaAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_options),
+    model=get_model(),
     instruction="""You are a social media assistant.
 
   When users ask you to post content:
@@ -92,8 +92,11 @@ social_media_agent = LlmAgent(
     tools=[FunctionTool(func=post_to_social_media)],
 )
 
+session_service = SpillingSessionService()
+
 root_agent = App(
     name="SocialMediaManager",
     root_agent=social_media_agent,
+    plugins=[ParkPausedSessionsPlugin()],
     resumability_config=ResumabilityConfig(is_resumable=True),
 )
\ No newline at end of file
@@ -15,17 +15,9 @@
 """An agent that uses an MCP server to interact with a file system."""
 
 from google.adk.agents import LlmAgent
-from google.adk.models import Gemini
 from google.adk.tools.mcp_tool import McpToolset, StdioConnectionParams
 from mcp import StdioServerParameters
-from google.genai import types
-
-retry_options = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
+from shared.model_clients import get_model
 
 mcp_filesystem_server = McpToolset(
     connection_params=StdioConnectionParams(
@@ -42,7 +34,7 @@ mcp_filesystem_server = McpToolset(
 
 root_agent = LlmAgent(
     name="FileSystemAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_options),
+    model=get_model(),
     instruction="""You are a file system agent. You can list files, read files, and write files.
 Use the available tools to interact with the file system.
 When asked to write a file, you must include the content to be written.
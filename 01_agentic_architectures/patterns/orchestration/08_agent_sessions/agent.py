@@ -13,81 +13,67 @@
 # limitations under the License.
 
 """
-
 Demonstrates a persistent session for a project setup assistant.
 
-
-
 This pattern shows how a `DatabaseSessionService` can be used to create an agent
-
 that remembers a user's project preferences (like programming language or
-
 database choice) across multiple conversations. This allows for a continuous
-
 and personalized user experience.
 
+As per ADR-008, this pattern defaults to a persistent session service: the
+SQLite-tuned `SqliteSessionService` (see `shared/sqlite_sessions.py`), or the
+stock `DatabaseSessionService` with `SESSION_BACKEND=database`.
 
-
-As per ADR-008, this pattern defaults to using a persistent `DatabaseSessionService`.
-
+`root_agent` and `session_service` are built on first access (see
+`shared/lazy.py`), so importing this module opens no database and needs no
+API key.
 """
 
+from shared.lazy import LazyAttributes, require_api_key
 
-
-import os
-
-from typing import Any, Dict
-
-
-
-from google.adk.agents import LlmAgent
-
-from google.adk.models.google_llm import Gemini
-
-from google.adk.sessions import DatabaseSessionService
-
-from google.genai import types
-
-
-
-# Ensure the GOOGLE_API_KEY environment variable is set.
-
-if "GOOGLE_API_KEY" not in os.environ:
-
-    raise ValueError("GOOGLE_API_KEY environment variable not set.")
-
-
-
-# 1. Initialize the Model with retry configuration
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
-model = Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config)
-
-
-
-# 2. Initialize the persistent Session Service (ADR-008)
+lazy = LazyAttributes(__name__)
+__getattr__ = lazy.getattr
+__dir__ = lazy.dir
 
 db_url = "sqlite:///my_project_assistant.db"
 
-session_service = DatabaseSessionService(db_url=db_url)
 
+@lazy.provides("root_agent")
+def _build_root_agent():
+    require_api_key()
+
+    from google.adk.agents import LlmAgent
+    from shared.model_clients import get_model
 
+    # 1. Get the shared, pooled model
+    model = get_model()
 
-# 3. Initialize the Agent
+    # 2. Initialize the Agent
+    return LlmAgent(
+        model=model,
+        name="project_setup_assistant",
+        description="An assistant that helps users set up their projects and remembers their preferences across sessions.",
+        instruction="You are a helpful project setup assistant. Your goal is to remember the user's choices so you can refer back to them later. For example, if they tell you their preferred programming language, you should remember it for the next time they ask a related question.",
+    )
 
-root_agent = LlmAgent(
 
-    model=model,
+@lazy.provides("session_service")
+def _build_session_service():
+    from shared.sqlite_sessions import create_session_service
 
-    name="project_setup_assistant",
+    # 3. Initialize the persistent Session Service (ADR-008). SQLite URLs get
+    # the WAL, group-commit `SqliteSessionService`; SESSION_BACKEND=database
+    # selects the stock `DatabaseSessionService`.
+    return create_session_service(db_url)
 
-    description="An assistant that helps users set up their projects and remembers their preferences across sessions.",
 
-    instruction="You are a helpful project setup assistant. Your goal is to remember the user's choices so you can refer back to them later. For example, if they tell you their preferred programming language, you should remember it for the next time they ask a related question.",
+@lazy.provides("session_maintenance")
+def _build_session_maintenance():
+    from shared.session_maintenance import RetentionPolicy, SessionMaintenance
 
-)
+    # 4. Archive and expire idle sessions so the database stops growing
+    # (SESSION_ARCHIVE_AFTER_DAYS / SESSION_TTL_DAYS). Start it next to the
+    # runner with `await session_maintenance.start()`.
+    return SessionMaintenance.for_service(
+        lazy.getattr("session_service"), default_policy=RetentionPolicy.from_env()
+    )
@@ -15,51 +15,111 @@
 """
 Demonstrates context compaction for a financial news analyst agent.
 
-This pattern shows how `EventsCompactionConfig` can be used for an agent that
+This pattern shows how context compaction can be used for an agent that
 analyzes financial news over a long conversation. As the conversation grows,
 the agent automatically summarizes the history, allowing it to maintain context
 about market trends and user interests without exceeding the context window.
+
+Compaction is triggered by the estimated size of the history rather than by
+turn count (`shared/token_compaction.py`), so a few pasted articles are
+summarized as soon as they grow large and short exchanges are left alone.
+Only events since the last compaction are summarized, and summaries are
+merged into a tree (`shared/summary_tree.py`), so neither the summarizer
+nor the prompt rereads earlier summaries one by one. Tune it with
+COMPACTION_HIGH_WATER_TOKENS and COMPACTION_FAN_OUT.
+
+`root_agent` and `session_service` are built on first access (see
+`shared/lazy.py`).
 """
 
 import os
 
-from google.adk.agents import LlmAgent
-from google.adk.apps.app import App, EventsCompactionConfig
-from google.adk.models.google_llm import Gemini
-from google.adk.sessions import DatabaseSessionService
-from google.genai import types
-
-# Ensure the GOOGLE_API_KEY environment variable is set.
-if "GOOGLE_API_KEY" not in os.environ:
-    raise ValueError("GOOGLE_API_KEY environment variable not set.")
-
-# 1. Initialize the Model with retry configuration
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
-model = Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config)
-
-# 2. Initialize the Agent
-compaction_agent = LlmAgent(
-    model=model,
-    name="financial_news_analyst",
-    description="A financial analyst that can discuss market trends and news over a long conversation.",
-    instruction="You are a financial news analyst. You can discuss market trends, analyze articles, and maintain a long-running conversation about the user's financial interests.",
-)
-
-# 3. Define the Application with Context Compaction
-root_agent = App(
-    name="financial_analyst_app",
-    root_agent=compaction_agent,
-    events_compaction_config=EventsCompactionConfig(
-        compaction_interval=5,  # Trigger compaction every 5 turns
-        overlap_size=2,  # Keep the last 2 turns for context
-    ),
-)
-
-# 4. Initialize the persistent Session Service
+from shared.lazy import LazyAttributes, require_api_key
+
+lazy = LazyAttributes(__name__)
+__getattr__ = lazy.getattr
+__dir__ = lazy.dir
+
 db_url = "sqlite:///my_financial_analyst.db"
-session_service = DatabaseSessionService(db_url=db_url)
+
+
+@lazy.provides("compaction_agent")
+def _build_compaction_agent():
+    require_api_key()
+
+    from google.adk.agents import LlmAgent
+    from shared.model_clients import get_model
+
+    # 1. Get the shared, pooled model
+    model = get_model()
+
+    # 2. Initialize the Agent
+    return LlmAgent(
+        model=model,
+        name="financial_news_analyst",
+        description="A financial analyst that can discuss market trends and news over a long conversation.",
+        instruction="You are a financial news analyst. You can discuss market trends, analyze articles, and maintain a long-running conversation about the user's financial interests.",
+    )
+
+
+@lazy.provides("token_accounting")
+def _build_token_accounting():
+    from shared.token_accounting import TokenAccountingPlugin
+
+    return TokenAccountingPlugin()
+
+
+@lazy.provides("compaction")
+def _build_compaction():
+    from shared.extractive_compaction import ExtractiveSummarizer
+    from shared.summary_tree import SummaryTreeCompactionPlugin
+
+    agent = lazy.getattr("compaction_agent")
+    token_accounting = lazy.getattr("token_accounting")
+
+    # A local extractive pre-pass condenses each window first; small windows
+    # need no model call at all. The model summarizer behind it is metered so
+    # compaction's own calls show up under the "events_compaction" agent in
+    # the token report.
+    return SummaryTreeCompactionPlugin(
+        summarizer=ExtractiveSummarizer(inner=token_accounting.metered_summarizer(agent.model)),
+        high_water_tokens=int(os.environ.get("COMPACTION_HIGH_WATER_TOKENS", "8000")),
+        fan_out=int(os.environ.get("COMPACTION_FAN_OUT", "4")),
+    )
+
+
+@lazy.provides("root_agent")
+def _build_root_agent():
+    from google.adk.apps.app import App
+
+    # 3. Define the Application with Context Compaction. The history is
+    # summarized once it is estimated to exceed the high-water mark, and
+    # every `fan_out` summaries are rolled up into one.
+    return App(
+        name="financial_analyst_app",
+        root_agent=lazy.getattr("compaction_agent"),
+        plugins=[lazy.getattr("token_accounting"), lazy.getattr("compaction")],
+    )
+
+
+@lazy.provides("session_service")
+def _build_session_service():
+    from shared.sqlite_sessions import create_session_service
+
+    # 4. Initialize the persistent Session Service. SQLite URLs get the WAL,
+    # group-commit `SqliteSessionService`; SESSION_BACKEND=database selects
+    # the stock `DatabaseSessionService`. The latest summary-tree compaction
+    # carries the whole frontier, so resumes load only that one summary.
+    return create_session_service(db_url, tail_summaries=1)
+
+
+@lazy.provides("session_maintenance")
+def _build_session_maintenance():
+    from shared.session_maintenance import RetentionPolicy, SessionMaintenance
+
+    # 5. Archive and expire idle sessions so the database stops growing
+    # (SESSION_ARCHIVE_AFTER_DAYS / SESSION_TTL_DAYS). Start it next to the
+    # runner with `await session_maintenance.start()`.
+    return SessionMaintenance.for_service(
+        lazy.getattr("session_service"), default_policy=RetentionPolicy.from_env()
+    )
@@ -19,58 +19,75 @@ This pattern shows how an agent can use tools (`add_item_to_cart`, `view_cart`)
 to modify a list of items stored in the session state. This is a common
 paradigm for managing dynamic, structured data within a conversation, such as
 maintaining a shopping cart, a list of tasks, or a configuration object.
+
+The tools are defined in `tools.py`. `root_agent` and `session_service` are
+built on first access (see `shared/lazy.py`).
+
+`session_service` writes behind: tool state updates are acknowledged in memory
+and persisted in the background (see `shared/write_behind.py`). The default
+SESSION_DURABILITY=event writes each event before its append returns, so it
+holds under `adk run` and `adk web` too. SESSION_DURABILITY=turn writes once
+per turn instead, but only holds with the flush plugin in the runner:
+
+    runner = Runner(..., session_service=session_service,
+                    plugins=[session_service.turn_plugin()])
 """
 
 import os
-from typing import Any, Dict, List
-
-from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.sessions import DatabaseSessionService
-from google.adk.tools.tool_context import ToolContext
-from google.genai import types
-
-# Ensure the GOOGLE_API_KEY environment variable is set.
-if "GOOGLE_API_KEY" not in os.environ:
-    raise ValueError("GOOGLE_API_KEY environment variable not set.")
-
-
-def add_item_to_cart(
-    tool_context: ToolContext, item: str, quantity: int
-) -> Dict[str, Any]:
-    """Adds an item to the shopping cart in the session state."""
-    if "cart" not in tool_context.state:
-        tool_context.state["cart"] = []
-
-    # The state is a mutable list, so we can append to it directly.
-    tool_context.state["cart"].append({"item": item, "quantity": quantity})
-    return {"status": "success", "item": item, "quantity": quantity}
-
-
-def view_cart(tool_context: ToolContext) -> Dict[str, Any]:
-    """Retrieves the current contents of the shopping cart from the session state."""
-    cart_items = tool_context.state.get("cart", [])
-    return {"status": "success", "cart": cart_items}
-
-
-# 1. Initialize the Model with retry configuration
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
-model = Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config)
-
-# 2. Initialize the Agent with the shopping cart tools
-root_agent = LlmAgent(
-    model=model,
-    name="shopping_cart_assistant",
-    description="An assistant that helps users manage their shopping cart.",
-    instruction="You are a shopping cart assistant. Use the `add_item_to_cart` tool to add items to the cart and the `view_cart` tool to show the user what is in their cart. Always confirm with the user after adding an item.",
-    tools=[add_item_to_cart, view_cart],
-)
-
-# 3. Initialize the persistent Session Service
+
+from shared.lazy import LazyAttributes, require_api_key
+
+lazy = LazyAttributes(__name__)
+__getattr__ = lazy.getattr
+__dir__ = lazy.dir
+
 db_url = "sqlite:///my_shopping_cart.db"
-session_service = DatabaseSessionService(db_url=db_url)
+
+
+@lazy.provides("root_agent")
+def _build_root_agent():
+    require_api_key()
+
+    from google.adk.agents import LlmAgent
+    from shared.model_clients import get_model
+
+    from .tools import add_item_to_cart, view_cart
+
+    # 1. Get the shared, pooled model
+    model = get_model()
+
+    # 2. Initialize the Agent with the shopping cart tools
+    return LlmAgent(
+        model=model,
+        name="shopping_cart_assistant",
+        description="An assistant that helps users manage their shopping cart.",
+        instruction="You are a shopping cart assistant. Use the `add_item_to_cart` tool to add items to the cart and the `view_cart` tool to show the user what is in their cart. Always confirm with the user after adding an item.",
+        tools=[add_item_to_cart, view_cart],
+    )
+
+
+@lazy.provides("session_service")
+def _build_session_service():
+    from shared.sqlite_sessions import create_session_service
+    from shared.write_behind import WriteBehindSessionService
+
+    # 3. Initialize the persistent Session Service. SQLite URLs get the WAL,
+    # group-commit `SqliteSessionService`; SESSION_BACKEND=database selects
+    # the stock `DatabaseSessionService`. Writes go through a write-behind
+    # queue; SESSION_DURABILITY picks "event", "turn" or "timer".
+    return WriteBehindSessionService(
+        create_session_service(db_url),
+        durability=os.environ.get("SESSION_DURABILITY", "event"),
+    )
+
+
+@lazy.provides("session_maintenance")
+def _build_session_maintenance():
+    from shared.session_maintenance import RetentionPolicy, SessionMaintenance
+
+    # 4. Archive and expire idle sessions so the database stops growing
+    # (SESSION_ARCHIVE_AFTER_DAYS / SESSION_TTL_DAYS). Start it next to the
+    # runner with `await session_maintenance.start()`.
+    return SessionMaintenance.for_service(
+        lazy.getattr("session_service"), default_policy=RetentionPolicy.from_env()
+    )
@@ -0,0 +1,42 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Shopping cart tools that keep the cart in session state.
+
+They live apart from `agent.py` because their `ToolContext` annotation imports
+`google.adk`; the agent module only imports them when `root_agent` is built.
+"""
+
+from typing import Any, Dict
+
+from google.adk.tools.tool_context import ToolContext
+
+
+def add_item_to_cart(
+    tool_context: ToolContext, item: str, quantity: int
+) -> Dict[str, Any]:
+    """Adds an item to the shopping cart in the session state."""
+    # Assign a new list rather than appending in place: only assignments are
+    # recorded in the event's state delta, and so persisted. The session
+    # service stores the change as an append, not as the whole cart.
+    cart = list(tool_context.state.get("cart", []))
+    cart.append({"item": item, "quantity": quantity})
+    tool_context.state["cart"] = cart
+    return {"status": "success", "item": item, "quantity": quantity}
+
+
+def view_cart(tool_context: ToolContext) -> Dict[str, Any]:
+    """Retrieves the current contents of the shopping cart from the session state."""
+    cart_items = tool_context.state.get("cart", [])
+    return {"status": "success", "cart": cart_items}
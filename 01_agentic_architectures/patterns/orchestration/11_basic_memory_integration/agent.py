@@ -23,40 +23,50 @@ conversations.
 Use Case: A "Customer Preference Tracker" agent that manually stores user
 preferences (e.g., dietary restrictions, favorite brands) from a conversation
 into long-term memory.
+
+`root_agent`, `memory_service` and `session_service` are built on first access
+(see `shared/lazy.py`).
 """
 
-import os
-
-from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.sessions import InMemorySessionService
-from google.adk.memory import InMemoryMemoryService
-from google.genai import types
-
-# Ensure the GOOGLE_API_KEY environment variable is set.
-if "GOOGLE_API_KEY" not in os.environ:
-    raise ValueError("GOOGLE_API_KEY environment variable not set.")
-
-# 1. Initialize the Model with standard retry configuration
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
-model = Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config)
-
-# 2. Initialize the Memory Service
-# For this basic demonstration, we use InMemoryMemoryService.
-# For production, VertexAiMemoryBankService would be used.
-memory_service = InMemoryMemoryService()
-
-# 3. Initialize the Session Service
-session_service = InMemorySessionService()
-
-# 4. Initialize the Agent
-root_agent = LlmAgent(
-    model=model,
-    name="customer_preference_tracker",
-    instruction="You are a customer preference tracker. Your goal is to understand and store user preferences.",
-)
+from shared.lazy import LazyAttributes, require_api_key
+
+lazy = LazyAttributes(__name__)
+__getattr__ = lazy.getattr
+__dir__ = lazy.dir
+
+
+@lazy.provides("root_agent")
+def _build_root_agent():
+    require_api_key()
+
+    from google.adk.agents import LlmAgent
+    from shared.model_clients import get_model
+
+    # 1. Get the shared, pooled model
+    model = get_model()
+
+    # 2. Initialize the Agent
+    return LlmAgent(
+        model=model,
+        name="customer_preference_tracker",
+        instruction="You are a customer preference tracker. Your goal is to understand and store user preferences.",
+    )
+
+
+@lazy.provides("memory_service")
+def _build_memory_service():
+    from shared.vector_memory import create_memory_service
+
+    # 3. Initialize the Memory Service
+    # For this basic demonstration, we use an in-process vector memory
+    # (InMemoryMemoryService with MEMORY_BACKEND=keyword).
+    # For production, VertexAiMemoryBankService would be used.
+    return create_memory_service()
+
+
+@lazy.provides("session_service")
+def _build_session_service():
+    from google.adk.sessions import InMemorySessionService
+
+    # 4. Initialize the Session Service
+    return InMemorySessionService()
@@ -23,42 +23,51 @@ it needs to recall past context to answer a query.
 Use Case: A "Technical Support Agent" that uses `load_memory` to reactively
 search a knowledge base (memory) only when it needs to answer a specific
 technical question that requires past context.
+
+`root_agent`, `memory_service` and `session_service` are built on first access
+(see `shared/lazy.py`).
 """
 
-import os
-
-from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.sessions import InMemorySessionService
-from google.adk.memory import InMemoryMemoryService
-from google.adk.tools import load_memory
-from google.genai import types
-
-# Ensure the GOOGLE_API_KEY environment variable is set.
-if "GOOGLE_API_KEY" not in os.environ:
-    raise ValueError("GOOGLE_API_KEY environment variable not set.")
-
-# 1. Initialize the Model with standard retry configuration
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
-model = Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config)
-
-# 2. Initialize the Memory Service
-memory_service = InMemoryMemoryService()
-
-# 3. Initialize the Session Service
-session_service = InMemorySessionService()
-
-# 4. Initialize the Agent with the load_memory tool
-root_agent = LlmAgent(
-    model=model,
-    name="technical_support_agent",
-    instruction="You are a technical support agent. Use the `load_memory` tool if you need to recall past information to answer a technical question. If you don't find relevant information, state that you don't know.",
-    tools=[
-        load_memory  # Agent now has access to Memory and can search it whenever it decides to!
-    ],
-)
+from shared.lazy import LazyAttributes, require_api_key
+
+lazy = LazyAttributes(__name__)
+__getattr__ = lazy.getattr
+__dir__ = lazy.dir
+
+
+@lazy.provides("root_agent")
+def _build_root_agent():
+    require_api_key()
+
+    from google.adk.agents import LlmAgent
+    from google.adk.tools import load_memory
+    from shared.model_clients import get_model
+
+    # 1. Get the shared, pooled model
+    model = get_model()
+
+    # 2. Initialize the Agent with the load_memory tool
+    return LlmAgent(
+        model=model,
+        name="technical_support_agent",
+        instruction="You are a technical support agent. Use the `load_memory` tool if you need to recall past information to answer a technical question. If you don't find relevant information, state that you don't know.",
+        tools=[
+            load_memory  # Agent now has access to Memory and can search it whenever it decides to!
+        ],
+    )
+
+
+@lazy.provides("memory_service")
+def _build_memory_service():
+    from shared.vector_memory import create_memory_service
+
+    # 3. Initialize the Memory Service (vector search; MEMORY_BACKEND=keyword for the stock one)
+    return create_memory_service()
+
+
+@lazy.provides("session_service")
+def _build_session_service():
+    from google.adk.sessions import InMemorySessionService
+
+    # 4. Initialize the Session Service
+    return InMemorySessionService()
@@ -23,42 +23,63 @@ making it suitable for highly personalized or context-dependent interactions.
 Use Case: A "Personalized Learning Assistant" that uses `preload_memory` to
 proactively load a student's learning history and preferences into the agent's
 context before every interaction, ensuring highly personalized guidance.
+
+The agent uses `CachedPreloadMemoryTool` (`shared/memory_preload.py`), which
+behaves like `preload_memory` but reuses a session's previous retrieval while
+the student's memories are unchanged and the question is the same, so it
+always loads what a fresh search would. PRELOAD_SIMILARITY (for example 0.8)
+also reuses it for close rephrasings, trading some stale memories for fewer
+searches.
+
+`root_agent`, `memory_service` and `session_service` are built on first access
+(see `shared/lazy.py`).
 """
 
 import os
 
-from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.sessions import InMemorySessionService
-from google.adk.memory import InMemoryMemoryService
-from google.adk.tools import preload_memory
-from google.genai import types
-
-# Ensure the GOOGLE_API_KEY environment variable is set.
-if "GOOGLE_API_KEY" not in os.environ:
-    raise ValueError("GOOGLE_API_KEY environment variable not set.")
-
-# 1. Initialize the Model with standard retry configuration
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
-model = Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config)
-
-# 2. Initialize the Memory Service
-memory_service = InMemoryMemoryService()
-
-# 3. Initialize the Session Service
-session_service = InMemorySessionService()
-
-# 4. Initialize the Agent with the preload_memory tool
-root_agent = LlmAgent(
-    model=model,
-    name="personalized_learning_assistant",
-    instruction="You are a personalized learning assistant. You will proactively use your memory to provide tailored guidance based on the student's learning history and preferences.",
-    tools=[
-        preload_memory  # Agent now has access to Memory and will preload it before each turn!
-    ],
-)
+from shared.lazy import LazyAttributes, require_api_key
+
+lazy = LazyAttributes(__name__)
+__getattr__ = lazy.getattr
+__dir__ = lazy.dir
+
+
+@lazy.provides("root_agent")
+def _build_root_agent():
+    require_api_key()
+
+    from google.adk.agents import LlmAgent
+    from shared.memory_preload import CachedPreloadMemoryTool
+    from shared.model_clients import get_model
+
+    # 1. Get the shared, pooled model
+    model = get_model()
+    similarity = os.environ.get("PRELOAD_SIMILARITY")
+
+    # 2. Initialize the Agent with the preload_memory tool
+    return LlmAgent(
+        model=model,
+        name="personalized_learning_assistant",
+        instruction="You are a personalized learning assistant. You will proactively use your memory to provide tailored guidance based on the student's learning history and preferences.",
+        tools=[
+            # Preloads memory before each turn, searching again only when the
+            # student's memories or the question have changed
+            CachedPreloadMemoryTool(similarity=float(similarity) if similarity else None)
+        ],
+    )
+
+
+@lazy.provides("memory_service")
+def _build_memory_service():
+    from shared.vector_memory import create_memory_service
+
+    # 3. Initialize the Memory Service (vector search; MEMORY_BACKEND=keyword for the stock one)
+    return create_memory_service()
+
+
+@lazy.provides("session_service")
+def _build_session_service():
+    from google.adk.sessions import InMemorySessionService
+
+    # 4. Initialize the Session Service
+    return InMemorySessionService()
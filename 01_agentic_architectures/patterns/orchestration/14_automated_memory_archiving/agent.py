@@ -23,47 +23,78 @@ applications that require persistent and up-to-date memory.
 Use Case: A "Meeting Minutes Generator" agent that automatically archives key
 discussion points from a meeting (session) into long-term memory after each
 turn, ensuring no important details are lost.
-"""
 
-import os
+`root_agent`, `memory_service`, `memory_archiver`, `archive_queue` and
+`session_service` are built on first access (see `shared/lazy.py`). Call
+`await archive_queue.aclose()` before exiting so queued turns are archived.
+"""
 
-from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.sessions import InMemorySessionService
-from google.adk.memory import InMemoryMemoryService
-from google.genai import types
+from shared.lazy import LazyAttributes, require_api_key
 
-# Ensure the GOOGLE_API_KEY environment variable is set.
-if "GOOGLE_API_KEY" not in os.environ:
-    raise ValueError("GOOGLE_API_KEY environment variable not set.")
+lazy = LazyAttributes(__name__)
+__getattr__ = lazy.getattr
+__dir__ = lazy.dir
 
 
 async def auto_save_to_memory(callback_context):
-    """Automatically saves the current session to memory after each agent turn."""
-    await callback_context._invocation_context.memory_service.add_session_to_memory(
-        callback_context._invocation_context.session
+    """Queues the session for archiving after each agent turn.
+
+    The turn does not wait for ingestion: `archive_queue` archives the events
+    added since the previous archive in the background, coalescing turns of
+    the same session (see `shared/archive_queue.py`).
+    """
+    invocation_context = callback_context._invocation_context
+    await lazy.getattr("archive_queue").submit(
+        invocation_context.memory_service, invocation_context.session
+    )
+
+
+@lazy.provides("root_agent")
+def _build_root_agent():
+    require_api_key()
+
+    from google.adk.agents import LlmAgent
+    from shared.model_clients import get_model
+
+    # 1. Get the shared, pooled model
+    model = get_model()
+
+    # 2. Initialize the Agent with the auto-save callback
+    return LlmAgent(
+        model=model,
+        name="meeting_minutes_generator",
+        instruction="You are a meeting minutes generator. You will automatically archive key discussion points from the conversation into long-term memory.",
+        after_agent_callback=auto_save_to_memory,  # Saves after each turn!
     )
 
 
-# 1. Initialize the Model with standard retry configuration
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1.0,
-    http_status_codes=[500, 502, 503, 504],
-)
-model = Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config)
-
-# 2. Initialize the Memory Service
-memory_service = InMemoryMemoryService()
-
-# 3. Initialize the Session Service
-session_service = InMemorySessionService()
-
-# 4. Initialize the Agent with the auto-save callback
-root_agent = LlmAgent(
-    model=model,
-    name="meeting_minutes_generator",
-    instruction="You are a meeting minutes generator. You will automatically archive key discussion points from the conversation into long-term memory.",
-    after_agent_callback=auto_save_to_memory,  # Saves after each turn!
-)
+@lazy.provides("memory_service")
+def _build_memory_service():
+    from shared.vector_memory import create_memory_service
+
+    # 3. Initialize the Memory Service (vector search; MEMORY_BACKEND=keyword for the stock one)
+    return create_memory_service()
+
+
+@lazy.provides("memory_archiver")
+def _build_memory_archiver():
+    from shared.memory_archiving import MemoryArchiver
+
+    # Tracks a watermark per session and a content hash per archived event
+    return MemoryArchiver()
+
+
+@lazy.provides("archive_queue")
+def _build_archive_queue():
+    from shared.archive_queue import ArchiveQueue
+
+    # Archives in the background; await archive_queue.aclose() on shutdown
+    return ArchiveQueue(lazy.getattr("memory_archiver"), workers=2, max_sessions=1000)
+
+
+@lazy.provides("session_service")
+def _build_session_service():
+    from google.adk.sessions import InMemorySessionService
+
+    # 4. Initialize the Session Service
+    return InMemorySessionService()
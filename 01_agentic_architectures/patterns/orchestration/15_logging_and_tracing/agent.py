@@ -2,18 +2,11 @@
 
 import logging
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.genai import types
+from shared.model_clients import get_model
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
+logger = logging.getLogger(__name__)
 
 def get_flight_status(flight_number: str) -> str:
     """Gets the status of a given flight.
@@ -24,7 +17,8 @@ def get_flight_status(flight_number: str) -> str:
     Returns:
         The status of the flight.
     """
-    logging.info(f"Checking status of flight: {flight_number}")
+    # Lazy %-formatting: the message is only built if INFO is enabled.
+    logger.info("Checking status of flight: %s", flight_number)
     if flight_number == "UA123":
         return "On Time"
     elif flight_number == "DL456":
@@ -35,7 +29,7 @@ def get_flight_status(flight_number: str) -> str:
 
 root_agent = LlmAgent(
     name="flight_status_checker_agent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=get_model(),
     instruction="""Your task is to check the status of a flight.
 
     You MUST ALWAYS use the 'get_flight_status' tool to check the flight status.
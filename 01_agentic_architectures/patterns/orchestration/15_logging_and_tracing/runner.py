@@ -1,21 +1,33 @@
 """Runner for the flight status checker agent."""
 
 import asyncio
+import os
 from google.adk.runners import InMemoryRunner
 from google.adk.plugins.logging_plugin import LoggingPlugin
+from shared.response_cache import ResponseCachePlugin
+from shared.tracing import FileSpanExporter, OtlpHttpSpanExporter, TracingPlugin
 from .agent import root_agent
 
 async def main():
     """Runs the agent."""
-    runner = InMemoryRunner(
-        agent=root_agent,
-        plugins=[
-            LoggingPlugin()
-        ],
+    # Spans go to an OTLP collector when one is configured, otherwise to a
+    # local JSON-lines file. TRACE_SAMPLE_RATE controls head-based sampling.
+    endpoint = os.environ.get("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")
+    exporter = OtlpHttpSpanExporter(endpoint) if endpoint else FileSpanExporter("spans.jsonl")
+    tracing = TracingPlugin(
+        exporter, sample_rate=float(os.environ.get("TRACE_SAMPLE_RATE", "1.0"))
     )
+    plugins = [tracing, ResponseCachePlugin()]
+    # The console LoggingPlugin is still available for local debugging.
+    if os.environ.get("VERBOSE_LOGGING", "").lower() == "true":
+        plugins.insert(0, LoggingPlugin())
+
+    runner = InMemoryRunner(agent=root_agent, plugins=plugins)
 
     response = await runner.run_debug("What is the status of flight UA123?")
     print(response)
+    tracing.shutdown()
+    print(tracing.stats)
 
 if __name__ == "__main__":
     asyncio.run(main())
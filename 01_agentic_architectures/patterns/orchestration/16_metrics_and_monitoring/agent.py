@@ -1,58 +1,258 @@
 """An e-commerce inventory checker agent that demonstrates metrics and monitoring."""
 
 import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
 from google.adk.plugins.base_plugin import BasePlugin
 from google.adk.agents.base_agent import BaseAgent
 from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
 from google.adk.models.llm_request import LlmRequest
-from google.genai import types
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from shared.histogram import LatencyHistogram
+from shared.metrics_registry import MetricsRegistry
+from shared.metrics_registry import registry as default_registry
+from shared.model_clients import get_model
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
+# Agent runs, tool calls and model calls awaiting their after callback, each.
+# ADK skips those callbacks when a run raises, and has no agent error callback,
+# so such entries are only dropped once this many newer ones have started.
+MAX_AGENTS_IN_FLIGHT = 10_000
+
 class MetricsPlugin(BasePlugin):
-    """A custom plugin that collects and reports metrics."""
+    """A custom plugin that collects and reports metrics.
+
+    Besides the run counters, it pairs each `before_*` callback with its
+    `after_*` (or error) callback and records the elapsed time into
+    fixed-memory histograms per agent, per tool and per model. For streamed
+    model responses it also records time to first token.
+
+    In-flight calls are keyed so that concurrent invocations, and the
+    concurrent branches of a `ParallelAgent`, never pair up with each other:
+    agents and model calls by (invocation, agent), tools by function call id.
+    A model call answered by a later plugin's `before_model_callback` (a
+    cache hit or a budget refusal) never reaches `after_model_callback`; it
+    leaves the in-flight gauge when the next call replaces it or its run ends.
 
-    def __init__(self) -> None:
+    Everything is also recorded into a labelled `MetricsRegistry` (the
+    process-wide one by default), which can be scraped as OpenMetrics text.
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None) -> None:
         """Initialize the plugin with counters."""
         super().__init__(name="metrics_plugin")
+        registry = registry or default_registry
+        self._agent_runs = registry.counter("adk_agent_runs", "Agent runs.", ["agent"])
+        self._tool_calls = registry.counter(
+            "adk_tool_calls", "Completed tool calls.", ["agent", "tool", "status"]
+        )
+        self._model_requests = registry.counter(
+            "adk_model_requests", "Completed model calls.", ["agent", "model", "status"]
+        )
+        self._agent_seconds = registry.histogram(
+            "adk_agent_duration_seconds", "Agent run latency.", ["agent"]
+        )
+        self._tool_seconds = registry.histogram(
+            "adk_tool_duration_seconds", "Tool call latency.", ["tool"]
+        )
+        self._model_seconds = registry.histogram(
+            "adk_model_duration_seconds", "Model call latency.", ["model"]
+        )
+        self._ttft_seconds = registry.histogram(
+            "adk_model_time_to_first_token_seconds",
+            "Time to the first chunk of a streamed model response.",
+            ["model"],
+        )
+        self._model_in_flight = registry.gauge(
+            "adk_model_calls_in_flight", "Model calls awaiting a response.", ["model"]
+        )
         self.agent_run_count: int = 0
         self.tool_call_count: int = 0
         self.model_request_count: int = 0
+        self.error_count: int = 0
+        self.agent_latency: Dict[str, LatencyHistogram] = {}
+        self.tool_latency: Dict[str, LatencyHistogram] = {}
+        self.model_latency: Dict[str, LatencyHistogram] = {}
+        self.time_to_first_token: Dict[str, LatencyHistogram] = {}
+        self._agent_starts: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._tool_starts: "OrderedDict[str, float]" = OrderedDict()
+        # (invocation, agent) -> [model, start, first chunk seen]
+        self._model_calls: "OrderedDict[Tuple[str, str], List[Any]]" = OrderedDict()
 
     async def before_agent_callback(
         self, *, agent: BaseAgent, callback_context: CallbackContext
     ) -> None:
         """Count agent runs."""
         self.agent_run_count += 1
+        self._agent_runs.labels(agent=agent.name).inc()
+        _remember(self._agent_starts, (callback_context.invocation_id, agent.name), time.perf_counter())
+
+    async def after_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> None:
+        """Record agent run latency."""
+        started = self._agent_starts.pop((callback_context.invocation_id, agent.name), None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            _record(self.agent_latency, agent.name, elapsed)
+            self._agent_seconds.labels(agent=agent.name).observe(elapsed)
 
     async def before_tool_callback(
-        self, *, agent: LlmAgent, callback_context: CallbackContext, tool_name: str
+        self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext
     ) -> None:
         """Count tool calls."""
         self.tool_call_count += 1
+        _remember(self._tool_starts, tool_context.function_call_id, time.perf_counter())
+
+    async def after_tool_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: Dict[str, Any],
+        tool_context: ToolContext,
+        result: Dict,
+    ) -> None:
+        """Record tool call latency."""
+        started = self._tool_starts.pop(tool_context.function_call_id, None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            _record(self.tool_latency, tool.name, elapsed)
+            self._tool_seconds.labels(tool=tool.name).observe(elapsed)
+        self._tool_calls.labels(
+            agent=tool_context.agent_name, tool=tool.name, status="ok"
+        ).inc()
+
+    async def on_tool_error_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: Dict[str, Any],
+        tool_context: ToolContext,
+        error: Exception,
+    ) -> None:
+        """Count failed tool calls and forget their start time."""
+        self.error_count += 1
+        self._tool_starts.pop(tool_context.function_call_id, None)
+        self._tool_calls.labels(
+            agent=tool_context.agent_name, tool=tool.name, status="error"
+        ).inc()
 
     async def before_model_callback(
         self, *, callback_context: CallbackContext, llm_request: LlmRequest
     ) -> None:
         """Count LLM requests."""
         self.model_request_count += 1
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        model = llm_request.model or "unknown"
+        # A call still recorded under this key was short-circuited by a later plugin.
+        previous = self._model_calls.pop(key, None)
+        if previous is not None:
+            self._model_in_flight.labels(model=previous[0]).dec()
+        for evicted in _remember(self._model_calls, key, [model, time.perf_counter(), False]):
+            self._model_in_flight.labels(model=evicted[0]).dec()
+        self._model_in_flight.labels(model=model).inc()
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> None:
+        """Record model latency, and time to first token for streamed responses."""
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        call = self._model_calls.get(key)
+        if call is None:
+            return
+        model, started, first_seen = call
+        elapsed = time.perf_counter() - started
+        if not first_seen:
+            call[2] = True
+            if llm_response.partial:
+                _record(self.time_to_first_token, model, elapsed)
+                self._ttft_seconds.labels(model=model).observe(elapsed)
+        if not llm_response.partial:
+            del self._model_calls[key]
+            _record(self.model_latency, model, elapsed)
+            self._model_seconds.labels(model=model).observe(elapsed)
+            self._model_in_flight.labels(model=model).dec()
+            status = "error" if llm_response.error_code else "ok"
+            self._model_requests.labels(
+                agent=callback_context.agent_name, model=model, status=status
+            ).inc()
+
+    async def on_model_error_callback(
+        self,
+        *,
+        callback_context: CallbackContext,
+        llm_request: LlmRequest,
+        error: Exception,
+    ) -> None:
+        """Count failed model calls and forget their start time."""
+        self.error_count += 1
+        call = self._model_calls.pop(
+            (callback_context.invocation_id, callback_context.agent_name), None
+        )
+        model = call[0] if call else llm_request.model or "unknown"
+        if call:
+            self._model_in_flight.labels(model=model).dec()
+        self._model_requests.labels(
+            agent=callback_context.agent_name, model=model, status="error"
+        ).inc()
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        """Forgets calls of the run that never got an after callback."""
+        invocation_id = invocation_context.invocation_id
+        for key in [key for key in self._model_calls if key[0] == invocation_id]:
+            self._model_in_flight.labels(model=self._model_calls.pop(key)[0]).dec()
+        for key in [key for key in self._agent_starts if key[0] == invocation_id]:
+            del self._agent_starts[key]
+
+    def latency_summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Returns p50/p90/p99/max (in seconds) for every recorded histogram."""
+        return {
+            "agent": {name: h.summary() for name, h in self.agent_latency.items()},
+            "tool": {name: h.summary() for name, h in self.tool_latency.items()},
+            "model": {name: h.summary() for name, h in self.model_latency.items()},
+            "time_to_first_token": {
+                name: h.summary() for name, h in self.time_to_first_token.items()
+            },
+        }
 
     def report_metrics(self):
         """Log the collected metrics."""
         logging.info(f"[Metrics] Agent runs: {self.agent_run_count}")
         logging.info(f"[Metrics] Tool calls: {self.tool_call_count}")
         logging.info(f"[Metrics] Model requests: {self.model_request_count}")
+        logging.info(f"[Metrics] Errors: {self.error_count}")
+        for kind, histograms in self.latency_summary().items():
+            for name, summary in histograms.items():
+                logging.info(
+                    f"[Metrics] {kind} latency {name}: n={summary['count']} "
+                    f"p50={summary['p50'] * 1000:.1f}ms p90={summary['p90'] * 1000:.1f}ms "
+                    f"p99={summary['p99'] * 1000:.1f}ms max={summary['max'] * 1000:.1f}ms"
+                )
 
 
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
+def _remember(entries: "OrderedDict[Any, Any]", key: Any, value: Any) -> List[Any]:
+    """Stores an in-flight entry; returns the oldest ones dropped to stay bounded."""
+    entries[key] = value
+    entries.move_to_end(key)
+    evicted = []
+    while len(entries) > MAX_AGENTS_IN_FLIGHT:
+        evicted.append(entries.popitem(last=False)[1])
+    return evicted
+
+
+def _record(histograms: Dict[str, LatencyHistogram], name: str, seconds: float) -> None:
+    histogram = histograms.get(name)
+    if histogram is None:
+        histogram = histograms[name] = LatencyHistogram()
+    histogram.record(seconds)
+
 
 def check_inventory(product_id: str) -> str:
     """Checks the inventory of a product.
@@ -71,7 +271,7 @@ def check_inventory(product_id: str) -> str:
 
 root_agent = LlmAgent(
     name="inventory_checker_agent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=get_model(),
     instruction="""You are an inventory checker agent. Your task is to check the inventory of a product.
 
     You MUST ALWAYS use the 'check_inventory' tool to check the inventory of a product.
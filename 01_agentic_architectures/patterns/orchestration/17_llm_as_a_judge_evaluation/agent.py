@@ -1,27 +1,19 @@
 """An agent that demonstrates LLM-as-a-judge evaluation for code generation."""
 
 from google.adk.agents import LlmAgent, SequentialAgent
-from google.adk.models.google_llm import Gemini
-from google.genai import types
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
+from shared.model_clients import get_model
 
 # Code Generation Agent
 code_generation_agent = LlmAgent(
     name="code_generation_agent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=get_model(),
     instruction="""You are a code generation agent. Your task is to write a Python function based on the user's prompt.""",
 )
 
 # LLM-as-a-Judge Agent
 code_reviewer_agent = LlmAgent(
     name="code_reviewer_agent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=get_model(),
     instruction="""You are a code reviewer agent. Your task is to evaluate a Python function based on the following criteria:
     - Correctness
     - Readability
@@ -1,14 +1,23 @@
 """Runner for the LLM-as-a-judge evaluation for code generation."""
 
 import asyncio
+import os
 from google.adk.runners import InMemoryRunner
+from shared.response_cache import ResponseCachePlugin
 from .agent import root_agent
 
 async def main():
     """Runs the agent."""
-    runner = InMemoryRunner(agent=root_agent)
+    # Eval runs repeat the same prompts; share answers across runs on disk.
+    # The file sits next to this pattern unless RESPONSE_CACHE_PATH says otherwise.
+    disk_path = os.environ.get(
+        "RESPONSE_CACHE_PATH", os.path.join(os.path.dirname(__file__), "response_cache.sqlite")
+    )
+    cache = ResponseCachePlugin(disk_path=disk_path)
+    runner = InMemoryRunner(agent=root_agent, plugins=[cache])
     response = await runner.run_debug("Write a Python function that calculates the factorial of a number.")
     print(response)
+    print(cache.report())
 
 if __name__ == "__main__":
     asyncio.run(main())
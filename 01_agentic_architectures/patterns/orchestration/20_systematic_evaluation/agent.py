@@ -1,15 +1,7 @@
 """A home automation agent for systematic evaluation."""
 
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.genai import types
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,
-    exp_base=7,
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],
-)
+from shared.model_clients import get_model
 
 def set_device_status(location: str, device_id: str, status: str) -> dict:
     """Sets the status of a smart home device.
@@ -25,12 +17,12 @@ def set_device_status(location: str, device_id: str, status: str) -> dict:
     print(f"Tool Call: Setting {device_id} in {location} to {status}")
     return {
         "success": True,
-        "message": f"Successfully set the {device_id} in {location} to {status.lower()}.
+        "message": f"Successfully set the {device_id} in {location} to {status.lower()}.",
     }
 
 
 root_agent = LlmAgent(
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=get_model(),
     name="home_automation_agent",
     description="An agent to control smart devices in a home.",
     instruction="""You are a home automation assistant. You control ALL smart devices in the house.
@@ -1,15 +1,7 @@
 import os
 from google.adk.agents import LlmAgent
 from google.adk.agents.remote_a2a_agent import RemoteA2aAgent, AGENT_CARD_WELL_KNOWN_PATH
-from google.adk.models.google_llm import Gemini
-from google.genai import types
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP errors
-)
+from shared.model_clients import get_model
 
 # Define ports for the A2A agents
 PRODUCT_CATALOG_PORT = 8001
@@ -36,7 +28,7 @@ remote_shipping_agent = RemoteA2aAgent(
 )
 
 customer_support_agent = LlmAgent(
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=get_model(),
     name="customer_support_agent",
     description="A customer support assistant that helps customers with product inquiries, stock, and shipping.",
     instruction="""
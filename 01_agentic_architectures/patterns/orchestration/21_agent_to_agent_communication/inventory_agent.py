@@ -1,13 +1,5 @@
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.genai import types
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP errors
-)
+from shared.model_clients import get_model
 
 def get_stock_level(product_name: str) -> str:
     """Get the stock level and restocking schedule for a given product.
@@ -36,7 +28,7 @@ def get_stock_level(product_name: str) -> str:
         return f"Stock information not available for {product_name}"
 
 inventory_agent = LlmAgent(
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=get_model(),
     name="inventory_agent",
     description="Agent that provides stock levels and restocking schedules.",
     instruction="""
@@ -1,13 +1,5 @@
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.genai import types
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP errors
-)
+from shared.model_clients import get_model
 
 def get_product_info(product_name: str) -> str:
     """Get product information for a given product.
@@ -41,7 +33,7 @@ def get_product_info(product_name: str) -> str:
 # Create the Product Catalog Agent
 # This agent specializes in providing product information from the vendor's catalog
 product_catalog_agent = LlmAgent(
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=get_model(),
     name="product_catalog_agent",
     description="External vendor's product catalog agent that provides product information and availability.",
     instruction="""
@@ -1,13 +1,5 @@
 from google.adk.agents import LlmAgent
-from google.adk.models.google_llm import Gemini
-from google.genai import types
-
-retry_config = types.HttpRetryOptions(
-    attempts=5,  # Maximum retry attempts
-    exp_base=7,  # Delay multiplier
-    initial_delay=1,
-    http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP errors
-)
+from shared.model_clients import get_model
 
 def get_delivery_estimate(product_name: str, destination: str) -> str:
     """Get the delivery estimate for a given product to a specific destination.
@@ -56,7 +48,7 @@ def get_tracking_info(order_id: str) -> str:
         return f"Tracking information not found for order {order_id}"
 
 shipping_agent = LlmAgent(
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=get_model(),
     name="shipping_agent",
     description="Agent that provides delivery estimates and tracking information.",
     instruction="""
@@ -30,3 +30,11 @@ print("\nSimulating agent interaction:")
 response = my_customer_agent.process_message("What is your return policy?")
 print(response)
 
+# Expose agent metrics in the serving app, not from this script: it exits
+# once the simulation above finishes, and this placeholder agent runs no ADK
+# plugins. In the app that runs the deployed ADK agent (for example the FastAPI
+# app behind `adk api_server`), install `MetricsPlugin` and `ToolCountPlugin`
+# on its runner; both record into the process-wide registry, which that app
+# serves at /metrics:
+#     from shared.metrics_registry import asgi_app
+#     app.mount("/metrics", asgi_app())
@@ -0,0 +1,179 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Turn latency of `14_automated_memory_archiving` with inline vs queued archiving.
+
+Runs `--sessions` meetings of `--turns` turns concurrently through the
+pattern's agent on `OfflineModel`, each model call taking `--model-ms`. The
+memory service is `VectorMemoryService` with `--ingest-ms` of simulated
+embedding latency per ingestion call. The variants are:
+
+* `inline`: the turn awaits `MemoryArchiver.archive`.
+* `queued/<policy>`: the pattern's `auto_save_to_memory` submits to an
+  `ArchiveQueue` with `--workers` workers, `--max-sessions` slots and the
+  given overflow policy. The queue is drained with `aclose()` at the end.
+
+It reports p50/p95 turn latency, ingestion calls, turns coalesced and
+dropped, the deepest the queue got, the longest ingestion lag, how long
+the final drain took, and the memories stored. `lost` counts memories that
+`inline` stored and the variant did not. With "block", it must be zero.
+The overflow policies only act once more sessions are active than the queue
+has slots; the second command below overloads it.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.archive_queue_benchmark
+    python -m benchmarks.archive_queue_benchmark --sessions 20 --max-sessions 8
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, print_table, summarize_latencies, write_json
+
+ensure_importable()
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from shared.archive_queue import ArchiveQueue
+from shared.memory_archiving import MemoryArchiver
+from shared.offline_model import Distribution, OfflineModel, use_offline_model
+from shared.vector_memory import VectorMemoryService
+
+APP_NAME = "archive_queue_benchmark"
+
+
+class SlowMemoryService(VectorMemoryService):
+    """`VectorMemoryService` with a fixed delay per ingestion call, like a remote embedder."""
+
+    def __init__(self, ingest_ms: float) -> None:
+        super().__init__(index_threshold=0)
+        self.ingest_ms = ingest_ms
+        self.calls = 0
+
+    async def add_events_to_memory(self, session, events) -> None:
+        self.calls += 1
+        await asyncio.sleep(self.ingest_ms / 1000)
+        await super().add_events_to_memory(session, events)
+
+
+async def meeting(runner: Runner, index: int, turns: int, latencies: List[float]) -> None:
+    user_id = f"user-{index}"
+    session = await runner.session_service.create_session(app_name=APP_NAME, user_id=user_id)
+    for turn in range(turns):
+        content = types.Content(role="user", parts=[types.Part(
+            text=f"Meeting {index} item {turn}: owner {turn % 7} updates the budget."
+        )])
+        started = time.perf_counter()
+        async for _ in runner.run_async(user_id=user_id, session_id=session.id, new_message=content):
+            pass
+        latencies.append(time.perf_counter() - started)
+
+
+async def simulate(module, variant: str, args: argparse.Namespace) -> Dict[str, Any]:
+    agent = module.root_agent
+    service = SlowMemoryService(args.ingest_ms)
+    module.memory_archiver = archiver = MemoryArchiver()
+    queue = None
+    if variant == "inline":
+        async def archive_inline(callback_context):
+            invocation_context = callback_context._invocation_context
+            await archiver.archive(invocation_context.memory_service, invocation_context.session)
+
+        agent.after_agent_callback = archive_inline
+    else:
+        queue = module.archive_queue = ArchiveQueue(
+            archiver, workers=args.workers, max_sessions=args.max_sessions, overflow=variant.split("/")[1]
+        )
+        agent.after_agent_callback = module.auto_save_to_memory
+
+    runner = Runner(
+        app_name=APP_NAME, agent=agent, session_service=InMemorySessionService(), memory_service=service
+    )
+    latencies: List[float] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(meeting(runner, index, args.turns, latencies) for index in range(args.sessions)))
+    turns_s = time.perf_counter() - started
+    drain_s = 0.0
+    if queue is not None:
+        started = time.perf_counter()
+        await queue.aclose(timeout=args.drain_timeout)
+        drain_s = time.perf_counter() - started
+    await runner.close()
+    summary = summarize_latencies(latencies)
+    row = {
+        "variant": variant,
+        "turn_p50_ms": summary["p50_ms"],
+        "turn_p95_ms": summary["p95_ms"],
+        "turns_s": turns_s,
+        "ingest_calls": service.calls,
+        "stored": sum(partition.size for partition in service._partitions.values()),
+    }
+    if queue is not None:
+        row.update({
+            "coalesced": queue.stats.coalesced,
+            "dropped": queue.stats.dropped,
+            "max_depth": queue.stats.max_depth,
+            "max_lag_ms": queue.stats.max_lag_s * 1000,
+            "drain_ms": drain_s * 1000,
+        })
+    return row
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=5, help="Meetings running at once.")
+    parser.add_argument("--turns", type=int, default=20, help="Turns per meeting.")
+    parser.add_argument("--model-ms", type=float, default=20.0, help="Latency of each model call.")
+    parser.add_argument("--ingest-ms", type=float, default=25.0, help="Latency of each ingestion call.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-sessions", type=int, default=64, help="Queue slots.")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument(
+        "--variants", nargs="+",
+        default=["inline", "queued/block", "queued/drop_newest", "queued/drop_oldest"],
+    )
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("GOOGLE_API_KEY", "archive-queue-benchmark")
+    module = importlib.import_module("14_automated_memory_archiving.agent")
+    use_offline_model(module.root_agent, OfflineModel(
+        output_tokens=Distribution.constant(40), latency_ms=Distribution.constant(args.model_ms)
+    ))
+    logging.getLogger().setLevel("WARNING")
+    rows = [await simulate(module, variant, args) for variant in args.variants]
+    expected = next((row["stored"] for row in rows if row["variant"] == "inline"), None)
+    for row in rows:
+        row["lost"] = None if expected is None else expected - row["stored"]
+    print_table(rows, [
+        "variant", "turn_p50_ms", "turn_p95_ms", "turns_s", "ingest_calls", "coalesced", "dropped",
+        "max_depth", "max_lag_ms", "drain_ms", "stored", "lost",
+    ])
+    if args.json_path:
+        write_json(args.json_path, rows)
+    if any(row["variant"] == "queued/block" and row["lost"] for row in rows):
+        sys.exit("The blocking queue lost memories.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,155 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-turn memory archiving cost of `14_automated_memory_archiving` as meetings grow.
+
+Drives the pattern's agent on `OfflineModel` through a meeting of `--turns`
+turns. About one user message in `--repeat-every` is a stock phrase ("Agreed.",
+"Next item, please.") that the meeting has already heard. Two archiving
+callbacks are compared, each with the stock keyword memory service and with
+`VectorMemoryService`:
+
+* `full`: `add_session_to_memory(session)` after every turn, as the pattern
+  did before `shared/memory_archiving.py`.
+* `incremental`: `MemoryArchiver.archive`, which the pattern's
+  `auto_save_to_memory` runs through its `ArchiveQueue`. It hands over only
+  the events since the session's watermark and skips repeated content. It is
+  awaited inline here so the callback's latency is the archiving cost; see
+  `benchmarks/archive_queue_benchmark.py` for the queued turn latency.
+
+It reports the events and text bytes handed to the memory service per turn,
+the callback's p50 latency over the first and last `--window` turns, and the
+memories stored at the end. A constant per-turn cost shows up as `late_p50_ms`
+close to `early_p50_ms`.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.archiving_benchmark --turns 300
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, print_table, summarize_latencies, write_json
+
+ensure_importable()
+
+from google.adk.memory import InMemoryMemoryService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from shared.memory_archiving import MemoryArchiver, _text
+from shared.offline_model import Distribution, OfflineModel, use_offline_model
+from shared.vector_memory import VectorMemoryService
+
+APP_NAME = "archiving_benchmark"
+USER_ID = "chair"
+STOCK_PHRASES = ("Agreed.", "Next item, please.", "Can everyone hear me?", "Let's take that offline.")
+
+
+def message(turn: int, repeat_every: int) -> str:
+    if turn % repeat_every == repeat_every - 1:
+        return STOCK_PHRASES[turn // repeat_every % len(STOCK_PHRASES)]
+    return f"Item {turn}: the team discussed budget line {turn * 7 % 97} and owner {turn % 13}."
+
+
+def stored(service) -> int:
+    if isinstance(service, VectorMemoryService):
+        return sum(partition.size for partition in service._partitions.values())
+    return sum(len(events) for sessions in service._session_events.values() for events in sessions.values())
+
+
+async def simulate(module, backend: str, mode: str, args: argparse.Namespace) -> Dict[str, Any]:
+    agent = module.root_agent
+    service = InMemoryMemoryService() if backend == "keyword" else VectorMemoryService(index_threshold=0)
+    archiver = MemoryArchiver()
+    handed = {"events": 0, "bytes": 0}
+    latencies: List[float] = []
+
+    async def full_save(callback_context):
+        session = callback_context._invocation_context.session
+        texts = [_text(event) for event in session.events]
+        handed["events"] += sum(1 for text in texts if text)
+        handed["bytes"] += sum(len(text.encode()) for text in texts)
+        await callback_context._invocation_context.memory_service.add_session_to_memory(session)
+
+    async def incremental_save(callback_context):
+        invocation_context = callback_context._invocation_context
+        await archiver.archive(invocation_context.memory_service, invocation_context.session)
+
+    save = full_save if mode == "full" else incremental_save
+
+    async def timed(callback_context):
+        started = time.perf_counter()
+        await save(callback_context)
+        latencies.append(time.perf_counter() - started)
+
+    agent.after_agent_callback = timed
+    runner = Runner(
+        app_name=APP_NAME, agent=agent, session_service=InMemorySessionService(), memory_service=service
+    )
+    session = await runner.session_service.create_session(app_name=APP_NAME, user_id=USER_ID)
+    for turn in range(args.turns):
+        content = types.Content(role="user", parts=[types.Part(text=message(turn, args.repeat_every))])
+        async for _ in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=content):
+            pass
+    await runner.close()
+    if mode == "incremental":
+        handed = {"events": archiver.stats.events, "bytes": archiver.stats.bytes}
+    return {
+        "backend": backend,
+        "mode": mode,
+        "turns": args.turns,
+        "events_per_turn": handed["events"] / args.turns,
+        "kb_per_turn": handed["bytes"] / args.turns / 1024,
+        "early_p50_ms": summarize_latencies(latencies[:args.window])["p50_ms"],
+        "late_p50_ms": summarize_latencies(latencies[-args.window:])["p50_ms"],
+        "stored": stored(service),
+        "duplicates_skipped": archiver.stats.duplicates,
+    }
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--repeat-every", type=int, default=5, help="One message in N is a stock phrase.")
+    parser.add_argument("--window", type=int, default=30, help="Turns in the early and late latency windows.")
+    parser.add_argument("--backends", nargs="+", default=["keyword", "vector"])
+    parser.add_argument("--modes", nargs="+", default=["full", "incremental"])
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("GOOGLE_API_KEY", "archiving-benchmark")
+    module = importlib.import_module("14_automated_memory_archiving.agent")
+    use_offline_model(module.root_agent, OfflineModel(output_tokens=Distribution.constant(40)))
+    logging.getLogger().setLevel("WARNING")
+    rows = [
+        await simulate(module, backend, mode, args) for backend in args.backends for mode in args.modes
+    ]
+    print_table(rows, [
+        "backend", "mode", "turns", "events_per_turn", "kb_per_turn",
+        "early_p50_ms", "late_p50_ms", "stored", "duplicates_skipped",
+    ])
+    if args.json_path:
+        write_json(args.json_path, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
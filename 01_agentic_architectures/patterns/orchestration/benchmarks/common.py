@@ -0,0 +1,99 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Helpers shared by the benchmark scripts: percentiles, tables and baselines."""
+
+import json
+import math
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Sequence
+
+ORCHESTRATION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def ensure_importable() -> None:
+    """Puts the orchestration directory on `sys.path` so patterns can be imported."""
+    if ORCHESTRATION_DIR not in sys.path:
+        sys.path.insert(0, ORCHESTRATION_DIR)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Returns the q-th percentile (0-100) using linear interpolation."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    if low == high:
+        return ordered[low]
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_latencies(latencies_s: Sequence[float]) -> Dict[str, float]:
+    """Summarizes a list of latencies (in seconds) as p50/p95/p99/max in milliseconds."""
+    return {
+        "p50_ms": percentile(latencies_s, 50) * 1000,
+        "p95_ms": percentile(latencies_s, 95) * 1000,
+        "p99_ms": percentile(latencies_s, 99) * 1000,
+        "max_ms": max(latencies_s) * 1000 if latencies_s else float("nan"),
+    }
+
+
+def print_table(rows: Iterable[Dict[str, Any]], columns: List[str]) -> None:
+    """Prints rows as a fixed-width table, formatting floats to two decimals."""
+    rendered = [
+        [f"{row.get(column, ''):.2f}" if isinstance(row.get(column), float) else str(row.get(column, ""))
+         for column in columns]
+        for row in rows
+    ]
+    widths = [
+        max([len(column)] + [len(row[index]) for row in rendered])
+        for index, column in enumerate(columns)
+    ]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    print("  ".join("-" * width for width in widths))
+    for row in rendered:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+def write_json(path: str, payload: Any) -> None:
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+
+
+def find_regressions(
+    current: Dict[str, Dict[str, float]],
+    baseline_path: str,
+    metric: str,
+    tolerance: float,
+) -> List[str]:
+    """Compares `metric` per key against a baseline JSON file.
+
+    Returns:
+        One human-readable line per key whose metric grew by more than
+        `tolerance` (e.g. 0.25 for 25%) over the baseline.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for key, result in current.items():
+        previous = baseline.get(key, {}).get(metric)
+        value = result.get(metric)
+        if previous is None or value is None or previous <= 0:
+            continue
+        if value > previous * (1 + tolerance):
+            regressions.append(f"{key}: {metric} {previous:.2f} -> {value:.2f}")
+    return regressions
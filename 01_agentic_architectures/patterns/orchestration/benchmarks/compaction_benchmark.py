@@ -0,0 +1,224 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Prompt size and summarization calls under different compaction policies.
+
+Runs a `09_context_compaction`-shaped agent on `OfflineModel` through three
+conversations:
+
+* `articles`: a few turns, each pasting a long article (`--article-tokens`).
+* `chatty`: many one-line turns.
+* `long`: `--long-turns` turns of a paragraph each.
+* `tools`: short questions, each answered with a `get_market_data` call
+  whose large response often repeats.
+
+Each conversation runs under these compaction policies:
+
+* `turns`: `EventsCompactionConfig(compaction_interval=5, overlap_size=2)`,
+  as the pattern used to.
+* `tokens`: `TokenBudgetCompactionPlugin` with `--high-water` and
+  `--overlap-tokens`.
+* `tree`: `SummaryTreeCompactionPlugin` with `--high-water` and `--fan-out`.
+* `turns+pre` and `tree+pre`: the same, with the summarizer wrapped in the
+  local `ExtractiveSummarizer` pre-pass.
+
+It reports the agent's model calls and the summarization calls, also per 100
+turns, and the prompt tokens sent to the summarizer (`summary_input`). For
+`+pre` policies, `local_rounds` counts compactions done without a model. It reports the mean prompt tokens the model reported, over the whole
+run and over its last tenth (`late_prompt`), which shows whether prompts
+keep growing. It also reports the maximum prompt and how many calls went
+over `--context-window`. Runner-scheduled compactions are awaited before the
+next turn, so every policy sees the same history. With `--sessions 2`, each
+conversation is replayed in a second session of the same app, which shows
+the tree's summary cache at work.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.compaction_benchmark
+"""
+
+import argparse
+import asyncio
+import random
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, print_table, write_json
+
+ensure_importable()
+
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App, EventsCompactionConfig
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.runners import InMemoryRunner
+
+from benchmarks.pattern_benchmark import run_turn
+from shared.extractive_compaction import ExtractiveSummarizer
+from shared.offline_model import Distribution, OfflineModel
+from shared.token_accounting import COMPACTION_AGENT, TokenAccountingPlugin
+from shared.summary_tree import SummaryTreeCompactionPlugin
+from shared.token_compaction import TokenBudgetCompactionPlugin
+
+APP_NAME = "compaction_benchmark"
+
+# Short market words: one or two estimated tokens each.
+WORDS = ("rate", "yield", "bond", "stock", "fed", "cut", "oil", "price", "bank", "risk", "gain", "loss")
+
+
+class PromptSizes(BasePlugin):
+    """Records the prompt tokens the model reports for every agent call."""
+
+    def __init__(self) -> None:
+        super().__init__(name="prompt_sizes")
+        self.sizes: List[int] = []
+
+    async def after_model_callback(self, *, callback_context, llm_response) -> None:
+        if not llm_response.partial and llm_response.usage_metadata is not None:
+            self.sizes.append(llm_response.usage_metadata.prompt_token_count or 0)
+        return None
+
+
+def get_market_data(ticker: str) -> dict:
+    """Returns quotes, fundamentals and recent headlines for a ticker."""
+    index = sum(map(ord, ticker)) % 3
+    return {
+        "status": "success",
+        "ticker": ticker,
+        "price": 100.0 + index,
+        "history": [{"day": day, "close": 100.0 + index + day / 10} for day in range(30)],
+        "fundamentals": {f"metric_{field}": field * 1.5 for field in range(25)},
+        "headlines": [f"{ticker} {WORDS[(day + index) % len(WORDS)]} story {day}" for day in range(10)],
+    }
+
+
+def conversation(workload: str, args: argparse.Namespace) -> List[str]:
+    rng = random.Random(11)
+
+    def words(tokens: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(tokens))
+
+    if workload == "articles":
+        return [
+            f"Analyze this article: {words(args.article_tokens)}" for _ in range(args.article_turns)
+        ]
+    if workload == "tools":
+        return [f"How is {WORDS[index % 3]} doing today?" for index in range(args.chatty_turns)]
+    if workload == "long":
+        return [f"Note {index}: {words(args.paragraph_tokens)}" for index in range(args.long_turns)]
+    return [f"Quick question {index}: {words(12)}?" for index in range(args.chatty_turns)]
+
+
+def build_app(
+    policy: str, workload: str, args: argparse.Namespace, model: OfflineModel, sizes: PromptSizes
+):
+    tokens = TokenAccountingPlugin()
+    summarizer = tokens.metered_summarizer(
+        OfflineModel(output_tokens=Distribution.constant(args.summary_tokens), call_tools=False)
+    )
+    pre = None
+    if policy.endswith("+pre"):
+        policy = policy[: -len("+pre")]
+        summarizer = pre = ExtractiveSummarizer(inner=summarizer)
+    agent = LlmAgent(
+        model=model,
+        name="financial_news_analyst",
+        instruction="You are a financial news analyst.",
+        tools=[get_market_data] if workload == "tools" else [],
+    )
+    plugins = [tokens, sizes]
+    config = None
+    if policy == "turns":
+        config = EventsCompactionConfig(compaction_interval=5, overlap_size=2, summarizer=summarizer)
+    elif policy == "tree":
+        plugins.append(SummaryTreeCompactionPlugin(
+            summarizer=summarizer,
+            high_water_tokens=args.high_water,
+            fan_out=args.fan_out,
+        ))
+    else:
+        plugins.append(TokenBudgetCompactionPlugin(
+            summarizer=summarizer,
+            high_water_tokens=args.high_water,
+            overlap_tokens=args.overlap_tokens,
+        ))
+    app = App(name=APP_NAME, root_agent=agent, plugins=plugins, events_compaction_config=config)
+    return app, tokens, pre
+
+
+async def simulate(policy: str, workload: str, args: argparse.Namespace) -> Dict[str, Any]:
+    model = OfflineModel(
+        output_tokens=Distribution.constant(args.reply_tokens), call_tools=workload == "tools"
+    )
+    sizes = PromptSizes()
+    app, tokens, pre = build_app(policy, workload, args, model, sizes)
+    runner = InMemoryRunner(app=app)
+    for _ in range(args.sessions):
+        session = await runner.session_service.create_session(app_name=APP_NAME, user_id="user")
+        for text in conversation(workload, args):
+            await run_turn(runner, "user", session.id, text)
+            pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            await asyncio.gather(*pending)
+    await runner.close()
+    summaries = tokens.by_agent.get(COMPACTION_AGENT)
+    summary_calls = summaries.calls if summaries else 0
+    late = sizes.sizes[-max(1, len(sizes.sizes) // 10):]
+    return {
+        "workload": workload,
+        "policy": policy,
+        "model_calls": len(sizes.sizes),
+        "summaries": summary_calls,
+        "per_100_turns": summary_calls * 100 / len(sizes.sizes),
+        "summary_input": summaries.prompt_tokens if summaries else 0,
+        "local_rounds": pre.stats.local_rounds if pre else "",
+        "mean_prompt": sum(sizes.sizes) / len(sizes.sizes),
+        "late_prompt": sum(late) / len(late),
+        "max_prompt": max(sizes.sizes),
+        "over_window": sum(size > args.context_window for size in sizes.sizes),
+    }
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--article-turns", type=int, default=8)
+    parser.add_argument("--article-tokens", type=int, default=3000)
+    parser.add_argument("--chatty-turns", type=int, default=60)
+    parser.add_argument("--long-turns", type=int, default=300)
+    parser.add_argument("--paragraph-tokens", type=int, default=150)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--summary-tokens", type=int, default=400)
+    parser.add_argument("--high-water", type=int, default=8000)
+    parser.add_argument("--overlap-tokens", type=int, default=1000)
+    parser.add_argument("--fan-out", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=1, help="Sessions per conversation.")
+    parser.add_argument("--context-window", type=int, default=12000)
+    parser.add_argument("--workloads", nargs="+", default=["articles", "chatty", "long", "tools"])
+    parser.add_argument(
+        "--policies", nargs="+", default=["turns", "turns+pre", "tokens", "tree", "tree+pre"]
+    )
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for workload in args.workloads:
+        for policy in args.policies:
+            rows.append(await simulate(policy, workload, args))
+    print_table(rows, [
+        "workload", "policy", "model_calls", "summaries", "per_100_turns", "summary_input", "local_rounds",
+        "mean_prompt", "late_prompt", "max_prompt", "over_window",
+    ])
+    if args.json_path:
+        write_json(args.json_path, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
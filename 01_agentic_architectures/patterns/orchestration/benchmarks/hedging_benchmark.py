@@ -0,0 +1,110 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures hedged requests on the `03_parallel_execution` fan-out.
+
+The pattern's `root_agent` runs through the real pooled `Gemini` client against
+a local `StubGeminiServer` whose latency has a long tail. Each turn fans out to
+two researchers and then runs the aggregator, so the turn pays for the slower
+researcher. The benchmark runs the same turns with and without `HedgedModel`
+on the researchers and reports turn latency, hedge rate and hedge wins.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.hedging_benchmark --turns 200 --tail-rate 0.03
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import ensure_importable, print_table, summarize_latencies
+
+ensure_importable()
+
+from google.adk.runners import InMemoryRunner
+
+from benchmarks.pattern_benchmark import run_turn
+from shared.hedging import HedgedModel, HedgePolicy
+from shared.model_clients import get_model
+from shared.offline_model import use_offline_model
+from shared.stub_server import FaultPlan, StubGeminiServer
+
+
+async def run_variant(root_agent, turns: int, warmup: int) -> List[float]:
+    """Runs `warmup + turns` turns, each in a fresh session, and returns latencies."""
+    runner = InMemoryRunner(agent=root_agent, app_name="hedging_benchmark")
+    latencies: List[float] = []
+    for turn in range(warmup + turns):
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id="benchmark"
+        )
+        started = time.perf_counter()
+        await run_turn(runner, session.user_id, session.id, f"research topic {turn}")
+        if turn >= warmup:
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--tail-rate", type=float, default=0.03)
+    parser.add_argument("--tail-latency-ms", type=float, default=400.0)
+    parser.add_argument("--percentile", type=float, default=95.0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("GOOGLE_API_KEY", "hedging-benchmark")
+    plan = FaultPlan(
+        latency_ms=args.latency_ms,
+        tail_rate=args.tail_rate,
+        tail_latency_ms=args.tail_latency_ms,
+        seed=11,
+    )
+    async with StubGeminiServer(plan) as server:
+        os.environ["GOOGLE_GEMINI_BASE_URL"] = server.base_url
+        from importlib import import_module
+
+        pattern = import_module("03_parallel_execution.agent")
+        logging.getLogger().setLevel(logging.WARNING)
+        researchers = pattern.parallel_research_team
+
+        rows: List[Dict[str, Any]] = []
+        use_offline_model(researchers, get_model())
+        row = {"variant": "plain", "hedge_rate": 0.0, "hedge_wins": 0}
+        row.update(summarize_latencies(await run_variant(pattern.root_agent, args.turns, args.warmup)))
+        rows.append(row)
+
+        hedged = HedgedModel.wrap(get_model(), HedgePolicy(percentile=args.percentile))
+        use_offline_model(researchers, hedged)
+        latencies = await run_variant(pattern.root_agent, args.turns, args.warmup)
+        row = {
+            "variant": f"hedged p{args.percentile:g}",
+            "hedge_rate": hedged.stats.hedge_rate,
+            "hedge_wins": hedged.stats.hedge_wins,
+        }
+        row.update(summarize_latencies(latencies))
+        rows.append(row)
+
+    print_table(rows, ["variant", "p50_ms", "p95_ms", "p99_ms", "max_ms", "hedge_rate", "hedge_wins"])
+    print(f"\n{hedged.stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
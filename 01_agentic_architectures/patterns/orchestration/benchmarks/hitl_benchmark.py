@@ -0,0 +1,157 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Memory and resume latency of paused `06_human_in_the_loop` invocations.
+
+Drives the `06_human_in_the_loop` app on `OfflineModel` until `--paused`
+posts are waiting for approval, then approves them all. The run is repeated
+with three session services:
+
+* `memory`: `InMemorySessionService`, the paused sessions held as objects.
+* `parked`: `SpillingSessionService` with snapshots kept in memory.
+* `spilled`: `SpillingSessionService` with a zero memory budget, so every
+  snapshot but the latest goes to SQLite.
+
+It reports the Python heap held per paused invocation (tracemalloc), the
+snapshot and JSON size per session, and p50/p95 latency of the resumed turn,
+which includes restoring a parked session.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.hitl_benchmark --paused 1000
+"""
+
+import argparse
+import asyncio
+import gc
+import importlib
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.common import ensure_importable, print_table, summarize_latencies, write_json
+
+ensure_importable()
+
+from google.adk.runners import Runner
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai import types
+
+from shared.offline_model import Distribution, OfflineModel, use_offline_model
+from shared.paused_sessions import SnapshotStore, SpillingSessionService, msgpack, zstandard
+
+APP_NAME = "SocialMediaManager"
+
+
+def build_service(mode: str, directory: str):
+    if mode == "memory":
+        return InMemorySessionService()
+    if mode == "parked":
+        return SpillingSessionService(SnapshotStore(max_resident_bytes=2**40))
+    return SpillingSessionService(
+        SnapshotStore(os.path.join(directory, "paused.db"), max_resident_bytes=0)
+    )
+
+
+async def pause(runner: Runner, user_id: str, text: str) -> Tuple[str, str, str, str]:
+    """Runs a post until it waits for approval; returns what resuming needs."""
+    session = await runner.session_service.create_session(app_name=APP_NAME, user_id=user_id)
+    message = types.Content(role="user", parts=[types.Part(text=text)])
+    confirmation = invocation_id = None
+    async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+        for call in event.get_function_calls():
+            if call.id in (event.long_running_tool_ids or ()):
+                confirmation, invocation_id = call, event.invocation_id
+    if confirmation is None:
+        raise RuntimeError(f"Post {text!r} did not pause for approval.")
+    return session.id, invocation_id, confirmation.id, confirmation.name
+
+
+async def resume(
+    runner: Runner, user_id: str, session_id: str, invocation_id: str, call_id: str, call_name: str
+) -> float:
+    message = types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+        id=call_id, name=call_name, response={"confirmed": True}
+    ))])
+    started = time.perf_counter()
+    async for _ in runner.run_async(
+        user_id=user_id, session_id=session_id, invocation_id=invocation_id, new_message=message
+    ):
+        pass
+    return time.perf_counter() - started
+
+
+async def simulate(mode: str, app, args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as directory:
+        service = build_service(mode, directory)
+        runner = Runner(app=app, session_service=service)
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        paused = []
+        for index in range(args.paused):
+            user_id = f"user-{index % 50}"
+            text = f"Post {index}: [image] {'market update ' * args.post_words}"
+            paused.append((user_id, *await pause(runner, user_id, text)))
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        latencies = [await resume(runner, *entry) for entry in paused]
+        await runner.close()
+        row = {
+            "mode": mode,
+            "paused": args.paused,
+            "kb_per_paused": held / args.paused / 1024,
+            **{f"resume_{key}": value for key, value in summarize_latencies(latencies).items()
+               if key in ("p50_ms", "p95_ms")},
+        }
+        if isinstance(service, SpillingSessionService):
+            row["snapshot_bytes"] = service.stats.snapshot_bytes // service.stats.parked
+            row["json_bytes"] = service.stats.json_bytes // service.stats.parked
+            row["spills"] = service.store.stats.spills
+            row["restored"] = service.stats.restored
+            service.store.close()
+        return row
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--paused", type=int, default=500, help="Invocations paused at once.")
+    parser.add_argument("--post-words", type=int, default=40, help="Length of each post.")
+    parser.add_argument("--modes", nargs="+", default=["memory", "parked", "spilled"])
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    app = importlib.import_module("06_human_in_the_loop.agent").root_agent
+    use_offline_model(app, OfflineModel(output_tokens=Distribution.constant(40)))
+    logging.getLogger().setLevel("WARNING")
+    print(
+        f"snapshot encoding: {'msgpack' if msgpack else 'json'}"
+        f" + {'zstd' if zstandard else 'zlib'}"
+    )
+    rows = [await simulate(mode, app, args) for mode in args.modes]
+    print_table(rows, [
+        "mode", "paused", "kb_per_paused", "snapshot_bytes", "json_bytes", "spills", "restored",
+        "resume_p50_ms", "resume_p95_ms",
+    ])
+    if args.json_path:
+        write_json(args.json_path, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,172 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cold-start benchmark: import time and first-use time per pattern.
+
+Each pattern is measured in a fresh interpreter started with `-X importtime`,
+so nothing is shared between measurements. The report splits cold start into:
+
+* `import_ms`: importing the pattern's agent module, which is what every
+  process pays, including ones that never serve a request.
+* `first_use_ms`: building `root_agent` afterwards (zero for eager patterns,
+  whose cost already sits in `import_ms`).
+* `modules`: modules loaded by the import.
+* `heaviest`: the pattern's direct imports with the largest cumulative
+  `-X importtime` cost.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.import_benchmark --repeat 3 --json imports.json
+    python -m benchmarks.import_benchmark --baseline imports.json --max-regression 0.25
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.common import ORCHESTRATION_DIR, find_regressions, print_table, write_json
+from benchmarks.pattern_benchmark import PATTERNS, PatternTarget
+
+_MARKER = "-- import benchmark probe --"
+
+_PROBE = """
+import importlib, json, sys, time
+sys.path.insert(0, {root!r})
+sys.stderr.write({marker!r} + "\\n")
+before = len(sys.modules)
+started = time.perf_counter()
+module = importlib.import_module({module!r})
+imported = time.perf_counter()
+getattr(module, {attribute!r})
+used = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "first_use_ms": (used - imported) * 1000,
+    "modules": len(sys.modules) - before,
+}}))
+"""
+
+
+def parse_importtime(stderr: str, package: str, top: int) -> List[Tuple[str, float]]:
+    """Returns the `top` heaviest direct imports as (module, cumulative ms).
+
+    Only imports made after interpreter startup count. A direct import is one
+    made by the pattern's own modules (or by its lazy builders), as opposed to
+    one pulled in transitively by a dependency.
+    """
+    lines = stderr.split(_MARKER, 1)[-1].splitlines()
+    # `-X importtime` prints the tree in post-order: children before parents.
+    pending: Dict[int, List[Tuple[str, float, list]]] = {}
+    for line in lines:
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        children = pending.pop(depth + 1, [])
+        pending.setdefault(depth, []).append((name.strip(), int(cumulative) / 1000.0, children))
+    if not pending:
+        return []
+
+    def direct(nodes):
+        for name, ms, children in nodes:
+            if name == package or name.startswith(package + "."):
+                yield from direct(children)
+            else:
+                yield name, ms
+
+    roots = pending[min(pending)]
+    return sorted(direct(roots), key=lambda entry: entry[1], reverse=True)[:top]
+
+
+def measure(target: PatternTarget, workdir: str, top: int) -> Dict[str, Any]:
+    """Runs one cold import of `target` in a fresh interpreter."""
+    module = f"{target.package}.{target.module}"
+    probe = _PROBE.format(
+        root=ORCHESTRATION_DIR, marker=_MARKER, module=module, attribute=target.attribute
+    )
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_API_KEY", "import-benchmark")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", probe],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["heaviest"] = parse_importtime(completed.stderr, target.package, top)
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Cold runs per pattern (median).")
+    parser.add_argument("--top", type=int, default=3, help="Heaviest direct imports to show.")
+    parser.add_argument("--only", nargs="*", default=None, help="Substrings selecting patterns.")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    parser.add_argument("--baseline", help="JSON file from a previous run to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    # Patterns that open sqlite files do so relative to the working directory.
+    workdir = tempfile.mkdtemp(prefix="import-benchmark-")
+    rows, skipped, results = [], [], {}
+    for target in PATTERNS:
+        if args.only and not any(token in target.label for token in args.only):
+            continue
+        if target.skip_reason:
+            skipped.append(f"{target.label}: {target.skip_reason}")
+            continue
+        try:
+            runs = [measure(target, workdir, args.top) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as e:
+            error = e.stderr.strip().splitlines()[-1] if e.stderr.strip() else e
+            skipped.append(f"{target.label}: failed with {error}")
+            continue
+        row = {
+            "pattern": target.label,
+            "import_ms": statistics.median(run["import_ms"] for run in runs),
+            "first_use_ms": statistics.median(run["first_use_ms"] for run in runs),
+            "modules": runs[-1]["modules"],
+            "heaviest": ", ".join(f"{name} {ms:.0f}ms" for name, ms in runs[-1]["heaviest"]),
+        }
+        row["cold_start_ms"] = row["import_ms"] + row["first_use_ms"]
+        rows.append(row)
+        results[target.label] = row
+
+    print_table(
+        rows, ["pattern", "import_ms", "first_use_ms", "cold_start_ms", "modules", "heaviest"]
+    )
+    for line in skipped:
+        print(f"skipped {line}")
+
+    if args.json_path:
+        write_json(args.json_path, results)
+    if args.baseline:
+        regressions = find_regressions(results, args.baseline, "import_ms", args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Session lookup latency and database size over months of simulated traffic.
+
+Simulates `--days` days of traffic against `SqliteSessionService`. Each day,
+`--sessions-per-day` new sessions of `--events` events each are created.
+Users return to a few recent sessions, then the day passes: every stored
+session is aged by one day. Variants:
+
+* `none`: no maintenance; the database keeps everything.
+* `maintained`: `SessionMaintenance` runs daily, archiving sessions idle for
+  `--archive-after` days and deleting those idle for `--ttl` days. Foreground
+  appends run concurrently with it.
+
+Every `--report-every` days it reports, per variant:
+
+* `get_p50_ms` / `get_p95_ms`: loads of recent sessions.
+* `list_user_ms`: `list_sessions` for one user.
+* `list_app_ms`: `list_sessions` for the whole app.
+* `live`: live sessions. `db_mib`: size of the live database.
+* `lock_ms`: the longest transaction maintenance held that day.
+* `append_p99_ms`: append latency while maintenance ran.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.maintenance_benchmark --days 180 --report-every 30
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, percentile, print_table, write_json
+
+ensure_importable()
+
+from google.adk.events.event import Event
+from google.genai import types
+
+from shared.session_maintenance import DAY, RetentionPolicy, SessionMaintenance
+from shared.sqlite_sessions import SqliteSessionService
+
+APP_NAME = "maintenance_benchmark"
+
+
+def make_event(text_bytes: int) -> Event:
+    return Event(
+        author="project_assistant",
+        content=types.Content(role="model", parts=[types.Part(text="x" * text_bytes)]),
+    )
+
+
+def age_by_one_day(path: str, archive_path: str) -> None:
+    """Moves every stored timestamp one day into the past."""
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute("UPDATE adk_sessions SET update_time = update_time - ?", (DAY,))
+    connection.commit()
+    connection.close()
+    if os.path.exists(archive_path):
+        connection = sqlite3.connect(archive_path, timeout=30)
+        connection.execute("UPDATE adk_session_archive SET update_time = update_time - ?", (DAY,))
+        connection.commit()
+        connection.close()
+
+
+async def timed(coroutine) -> float:
+    started = time.perf_counter()
+    await coroutine
+    return time.perf_counter() - started
+
+
+async def simulate(variant: str, args: argparse.Namespace, workdir: str) -> List[Dict[str, Any]]:
+    path = os.path.join(workdir, f"{variant}.db")
+    archive_path = os.path.join(workdir, f"{variant}.archive.db")
+    service = SqliteSessionService(path)
+    maintenance = None
+    if variant == "maintained":
+        maintenance = SessionMaintenance(
+            [path],
+            default_policy=RetentionPolicy(archive_after=args.archive_after * DAY, ttl=args.ttl * DAY),
+        )
+    rng = random.Random(7)
+    recent: List[Any] = []
+    rows = []
+    for day in range(1, args.days + 1):
+        for _ in range(args.sessions_per_day):
+            session = await service.create_session(app_name=APP_NAME, user_id=f"user{rng.randrange(args.users)}")
+            for _ in range(args.events):
+                await service.append_event(session, make_event(args.text_bytes))
+            recent.append(session)
+        recent = recent[-args.sessions_per_day * 7:]
+
+        # Returning users, concurrently with the day's maintenance pass.
+        async def returning_users() -> List[float]:
+            latencies = []
+            for stub in rng.sample(recent, min(len(recent), args.sessions_per_day // 2)):
+                session = await service.get_session(
+                    app_name=APP_NAME, user_id=stub.user_id, session_id=stub.id
+                )
+                if session is not None:
+                    latencies.append(await timed(service.append_event(session, make_event(args.text_bytes))))
+            return latencies
+
+        report = None
+        if maintenance is not None:
+            latencies, report = await asyncio.gather(returning_users(), maintenance.run_once())
+        else:
+            latencies = await returning_users()
+
+        if day % args.report_every == 0:
+            gets = []
+            for stub in rng.sample(recent, min(len(recent), 100)):
+                gets.append(await timed(service.get_session(
+                    app_name=APP_NAME, user_id=stub.user_id, session_id=stub.id
+                )))
+            list_user = [
+                await timed(service.list_sessions(app_name=APP_NAME, user_id=f"user{index}"))
+                for index in range(20)
+            ]
+            list_app = await timed(service.list_sessions(app_name=APP_NAME))
+            connection = sqlite3.connect(path)
+            live = connection.execute("SELECT COUNT(*) FROM adk_sessions").fetchone()[0]
+            pages, page_size = (
+                connection.execute("PRAGMA page_count").fetchone()[0],
+                connection.execute("PRAGMA page_size").fetchone()[0],
+            )
+            connection.close()
+            rows.append({
+                "variant": variant,
+                "day": day,
+                "get_p50_ms": percentile(gets, 50) * 1000,
+                "get_p95_ms": percentile(gets, 95) * 1000,
+                "list_user_ms": percentile(list_user, 50) * 1000,
+                "list_app_ms": list_app * 1000,
+                "live": live,
+                "db_mib": pages * page_size / 2**20,
+                "lock_ms": report.max_lock_ms if report else "",
+                "append_p99_ms": percentile(latencies, 99) * 1000,
+            })
+        age_by_one_day(path, archive_path)
+    if maintenance is not None:
+        maintenance.close()
+    service.close()
+    return rows
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--report-every", type=int, default=30)
+    parser.add_argument("--sessions-per-day", type=int, default=40)
+    parser.add_argument("--events", type=int, default=6, help="Events per new session.")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--text-bytes", type=int, default=600)
+    parser.add_argument("--archive-after", type=float, default=14, help="Days idle before archiving.")
+    parser.add_argument("--ttl", type=float, default=90, help="Days idle before deletion.")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="maintenance-benchmark-")
+    rows = []
+    for variant in ("none", "maintained"):
+        rows.extend(await simulate(variant, args, workdir))
+    print_table(rows, [
+        "variant", "day", "get_p50_ms", "get_p95_ms", "list_user_ms", "list_app_ms",
+        "live", "db_mib", "lock_ms", "append_p99_ms",
+    ])
+    if args.json_path:
+        write_json(args.json_path, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,208 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Memory search latency and recall: keyword scan vs vector search.
+
+Fills one user's memory with `--sizes` synthetic memories. Each memory is
+drawn from one of `--topics` topics: a few words of the topic's vocabulary
+plus filler. Queries are fresh draws from a random topic's vocabulary. The
+backends are:
+
+* `keyword`: the stock `InMemoryMemoryService`, up to `--keyword-max`
+  memories (it is too slow beyond that).
+* `exact`: `VectorMemoryService` scoring every row (`n_probe=0`).
+* `ivf/N`: `VectorMemoryService` through its IVF index, probing N lists,
+  for each N in `--n-probe`.
+
+It reports p50/p95 search latency and the memories returned. `precision` is
+the share of returned memories on the query's topic. `recall@k` is the
+share of the exact top-k that the backend also returned; memories tied with
+the exact k-th score count as hits. Embeddings come
+from the local `HashingEmbedder`, so the run is deterministic and offline.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.memory_benchmark --sizes 10000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.common import ensure_importable, print_table, summarize_latencies, write_json
+
+ensure_importable()
+
+from google.adk.events.event import Event
+from google.adk.memory import InMemoryMemoryService
+from google.adk.sessions.session import Session
+from google.genai import types
+
+from shared.vector_memory import VectorMemoryService
+
+APP_NAME = "memory_benchmark"
+USER_ID = "user"
+
+# Words any topic uses; they make keyword search match almost anything.
+FILLER = tuple(
+    "update meeting notes team today plan review issue customer project status week call email"
+    " report budget launch design feedback goal question idea draft follow action item owner date"
+    " task risk change request support account order price product release version test data".split()
+)
+
+
+def topic_words(topics: int, vocabulary: int) -> List[List[str]]:
+    rng = random.Random(3)
+    letters = "bcdfghjklmnprstvz"
+    return [
+        ["".join(rng.choice(letters) + rng.choice("aeiou") for _ in range(3)) for _ in range(vocabulary)]
+        for _ in range(topics)
+    ]
+
+
+def corpus(size: int, words: List[List[str]], seed: int = 5) -> Tuple[List[str], List[int]]:
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for index in range(size):
+        topic = rng.randrange(len(words))
+        body = rng.sample(words[topic], 6) + rng.sample(FILLER, 3)
+        rng.shuffle(body)
+        texts.append(f"memo{index} " + " ".join(body))
+        labels.append(topic)
+    return texts, labels
+
+
+def queries(count: int, words: List[List[str]]) -> List[Tuple[str, int]]:
+    rng = random.Random(9)
+    drawn = []
+    for _ in range(count):
+        topic = rng.randrange(len(words))
+        drawn.append((" ".join(rng.sample(words[topic], 3)), topic))
+    return drawn
+
+
+async def measure(service, drawn, labels: Dict[str, int]) -> Tuple[List[float], List[List[str]], float]:
+    latencies, results, on_topic, returned = [], [], 0, 0
+    for query, topic in drawn:
+        started = time.perf_counter()
+        response = await service.search_memory(app_name=APP_NAME, user_id=USER_ID, query=query)
+        latencies.append(time.perf_counter() - started)
+        texts = [memory.content.parts[0].text for memory in response.memories]
+        results.append(texts)
+        returned += len(texts)
+        on_topic += sum(labels[text] == topic for text in texts)
+    return latencies, results, on_topic / max(1, returned)
+
+
+def recall(embedder, drawn, results, truth) -> float:
+    """Share of the exact top-k matched, counting ties with the k-th score as hits."""
+    hits = wanted = 0
+    for (query, _), got, want in zip(drawn, results, truth):
+        if not want:
+            continue
+        query_vector = embedder([query])[0]
+        kth = min(embedder(want) @ query_vector)
+        scores = embedder(got) @ query_vector if got else []
+        hits += min(len(want), sum(score >= kth - 1e-6 for score in scores))
+        wanted += len(want)
+    return hits / max(1, wanted)
+
+
+def row(backend: str, size: int, latencies, results, precision, recall_at_k=None) -> Dict[str, Any]:
+    summary = summarize_latencies(latencies)
+    return {
+        "backend": backend,
+        "memories": size,
+        "p50_ms": summary["p50_ms"],
+        "p95_ms": summary["p95_ms"],
+        "returned": sum(map(len, results)) / len(results),
+        "precision": precision,
+        "recall@k": recall_at_k,
+    }
+
+
+async def benchmark_size(size: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    words = topic_words(args.topics, args.vocabulary)
+    texts, topics = corpus(size, words)
+    labels = dict(zip(texts, topics))
+    drawn = queries(args.queries, words)
+    rows = []
+
+    service = VectorMemoryService(top_k=args.top_k, index_threshold=args.index_threshold)
+    started = time.perf_counter()
+    for start in range(0, size, 10_000):
+        await service.add_texts(app_name=APP_NAME, user_id=USER_ID, texts=texts[start:start + 10_000])
+    ingest_s = time.perf_counter() - started
+
+    service.n_probe = 0
+    latencies, truth, precision = await measure(service, drawn, labels)
+    rows.append(row("exact", size, latencies, truth, precision, 1.0))
+    if service.stats.index_builds:
+        for n_probe in args.n_probe:
+            service.n_probe = n_probe
+            latencies, results, precision = await measure(service, drawn, labels)
+            rows.append(row(
+                f"ivf/{n_probe}", size, latencies, results, precision,
+                recall(service.embedder, drawn, results, truth),
+            ))
+    for result in rows:
+        result["ingest_s"] = ingest_s
+
+    if size <= args.keyword_max:
+        keyword = InMemoryMemoryService()
+        await keyword.add_session_to_memory(Session(
+            id="corpus",
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            events=[
+                Event(author="user", content=types.Content(role="user", parts=[types.Part(text=text)]))
+                for text in texts
+            ],
+        ))
+        latencies, results, precision = await measure(keyword, drawn[:args.keyword_queries], labels)
+        rows.append(row(
+            "keyword", size, latencies, results, precision,
+            recall(service.embedder, drawn, results, truth[:args.keyword_queries]),
+        ))
+    return rows
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--vocabulary", type=int, default=12, help="Words per topic.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--index-threshold", type=int, default=20_000)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[8, 32, 64], help="Lists probed per query.")
+    parser.add_argument("--keyword-max", type=int, default=100_000)
+    parser.add_argument("--keyword-queries", type=int, default=20)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for size in args.sizes:
+        rows.extend(await benchmark_size(size, args))
+    print_table(rows, [
+        "backend", "memories", "ingest_s", "p50_ms", "p95_ms", "returned", "precision", "recall@k",
+    ])
+    if args.json_path:
+        write_json(args.json_path, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,364 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Warm start, page sharing, crash safety and compaction of `PersistentMemoryService`.
+
+Builds a store of `--memories` memories for one user, timing the ingestion
+that a restart of an in-memory service would have to repeat. Then starts
+`--workers` processes at once. Each one opens the store, runs `--queries`
+searches, and reports:
+
+* how long opening took, and how long the first and later searches took;
+* the resident (RSS) and proportional (PSS) size of its mapping of the
+  vector file. PSS divides shared pages among the processes mapping them,
+  so when the workers share one copy, PSS is about RSS / workers.
+
+With `--crash-check`, a child process appends batches and is killed with
+SIGKILL at a random point after its first batch, `--crash-trials` times.
+After each kill the store is reopened and checked. The metadata rows must
+match the committed vector rows. Every batch the child reported as written
+must be present, and the last one must be searchable. `vector_rows` above
+`committed` are the uncommitted tail of the killed append.
+
+With `--compact-check`, a second user gets two sessions of
+`--compact-memories / 2` memories each. One session is deleted and the
+partition compacted; the check reports the file size before and after, and
+confirms that search still finds the surviving session. Throughout, a
+second service instance on the store, with its own connection and mappings
+as another worker process has, searches the partition from a thread, and
+`--compact-rounds` further rounds each add a session, delete the previous
+one and compact again. The reader must see no errors while rows are
+renumbered and old vector files unlinked under it, and every search's
+results, re-scored, must come back in score order.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.memory_store_benchmark --memories 1000000 --workers 4
+    python -m benchmarks.memory_store_benchmark --crash-check --compact-check
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, print_table, summarize_latencies, write_json
+
+ensure_importable()
+
+from google.adk.events.event import Event
+from google.adk.sessions.session import Session
+from google.genai import types
+
+from benchmarks.memory_benchmark import corpus, queries, topic_words
+from shared.persistent_memory import PersistentMemoryService
+from shared.vector_memory import VectorMemoryService
+
+APP_NAME = "memory_store_benchmark"
+USER_ID = "user"
+
+
+def mapping_kib(path: str) -> Dict[str, int]:
+    """Returns the Rss and Pss, in KiB, of this process's mappings of `path`'s vector files."""
+    totals = {"Rss": 0, "Pss": 0}
+    inside = False
+    with open("/proc/self/smaps") as smaps:
+        for line in smaps:
+            fields = line.split()
+            if "-" in fields[0] and len(fields[0]) > 8 and not fields[0].endswith(":"):
+                inside = len(fields) >= 6 and fields[-1].startswith(os.path.join(path, "vectors"))
+            elif inside and fields[0][:-1] in totals:
+                totals[fields[0][:-1]] += int(fields[1])
+    return totals
+
+
+async def build(path: str, texts: List[str], reingest: bool) -> Dict[str, Any]:
+    result = {"memories": len(texts)}
+    if reingest:
+        service = VectorMemoryService(index_threshold=0)
+        started = time.perf_counter()
+        for start in range(0, len(texts), 50_000):
+            await service.add_texts(app_name=APP_NAME, user_id=USER_ID, texts=texts[start:start + 50_000])
+        result["reingest_s"] = time.perf_counter() - started
+        del service
+    store = PersistentMemoryService(path)
+    started = time.perf_counter()
+    for start in range(0, len(texts), 50_000):
+        await store.add_texts(app_name=APP_NAME, user_id=USER_ID, texts=texts[start:start + 50_000])
+    result["build_s"] = time.perf_counter() - started
+    store.close()
+    result["store_mib"] = sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+    ) / 2**20
+    return result
+
+
+async def worker(path: str, count: int, start_at: float) -> None:
+    """Opens the store, searches, and prints its timings and mapping sizes as JSON."""
+    while time.time() < start_at:
+        await asyncio.sleep(0.001)
+    started = time.perf_counter()
+    store = PersistentMemoryService(path)
+    opened = time.perf_counter() - started
+    drawn = queries(count, topic_words(500, 12))
+    latencies = []
+    for query, _ in drawn:
+        started = time.perf_counter()
+        await store.search_memory(app_name=APP_NAME, user_id=USER_ID, query=query)
+        latencies.append(time.perf_counter() - started)
+    print(json.dumps({
+        "open_ms": opened * 1000,
+        "first_search_ms": latencies[0] * 1000,
+        "search_p50_ms": summarize_latencies(latencies[1:])["p50_ms"],
+        **{f"{key.lower()}_mib": value / 1024 for key, value in mapping_kib(path).items()},
+    }), flush=True)
+
+
+def run_workers(path: str, workers: int, count: int) -> List[Dict[str, Any]]:
+    start_at = time.time() + 1.0
+    children = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.memory_store_benchmark", "--worker", path, str(count), str(start_at)],
+            stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    # Collect every worker's numbers only after all have mapped the file.
+    rows = []
+    for index, child in enumerate(children):
+        output, _ = child.communicate()
+        rows.append({"worker": index, **json.loads(output.strip().splitlines()[-1])})
+    return rows
+
+
+async def crash_child(path: str, trial: str) -> None:
+    """Appends numbered batches forever, printing each one once it is committed."""
+    store = PersistentMemoryService(path)
+    for batch in range(1_000_000):
+        await store.add_texts(
+            app_name=APP_NAME, user_id="crash",
+            texts=[f"trial{trial} batch{batch} item{item} crash durability check" for item in range(500)],
+        )
+        print(batch, flush=True)
+
+
+async def crash_check(workdir: str, trials: int) -> List[Dict[str, Any]]:
+    path = os.path.join(workdir, "crash-store")
+    rng = random.Random(7)
+    rows = []
+    previous = 0
+    for trial in range(trials):
+        child = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.memory_store_benchmark", "--crash-child", path, str(trial)],
+            stdout=subprocess.PIPE, text=True,
+        )
+        first = child.stdout.readline()
+        time.sleep(rng.uniform(0.0, 1.0))
+        child.send_signal(signal.SIGKILL)
+        output, _ = child.communicate()
+        acknowledged = [int(line) for line in (first + output).split()]
+
+        store = PersistentMemoryService(path)
+        connection = store._connection()
+        committed = connection.execute(
+            "SELECT id, generation, rows FROM memory_partitions WHERE app_name = ? AND user_id = 'crash'",
+            (APP_NAME,),
+        ).fetchone()
+        metadata = connection.execute(
+            "SELECT COUNT(*), COALESCE(MAX(row), -1) FROM memories WHERE partition_id = ?", (committed[0],)
+        ).fetchone()
+        vector_rows = os.path.getsize(store._file(committed[0], committed[1])) // store._row_bytes
+        latest = acknowledged[-1] if acknowledged else None
+        found = True
+        if latest is not None:
+            probe = f"trial{trial} batch{latest} item7 "
+            response = await store.search_memory(app_name=APP_NAME, user_id="crash", query=probe)
+            found = any(memory.content.parts[0].text.startswith(probe) for memory in response.memories)
+        store.close()
+        rows.append({
+            "trial": trial,
+            "acknowledged": len(acknowledged) * 500,
+            "committed": committed[2],
+            "metadata_rows": metadata[0],
+            "vector_rows": vector_rows,
+            "consistent": metadata[0] == committed[2] == metadata[1] + 1 and vector_rows >= committed[2],
+            "none_lost": committed[2] - previous >= len(acknowledged) * 500,
+            "latest_found": found,
+        })
+        previous = committed[2]
+    return rows
+
+
+async def add_session(store: PersistentMemoryService, session_id: str, texts: List[str]) -> None:
+    for start in range(0, len(texts), 10_000):
+        await store.add_session_to_memory(Session(
+            id=session_id, app_name=APP_NAME, user_id="churn",
+            events=[
+                Event(author="user", content=types.Content(role="user", parts=[types.Part(text=text)]))
+                for text in texts[start:start + 10_000]
+            ],
+        ))
+
+
+def compact_reader(path: str, stop: threading.Event, results: Dict[str, Any]) -> None:
+    """Searches the compacted partition through its own service until `stop` is set.
+
+    A search whose results, re-scored against the query, are not in
+    descending order read metadata rows that do not match the vectors it
+    scored, which is how rows renumbered mid-search show up.
+    """
+    store = PersistentMemoryService(path)
+    drawn = queries(200, topic_words(500, 12))
+    searches, misordered, errors = 0, 0, []
+    while not stop.is_set():
+        query = drawn[searches % 200][0]
+        searches += 1
+        try:
+            response = asyncio.run(store.search_memory(app_name=APP_NAME, user_id="churn", query=query))
+        except Exception as e:
+            errors.append(repr(e))
+            continue
+        if response.memories:
+            texts = [memory.content.parts[0].text for memory in response.memories]
+            scores = store.embedder(texts) @ store.embedder([query])[0]
+            misordered += any(later > earlier + 1e-5 for earlier, later in zip(scores, scores[1:]))
+    store.close()
+    results.update({"searches": searches, "misordered": misordered, "errors": errors})
+
+
+async def compact_check(workdir: str, memories: int, rounds: int) -> Dict[str, Any]:
+    path = os.path.join(workdir, "compact-store")
+    store = PersistentMemoryService(path)
+    half = memories // 2
+    texts, _ = corpus(memories, topic_words(500, 12), seed=13)
+    await add_session(store, "old", texts[:half])
+    await add_session(store, "new", texts[half:])
+
+    def vector_bytes() -> int:
+        directory = os.path.join(path, "vectors")
+        return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+    # A second service on the store, as another worker process would open it.
+    stop, read = threading.Event(), {}
+    reader = threading.Thread(target=compact_reader, args=(path, stop, read))
+    reader.start()
+    before = vector_bytes()
+    deleted = await store.delete_memories(app_name=APP_NAME, user_id="churn", session_id="old")
+    started = time.perf_counter()
+    reclaimed = await store.compact(app_name=APP_NAME, user_id="churn")
+    compact_s = time.perf_counter() - started
+    probe = texts[half + 1]
+    response = await store.search_memory(app_name=APP_NAME, user_id="churn", query=probe)
+    after = vector_bytes()
+
+    extra, _ = corpus(rounds * max(1, memories // 20), topic_words(500, 12), seed=17)
+    size = len(extra) // max(1, rounds)
+    previous = "new"
+    for index in range(rounds):
+        await add_session(store, f"round{index}", extra[index * size:(index + 1) * size])
+        await store.delete_memories(app_name=APP_NAME, user_id="churn", session_id=previous)
+        await store.compact(app_name=APP_NAME, user_id="churn")
+        previous = f"round{index}"
+    stop.set()
+    reader.join()
+    store.close()
+    return {
+        "memories": memories,
+        "deleted": deleted,
+        "reclaimed": reclaimed,
+        "vectors_mib_before": before / 2**20,
+        "vectors_mib_after": after / 2**20,
+        "compact_s": compact_s,
+        "survivor_found": any(memory.content.parts[0].text == probe for memory in response.memories),
+        "compactions": rounds + 1,
+        "reader_searches": read["searches"],
+        "reader_misordered": read["misordered"],
+        "reader_errors": len(read["errors"]),
+        "first_errors": sorted(set(read["errors"]))[:5],
+    }
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memories", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50, help="Searches per worker.")
+    parser.add_argument("--no-reingest", action="store_true", help="Skip timing an in-memory rebuild.")
+    parser.add_argument("--crash-check", action="store_true", help="Verify appends survive SIGKILL.")
+    parser.add_argument("--crash-trials", type=int, default=5)
+    parser.add_argument("--compact-check", action="store_true", help="Verify compaction of deleted rows.")
+    parser.add_argument("--compact-memories", type=int, default=100_000)
+    parser.add_argument("--compact-rounds", type=int, default=20, help="Compactions under the reader.")
+    parser.add_argument("--worker", nargs=3, help=argparse.SUPPRESS)
+    parser.add_argument("--crash-child", nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        path, count, start_at = args.worker
+        await worker(path, int(count), float(start_at))
+        return
+    if args.crash_child:
+        await crash_child(*args.crash_child)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="memory-store-benchmark-")
+    results: Dict[str, Any] = {}
+    try:
+        if args.crash_check or args.compact_check:
+            if args.crash_check:
+                results["crash"] = await crash_check(workdir, args.crash_trials)
+                print_table(results["crash"], [
+                    "trial", "acknowledged", "committed", "metadata_rows", "vector_rows",
+                    "consistent", "none_lost", "latest_found",
+                ])
+            if args.compact_check:
+                results["compact"] = await compact_check(workdir, args.compact_memories, args.compact_rounds)
+                print_table([results["compact"]], [
+                    column for column in results["compact"] if column != "first_errors"
+                ])
+        else:
+            path = os.path.join(workdir, "store")
+            texts, _ = corpus(args.memories, topic_words(500, 12))
+            results["build"] = await build(path, texts, reingest=not args.no_reingest)
+            del texts
+            print_table([results["build"]], list(results["build"]))
+            results["workers"] = run_workers(path, args.workers, args.queries)
+            print_table(results["workers"], [
+                "worker", "open_ms", "first_search_ms", "search_p50_ms", "rss_mib", "pss_mib",
+            ])
+        if args.json_path:
+            write_json(args.json_path, results)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    failed = [
+        row for row in results.get("crash", [])
+        if not (row["consistent"] and row["none_lost"] and row["latest_found"])
+    ]
+    compact = results.get("compact", {})
+    if failed or not compact.get("survivor_found", True) or compact.get("reader_errors") or compact.get("reader_misordered"):
+        sys.exit(f"Memory store check failed: {failed or compact}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,297 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cross-pattern latency and throughput benchmark using the offline model.
+
+Every pattern's `root_agent` is switched to `OfflineModel` and driven through
+an `InMemoryRunner`, so the numbers measure orchestration overhead only:
+agent tree traversal, plugin callbacks, session bookkeeping and tool dispatch.
+No network access or API key is needed.
+
+For each pattern the benchmark reports p50/p95/p99 turn latency, turns/sec and
+the transient Python heap growth per turn (tracemalloc peak), which is the
+closest portable proxy for allocations per turn.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.pattern_benchmark --turns 50 --json results.json
+    python -m benchmarks.pattern_benchmark --baseline results.json --max-regression 0.25
+
+With `--baseline`, the script exits non-zero when any pattern's p95 latency
+regresses by more than `--max-regression`, which makes it usable as a CI gate.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import (
+    ensure_importable,
+    find_regressions,
+    print_table,
+    summarize_latencies,
+    write_json,
+)
+
+ensure_importable()
+
+from google.adk.apps import App
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from shared.offline_model import Distribution, OfflineModel, use_offline_model
+
+
+@dataclass(frozen=True)
+class PatternTarget:
+    """Where to find a benchmarkable agent inside a pattern package.
+
+    Attributes:
+        package: The pattern directory, e.g. "02_sequential_pipeline".
+        module: The module inside the package that defines the agent.
+        attribute: The module attribute holding the agent or `App`.
+        plugin: Optional name of a plugin class in the same module to attach.
+        skip_reason: Set when the pattern cannot run offline.
+    """
+
+    package: str
+    module: str = "agent"
+    attribute: str = "root_agent"
+    plugin: Optional[str] = None
+    skip_reason: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        if self.module == "agent":
+            return self.package
+        return f"{self.package}:{self.module}"
+
+
+PATTERNS: List[PatternTarget] = [
+    PatternTarget("01_basic_react_agent"),
+    PatternTarget("02_sequential_pipeline"),
+    PatternTarget("03_parallel_execution"),
+    PatternTarget("04_feedback_loop"),
+    PatternTarget("05_delegation"),
+    PatternTarget("06_human_in_the_loop"),
+    PatternTarget(
+        "07_mcp_filesystem",
+        skip_reason="needs an `npx` MCP filesystem server subprocess",
+    ),
+    PatternTarget("08_agent_sessions"),
+    PatternTarget("09_context_compaction"),
+    PatternTarget("10_session_state_tools"),
+    PatternTarget("11_basic_memory_integration"),
+    PatternTarget("12_reactive_memory_retrieval"),
+    PatternTarget("13_proactive_memory_loading"),
+    PatternTarget("14_automated_memory_archiving"),
+    PatternTarget("15_logging_and_tracing"),
+    PatternTarget("16_metrics_and_monitoring", plugin="MetricsPlugin"),
+    PatternTarget("17_llm_as_a_judge_evaluation"),
+    PatternTarget("18_human_in_the_loop_evaluation"),
+    PatternTarget("19_custom_plugin_tool_counter", plugin="ToolCountPlugin"),
+    PatternTarget("20_systematic_evaluation"),
+    PatternTarget(
+        "21_agent_to_agent_communication",
+        module="product_catalog_agent",
+        attribute="product_catalog_agent",
+    ),
+    PatternTarget(
+        "21_agent_to_agent_communication",
+        module="inventory_agent",
+        attribute="inventory_agent",
+    ),
+    PatternTarget(
+        "21_agent_to_agent_communication",
+        module="shipping_agent",
+        attribute="shipping_agent",
+    ),
+    PatternTarget(
+        "22_agent_deployment",
+        skip_reason="conceptual deployment stub, not an ADK agent",
+    ),
+]
+
+
+def build_runner(
+    target: PatternTarget, model: OfflineModel, log_level: str = "WARNING"
+) -> InMemoryRunner:
+    """Imports a pattern, switches it to `model` and wraps it in a runner."""
+    module = importlib.import_module(f"{target.package}.{target.module}")
+    agent_or_app = getattr(module, target.attribute)
+    use_offline_model(agent_or_app, model)
+    # Some patterns call `logging.basicConfig(level=INFO)` at import time, which
+    # would otherwise leak into every pattern benchmarked after them.
+    logging.getLogger().setLevel(log_level)
+    if isinstance(agent_or_app, App):
+        return InMemoryRunner(app=agent_or_app)
+    plugins = [getattr(module, target.plugin)()] if target.plugin else []
+    return InMemoryRunner(
+        app=App(name="pattern_benchmark", root_agent=agent_or_app, plugins=plugins)
+    )
+
+
+async def run_turn(runner: InMemoryRunner, user_id: str, session_id: str, text: str) -> int:
+    """Runs one user turn to completion and returns the number of events."""
+    message = types.Content(role="user", parts=[types.Part(text=text)])
+    events = 0
+    async for _ in runner.run_async(
+        user_id=user_id, session_id=session_id, new_message=message
+    ):
+        events += 1
+    return events
+
+
+async def benchmark_pattern(
+    target: PatternTarget,
+    model: OfflineModel,
+    turns: int,
+    warmup: int,
+    concurrency: int,
+    alloc_turns: int,
+    log_level: str,
+) -> Dict[str, Any]:
+    """Benchmarks one pattern and returns its summary row."""
+    runner = build_runner(target, model, log_level)
+    sessions = []
+    for index in range(concurrency):
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id=f"user-{index}"
+        )
+        sessions.append(session)
+
+    for turn in range(warmup):
+        await run_turn(runner, sessions[0].user_id, sessions[0].id, f"warmup {turn}")
+
+    latencies: List[float] = []
+    calls_before = model.call_count
+
+    async def worker(session, count: int) -> None:
+        for turn in range(count):
+            started = time.perf_counter()
+            await run_turn(runner, session.user_id, session.id, f"turn {turn} from {session.user_id}")
+            latencies.append(time.perf_counter() - started)
+
+    per_worker = max(1, turns // concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(session, per_worker) for session in sessions))
+    elapsed = time.perf_counter() - started
+    model_calls = model.call_count - calls_before
+
+    alloc_kib = []
+    tracemalloc.start()
+    try:
+        for turn in range(alloc_turns):
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await run_turn(runner, sessions[0].user_id, sessions[0].id, f"alloc {turn}")
+            _, peak = tracemalloc.get_traced_memory()
+            alloc_kib.append((peak - baseline) / 1024)
+    finally:
+        tracemalloc.stop()
+    await runner.close()
+
+    row = {"pattern": target.label, "turns": len(latencies)}
+    row.update(summarize_latencies(latencies))
+    row["turns_per_s"] = len(latencies) / elapsed if elapsed else float("nan")
+    row["model_calls_per_turn"] = model_calls / len(latencies) if latencies else 0.0
+    row["alloc_kib_per_turn"] = sum(alloc_kib) / len(alloc_kib) if alloc_kib else float("nan")
+    return row
+
+
+async def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50, help="Timed turns per pattern.")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed turns per pattern.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent sessions per pattern.")
+    parser.add_argument("--alloc-turns", type=int, default=5, help="Turns traced with tracemalloc.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Median simulated model latency.")
+    parser.add_argument("--latency-sigma", type=float, default=0.0, help="Log-normal sigma for latency.")
+    parser.add_argument("--output-tokens", type=int, default=32, help="Tokens per text response.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING", help="Root log level while running.")
+    parser.add_argument("--only", nargs="*", default=None, help="Substrings selecting patterns.")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    parser.add_argument("--baseline", help="JSON file from a previous run to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    if args.latency_sigma > 0:
+        latency = Distribution.lognormal(args.latency_ms, args.latency_sigma)
+    else:
+        latency = Distribution.constant(args.latency_ms)
+
+    # Several patterns insist on an API key or open sqlite files in the working
+    # directory when `root_agent` is built; neither matters offline.
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    workdir = tempfile.mkdtemp(prefix="pattern-benchmark-")
+    os.chdir(workdir)
+
+    rows, skipped, results = [], [], {}
+    for target in PATTERNS:
+        if args.only and not any(token in target.label for token in args.only):
+            continue
+        if target.skip_reason:
+            skipped.append(f"{target.label}: {target.skip_reason}")
+            continue
+        model = OfflineModel(
+            latency_ms=latency,
+            output_tokens=Distribution.constant(args.output_tokens),
+            seed=args.seed,
+        )
+        try:
+            # Tools and plugins in the patterns print freely; keep the report readable.
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                row = await benchmark_pattern(
+                    target, model, args.turns, args.warmup, args.concurrency, args.alloc_turns,
+                    args.log_level,
+                )
+        except Exception as e:  # A broken pattern should not hide the others.
+            skipped.append(f"{target.label}: failed with {type(e).__name__}: {e}")
+            continue
+        rows.append(row)
+        results[target.label] = row
+
+    print_table(
+        rows,
+        ["pattern", "turns", "p50_ms", "p95_ms", "p99_ms", "turns_per_s",
+         "model_calls_per_turn", "alloc_kib_per_turn"],
+    )
+    for line in skipped:
+        print(f"skipped {line}")
+
+    if json_path:
+        write_json(json_path, results)
+    if baseline:
+        regressions = find_regressions(results, baseline, "p95_ms", args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,190 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Memory searches and preloaded prompt tokens of `13_proactive_memory_loading`.
+
+Seeds one student's memory with `--memories` synthetic memories, then drives
+the pattern's agent on `OfflineModel` through `--sessions` sessions of
+`--turns` turns. Each turn either asks about a new topic, repeats the last
+question word for word, repeats it with different case and punctuation, or
+rephrases it with a couple of extra words. With probability
+`--add-probability`, a new memory is added to the student's store before a
+turn. The variants are:
+
+* `stock`: ADK's `preload_memory`.
+* `cached`: `CachedPreloadMemoryTool()`, reusing identical fingerprints only.
+* `cached/<s>`: `CachedPreloadMemoryTool(similarity=s)` for each `--similarity`.
+
+It reports the memory searches run and avoided, the preloaded prompt tokens
+per turn, the p50 search latency, and `differs`: the turns whose preloaded
+memory was not what `stock` loaded. `cached` must have none; the similarity
+variants trade some for fewer searches.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.preload_benchmark --memories 100000
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, print_table, summarize_latencies, write_json
+
+ensure_importable()
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools import preload_memory
+from google.genai import types
+
+from benchmarks.memory_benchmark import corpus, topic_words
+from shared.memory_preload import CachedPreloadMemoryTool
+from shared.offline_model import Distribution, OfflineModel, use_offline_model
+from shared.token_compaction import estimate_text_tokens
+from shared.vector_memory import VectorMemoryService
+
+APP_NAME = "preload_benchmark"
+USER_ID = "student"
+# Memories carry a fixed time so that runs of different variants load identical text.
+TIMESTAMP = 1_750_000_000.0
+
+
+class CountingMemoryService(VectorMemoryService):
+    """`VectorMemoryService` that times its searches."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.latencies: List[float] = []
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str):
+        started = time.perf_counter()
+        response = await super().search_memory(app_name=app_name, user_id=user_id, query=query)
+        self.latencies.append(time.perf_counter() - started)
+        return response
+
+
+def script(args: argparse.Namespace, words: List[List[str]]) -> List[List[Dict[str, Any]]]:
+    """Every session's turns: the message, and the memory to add first, if any."""
+    rng = random.Random(11)
+    sessions = []
+    for session in range(args.sessions):
+        turns, question = [], None
+        for turn in range(args.turns):
+            kind = "new" if question is None else rng.choice(["new", "repeat", "recase", "rephrase"])
+            if kind == "new":
+                question = f"Can you remind me about {' '.join(rng.sample(rng.choice(words), 3))}?"
+                text = question
+            elif kind == "repeat":
+                text = question
+            elif kind == "recase":
+                text = question.upper().rstrip("?") + "!"
+            else:
+                text = question.rstrip("?") + " again please?"
+            added = None
+            if rng.random() < args.add_probability:
+                added = f"note s{session}t{turn} " + " ".join(rng.sample(rng.choice(words), 6))
+            turns.append({"text": text, "add": added})
+        sessions.append(turns)
+    return sessions
+
+
+async def simulate(
+    agent, variant: str, texts: List[str], turns: List[List[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    service = CountingMemoryService()
+    for start in range(0, len(texts), 50_000):
+        await service.add_texts(
+            app_name=APP_NAME, user_id=USER_ID, texts=texts[start:start + 50_000], timestamp=TIMESTAMP
+        )
+    if variant == "stock":
+        tool = preload_memory
+    else:
+        tool = CachedPreloadMemoryTool(similarity=float(variant.split("/")[1]) if "/" in variant else None)
+    agent.tools = [tool]
+    preloaded: List[str] = []
+
+    def capture(callback_context, llm_request):
+        instruction = llm_request.config.system_instruction or ""
+        marker = instruction.find("The following content is from your previous conversations")
+        preloaded.append(instruction[marker:] if marker >= 0 else "")
+
+    agent.before_model_callback = capture
+    runner = Runner(
+        app_name=APP_NAME, agent=agent, session_service=InMemorySessionService(), memory_service=service
+    )
+    for session_turns in turns:
+        session = await runner.session_service.create_session(app_name=APP_NAME, user_id=USER_ID)
+        for turn in session_turns:
+            if turn["add"]:
+                await service.add_texts(
+                    app_name=APP_NAME, user_id=USER_ID, texts=[turn["add"]], timestamp=TIMESTAMP
+                )
+            content = types.Content(role="user", parts=[types.Part(text=turn["text"])])
+            async for _ in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=content):
+                pass
+    await runner.close()
+    total = len(preloaded)
+    return {
+        "variant": variant,
+        "turns": total,
+        "searches": len(service.latencies),
+        "avoided": total - len(service.latencies),
+        "tokens_per_turn": sum(estimate_text_tokens(text) for text in preloaded) / total,
+        "search_p50_ms": summarize_latencies(service.latencies)["p50_ms"],
+        "preloaded": preloaded,
+    }
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memories", type=int, default=100_000)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10, help="Turns per session.")
+    parser.add_argument(
+        "--add-probability", type=float, default=0.1, help="Chance a memory is added before a turn."
+    )
+    parser.add_argument("--similarity", type=float, nargs="+", default=[0.8])
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("GOOGLE_API_KEY", "preload-benchmark")
+    agent = importlib.import_module("13_proactive_memory_loading.agent").root_agent
+    use_offline_model(agent, OfflineModel(output_tokens=Distribution.constant(40)))
+    logging.getLogger().setLevel("WARNING")
+    words = topic_words(500, 12)
+    texts, _ = corpus(args.memories, words)
+    turns = script(args, words)
+    variants = ["stock", "cached"] + [f"cached/{similarity}" for similarity in args.similarity]
+    rows = [await simulate(agent, variant, texts, turns) for variant in variants]
+    stock = rows[0]["preloaded"]
+    for row in rows:
+        row["differs"] = sum(mine != theirs for mine, theirs in zip(row.pop("preloaded"), stock))
+    print_table(rows, [
+        "variant", "turns", "searches", "avoided", "tokens_per_turn", "search_p50_ms", "differs",
+    ])
+    if args.json_path:
+        write_json(args.json_path, rows)
+    if next(row for row in rows if row["variant"] == "cached")["differs"]:
+        sys.exit("The exact-match cache preloaded different memories than preload_memory.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Resume cost of long, compacted sessions: tail-only vs full history loads.
+
+Builds sessions shaped like `09_context_compaction` conversations (a user and
+a model event per turn, and a compaction summary every `--interval` turns
+overlapping `--overlap` turns) in `SqliteSessionService`, then reloads each
+one with `get_session` as a runner does on resume. It reports, per session
+size, the events loaded, median load latency and peak memory allocated while
+loading, in three modes:
+
+* `full`: `tail_only=False`.
+* `tail`: the default; every summary plus the latest one's window.
+* `latest`: `tail_summaries=1`, the opt-in for `SummaryTreeCompactionPlugin`
+  sessions, which skips the superseded summaries. It is shown for
+  comparison; flat summaries like these need `tail`.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.resume_benchmark --sizes 100 1000 5000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, print_table, write_json
+
+ensure_importable()
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions, EventCompaction
+from google.genai import types
+
+from shared.sqlite_sessions import SqliteSessionService
+
+APP_NAME = "resume_benchmark"
+
+MODES = {
+    "full": {"tail_only": False},
+    "tail": {},
+    "latest": {"tail_summaries": 1},
+}
+
+
+def _text(role: str, size: int) -> types.Content:
+    return types.Content(role=role, parts=[types.Part(text="m" * size)])
+
+
+async def build_session(
+    service: SqliteSessionService, events: int, interval: int, overlap: int, text_bytes: int
+) -> str:
+    """Appends `events` turn events, with compaction summaries as ADK would."""
+    session = await service.create_session(app_name=APP_NAME, user_id="user")
+    turn_starts: List[float] = []
+    for index in range(events // 2):
+        invocation_id = f"inv-{index}"
+        user = Event(author="user", invocation_id=invocation_id, content=_text("user", text_bytes // 4))
+        model = Event(
+            author="financial_news_analyst",
+            invocation_id=invocation_id,
+            content=_text("model", text_bytes),
+        )
+        turn_starts.append(user.timestamp)
+        await service.append_event(session, user)
+        await service.append_event(session, model)
+        if (index + 1) % interval == 0:
+            start = turn_starts[max(0, index + 1 - interval - overlap)]
+            summary = Event(
+                author="user",
+                invocation_id=f"compaction-{index}",
+                actions=EventActions(compaction=EventCompaction(
+                    start_timestamp=start,
+                    end_timestamp=model.timestamp,
+                    compacted_content=_text("model", text_bytes),
+                )),
+            )
+            await service.append_event(session, summary)
+    return session.id
+
+
+async def measure(service: SqliteSessionService, session_id: str, repeat: int) -> Dict[str, Any]:
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        session = await service.get_session(app_name=APP_NAME, user_id="user", session_id=session_id)
+        latencies.append(time.perf_counter() - started)
+    tracemalloc.start()
+    session = await service.get_session(app_name=APP_NAME, user_id="user", session_id=session_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "loaded_events": len(session.events),
+        "load_ms": statistics.median(latencies) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--interval", type=int, default=5, help="Turns between compactions.")
+    parser.add_argument("--overlap", type=int, default=2, help="Turns each summary overlaps.")
+    parser.add_argument("--text-bytes", type=int, default=800)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="resume-benchmark-")
+    rows = []
+    for size in args.sizes:
+        path = os.path.join(workdir, f"sessions-{size}.db")
+        writer = SqliteSessionService(path)
+        session_id = await build_session(writer, size, args.interval, args.overlap, args.text_bytes)
+        writer.close()
+        for mode, options in MODES.items():
+            service = SqliteSessionService(path, **options)
+            row = {"events": size, "mode": mode}
+            row.update(await measure(service, session_id, args.repeat))
+            service.close()
+            rows.append(row)
+    print_table(rows, ["events", "mode", "loaded_events", "load_ms", "peak_kib"])
+    if args.json_path:
+        write_json(args.json_path, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the legacy static retry policy with `ResilientModel` under faults.
+
+Both variants use the real `Gemini` client against a local `StubGeminiServer`
+that injects 429s (with `Retry-After`) or 503s. The report shows request
+latency, how many requests ultimately failed, and load amplification: how many
+HTTP requests the server saw per logical request.
+
+The legacy policy backs off 1s, 7s, 49s, 60s, so an outage run at real speed
+takes minutes. `--time-scale` shrinks every delay of both policies (and the
+deadline) by the same factor; the relative results are unchanged.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.retry_benchmark --scenario flaky
+    python -m benchmarks.retry_benchmark --scenario outage
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from dataclasses import replace
+from typing import Any, Dict, List
+
+from benchmarks.common import ensure_importable, print_table, summarize_latencies
+
+ensure_importable()
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from shared.retry import ResilientModel, RetryPolicy, RetryRuntime
+from shared.stub_server import FaultPlan, StubGeminiServer
+
+
+def legacy_retry_options(time_scale: float) -> types.HttpRetryOptions:
+    """The policy every pattern used to copy, with its delays scaled."""
+    return types.HttpRetryOptions(
+        attempts=5,
+        exp_base=7,
+        initial_delay=1 * time_scale,
+        max_delay=60 * time_scale,
+        http_status_codes=[429, 500, 503, 504],
+    )
+
+
+SCENARIOS = {
+    "flaky": FaultPlan(error_rate=0.2, status=429, retry_after=0.5, latency_ms=5, seed=7),
+    "outage": FaultPlan(error_rate=1.0, status=503, latency_ms=5, seed=7),
+}
+
+
+def _request(index: int) -> LlmRequest:
+    return LlmRequest(
+        model="gemini-2.5-flash-lite",
+        contents=[types.Content(role="user", parts=[types.Part(text=f"request {index}")])],
+    )
+
+
+async def run_variant(
+    name: str, build_model, plan: FaultPlan, requests: int, concurrency: int
+) -> Dict[str, Any]:
+    async with StubGeminiServer(plan) as server:
+        os.environ["GOOGLE_GEMINI_BASE_URL"] = server.base_url
+        model: BaseLlm = build_model()
+        latencies: List[float] = []
+        failures = 0
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(index: int) -> None:
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    async for _ in model.generate_content_async(_request(index)):
+                        pass
+                except Exception:
+                    failures += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    row = {"variant": name, "failed": failures, "server_requests": server.requests}
+    row.update(summarize_latencies(latencies))
+    row["amplification"] = server.requests / requests
+    row["wall_s"] = elapsed
+    return row
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="flaky")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--deadline", type=float, default=30.0, help="Per-request deadline (s).")
+    parser.add_argument("--time-scale", type=float, default=0.1,
+                        help="Factor applied to every retry delay and the deadline.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GOOGLE_API_KEY", "retry-benchmark")
+    plan = SCENARIOS[args.scenario]
+    scale = args.time_scale
+    if plan.retry_after is not None:
+        plan = replace(plan, retry_after=plan.retry_after * scale)
+    policy = RetryPolicy(
+        initial_delay=RetryPolicy.initial_delay * scale,
+        max_delay=RetryPolicy.max_delay * scale,
+        deadline=args.deadline * scale,
+        max_retry_after=RetryPolicy.max_retry_after * scale,
+    )
+    retry_runtime = RetryRuntime(seed=1)
+
+    rows = [
+        await run_variant(
+            "legacy exp_base=7",
+            lambda: Gemini(model="gemini-2.5-flash-lite", retry_options=legacy_retry_options(scale)),
+            plan, args.requests, args.concurrency,
+        ),
+        await run_variant(
+            "ResilientModel",
+            lambda: ResilientModel.wrap(
+                Gemini(model="gemini-2.5-flash-lite"),
+                policy,
+                retry_runtime,
+            ),
+            plan, args.requests, args.concurrency,
+        ),
+    ]
+    print_table(
+        rows,
+        ["variant", "failed", "p50_ms", "p95_ms", "p99_ms", "server_requests",
+         "amplification", "wall_s"],
+    )
+    stats = retry_runtime.stats
+    print(
+        f"\nResilientModel: retries={stats.retries} by_status={stats.retries_by_status} "
+        f"budget_exhausted={stats.budget_exhausted} deadline_exceeded={stats.deadline_exceeded} "
+        f"retry_after_honored={stats.retry_after_honored} "
+        f"throttled_s={stats.throttled_seconds:.2f} backoff_s={stats.backoff_seconds:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Session-store throughput: stock `DatabaseSessionService` vs `SqliteSessionService`.
+
+For each backend and concurrency level, `concurrency` sessions append events
+at the same time, each session sequentially (as a runner does). Every event
+carries a model-sized text part and a state delta, like a tool call that
+updates the cart in `10_session_state_tools`. The benchmark then reloads every
+session and reports:
+
+* `events_per_s`: appended events per second across all sessions.
+* `append_p95_ms`: 95th percentile latency of one `append_event`.
+* `load_p50_ms` / `load_p95_ms`: latency of one `get_session`, issued for
+  every session at once. The stock service blocks the event loop, so its
+  loads run one after another; `load_total_ms` is the wall time for all.
+* `mean_batch`: appends per commit (group commit; 1 for the stock service).
+* `errors`: appends that raised (for example `database is locked`).
+
+Each backend starts from an empty database file in a temporary directory.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.session_benchmark --concurrency 1 8 64 --events 50
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, percentile, print_table, write_json
+
+ensure_importable()
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions import DatabaseSessionService
+from google.adk.sessions.base_session_service import BaseSessionService
+from google.genai import types
+
+from shared.sqlite_sessions import SqliteSessionService
+
+APP_NAME = "session_benchmark"
+
+BACKENDS: Dict[str, Callable[[str], BaseSessionService]] = {
+    "database": lambda path: DatabaseSessionService(db_url=f"sqlite:///{path}"),
+    "sqlite": lambda path: SqliteSessionService(path),
+}
+
+
+def make_event(session_index: int, event_index: int, text_bytes: int) -> Event:
+    return Event(
+        author="shopping_cart_agent",
+        invocation_id=f"inv-{session_index}-{event_index // 4}",
+        content=types.Content(role="model", parts=[types.Part(text="x" * text_bytes)]),
+        actions=EventActions(state_delta={"cart_size": event_index, "last_item": f"item-{event_index}"}),
+    )
+
+
+async def run_session(
+    service: BaseSessionService,
+    index: int,
+    events: int,
+    text_bytes: int,
+    latencies: List[float],
+    errors: List[str],
+) -> str:
+    session = await service.create_session(app_name=APP_NAME, user_id=f"user-{index}")
+    for event_index in range(events):
+        started = time.perf_counter()
+        try:
+            await service.append_event(session, make_event(index, event_index, text_bytes))
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            continue
+        latencies.append(time.perf_counter() - started)
+    return session.id
+
+
+async def benchmark(
+    backend: str, concurrency: int, events: int, text_bytes: int, workdir: str
+) -> Dict[str, Any]:
+    path = os.path.join(workdir, f"{backend}-{concurrency}.db")
+    service = BACKENDS[backend](path)
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    started = time.perf_counter()
+    session_ids = await asyncio.gather(*(
+        run_session(service, index, events, text_bytes, latencies, errors)
+        for index in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    async def load(index: int, session_id: str) -> float:
+        load_started = time.perf_counter()
+        await service.get_session(app_name=APP_NAME, user_id=f"user-{index}", session_id=session_id)
+        return time.perf_counter() - load_started
+
+    load_started = time.perf_counter()
+    loads = await asyncio.gather(*(load(i, sid) for i, sid in enumerate(session_ids)))
+    load_total = time.perf_counter() - load_started
+    mean_batch = 1.0
+    if isinstance(service, SqliteSessionService):
+        mean_batch = service.stats.mean_batch
+        service.close()
+    else:
+        service.db_engine.dispose()
+    if errors:
+        logging.warning("%s x%d: %d errors, first: %s", backend, concurrency, len(errors), errors[0])
+    return {
+        "backend": backend,
+        "concurrency": concurrency,
+        "events_per_s": len(latencies) / elapsed,
+        "append_p95_ms": percentile(latencies, 95) * 1000,
+        "load_p50_ms": percentile(loads, 50) * 1000,
+        "load_p95_ms": percentile(loads, 95) * 1000,
+        "load_total_ms": load_total * 1000,
+        "mean_batch": mean_batch,
+        "errors": len(errors),
+    }
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--events", type=int, default=50, help="Events appended per session.")
+    parser.add_argument("--text-bytes", type=int, default=800)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="session-benchmark-")
+    rows = []
+    for concurrency in args.concurrency:
+        for backend in args.backends:
+            rows.append(await benchmark(backend, concurrency, args.events, args.text_bytes, workdir))
+    print_table(
+        rows,
+        [
+            "backend", "concurrency", "events_per_s", "append_p95_ms",
+            "load_p50_ms", "load_p95_ms", "load_total_ms", "mean_batch", "errors",
+        ],
+    )
+    if args.json_path:
+        write_json(args.json_path, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,196 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Session write throughput vs shard count, and an online reshard check.
+
+Each of `--processes` worker processes opens a `ShardedSessionService` over
+the same shard files (as several serving processes would) and appends
+`--events` events to each of `--sessions` sessions, for its own users. The
+workers start together; `events_per_s` is the total appended across all
+processes over the wall time of the slowest worker, and `speedup` compares
+it with one shard. With one shard every process queues on one SQLite write
+lock; with N shards, writes to different files proceed in parallel, so
+throughput scales up to the number of cores (or disks, with
+`--synchronous FULL`).
+
+`--reshard-check` then moves a live service from 2 to 3 shards while
+sessions keep appending, and verifies that every event and state value
+survived. It exits non-zero if any did not.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.shard_benchmark --shards 1 2 4 8 --processes 8
+    python -m benchmarks.shard_benchmark --reshard-check
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, print_table, write_json
+
+ensure_importable()
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+
+from shared.sharded_sessions import ShardedSessionService
+
+APP_NAME = "shard_benchmark"
+
+
+def make_event(user: str, index: int, text_bytes: int) -> Event:
+    return Event(
+        author="project_assistant",
+        invocation_id=f"{user}-{index // 4}",
+        content=types.Content(role="model", parts=[types.Part(text="x" * text_bytes)]),
+        actions=EventActions(state_delta={"last_note": index}),
+    )
+
+
+async def run_worker(path: str, shards: int, worker: int, options: Dict[str, Any], barrier) -> float:
+    service = ShardedSessionService(
+        ShardedSessionService.sqlite_shards(path, shards, synchronous=options["synchronous"])
+    )
+    sessions = [
+        await service.create_session(app_name=APP_NAME, user_id=f"worker{worker}-user{index}")
+        for index in range(options["sessions"])
+    ]
+    barrier.wait()
+    started = time.perf_counter()
+
+    async def fill(session) -> None:
+        for index in range(options["events"]):
+            await service.append_event(session, make_event(session.user_id, index, options["text_bytes"]))
+
+    await asyncio.gather(*(fill(session) for session in sessions))
+    elapsed = time.perf_counter() - started
+    service.close()
+    return elapsed
+
+
+def _worker_main(path, shards, worker, options, barrier, results) -> None:
+    results.put(asyncio.run(run_worker(path, shards, worker, options, barrier)))
+
+
+def benchmark(shards: int, processes: int, options: Dict[str, Any], workdir: str) -> Dict[str, Any]:
+    path = os.path.join(workdir, f"sessions-{shards}.db")
+    # Create the schema once, so workers do not race to create it.
+    ShardedSessionService(ShardedSessionService.sqlite_shards(path, shards)).close()
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    workers = [
+        context.Process(target=_worker_main, args=(path, shards, worker, options, barrier, results))
+        for worker in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    elapsed = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    events = processes * options["sessions"] * options["events"]
+    return {"shards": shards, "processes": processes, "events_per_s": events / max(elapsed)}
+
+
+async def reshard_check(workdir: str, users: int = 60, events: int = 20) -> Dict[str, Any]:
+    path = os.path.join(workdir, "reshard.db")
+    service = ShardedSessionService(ShardedSessionService.sqlite_shards(path, 2))
+    sessions = {}
+    for index in range(users):
+        user_id = f"user{index}"
+        sessions[user_id] = await service.create_session(
+            app_name=APP_NAME, user_id=user_id, state={"user:name": user_id}
+        )
+    before = {user_id: service.shard_for(APP_NAME, user_id) for user_id in sessions}
+
+    async def keep_appending(user_id: str) -> None:
+        for index in range(events):
+            await service.append_event(sessions[user_id], Event(
+                author="project_assistant",
+                actions=EventActions(state_delta={"notes": list(range(index + 1))}),
+            ))
+            await asyncio.sleep(0.001)
+
+    grown = dict(service.shards)
+    grown["shard2"] = ShardedSessionService.sqlite_shards(path, 3)["shard2"]
+    started = time.perf_counter()
+    await asyncio.gather(*(keep_appending(user_id) for user_id in sessions), service.reshard(grown, [APP_NAME]))
+    elapsed = time.perf_counter() - started
+
+    damaged = []
+    for user_id, session in sessions.items():
+        loaded = await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session.id)
+        if (
+            loaded is None
+            or len(loaded.events) != events
+            or loaded.state.get("notes") != list(range(events))
+            or loaded.state.get("user:name") != user_id
+        ):
+            damaged.append(user_id)
+    listed = await service.list_sessions(app_name=APP_NAME)
+    service.close()
+    return {
+        "users": users,
+        "moved": sum(before[user_id] != service.shard_for(APP_NAME, user_id) for user_id in sessions),
+        "listed": len(listed.sessions),
+        "damaged": len(damaged),
+        "elapsed_ms": elapsed * 1000,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions per process.")
+    parser.add_argument("--events", type=int, default=50, help="Events appended per session.")
+    parser.add_argument("--text-bytes", type=int, default=800)
+    parser.add_argument("--synchronous", default="NORMAL", choices=["NORMAL", "FULL"])
+    parser.add_argument("--reshard-check", action="store_true", help="Verify an online 2 -> 3 reshard.")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="shard-benchmark-")
+    if args.reshard_check:
+        row = asyncio.run(reshard_check(workdir))
+        print_table([row], ["users", "moved", "listed", "damaged", "elapsed_ms"])
+        if args.json_path:
+            write_json(args.json_path, [row])
+        if row["damaged"] or row["listed"] != row["users"]:
+            sys.exit("Sessions were lost or damaged during the reshard.")
+        return
+
+    options = {
+        "sessions": args.sessions,
+        "events": args.events,
+        "text_bytes": args.text_bytes,
+        "synchronous": args.synchronous,
+    }
+    rows = [benchmark(shards, args.processes, options, workdir) for shards in args.shards]
+    for row in rows:
+        row["speedup"] = row["events_per_s"] / rows[0]["events_per_s"]
+    print_table(rows, ["shards", "processes", "events_per_s", "speedup"])
+    if args.json_path:
+        write_json(args.json_path, rows)
+
+
+if __name__ == "__main__":
+    main()
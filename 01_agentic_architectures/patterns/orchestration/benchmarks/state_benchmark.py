@@ -0,0 +1,142 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Storage cost of a growing cart: whole-value state vs delta-encoded state.
+
+Builds `10_session_state_tools`-shaped sessions in `SqliteSessionService`:
+each turn is a user message, an `add_item_to_cart` response whose state delta
+carries the whole cart (as ADK records it), and a reply. Modes:
+
+* `full`: `snapshot_every=1`, so the session row is rewritten with the
+  whole cart on every change, as before delta encoding.
+* `delta`: the defaults; changes to the session row are stored as patch
+  operations, with a snapshot every `snapshot_every` changes.
+
+In both modes the event keeps the whole cart, as ADK records it.
+
+Per cart size, it reports `bytes_per_turn` (text written by the last 10%
+of turns), the database file size, and the median `get_session` latency.
+It also checks that both modes load the same cart.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.state_benchmark --items 100 500 1000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, print_table, write_json
+
+ensure_importable()
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.genai import types
+
+from shared.sqlite_sessions import SqliteSessionService
+
+APP_NAME = "state_benchmark"
+
+MODES = {
+    "full": {"snapshot_every": 1},
+    "delta": {},
+}
+
+
+def _text(role: str, text: str) -> types.Content:
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+async def build_session(service: SqliteSessionService, items: int) -> Dict[str, Any]:
+    """Appends one cart turn per item; returns the session id and bytes per turn."""
+    session = await service.create_session(app_name=APP_NAME, user_id="user")
+    cart: List[Dict[str, Any]] = []
+    tail_from = items - max(1, items // 10)
+    tail_bytes = 0
+    for index in range(items):
+        written = service.stats.bytes_written
+        invocation_id = f"inv-{index}"
+        cart = cart + [{"item": f"item number {index}", "quantity": index % 5 + 1}]
+        await service.append_event(
+            session, Event(author="user", invocation_id=invocation_id, content=_text("user", "Add one more."))
+        )
+        await service.append_event(session, Event(
+            author="shopping_cart_assistant",
+            invocation_id=invocation_id,
+            content=types.Content(role="user", parts=[types.Part(
+                function_response=types.FunctionResponse(
+                    name="add_item_to_cart", response={"status": "success"}
+                )
+            )]),
+            actions=EventActions(state_delta={"cart": cart}),
+        ))
+        await service.append_event(session, Event(
+            author="shopping_cart_assistant",
+            invocation_id=invocation_id,
+            content=_text("model", "Added it to your cart."),
+        ))
+        if index >= tail_from:
+            tail_bytes += service.stats.bytes_written - written
+    return {"session_id": session.id, "bytes_per_turn": tail_bytes / (items - tail_from), "cart": cart}
+
+
+async def measure(path: str, options: Dict[str, Any], session_id: str, repeat: int) -> Dict[str, Any]:
+    service = SqliteSessionService(path, **options)
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        session = await service.get_session(app_name=APP_NAME, user_id="user", session_id=session_id)
+        latencies.append(time.perf_counter() - started)
+    service.close()
+    return {"load_ms": statistics.median(latencies) * 1000, "cart": session.state["cart"]}
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="state-benchmark-")
+    rows = []
+    for items in args.items:
+        for mode, options in MODES.items():
+            path = os.path.join(workdir, f"{mode}-{items}.db")
+            writer = SqliteSessionService(path, **options)
+            built = await build_session(writer, items)
+            writer.close()
+            loaded = await measure(path, options, built["session_id"], args.repeat)
+            if loaded["cart"] != built["cart"]:
+                raise AssertionError(f"{mode} x{items}: loaded cart differs from the one written")
+            rows.append({
+                "items": items,
+                "mode": mode,
+                "bytes_per_turn": built["bytes_per_turn"],
+                "db_kib": os.path.getsize(path) / 1024,
+                "load_ms": loaded["load_ms"],
+            })
+    print_table(rows, ["items", "mode", "bytes_per_turn", "db_kib", "load_ms"])
+    if args.json_path:
+        write_json(args.json_path, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
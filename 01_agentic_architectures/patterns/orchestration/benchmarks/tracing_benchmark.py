@@ -0,0 +1,120 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the overhead of `LoggingPlugin` and the sampled `TracingPlugin`.
+
+The `15_logging_and_tracing` agent runs against the zero-latency offline model,
+so each turn's cost is the orchestration itself plus whatever the
+observability plugin adds. Variants:
+
+* `none`: no plugin.
+* `logging_plugin`: ADK's `LoggingPlugin`, with stdout sent to /dev/null so
+  terminal rendering is not counted, only formatting and writing.
+* `tracing pN%`: `TracingPlugin` exporting to an in-process OTLP collector
+  at the given sample rates.
+
+`cpu_ms_per_turn` is process CPU time (including the export thread) divided
+by the number of turns; `overhead_pct` compares it with `none`.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.tracing_benchmark --turns 500 --sample-rates 1.0 0.1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, print_table, summarize_latencies
+
+ensure_importable()
+
+from google.adk.plugins.logging_plugin import LoggingPlugin
+from google.adk.runners import InMemoryRunner
+
+from benchmarks.pattern_benchmark import run_turn
+from shared.offline_model import OfflineModel, use_offline_model
+from shared.tracing import OtlpCollector, OtlpHttpSpanExporter, TracingPlugin
+
+
+async def run_variant(root_agent, plugins: List[Any], turns: int, warmup: int) -> Dict[str, float]:
+    """Runs `warmup + turns` turns, each in a fresh session, and returns a summary row."""
+    runner = InMemoryRunner(agent=root_agent, app_name="tracing_benchmark", plugins=plugins)
+    latencies: List[float] = []
+    cpu_started = 0.0
+    for turn in range(warmup + turns):
+        if turn == warmup:
+            cpu_started = time.process_time()
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id="benchmark"
+        )
+        started = time.perf_counter()
+        await run_turn(runner, session.user_id, session.id, f"What is the status of flight UA{turn}?")
+        if turn >= warmup:
+            latencies.append(time.perf_counter() - started)
+    for plugin in plugins:
+        if isinstance(plugin, TracingPlugin):
+            plugin.flush()
+    row = {"cpu_ms_per_turn": (time.process_time() - cpu_started) * 1000 / turns}
+    row.update(summarize_latencies(latencies))
+    return row
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--sample-rates", type=float, nargs="+", default=[1.0, 0.1])
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("GOOGLE_API_KEY", "tracing-benchmark")
+    from importlib import import_module
+
+    pattern = import_module("15_logging_and_tracing.agent")
+    logging.getLogger().setLevel(logging.WARNING)
+    use_offline_model(pattern.root_agent, OfflineModel())
+
+    rows: List[Dict[str, Any]] = []
+    row = {"variant": "none"}
+    row.update(await run_variant(pattern.root_agent, [], args.turns, args.warmup))
+    rows.append(row)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        summary = await run_variant(pattern.root_agent, [LoggingPlugin()], args.turns, args.warmup)
+    rows.append({"variant": "logging_plugin", **summary})
+
+    with OtlpCollector() as collector:
+        for rate in args.sample_rates:
+            tracing = TracingPlugin(OtlpHttpSpanExporter(collector.endpoint), sample_rate=rate)
+            summary = await run_variant(pattern.root_agent, [tracing], args.turns, args.warmup)
+            tracing.shutdown()
+            summary["spans"] = tracing.stats.spans_exported
+            summary["dropped"] = tracing.stats.spans_dropped
+            rows.append({"variant": f"tracing p{rate * 100:g}%", **summary})
+
+    base = rows[0]["cpu_ms_per_turn"]
+    for row in rows:
+        row["overhead_pct"] = (row["cpu_ms_per_turn"] / base - 1) * 100
+    print_table(
+        rows,
+        ["variant", "cpu_ms_per_turn", "overhead_pct", "p50_ms", "p95_ms", "p99_ms", "spans", "dropped"],
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
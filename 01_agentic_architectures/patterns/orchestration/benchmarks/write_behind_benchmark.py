@@ -0,0 +1,209 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Turn latency of `10_session_state_tools` with synchronous and write-behind sessions.
+
+The shopping cart agent runs against the offline model, so every turn is a
+user message, an `add_item_to_cart` call, its response (with the cart state
+delta) and a reply, each appended to the session store. `--concurrency`
+sessions run turns at the same time. Variants:
+
+* `database`, `sqlite`: the stock `DatabaseSessionService` and
+  `SqliteSessionService`, every append written before it returns.
+* `wb-event`, `wb-turn`, `wb-timer`: `WriteBehindSessionService` over
+  `SqliteSessionService` at each durability level.
+* `db+wb-turn`: write-behind at turn durability over the stock service.
+
+With `--crash-check`, a child process runs turns at each durability level and
+exits abruptly (no flush, no close) right after the last turn returns. The
+parent reopens the database and counts the events of acknowledged turns that
+were lost: none are allowed for "event" and "turn"; for "timer" the loss is
+reported. The check fails with a non-zero exit status otherwise.
+
+Usage (from `01_agentic_architectures/patterns/orchestration/`):
+
+    python -m benchmarks.write_behind_benchmark --turns 40 --concurrency 1 16
+    python -m benchmarks.write_behind_benchmark --crash-check
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import ensure_importable, print_table, summarize_latencies, write_json
+
+ensure_importable()
+
+from google.adk.runners import Runner
+from google.adk.sessions import DatabaseSessionService
+from google.adk.sessions.base_session_service import BaseSessionService
+
+from benchmarks.pattern_benchmark import run_turn
+from shared.offline_model import OfflineModel, use_offline_model
+from shared.sqlite_sessions import SqliteSessionService
+from shared.write_behind import WriteBehindSessionService
+
+APP_NAME = "write_behind_benchmark"
+
+VARIANTS: Dict[str, Callable[[str], BaseSessionService]] = {
+    "database": lambda path: DatabaseSessionService(db_url=f"sqlite:///{path}"),
+    "sqlite": lambda path: SqliteSessionService(path),
+    "wb-event": lambda path: WriteBehindSessionService(SqliteSessionService(path), durability="event"),
+    "wb-turn": lambda path: WriteBehindSessionService(SqliteSessionService(path), durability="turn"),
+    "wb-timer": lambda path: WriteBehindSessionService(SqliteSessionService(path), durability="timer"),
+    "db+wb-turn": lambda path: WriteBehindSessionService(
+        DatabaseSessionService(db_url=f"sqlite:///{path}"), durability="turn"
+    ),
+}
+
+
+def load_agent():
+    os.environ.setdefault("GOOGLE_API_KEY", "write-behind-benchmark")
+    from importlib import import_module
+
+    root_agent = import_module("10_session_state_tools.agent").root_agent
+    use_offline_model(root_agent, OfflineModel())
+    return root_agent
+
+
+def build_runner(root_agent, service: BaseSessionService) -> Runner:
+    plugins = [service.turn_plugin()] if isinstance(service, WriteBehindSessionService) else []
+    return Runner(agent=root_agent, app_name=APP_NAME, session_service=service, plugins=plugins)
+
+
+async def close(service: BaseSessionService) -> None:
+    if isinstance(service, WriteBehindSessionService):
+        await service.aclose()
+        service = service.inner
+    if isinstance(service, SqliteSessionService):
+        service.close()
+    else:
+        service.db_engine.dispose()
+
+
+async def benchmark(root_agent, variant: str, concurrency: int, turns: int, workdir: str) -> Dict[str, Any]:
+    service = VARIANTS[variant](os.path.join(workdir, f"{variant}-{concurrency}.db"))
+    runner = build_runner(root_agent, service)
+    latencies: List[float] = []
+
+    async def run_session(index: int) -> None:
+        session = await service.create_session(app_name=APP_NAME, user_id=f"user-{index}")
+        for turn in range(turns):
+            started = time.perf_counter()
+            await run_turn(runner, session.user_id, session.id, f"Add {turn + 1} apples to my cart.")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_session(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    row: Dict[str, Any] = {"variant": variant, "concurrency": concurrency}
+    row.update(summarize_latencies(latencies))
+    row["turns_per_s"] = len(latencies) / elapsed
+    await close(service)
+    return row
+
+
+async def crash_child(path: str, durability: str, turns: int) -> None:
+    """Runs `turns` turns, reports what was acknowledged, then dies without flushing."""
+    root_agent = load_agent()
+    service = WriteBehindSessionService(
+        SqliteSessionService(path), durability=durability, flush_interval=0.5
+    )
+    runner = build_runner(root_agent, service)
+    session = await service.create_session(app_name=APP_NAME, user_id="crash")
+    for turn in range(turns):
+        await run_turn(runner, session.user_id, session.id, f"Add {turn + 1} pears to my cart.")
+    acknowledged = await service.get_session(app_name=APP_NAME, user_id="crash", session_id=session.id)
+    print(json.dumps({
+        "session_id": session.id,
+        "events": [event.id for event in acknowledged.events],
+    }), flush=True)
+    os._exit(0)
+
+
+async def crash_check(turns: int, workdir: str) -> List[Dict[str, Any]]:
+    rows = []
+    for durability in ("event", "turn", "timer"):
+        path = os.path.join(workdir, f"crash-{durability}.db")
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.write_behind_benchmark",
+             "--crash-child", path, durability, str(turns)],
+            capture_output=True, text=True, check=True,
+        )
+        acknowledged = json.loads(child.stdout.strip().splitlines()[-1])
+        service = SqliteSessionService(path, tail_only=False)
+        session = await service.get_session(
+            app_name=APP_NAME, user_id="crash", session_id=acknowledged["session_id"]
+        )
+        service.close()
+        persisted = [event.id for event in session.events]
+        rows.append({
+            "durability": durability,
+            "acknowledged": len(acknowledged["events"]),
+            "persisted": len(persisted),
+            "lost": len(acknowledged["events"]) - len(persisted),
+            "prefix": persisted == acknowledged["events"][:len(persisted)],
+        })
+    return rows
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--turns", type=int, default=40, help="Turns per session.")
+    parser.add_argument("--crash-check", action="store_true", help="Verify durability across a crash.")
+    parser.add_argument("--crash-child", nargs=3, metavar=("PATH", "DURABILITY", "TURNS"), help=argparse.SUPPRESS)
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.crash_child:
+        path, durability, turns = args.crash_child
+        await crash_child(path, durability, int(turns))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="write-behind-benchmark-")
+    if args.crash_check:
+        rows = await crash_check(args.turns, workdir)
+        print_table(rows, ["durability", "acknowledged", "persisted", "lost", "prefix"])
+        failed = [
+            row for row in rows
+            if not row["prefix"] or (row["durability"] != "timer" and row["lost"])
+        ]
+        if args.json_path:
+            write_json(args.json_path, rows)
+        if failed:
+            sys.exit(f"Acknowledged events lost: {failed}")
+        return
+
+    root_agent = load_agent()
+    rows = []
+    for concurrency in args.concurrency:
+        for variant in args.variants:
+            rows.append(await benchmark(root_agent, variant, concurrency, args.turns, workdir))
+    print_table(rows, ["variant", "concurrency", "p50_ms", "p95_ms", "p99_ms", "turns_per_s"])
+    if args.json_path:
+        write_json(args.json_path, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
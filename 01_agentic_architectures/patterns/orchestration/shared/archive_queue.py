@@ -0,0 +1,279 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Memory archiving off the turn's critical path.
+
+An `after_agent_callback` that awaits the memory write makes every response
+wait for ingestion and embedding. `ArchiveQueue.submit` only records that a
+session has new events; a pool of worker tasks archives them through a
+`MemoryArchiver` in the background.
+
+* Turns of the same session coalesce. While a session waits in the queue,
+  later turns only replace the session it will read, and one
+  `MemoryArchiver.archive` call takes every event since the watermark in a
+  single batch. A session being archived is queued again rather than
+  archived twice at once.
+* The queue holds at most `max_sessions` waiting sessions. When it is full,
+  the `overflow` policy applies to a session not already waiting:
+  `"block"` makes `submit` wait for room (backpressure onto the turn),
+  `"drop_newest"` turns the submission away, and `"drop_oldest"` evicts the
+  session that has waited longest. Dropping loses no events while the session
+  lives on: its watermark has not moved, so its next turn archives them.
+* A failed archive is logged and counted, and the session is retried on its
+  next turn.
+* `aclose()` stops taking turns and drains the queue, waiting at most
+  `timeout` seconds; `drain()` waits for the queue to empty without closing.
+
+Queue depth, submissions by outcome, and ingestion lag (from a session's first
+queued turn to its archive completing) are exported as
+`adk_memory_archive_queue_depth`, `adk_memory_archive_submissions` and
+`adk_memory_archive_lag_seconds`, and counted in `stats`.
+
+Sample:
+```python
+archive_queue = ArchiveQueue(MemoryArchiver(), workers=2, max_sessions=1000)
+
+
+async def auto_save_to_memory(callback_context):
+    invocation_context = callback_context._invocation_context
+    await archive_queue.submit(invocation_context.memory_service, invocation_context.session)
+
+# On shutdown:
+await archive_queue.aclose(timeout=30)
+```
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+
+from google.adk.memory.base_memory_service import BaseMemoryService
+from google.adk.sessions.session import Session
+
+from shared.memory_archiving import MemoryArchiver
+from shared.metrics_registry import MetricsRegistry
+from shared.metrics_registry import registry as default_registry
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+_Key = Tuple[str, str, str]
+
+
+@dataclass
+class ArchiveQueueStats:
+    """Counters for `ArchiveQueue`.
+
+    Attributes:
+        submitted: Turns submitted.
+        coalesced: Turns merged into a session already waiting.
+        dropped: Turns dropped by the overflow policy or an unfinished drain.
+        blocked: Submissions that waited for room.
+        batches: Archive calls made by the workers.
+        errors: Archive calls that failed.
+        max_depth: Most sessions waiting at once.
+        max_lag_s: Longest time from a session's first queued turn to its archive.
+    """
+
+    submitted: int = 0
+    coalesced: int = 0
+    dropped: int = 0
+    blocked: int = 0
+    batches: int = 0
+    errors: int = 0
+    max_depth: int = 0
+    max_lag_s: float = 0.0
+
+
+@dataclass
+class _Waiting:
+    memory_service: BaseMemoryService
+    session: Session
+    queued_at: float
+    turns: int = 1
+
+
+class ArchiveQueue:
+    """Archives sessions into memory in the background, one batch per session.
+
+    Args:
+        archiver: Tracks watermarks and does the ingestion.
+        workers: Worker tasks archiving concurrently.
+        max_sessions: Sessions waiting before `overflow` applies.
+        overflow: "block", "drop_newest" or "drop_oldest"; see the module docstring.
+        registry: Where metrics are exported; the process-wide registry by default.
+    """
+
+    def __init__(
+        self,
+        archiver: Optional[MemoryArchiver] = None,
+        workers: int = 2,
+        max_sessions: int = 1000,
+        overflow: str = "block",
+        registry: Optional[MetricsRegistry] = None,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, not {overflow!r}")
+        self.archiver = archiver or MemoryArchiver(registry=registry)
+        self.workers = workers
+        self.max_sessions = max_sessions
+        self.overflow = overflow
+        self.stats = ArchiveQueueStats()
+        self._waiting: "OrderedDict[_Key, _Waiting]" = OrderedDict()
+        self._active: Set[_Key] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Condition] = None
+        self._closing = False
+        registry = registry or default_registry
+        self._depth = registry.gauge(
+            "adk_memory_archive_queue_depth", "Sessions waiting to be archived."
+        ).labels()
+        self._submissions = registry.counter(
+            "adk_memory_archive_submissions", "Turns submitted for archiving.", ["outcome"]
+        )
+        self._lag = registry.histogram(
+            "adk_memory_archive_lag_seconds", "Time from a session's first queued turn to its archive."
+        ).labels()
+
+    @property
+    def depth(self) -> int:
+        """Sessions waiting to be archived."""
+        return len(self._waiting)
+
+    async def submit(self, memory_service: BaseMemoryService, session: Session) -> bool:
+        """Queues `session` for archiving; returns False if the overflow policy dropped it."""
+        if self._closing:
+            raise RuntimeError("ArchiveQueue is closed.")
+        self._ensure_workers()
+        key = (session.app_name, session.user_id, session.id)
+        changed = self._changed
+        async with changed:
+            self.stats.submitted += 1
+            if self._coalesce(key, memory_service, session):
+                return True
+            if len(self._waiting) >= self.max_sessions:
+                if self.overflow == "drop_newest":
+                    self._drop(1)
+                    return False
+                if self.overflow == "drop_oldest":
+                    self._drop(self._waiting.popitem(last=False)[1].turns)
+                else:
+                    self.stats.blocked += 1
+                    await changed.wait_for(lambda: len(self._waiting) < self.max_sessions or self._closing)
+                    if self._closing:
+                        self._drop(1)
+                        return False
+                    if self._coalesce(key, memory_service, session):
+                        return True
+            self._waiting[key] = _Waiting(memory_service, session, time.monotonic())
+            self.stats.max_depth = max(self.stats.max_depth, len(self._waiting))
+            self._depth.set(len(self._waiting))
+            self._submissions.labels(outcome="queued").inc()
+            changed.notify_all()
+            return True
+
+    async def drain(self) -> None:
+        """Waits until every queued session has been archived."""
+        if self._changed is None:
+            return
+        async with self._changed:
+            await self._changed.wait_for(lambda: not self._waiting and not self._active)
+
+    async def aclose(self, timeout: Optional[float] = None) -> None:
+        """Stops taking turns and archives what is queued, for at most `timeout` seconds.
+
+        Sessions still waiting when the timeout expires are dropped and
+        counted in `stats.dropped`.
+        """
+        self._closing = True
+        if not self._tasks:
+            return
+        async with self._changed:
+            self._changed.notify_all()
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+        if self._waiting:
+            self._drop(sum(waiting.turns for waiting in self._waiting.values()))
+            self._waiting.clear()
+            self._depth.set(0)
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._tasks and self._tasks[0].get_loop() is loop:
+            self._tasks = [task for task in self._tasks if not task.done()]
+            if len(self._tasks) == self.workers:
+                return
+        else:
+            self._changed = asyncio.Condition()
+            self._tasks = []
+        self._tasks += [loop.create_task(self._work()) for _ in range(self.workers - len(self._tasks))]
+
+    def _coalesce(self, key: _Key, memory_service: BaseMemoryService, session: Session) -> bool:
+        waiting = self._waiting.get(key)
+        if waiting is None:
+            return False
+        # The newest copy of the session holds the earlier turns' events too.
+        waiting.memory_service, waiting.session = memory_service, session
+        waiting.turns += 1
+        self.stats.coalesced += 1
+        self._submissions.labels(outcome="coalesced").inc()
+        return True
+
+    def _drop(self, turns: int) -> None:
+        self.stats.dropped += turns
+        self._submissions.labels(outcome="dropped").inc(turns)
+
+    async def _work(self) -> None:
+        changed = self._changed
+        while True:
+            async with changed:
+                await changed.wait_for(lambda: self._closing or self._next() is not None)
+                key = self._next()
+                if key is None:
+                    # Closing, and nothing is left that this worker can take.
+                    if not self._waiting:
+                        return
+                    await changed.wait()
+                    continue
+                waiting = self._waiting.pop(key)
+                self._active.add(key)
+                self._depth.set(len(self._waiting))
+                changed.notify_all()
+            try:
+                await self.archiver.archive(waiting.memory_service, waiting.session)
+            except Exception as e:
+                self.stats.errors += 1
+                logger.warning("Archiving session %s failed; its next turn retries: %r", key[2], e)
+            finally:
+                lag = time.monotonic() - waiting.queued_at
+                self._lag.observe(lag)
+                self.stats.batches += 1
+                self.stats.max_lag_s = max(self.stats.max_lag_s, lag)
+                async with changed:
+                    self._active.discard(key)
+                    changed.notify_all()
+
+    def _next(self) -> Optional[_Key]:
+        """The session waiting longest that no worker is archiving."""
+        for key in self._waiting:
+            if key not in self._active:
+                return key
+        return None
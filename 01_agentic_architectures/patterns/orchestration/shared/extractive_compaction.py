@@ -0,0 +1,346 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A local, extractive pre-pass that runs before any LLM summarization.
+
+ADR-009 accepts a "minor increase in LLM usage" for compaction. In practice
+every compaction round is a model call over the whole window, and much of
+that window is noise: function-call boilerplate, the same tool result
+fetched three times, and kilobytes of JSON of which the answer used two
+fields.
+
+`ExtractiveSummarizer` is a `BaseEventsSummarizer` that condenses the window
+locally first:
+
+1. Function calls that got a response are dropped; the response says what
+   was called.
+2. A tool result identical to an earlier one in the window is replaced by a
+   one-line back-reference.
+3. Large function responses are cut to their salient fields: status and
+   error fields first, then short scalars, then the first items of lists.
+4. If the result is still over budget, sentences are scored extractively
+   (frequency of their content words across the window, with a bonus for
+   figures and for the user's own words) and the best are kept, in order.
+
+If the condensed window fits in `local_max_tokens`, it becomes the summary
+and no model is called. So does its extract if the window is at most
+`max_local_ratio` times that size. Otherwise the condensed window, capped at
+`model_input_tokens`, goes to `inner` (such as `LlmEventSummarizer`). The
+stock summarizer only reads text parts, so tool results it would have
+dropped now reach it as a few salient fields.
+
+Use it wherever a summarizer goes: `EventsCompactionConfig(summarizer=...)`
+on an `App`, or the `summarizer` of `TokenBudgetCompactionPlugin` and
+`SummaryTreeCompactionPlugin`. `stats` and the
+`adk_precompaction_tokens_saved` and `adk_precompaction_calls_saved`
+counters report what it saved.
+
+Sample:
+```python
+summarizer = ExtractiveSummarizer(inner=tokens.metered_summarizer(agent.model))
+app = App(
+    name="financial_analyst_app",
+    root_agent=agent,
+    events_compaction_config=EventsCompactionConfig(
+        compaction_interval=5, overlap_size=2, summarizer=summarizer
+    ),
+)
+```
+"""
+
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.apps.base_events_summarizer import BaseEventsSummarizer
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions, EventCompaction
+from google.genai import types
+
+from shared.metrics_registry import MetricsRegistry
+from shared.metrics_registry import registry as default_registry
+from shared.token_compaction import CHARS_PER_TOKEN, estimate_content_tokens, estimate_text_tokens
+
+# Fields kept first when a function response is cut down.
+SALIENT_KEYS = (
+    "status", "error", "error_message", "message", "result", "summary", "answer",
+    "title", "name", "id", "price", "total", "count", "date",
+)
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"[a-z0-9][a-z0-9'%$.-]*")
+_FIGURE = re.compile(r"\d")
+_MAX_SENTENCE_WORDS = 60
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from has have i if in is it its me my "
+    "no not of on or our so that the their them then there these they this to was "
+    "we were what when which who will with you your".split()
+)
+
+
+@dataclass
+class PreCompactionStats:
+    """What the pre-pass saved.
+
+    Attributes:
+        rounds: Windows summarized.
+        local_rounds: Windows summarized without a model call.
+        tokens_in: Estimated tokens of the windows as received.
+        tokens_to_model: Estimated tokens of the condensed windows sent on.
+    """
+
+    rounds: int = 0
+    local_rounds: int = 0
+    tokens_in: int = 0
+    tokens_to_model: int = 0
+
+    @property
+    def calls_saved(self) -> int:
+        return self.local_rounds
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_to_model
+
+
+class ExtractiveSummarizer(BaseEventsSummarizer):
+    """Condenses a window locally; calls `inner` only when it is still large.
+
+    Args:
+        inner: The summarizer for windows that do not condense below
+            `local_max_tokens`. Without one, those windows are cut
+            extractively to `local_max_tokens` instead.
+        local_max_tokens: Condensed windows up to this size are used as the
+            summary directly.
+        max_local_ratio: Condensed windows up to `max_local_ratio` times
+            `local_max_tokens` are cut extractively to `local_max_tokens`
+            and used as the summary, without a model call.
+        model_input_tokens: Most tokens of condensed window sent to `inner`.
+        max_response_chars: Function responses longer than this, as JSON,
+            are cut to their salient fields.
+        registry: Where savings are exported; the process-wide registry by default.
+    """
+
+    def __init__(
+        self,
+        inner: Optional[BaseEventsSummarizer] = None,
+        local_max_tokens: int = 512,
+        max_local_ratio: float = 2.0,
+        model_input_tokens: int = 2_000,
+        max_response_chars: int = 400,
+        registry: Optional[MetricsRegistry] = None,
+    ) -> None:
+        self.inner = inner
+        self.local_max_tokens = local_max_tokens
+        self.max_local_ratio = max_local_ratio
+        self.model_input_tokens = model_input_tokens
+        self.max_response_chars = max_response_chars
+        self.stats = PreCompactionStats()
+        registry = registry or default_registry
+        self._tokens_saved = registry.counter(
+            "adk_precompaction_tokens_saved", "Summarizer input tokens removed by the local pre-pass."
+        ).labels()
+        self._calls_saved = registry.counter(
+            "adk_precompaction_calls_saved", "Compaction rounds that needed no model call."
+        ).labels()
+
+    async def maybe_summarize_events(self, *, events: List[Event]) -> Optional[Event]:
+        if not events:
+            return None
+        tokens_in = sum(estimate_content_tokens(event.content) for event in events)
+        lines = self.condense(events)
+        if not lines:
+            return None
+        condensed = sum(estimate_text_tokens(text) for _, text in lines)
+
+        if condensed <= self.local_max_tokens * self.max_local_ratio or self.inner is None:
+            text = _render(_extract(lines, self.local_max_tokens))
+            self._record(tokens_in, 0, local=True)
+            return _compaction_event(events, text)
+
+        lines = _extract(lines, self.model_input_tokens)
+        condensed_events = [
+            Event(
+                author=author,
+                invocation_id=events[0].invocation_id,
+                timestamp=events[0].timestamp,
+                content=types.Content(role="user", parts=[types.Part(text=text)]),
+            )
+            for author, text in lines
+        ]
+        # Keep the window's range; the summary covers the original events.
+        condensed_events[-1].timestamp = events[-1].timestamp
+        self._record(tokens_in, sum(estimate_text_tokens(text) for _, text in lines), local=False)
+        return await self.inner.maybe_summarize_events(events=condensed_events)
+
+    def condense(self, events: List[Event]) -> List[Tuple[str, str]]:
+        """Returns the window as (author, text) lines, without boilerplate."""
+        answered = {
+            part.function_response.id or part.function_response.name
+            for event in events
+            for part in _parts(event)
+            if part.function_response
+        }
+        seen: Dict[str, str] = {}
+        lines = []
+        for event in events:
+            for part in _parts(event):
+                if part.thought:
+                    continue
+                if part.text and part.text.strip():
+                    lines.append((event.author, part.text.strip()))
+                elif part.function_call:
+                    call = part.function_call
+                    if (call.id or call.name) not in answered:
+                        lines.append((event.author, f"called {call.name}({_dumps(call.args)})"))
+                elif part.function_response:
+                    response = part.function_response
+                    payload = _dumps(response.response)
+                    fingerprint = f"{response.name}:{payload}"
+                    if fingerprint in seen:
+                        lines.append((event.author, f"{response.name} returned the same as before."))
+                        continue
+                    seen[fingerprint] = response.name
+                    if len(payload) > self.max_response_chars:
+                        payload = _dumps(_salient(response.response, self.max_response_chars))
+                    lines.append((event.author, f"{response.name} returned {payload}"))
+        return lines
+
+    def _record(self, tokens_in: int, tokens_to_model: int, local: bool) -> None:
+        self.stats.rounds += 1
+        self.stats.tokens_in += tokens_in
+        self.stats.tokens_to_model += tokens_to_model
+        self._tokens_saved.inc(max(0, tokens_in - tokens_to_model))
+        if local:
+            self.stats.local_rounds += 1
+            self._calls_saved.inc()
+
+
+def _extract(lines: List[Tuple[str, str]], budget_tokens: int) -> List[Tuple[str, str]]:
+    """Keeps the highest-scoring sentences that fit in `budget_tokens`, in order."""
+    if sum(estimate_text_tokens(text) for _, text in lines) <= budget_tokens:
+        return lines
+    sentences = []
+    for line, (author, text) in enumerate(lines):
+        for sentence in _sentences(text):
+            sentences.append((line, author, sentence))
+    frequency = Counter(
+        word for _, _, sentence in sentences for word in _content_words(sentence)
+    )
+
+    def score(item: Tuple[int, str, str]) -> float:
+        _, author, sentence = item
+        words = _content_words(sentence)
+        if not words:
+            return 0.0
+        value = sum(frequency[word] for word in set(words)) / len(words) ** 0.5
+        if _FIGURE.search(sentence):
+            value *= 1.5
+        if author == "user":
+            value *= 1.25
+        return value
+
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    chosen = set()
+    for index in sorted(range(len(sentences)), key=lambda index: -score(sentences[index])):
+        cost = len(sentences[index][2]) + 1
+        if cost <= budget_chars:
+            chosen.add(index)
+            budget_chars -= cost
+    kept: List[Tuple[str, str]] = []
+    previous = None
+    for index in sorted(chosen):
+        line, author, sentence = sentences[index]
+        if line == previous:
+            kept[-1] = (author, f"{kept[-1][1]} {sentence}")
+        else:
+            kept.append((author, sentence))
+        previous = line
+    return kept
+
+
+def _sentences(text: str) -> List[str]:
+    """Splits text into sentences, and run-on sentences into word windows."""
+    pieces = []
+    for sentence in _SENTENCE.split(text):
+        words = sentence.split()
+        while len(words) > _MAX_SENTENCE_WORDS:
+            pieces.append(" ".join(words[:_MAX_SENTENCE_WORDS]))
+            words = words[_MAX_SENTENCE_WORDS:]
+        if words:
+            pieces.append(" ".join(words))
+    return pieces
+
+
+def _salient(value: Any, budget_chars: int, depth: int = 0) -> Any:
+    """Cuts a JSON-like value down to its most telling fields."""
+    if isinstance(value, str):
+        return value if len(value) <= 80 else value[:77] + "..."
+    if isinstance(value, list):
+        head = [_salient(item, budget_chars // 3, depth + 1) for item in value[:3]]
+        return head + [f"(+{len(value) - 3} more)"] if len(value) > 3 else head
+    if not isinstance(value, dict) or depth >= 2:
+        return value if not isinstance(value, dict) else f"{{{len(value)} fields}}"
+    ordered = sorted(
+        value.items(),
+        key=lambda item: (
+            item[0] not in SALIENT_KEYS,
+            isinstance(item[1], (dict, list)),
+            len(_dumps(item[1])),
+        ),
+    )
+    kept: Dict[str, Any] = {}
+    used = 2
+    for key, item in ordered:
+        item = _salient(item, budget_chars // 2, depth + 1)
+        cost = len(key) + len(_dumps(item)) + 4
+        if used + cost > budget_chars and kept:
+            kept["..."] = f"{len(value) - len(kept)} more fields"
+            break
+        kept[key] = item
+        used += cost
+    return kept
+
+
+def _content_words(sentence: str) -> List[str]:
+    return [word for word in _WORD.findall(sentence.lower()) if word not in _STOPWORDS]
+
+
+def _render(lines: List[Tuple[str, str]]) -> str:
+    return "\n".join(f"{author}: {text}" for author, text in lines)
+
+
+def _compaction_event(events: List[Event], text: str) -> Event:
+    return Event(
+        author="user",
+        invocation_id=Event.new_id(),
+        actions=EventActions(compaction=EventCompaction(
+            start_timestamp=events[0].timestamp,
+            end_timestamp=events[-1].timestamp,
+            compacted_content=types.Content(role="model", parts=[types.Part(text=text)]),
+        )),
+    )
+
+
+def _parts(event: Event) -> List[types.Part]:
+    return (event.content.parts or []) if event.content else []
+
+
+def _dumps(value: Any) -> str:
+    try:
+        return json.dumps(value, default=str, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return str(value)
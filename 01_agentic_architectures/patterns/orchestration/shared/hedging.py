@@ -0,0 +1,267 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Hedged (speculative duplicate) model requests for tail-latency reduction.
+
+A `ParallelAgent` finishes when its slowest sub-agent does, so a fan-out of N
+model calls pays for the tail of the latency distribution, not the median.
+`HedgedModel` bounds that tail: when a call has been outstanding for longer
+than a chosen percentile of recently observed latencies, a duplicate request
+is sent. Whichever attempt produces a response first wins and the other is
+cancelled. With a p95 trigger, at most about 5% of calls are duplicated.
+
+Sample:
+```python
+from shared.hedging import HedgedModel, HedgePolicy
+from shared.model_clients import get_model
+
+researcher_model = HedgedModel.wrap(get_model(), HedgePolicy(percentile=95))
+print(researcher_model.stats.hedge_rate, researcher_model.stats.hedge_wins)
+```
+"""
+
+import asyncio
+import bisect
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncGenerator, Deque, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.base_llm_connection import BaseLlmConnection
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import PrivateAttr
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """When to send a duplicate request.
+
+    Attributes:
+        percentile: The hedge fires once a call has been outstanding for this
+            percentile of recent latencies.
+        window: How many recent latencies the percentile is computed over.
+        min_samples: No hedging until this many latencies have been observed.
+        min_delay: Lower bound, in seconds, on the hedge delay.
+    """
+
+    percentile: float = 95.0
+    window: int = 200
+    min_samples: int = 20
+    min_delay: float = 0.0
+
+
+class LatencyWindow:
+    """A sliding window of recent latencies with percentile lookup.
+
+    Args:
+        size: The number of samples kept.
+    """
+
+    def __init__(self, size: int) -> None:
+        self._samples: Deque[float] = deque()
+        self._sorted: List[float] = []
+        self._size = size
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        if len(self._samples) == self._size:
+            oldest = self._samples.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+        self._samples.append(seconds)
+        bisect.insort(self._sorted, seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._sorted:
+            return None
+        index = min(len(self._sorted) - 1, int(len(self._sorted) * pct / 100.0))
+        return self._sorted[index]
+
+
+@dataclass
+class HedgeStats:
+    """Counters for one `HedgedModel`.
+
+    Attributes:
+        requests: Model calls made through the wrapper.
+        hedges: Calls for which a duplicate request was sent.
+        hedge_wins: Hedged calls answered first by the duplicate.
+        primary_wins: Hedged calls answered first by the original request.
+        cancelled: Losing attempts that were cancelled.
+    """
+
+    requests: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    primary_wins: int = 0
+    cancelled: int = 0
+
+    @property
+    def hedge_rate(self) -> float:
+        """The fraction of calls that sent a duplicate request."""
+        return self.hedges / self.requests if self.requests else 0.0
+
+
+_DONE = object()
+
+
+class HedgedModel(BaseLlm):
+    """Wraps any `BaseLlm` and hedges calls that run past a latency percentile.
+
+    The race is decided by the first response chunk, so streamed responses are
+    never interleaved: once an attempt has yielded, it alone is consumed.
+
+    Attributes:
+        inner: The model that performs the actual calls.
+        policy: When to send the duplicate request.
+    """
+
+    inner: BaseLlm
+    policy: HedgePolicy = HedgePolicy()
+
+    _window: Optional[LatencyWindow] = PrivateAttr(default=None)
+    _stats: HedgeStats = PrivateAttr(default_factory=HedgeStats)
+
+    @classmethod
+    def wrap(cls, inner: BaseLlm, policy: Optional[HedgePolicy] = None) -> "HedgedModel":
+        """Builds a wrapper that reports the inner model's name to ADK."""
+        return cls(model=inner.model, inner=inner, policy=policy or HedgePolicy())
+
+    @property
+    def stats(self) -> HedgeStats:
+        return self._stats
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data."""
+        window = self._latencies()
+        if len(window) < self.policy.min_samples:
+            return None
+        return max(self.policy.min_delay, window.percentile(self.policy.percentile))
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """Runs the call, racing a duplicate if the first attempt is slow."""
+        self._stats.requests += 1
+        attempts = [_Attempt(self.inner.generate_content_async(llm_request, stream=stream))]
+        try:
+            delay = self.hedge_delay()
+            if delay is not None and not await attempts[0].wait_ready(delay):
+                self._stats.hedges += 1
+                attempts.append(
+                    _Attempt(self.inner.generate_content_async(llm_request, stream=stream))
+                )
+            winner = await _first_successful(attempts)
+            if len(attempts) > 1:
+                if winner is attempts[0]:
+                    self._stats.primary_wins += 1
+                else:
+                    self._stats.hedge_wins += 1
+            for attempt in attempts:
+                if attempt is not winner and attempt.cancel():
+                    self._stats.cancelled += 1
+            # Time to the first response as the caller saw it, from the original
+            # request. A hedge winner's own latency would skew the window low, and
+            # the hedge delay and hedge rate with it. Failures are left out: fast
+            # errors during an outage would collapse the delay and hedge every call.
+            if not winner.failed:
+                self._latencies().add(winner.started + winner.latency - attempts[0].started)
+            async for response in winner.responses():
+                yield response
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def connect(self, llm_request: LlmRequest) -> BaseLlmConnection:
+        """Live connections are not hedged; delegate to the inner model."""
+        return await self.inner.connect(llm_request)
+
+    def _latencies(self) -> LatencyWindow:
+        if self._window is None:
+            self._window = LatencyWindow(self.policy.window)
+        return self._window
+
+
+class _Attempt:
+    """One in-flight call, pumped into a queue by its own task."""
+
+    def __init__(self, generator: AsyncGenerator[LlmResponse, None]) -> None:
+        self.started = time.monotonic()
+        self.latency = 0.0
+        self.failed = False
+        self.ready = asyncio.Event()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._pump(generator))
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Waits up to `timeout` for the first item; returns whether it arrived."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def responses(self) -> AsyncGenerator[LlmResponse, None]:
+        while True:
+            item = await self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def cancel(self) -> bool:
+        """Cancels the attempt; returns True if it was still running."""
+        if self._task.done():
+            return False
+        self._task.cancel()
+        return True
+
+    async def _pump(self, generator: AsyncGenerator[LlmResponse, None]) -> None:
+        try:
+            async for response in generator:
+                self._put(response)
+            self._put(_DONE)
+        except Exception as e:  # Re-raised to the consumer by `responses()`.
+            self._put(e)
+
+    def _put(self, item) -> None:
+        if not self.ready.is_set():
+            self.latency = time.monotonic() - self.started
+            self.failed = isinstance(item, Exception)
+            self.ready.set()
+        self._queue.put_nowait(item)
+
+
+async def _first_successful(attempts: List[_Attempt]) -> _Attempt:
+    """Returns the first attempt to produce a response.
+
+    An attempt that fails only loses the race while another is still running;
+    if every attempt fails, the first one is returned so its error surfaces.
+    """
+    pending = {asyncio.ensure_future(attempt.ready.wait()): attempt for attempt in attempts}
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in done:
+                attempt = pending.pop(waiter)
+                if not attempt.failed:
+                    return attempt
+        return attempts[0]
+    finally:
+        for waiter in pending:
+            waiter.cancel()
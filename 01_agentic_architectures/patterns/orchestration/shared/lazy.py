@@ -0,0 +1,112 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Lazily built module attributes for fast cold starts.
+
+Importing anything under `google.adk` loads the whole framework (several
+seconds on a cold container), and the session patterns also opened SQLite
+engines and checked `GOOGLE_API_KEY` at import time. A serverless instance
+paid for all of that even when the agent was never called.
+
+`LazyAttributes` moves that work to first use. A pattern registers a provider
+per attribute and installs the registry as the module's `__getattr__`
+(PEP 562). `module.root_agent` then builds the agent on first access, caches
+it in the module, and never calls the provider again. `adk web`, `adk run` and
+the benchmarks find `root_agent` exactly as before.
+
+Sample:
+```python
+lazy = LazyAttributes(__name__)
+__getattr__ = lazy.getattr
+__dir__ = lazy.dir
+
+
+@lazy.provides("session_service")
+def _build_session_service():
+    from google.adk.sessions import DatabaseSessionService
+
+    return DatabaseSessionService(db_url=db_url)
+```
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+_registries: List["LazyAttributes"] = []
+
+
+class LazyAttributes:
+    """A per-module registry of attribute providers.
+
+    Args:
+        module_name: The `__name__` of the module that owns the attributes.
+    """
+
+    def __init__(self, module_name: str) -> None:
+        self.module_name = module_name
+        self.build_seconds: Dict[str, float] = {}
+        self._providers: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.RLock()
+        _registries.append(self)
+
+    def provides(self, name: str) -> Callable[[Callable[[], Any]], Callable[[], Any]]:
+        """Registers the decorated function as the provider of `name`."""
+
+        def register(provider: Callable[[], Any]) -> Callable[[], Any]:
+            self._providers[name] = provider
+            return provider
+
+        return register
+
+    def getattr(self, name: str) -> Any:
+        """The module's `__getattr__`: builds `name` on first access."""
+        provider = self._providers.get(name)
+        if provider is None:
+            raise AttributeError(f"module {self.module_name!r} has no attribute {name!r}")
+        module = sys.modules[self.module_name]
+        with self._lock:
+            # Another thread may have built it while we waited for the lock.
+            if name in module.__dict__:
+                return module.__dict__[name]
+            started = time.perf_counter()
+            value = provider()
+            self.build_seconds[name] = time.perf_counter() - started
+            setattr(module, name, value)
+            return value
+
+    def dir(self) -> List[str]:
+        """The module's `__dir__`: includes attributes not built yet."""
+        return sorted(set(sys.modules[self.module_name].__dict__) | set(self._providers))
+
+    def built(self) -> List[str]:
+        """Names that have been built so far."""
+        return sorted(self.build_seconds)
+
+
+def build_report() -> Dict[str, Dict[str, float]]:
+    """Returns the build time of every lazily built attribute, per module."""
+    return {registry.module_name: dict(registry.build_seconds) for registry in _registries}
+
+
+def require_api_key() -> None:
+    """Fails fast when no Gemini API key is configured.
+
+    Call it from a provider rather than at import time, so importing a pattern
+    (for discovery, tests or a cold start) never depends on credentials.
+    """
+    if "GOOGLE_API_KEY" not in os.environ:
+        raise ValueError("GOOGLE_API_KEY environment variable not set.")
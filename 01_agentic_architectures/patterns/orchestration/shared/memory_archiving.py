@@ -0,0 +1,206 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Incremental archiving of sessions into memory, one watermark per session.
+
+Calling `add_session_to_memory(session)` after every turn hands the memory
+service the whole session each time. Over a conversation of n turns that
+is O(n²) work, and services that append what they are given store every
+early event again on every turn.
+
+`MemoryArchiver.archive(memory_service, session)` hands over only what is
+new:
+
+* It keeps a *watermark* per session: the id and timestamp of the last
+  event archived. New events are found by walking back from the end of
+  the session to the watermark, so the cost is proportional to the turn,
+  not the session. If the watermark event is not in the loaded session
+  (tail-only loads, rewinds), events newer than its timestamp are used.
+* It drops events whose author and text were already archived for the
+  user, by content hash. This catches repeated boilerplate, and events
+  handed over again when a watermark was evicted. Watermarks and hashes
+  live in the process; after a restart, `VectorMemoryService` and
+  `PersistentMemoryService` still skip event ids they already hold.
+* It ingests the remaining text events. Services with an
+  `add_events_to_memory(session, events)` method (`VectorMemoryService`,
+  `PersistentMemoryService`) take them directly. Any other service gets
+  `add_session_to_memory` with a copy of the session holding only the new
+  events, under an id derived from the session's, so services that key
+  memories by session id do not overwrite the earlier chunks.
+
+Each call returns what it archived, and the totals go to `stats` and the
+`adk_memory_archived_events` and `adk_memory_archived_bytes` counters.
+
+Sample:
+```python
+archiver = MemoryArchiver()
+
+
+async def auto_save_to_memory(callback_context):
+    invocation_context = callback_context._invocation_context
+    await archiver.archive(invocation_context.memory_service, invocation_context.session)
+```
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from google.adk.events.event import Event
+from google.adk.memory.base_memory_service import BaseMemoryService
+from google.adk.sessions.session import Session
+
+from shared.metrics_registry import MetricsRegistry
+from shared.metrics_registry import registry as default_registry
+
+
+@dataclass
+class ArchivedTurn:
+    """What one `archive` call handed to the memory service.
+
+    Attributes:
+        events: Events ingested.
+        bytes: UTF-8 bytes of their text.
+        duplicates: New events skipped because their content was already archived.
+        scanned: Events examined to find the new ones.
+    """
+
+    events: int = 0
+    bytes: int = 0
+    duplicates: int = 0
+    scanned: int = 0
+
+
+@dataclass
+class ArchiveStats:
+    """Totals for `MemoryArchiver`."""
+
+    turns: int = 0
+    events: int = 0
+    bytes: int = 0
+    duplicates: int = 0
+
+
+class MemoryArchiver:
+    """Archives each session's new events into memory, deduplicated by content.
+
+    Args:
+        max_sessions: Session watermarks kept, least recently archived dropped first.
+        max_hashes: Content hashes kept per user.
+        registry: Where metrics are exported; the process-wide registry by default.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 100_000,
+        max_hashes: int = 100_000,
+        registry: Optional[MetricsRegistry] = None,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.max_hashes = max_hashes
+        self.stats = ArchiveStats()
+        self._watermarks: "OrderedDict[Tuple[str, str, str], Tuple[str, float]]" = OrderedDict()
+        self._hashes: Dict[Tuple[str, str], "OrderedDict[bytes, None]"] = {}
+        self._lock = threading.Lock()
+        registry = registry or default_registry
+        self._events = registry.counter(
+            "adk_memory_archived_events", "Session events considered for memory.", ["outcome"]
+        )
+        self._bytes = registry.counter("adk_memory_archived_bytes", "Text bytes archived to memory.").labels()
+
+    def watermark(self, session: Session) -> Optional[str]:
+        """Returns the id of the last event archived from `session`, if any."""
+        mark = self._watermarks.get((session.app_name, session.user_id, session.id))
+        return mark[0] if mark else None
+
+    async def archive(self, memory_service: BaseMemoryService, session: Session) -> ArchivedTurn:
+        """Ingests the events of `session` added since the last call."""
+        key = (session.app_name, session.user_id, session.id)
+        with self._lock:
+            events, scanned = _since(session.events, self._watermarks.get(key))
+            turn = ArchivedTurn(scanned=scanned)
+            fresh: List[Event] = []
+            digests: List[bytes] = []
+            hashes = self._hashes.setdefault(key[:2], OrderedDict())
+            for event in events:
+                if event.partial:
+                    continue
+                text = _text(event)
+                if not text:
+                    continue
+                digest = hashlib.blake2b(f"{event.author}\x00{text}".encode(), digest_size=16).digest()
+                if digest in hashes:
+                    hashes.move_to_end(digest)
+                    turn.duplicates += 1
+                    continue
+                hashes[digest] = None
+                digests.append(digest)
+                fresh.append(event)
+                turn.bytes += len(text.encode())
+            while len(hashes) > self.max_hashes:
+                hashes.popitem(last=False)
+
+        if fresh:
+            try:
+                await _ingest(memory_service, session, fresh)
+            except BaseException:
+                # Forget the hashes so the retry is not skipped as duplicates.
+                with self._lock:
+                    for digest in digests:
+                        hashes.pop(digest, None)
+                raise
+        with self._lock:
+            # Only move the watermark once the events are safely ingested.
+            if events:
+                self._watermarks[key] = (events[-1].id, events[-1].timestamp)
+                self._watermarks.move_to_end(key)
+                while len(self._watermarks) > self.max_sessions:
+                    self._watermarks.popitem(last=False)
+            turn.events = len(fresh)
+            self.stats.turns += 1
+            self.stats.events += turn.events
+            self.stats.bytes += turn.bytes
+            self.stats.duplicates += turn.duplicates
+        self._events.labels(outcome="archived").inc(turn.events)
+        self._events.labels(outcome="duplicate").inc(turn.duplicates)
+        self._bytes.inc(turn.bytes)
+        return turn
+
+
+async def _ingest(memory_service: BaseMemoryService, session: Session, events: List[Event]) -> None:
+    add_events = getattr(memory_service, "add_events_to_memory", None)
+    if add_events is not None:
+        await add_events(session, events)
+        return
+    chunk = session.model_copy(update={"id": f"{session.id}:{events[0].id}", "events": events})
+    await memory_service.add_session_to_memory(chunk)
+
+
+def _since(events: List[Event], mark: Optional[Tuple[str, float]]) -> Tuple[List[Event], int]:
+    """Returns the events after the watermark, and how many events were examined."""
+    if mark is None:
+        return list(events), len(events)
+    event_id, timestamp = mark
+    for index in range(len(events) - 1, -1, -1):
+        if events[index].id == event_id:
+            return events[index + 1:], len(events) - index
+    return [event for event in events if event.timestamp > timestamp], len(events)
+
+
+def _text(event: Event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    return " ".join(part.text for part in event.content.parts if part.text)
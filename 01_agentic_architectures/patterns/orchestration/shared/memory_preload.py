@@ -0,0 +1,240 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""`preload_memory` that reuses its last retrieval while nothing has changed.
+
+ADK's `preload_memory` searches memory for every model request, including
+each model call of a turn that calls tools. It searches again even when the
+user's memories are the same as last time and the query is unchanged.
+`CachedPreloadMemoryTool` is a drop-in replacement. It keeps each session's
+last few retrievals, keyed on:
+
+* the memory-store version: `await memory_version(app_name=..., user_id=...)`
+  of `VectorMemoryService` or `PersistentMemoryService` (which reads it on a
+  worker thread, off the event loop). Adding (or deleting) any of the user's
+  memories changes it and invalidates the user's cached retrievals. Services
+  without it are only cached within one invocation.
+* a fingerprint of the query: its lowercase words, with punctuation and
+  extra whitespace dropped.
+
+With `similarity` set, a query whose word set overlaps a cached one by at
+least that much (Jaccard similarity) reuses its retrieval too, so a
+slightly rephrased follow-up does not search again. That retrieval may
+differ from what a fresh search would load, so it is off by default; see
+`benchmarks/preload_benchmark.py` for how often it differs.
+
+The instruction added to the prompt is the same as `preload_memory`'s.
+`stats` and the `adk_memory_preloads` and `adk_memory_preload_tokens` counters
+report searches run and avoided, and the prompt tokens the memories added.
+
+Sample:
+```python
+root_agent = LlmAgent(
+    model=get_model(),
+    name="assistant",
+    instruction="...",
+    tools=[CachedPreloadMemoryTool()],
+)
+```
+"""
+
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, FrozenSet, Hashable, List, Optional, Tuple
+
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.models.llm_request import LlmRequest
+from google.adk.tools.preload_memory_tool import PreloadMemoryTool
+from google.adk.tools.tool_context import ToolContext
+
+from shared.metrics_registry import MetricsRegistry
+from shared.metrics_registry import registry as default_registry
+from shared.token_compaction import estimate_text_tokens
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+_Key = Tuple[str, str, str]
+
+
+@dataclass
+class PreloadStats:
+    """Counters for `CachedPreloadMemoryTool`.
+
+    Attributes:
+        searches: Memory searches run.
+        exact_hits: Searches avoided because the query fingerprint matched.
+        similar_hits: Searches avoided because a cached query was similar enough.
+        prompt_tokens: Estimated tokens of memory added to prompts.
+    """
+
+    searches: int = 0
+    exact_hits: int = 0
+    similar_hits: int = 0
+    prompt_tokens: int = 0
+
+    @property
+    def searches_avoided(self) -> int:
+        return self.exact_hits + self.similar_hits
+
+
+@dataclass
+class _Retrieval:
+    version: Hashable
+    invocation_id: str
+    words: FrozenSet[str]
+    instruction: str
+    tokens: int
+
+
+class CachedPreloadMemoryTool(PreloadMemoryTool):
+    """Preloads memory like `preload_memory`, searching only when the answer may differ.
+
+    Args:
+        similarity: Jaccard similarity of query words at or above which a cached
+            retrieval is reused; None reuses only identical fingerprints.
+        per_session: Retrievals kept per session.
+        max_sessions: Sessions cached, least recently used dropped first.
+        registry: Where metrics are exported; the process-wide registry by default.
+    """
+
+    def __init__(
+        self,
+        similarity: Optional[float] = None,
+        per_session: int = 4,
+        max_sessions: int = 10_000,
+        registry: Optional[MetricsRegistry] = None,
+    ) -> None:
+        super().__init__()
+        self.similarity = similarity
+        self.per_session = per_session
+        self.max_sessions = max_sessions
+        self.stats = PreloadStats()
+        self._sessions: "OrderedDict[_Key, OrderedDict[str, _Retrieval]]" = OrderedDict()
+        registry = registry or default_registry
+        self._preloads = registry.counter(
+            "adk_memory_preloads", "Memory preloads, by whether a search was run.", ["outcome"]
+        )
+        self._tokens = registry.counter(
+            "adk_memory_preload_tokens", "Estimated prompt tokens added by preloaded memory."
+        ).labels()
+
+    async def process_llm_request(self, *, tool_context: ToolContext, llm_request: LlmRequest) -> None:
+        user_content = tool_context.user_content
+        if not user_content or not user_content.parts or not user_content.parts[0].text:
+            return
+        query = user_content.parts[0].text
+        invocation_context = tool_context._invocation_context
+        memory_service = invocation_context.memory_service
+        if memory_service is None:
+            return
+        words = _WORD.findall(query.lower())
+        fingerprint = " ".join(words)
+        app_name, user_id = invocation_context.app_name, invocation_context.user_id
+        key = (app_name, user_id, invocation_context.session.id)
+        version = await _version(memory_service, app_name, user_id)
+
+        retrieval, outcome = self._lookup(
+            key, fingerprint, frozenset(words), version, invocation_context.invocation_id
+        )
+        if retrieval is None:
+            try:
+                response = await tool_context.search_memory(query)
+            except Exception:
+                logger.warning("Failed to preload memory for query: %s", query)
+                return
+            instruction = _instruction(response.memories)
+            retrieval = _Retrieval(
+                version, invocation_context.invocation_id, frozenset(words),
+                instruction, estimate_text_tokens(instruction),
+            )
+            self._store(key, fingerprint, retrieval)
+            self.stats.searches += 1
+        elif outcome == "exact":
+            self.stats.exact_hits += 1
+        else:
+            self.stats.similar_hits += 1
+        self._preloads.labels(outcome=outcome).inc()
+        if retrieval.instruction:
+            llm_request.append_instructions([retrieval.instruction])
+            self.stats.prompt_tokens += retrieval.tokens
+            self._tokens.inc(retrieval.tokens)
+
+    def _lookup(
+        self, key: _Key, fingerprint: str, words: FrozenSet[str], version: Hashable, invocation_id: str
+    ) -> Tuple[Optional[_Retrieval], str]:
+        retrievals = self._sessions.get(key)
+        if not retrievals:
+            return None, "search"
+        self._sessions.move_to_end(key)
+        for stale in [
+            cached for cached, retrieval in retrievals.items()
+            if retrieval.version != version
+            or (version is None and retrieval.invocation_id != invocation_id)
+        ]:
+            del retrievals[stale]
+        retrieval = retrievals.get(fingerprint)
+        if retrieval is not None:
+            retrievals.move_to_end(fingerprint)
+            return retrieval, "exact"
+        if self.similarity is None or not words:
+            return None, "search"
+        best, best_score = None, self.similarity
+        for cached, retrieval in retrievals.items():
+            score = len(words & retrieval.words) / len(words | retrieval.words)
+            if score >= best_score:
+                best, best_score = cached, score
+        if best is None:
+            return None, "search"
+        retrievals.move_to_end(best)
+        return retrievals[best], "similar"
+
+    def _store(self, key: _Key, fingerprint: str, retrieval: _Retrieval) -> None:
+        retrievals = self._sessions.setdefault(key, OrderedDict())
+        self._sessions.move_to_end(key)
+        retrievals[fingerprint] = retrieval
+        while len(retrievals) > self.per_session:
+            retrievals.popitem(last=False)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+
+async def _version(memory_service: Any, app_name: str, user_id: str) -> Hashable:
+    memory_version = getattr(memory_service, "memory_version", None)
+    if memory_version is None:
+        return None
+    return await memory_version(app_name=app_name, user_id=user_id)
+
+
+def _instruction(memories: List[MemoryEntry]) -> str:
+    """Formats memories exactly as `preload_memory` does; empty if there are none."""
+    lines = []
+    for memory in memories:
+        if memory.timestamp:
+            lines.append(f"Time: {memory.timestamp}")
+        text = " ".join(part.text for part in memory.content.parts or [] if part.text)
+        if text:
+            lines.append(f"{memory.author}: {text}" if memory.author else text)
+    if not lines:
+        return ""
+    full_memory_text = "\n".join(lines)
+    return f"""The following content is from your previous conversations with the user.
+They may be useful for answering the user's current query.
+<PAST_CONVERSATIONS>
+{full_memory_text}
+</PAST_CONVERSATIONS>
+"""
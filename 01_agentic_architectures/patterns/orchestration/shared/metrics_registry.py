@@ -0,0 +1,312 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A labelled metrics registry with OpenMetrics (Prometheus) text exposition.
+
+`MetricsPlugin` and `ToolCountPlugin` record into this registry, so a
+long-running server can be scraped instead of relying on log lines written at
+exit. It supports counters, gauges and fixed-bucket histograms, each keyed by
+label values such as agent, tool, model and status.
+
+Cost is bounded on both sides:
+
+* Each metric keeps at most `max_series` label combinations. Further
+  combinations are folded into one extra series whose labels are all
+  `"other"`, and `dropped_series` counts how often that happened. Memory
+  therefore stays constant however many distinct tool or agent names show up.
+* A scrape renders at most `(max_series + 1) * (buckets + 3)` lines per metric.
+
+Sample:
+```python
+from shared.metrics_registry import registry
+
+calls = registry.counter("adk_tool_calls", "Tool calls.", ["tool", "status"])
+calls.labels(tool="check_inventory", status="ok").inc()
+print(registry.render())
+```
+
+To serve it, mount `asgi_app(registry)` at `/metrics` in a FastAPI/Starlette
+server (such as the one `adk api_server` builds), or call `serve(registry)`
+for a standalone stdlib HTTP endpoint.
+"""
+
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+OVERFLOW_LABEL = "other"
+
+
+class _Counter:
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase.")
+        self.value += amount
+
+
+class _Gauge:
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class _Histogram:
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class MetricFamily:
+    """One named metric and its labelled series.
+
+    Args:
+        name: The metric name, without the `_total` suffix for counters.
+        help_text: The `# HELP` line.
+        kind: "counter", "gauge" or "histogram".
+        label_names: The label keys every series carries.
+        max_series: Label combinations kept before folding into "other".
+        buckets: Upper bounds for histograms, in seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        kind: str,
+        label_names: Sequence[str],
+        max_series: int,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self.max_series = max_series
+        self.buckets = tuple(sorted(buckets))
+        self.dropped_series = 0
+        self._series: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: Any) -> Any:
+        """Returns the series for these label values, creating it if allowed."""
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        series = self._series.get(key)
+        if series is not None:
+            return series
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    self.dropped_series += 1
+                    key = (OVERFLOW_LABEL,) * len(self.label_names)
+                    series = self._series.get(key)
+                if series is None:
+                    series = self._new_series()
+                    self._series[key] = series
+            return series
+
+    def _new_series(self) -> Any:
+        if self.kind == "counter":
+            return _Counter()
+        if self.kind == "gauge":
+            return _Gauge()
+        return _Histogram(self.buckets)
+
+    def render(self, lines: List[str]) -> None:
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        lines.append(f"# HELP {self.name} {_escape(self.help_text)}")
+        for key, series in list(self._series.items()):
+            labels = list(zip(self.label_names, key))
+            if self.kind == "counter":
+                lines.append(f"{self.name}_total{_format_labels(labels)} {_number(series.value)}")
+            elif self.kind == "gauge":
+                lines.append(f"{self.name}{_format_labels(labels)} {_number(series.value)}")
+            else:
+                cumulative = 0
+                for bound, bucket_count in zip(series.bounds + (math.inf,), series.counts):
+                    cumulative += bucket_count
+                    le = _number(bound)
+                    lines.append(
+                        f"{self.name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}"
+                    )
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series.count}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {_number(series.sum)}")
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them as OpenMetrics text.
+
+    Registering a name that already exists returns the existing family, so
+    several plugin instances in one process share their series.
+
+    Args:
+        max_series: Default per-metric cap on label combinations.
+    """
+
+    def __init__(self, max_series: int = 200) -> None:
+        self.max_series = max_series
+        self._families: Dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> MetricFamily:
+        return self._register(name, help_text, "counter", label_names)
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> MetricFamily:
+        return self._register(name, help_text, "gauge", label_names)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> MetricFamily:
+        return self._register(name, help_text, "histogram", label_names, buckets)
+
+    def render(self) -> str:
+        """Returns every metric in OpenMetrics text format."""
+        lines: List[str] = []
+        for family in list(self._families.values()):
+            family.render(lines)
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def dropped_series(self) -> Dict[str, int]:
+        """Series folded into "other" per metric, for alerting on cardinality."""
+        return {
+            name: family.dropped_series
+            for name, family in self._families.items()
+            if family.dropped_series
+        }
+
+    def _register(
+        self,
+        name: str,
+        help_text: str,
+        kind: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = MetricFamily(
+                    name, help_text, kind, label_names, self.max_series, buckets
+                )
+                self._families[name] = family
+            elif family.kind != kind or family.label_names != tuple(label_names):
+                raise ValueError(
+                    f"Metric {name!r} is already registered as a {family.kind} "
+                    f"with labels {family.label_names}."
+                )
+            return family
+
+
+registry = MetricsRegistry()
+"""The process-wide registry the plugins record into by default."""
+
+
+def asgi_app(metrics: Optional[MetricsRegistry] = None) -> Callable:
+    """Returns an ASGI app that serves `metrics` as OpenMetrics text.
+
+    Mount it in FastAPI/Starlette with `app.mount("/metrics", asgi_app())`.
+    """
+    metrics = metrics or registry
+
+    async def app(scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return
+        body = metrics.render().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", CONTENT_TYPE.encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def serve(
+    metrics: Optional[MetricsRegistry] = None, host: str = "0.0.0.0", port: int = 9464
+) -> ThreadingHTTPServer:
+    """Serves `metrics` at `http://host:port/metrics` from a daemon thread.
+
+    The endpoint lives only as long as the calling process, so call it from a
+    long-running server, not a script that exits.
+    """
+    metrics = metrics or registry
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
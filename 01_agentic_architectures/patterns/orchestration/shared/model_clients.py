@@ -0,0 +1,252 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A shared, pooled model-client registry for the orchestration patterns.
+
+Constructing `Gemini(...)` per agent gives every agent its own `genai.Client`
+and, with it, its own HTTP connection pool. A three-stage pipeline therefore
+pays for three TCP connects and three TLS handshakes before the first token.
+
+`get_model()` instead hands out one model per (model, retry policy). All of
+them send traffic through a single keep-alive `httpx.AsyncClient`, so
+connections to the API endpoint are opened once per process and reused by every
+agent. `stats()` reports how often models were reused and how many connections
+and TLS handshakes were actually made.
+
+Retries are handled by `shared.retry.ResilientModel` rather than by the
+`genai` client, so every model is a `ResilientModel` around a `PooledGemini`
+whose client never retries on its own.
+
+Sample:
+```python
+from shared.model_clients import get_model
+
+writer = Agent(name="WriterAgent", model=get_model(), ...)
+editor = Agent(name="EditorAgent", model=get_model(), ...)  # same client
+```
+
+Note: `httpx.AsyncClient` connections belong to the event loop that opened
+them. The registry is meant for the usual single-loop server (`adk web`,
+`adk api_server`, Agent Engine); call `reset()` between `asyncio.run()` calls.
+"""
+
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.google_llm import Gemini
+from google.genai import Client, types
+from pydantic import PrivateAttr
+
+from shared.retry import ResilientModel, RetryPolicy
+
+DEFAULT_MODEL = "gemini-2.5-flash-lite"
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+@dataclass
+class ModelClientStats:
+    """A snapshot of the registry's pooling counters.
+
+    Attributes:
+        models_created: Distinct models built, one per (model, retry policy).
+        model_reuses: `get_model()` calls answered with an existing instance.
+        clients_created: Distinct `genai.Client` instances.
+        requests: HTTP requests sent through the shared pool.
+        connections_opened: TCP connections established.
+        tls_handshakes: TLS handshakes completed.
+        open_connections: Connections currently held by the pool.
+        max_connections: The pool's connection limit.
+        max_keepalive_connections: Idle connections the pool keeps warm.
+    """
+
+    models_created: int = 0
+    model_reuses: int = 0
+    clients_created: int = 0
+    requests: int = 0
+    connections_opened: int = 0
+    tls_handshakes: int = 0
+    open_connections: int = 0
+    max_connections: int = 0
+    max_keepalive_connections: int = 0
+
+
+class PooledGemini(Gemini):
+    """A `Gemini` whose API client is owned by a `ModelClientRegistry`."""
+
+    _registry: Optional["ModelClientRegistry"] = PrivateAttr(default=None)
+
+    @cached_property
+    def api_client(self) -> Client:
+        """Provides the registry's shared client."""
+        if self._registry is None:
+            return super().api_client
+        return self._registry.client_for(self.retry_options, self._tracking_headers)
+
+
+class ModelClientRegistry:
+    """Hands out one pooled model per (model, retry policy).
+
+    Args:
+        max_connections: Upper bound on concurrent connections to the API.
+        max_keepalive_connections: Idle connections kept open for reuse.
+        keepalive_expiry: Seconds an idle connection stays in the pool.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+    ) -> None:
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._lock = threading.Lock()
+        self._models: Dict[Tuple[str, Optional[RetryPolicy]], BaseLlm] = {}
+        self._gemini: Dict[str, PooledGemini] = {}
+        self._clients: Dict[str, Client] = {}
+        self._transport: Optional[httpx.AsyncHTTPTransport] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._stats = ModelClientStats(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+
+    def get_model(
+        self,
+        model: str = DEFAULT_MODEL,
+        retry_policy: Optional[RetryPolicy] = DEFAULT_RETRY_POLICY,
+    ) -> BaseLlm:
+        """Returns the shared model for `model` and `retry_policy`.
+
+        Args:
+            model: The Gemini model name.
+            retry_policy: How requests are retried; `None` disables retries.
+
+        Returns:
+            A `ResilientModel` wrapping the pooled `Gemini`, or the pooled
+            `Gemini` itself when `retry_policy` is None.
+        """
+        key = (model, retry_policy)
+        with self._lock:
+            existing = self._models.get(key)
+            if existing is not None:
+                self._stats.model_reuses += 1
+                return existing
+            pooled = self._gemini.get(model)
+            if pooled is None:
+                pooled = PooledGemini(model=model)
+                pooled._registry = self
+                self._gemini[model] = pooled
+            shared = pooled if retry_policy is None else ResilientModel.wrap(pooled, retry_policy)
+            self._models[key] = shared
+            self._stats.models_created += 1
+            return shared
+
+    def client_for(
+        self,
+        retry_options: Optional[types.HttpRetryOptions],
+        headers: Dict[str, str],
+    ) -> Client:
+        """Returns the `genai.Client` shared by every model with these retry options."""
+        key = _retry_key(retry_options)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = Client(
+                    http_options=types.HttpOptions(
+                        headers=headers,
+                        retry_options=retry_options,
+                        httpx_async_client=self._shared_http_client(),
+                    )
+                )
+                self._clients[key] = client
+                self._stats.clients_created += 1
+            return client
+
+    def stats(self) -> ModelClientStats:
+        """Returns a copy of the pooling counters."""
+        with self._lock:
+            snapshot = ModelClientStats(**vars(self._stats))
+        pool = getattr(self._transport, "_pool", None)
+        snapshot.open_connections = len(getattr(pool, "connections", []))
+        return snapshot
+
+    async def aclose(self) -> None:
+        """Closes the shared connection pool."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+
+    def reset(self) -> None:
+        """Forgets every model and client so the next call builds fresh ones.
+
+        Agents that already hold a model keep using it; this only affects
+        subsequent `get_model()` calls.
+        """
+        with self._lock:
+            self._models.clear()
+            self._gemini.clear()
+            self._clients.clear()
+            self._transport = None
+            self._http_client = None
+
+    def _shared_http_client(self) -> httpx.AsyncClient:
+        # Called with self._lock held.
+        if self._http_client is None:
+            self._transport = httpx.AsyncHTTPTransport(limits=self._limits)
+            self._http_client = httpx.AsyncClient(
+                transport=self._transport,
+                event_hooks={"request": [self._on_request]},
+            )
+        return self._http_client
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        self._stats.requests += 1
+        request.extensions["trace"] = self._on_trace
+
+    async def _on_trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._stats.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self._stats.tls_handshakes += 1
+
+
+def _retry_key(retry_options: Optional[types.HttpRetryOptions]) -> str:
+    if retry_options is None:
+        return ""
+    return retry_options.model_dump_json(exclude_none=True)
+
+
+registry = ModelClientRegistry()
+"""The process-wide registry used by the patterns."""
+
+
+def get_model(
+    model: str = DEFAULT_MODEL,
+    retry_policy: Optional[RetryPolicy] = DEFAULT_RETRY_POLICY,
+) -> BaseLlm:
+    """Returns the shared model from the process-wide registry."""
+    return registry.get_model(model, retry_policy)
+
+
+def stats() -> ModelClientStats:
+    """Returns the process-wide registry's pooling counters."""
+    return registry.stats()
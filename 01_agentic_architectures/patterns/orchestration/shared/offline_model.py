@@ -0,0 +1,316 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A scripted, deterministic stand-in for `Gemini` that never touches the network.
+
+`OfflineModel` lets us exercise the orchestration machinery (SequentialAgent,
+ParallelAgent, LoopAgent, AgentTool, plugins, session services) without a live
+API. Every response is derived from a hash of the request and a seed, so the
+same request always produces the same text, tool call, token counts and
+simulated latency. Latency and output length are drawn from configurable
+distributions so that benchmarks can model realistic long-tailed model calls.
+
+Use `use_offline_model()` to swap the model of every `LlmAgent` in an existing
+`root_agent` (or `App`) tree in place.
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from google.adk.agents import LlmAgent
+from google.adk.agents.base_agent import BaseAgent
+from google.adk.apps import App
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.agent_tool import AgentTool
+from google.genai import types
+from pydantic import PrivateAttr
+
+# Tools that change control flow in ways a scripted model cannot reason about.
+_SKIPPED_TOOLS = frozenset({"transfer_to_agent"})
+
+_VOCABULARY = (
+    "agent", "latency", "pipeline", "summary", "context", "session", "model",
+    "tool", "result", "state", "memory", "event", "report", "draft", "review",
+    "plan", "signal", "trace", "budget", "answer", "the", "a", "of", "and",
+    "with", "for", "is", "to", "in", "on",
+)
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """A small, seedable distribution used for latency and token counts.
+
+    Attributes:
+        kind: One of "constant", "uniform" or "lognormal".
+        a: The constant value, the lower bound, or the median respectively.
+        b: Unused, the upper bound, or the log-space sigma respectively.
+    """
+
+    kind: str = "constant"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def constant(cls, value: float) -> "Distribution":
+        return cls("constant", float(value))
+
+    @classmethod
+    def uniform(cls, low: float, high: float) -> "Distribution":
+        return cls("uniform", float(low), float(high))
+
+    @classmethod
+    def lognormal(cls, median: float, sigma: float) -> "Distribution":
+        """A long-tailed distribution, a good fit for real model-call latency."""
+        return cls("lognormal", float(median), float(sigma))
+
+    def sample(self, rng: random.Random) -> float:
+        """Draws one non-negative value from the distribution."""
+        if self.kind == "constant":
+            return max(0.0, self.a)
+        if self.kind == "uniform":
+            return max(0.0, rng.uniform(self.a, self.b))
+        if self.kind == "lognormal":
+            if self.a <= 0:
+                return 0.0
+            return rng.lognormvariate(math.log(self.a), self.b)
+        raise ValueError(f"Unknown distribution kind: {self.kind}")
+
+
+class OfflineModel(BaseLlm):
+    """A deterministic `BaseLlm` that scripts responses from the request itself.
+
+    The script is intentionally simple but exercises every orchestration path:
+
+    * If the latest content carries a function response, reply with text.
+    * Otherwise, if the request declares function tools, call one of them with
+      arguments synthesized from its schema.
+    * Otherwise, reply with text whose length follows `output_tokens`.
+
+    Attributes:
+        model: The model name reported to ADK.
+        latency_ms: Simulated model-call latency in milliseconds.
+        output_tokens: Number of tokens in each text response.
+        seed: Mixed into every request hash; change it to get a different but
+            still reproducible run.
+        call_tools: Whether to emit function calls when tools are declared.
+        stream_chunks: Number of partial chunks yielded when streaming.
+    """
+
+    # ADK gates built-in tools such as `google_search` on the model name, so
+    # the offline model reports the name of the model the patterns use.
+    model: str = "gemini-2.5-flash-lite"
+    latency_ms: Distribution = Distribution.constant(0.0)
+    output_tokens: Distribution = Distribution.constant(32)
+    seed: int = 0
+    call_tools: bool = True
+    stream_chunks: int = 4
+
+    _call_count: int = PrivateAttr(default=0)
+
+    @property
+    def call_count(self) -> int:
+        """The number of model calls served so far."""
+        return self._call_count
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """Yields a scripted response after the simulated latency."""
+        self._call_count += 1
+        rng = random.Random(_request_digest(llm_request, self.seed))
+        delay = self.latency_ms.sample(rng) / 1000.0
+        prompt_tokens = _estimate_prompt_tokens(llm_request)
+
+        declaration = self._pick_tool(llm_request, rng)
+        if declaration is not None:
+            content = types.Content(
+                role="model",
+                parts=[
+                    types.Part(
+                        function_call=types.FunctionCall(
+                            name=declaration.name,
+                            args=_synthesize_args(declaration, rng),
+                        )
+                    )
+                ],
+            )
+            if delay:
+                await asyncio.sleep(delay)
+            yield LlmResponse(
+                content=content,
+                usage_metadata=_usage(prompt_tokens, 8),
+                finish_reason=types.FinishReason.STOP,
+                turn_complete=True,
+            )
+            return
+
+        words = _generate_words(rng, max(1, int(self.output_tokens.sample(rng))))
+        if not stream or self.stream_chunks <= 1:
+            if delay:
+                await asyncio.sleep(delay)
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(text=" ".join(words))]),
+                usage_metadata=_usage(prompt_tokens, len(words)),
+                finish_reason=types.FinishReason.STOP,
+                turn_complete=True,
+            )
+            return
+
+        chunk_size = math.ceil(len(words) / self.stream_chunks)
+        for start in range(0, len(words), chunk_size):
+            if delay:
+                await asyncio.sleep(delay / self.stream_chunks)
+            yield LlmResponse(
+                content=types.Content(
+                    role="model",
+                    parts=[types.Part(text=" ".join(words[start:start + chunk_size]) + " ")],
+                ),
+                partial=True,
+            )
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=" ".join(words))]),
+            usage_metadata=_usage(prompt_tokens, len(words)),
+            finish_reason=types.FinishReason.STOP,
+            turn_complete=True,
+        )
+
+    def _pick_tool(
+        self, llm_request: LlmRequest, rng: random.Random
+    ) -> Optional[types.FunctionDeclaration]:
+        """Chooses the function to call, or None when the model should answer."""
+        if not self.call_tools:
+            return None
+        if llm_request.contents:
+            last_parts = llm_request.contents[-1].parts or []
+            if any(part.function_response for part in last_parts):
+                return None
+        declarations = [
+            declaration
+            for tool in (llm_request.config.tools or [])
+            for declaration in (getattr(tool, "function_declarations", None) or [])
+            if declaration.name not in _SKIPPED_TOOLS
+        ]
+        if not declarations:
+            return None
+        return rng.choice(declarations)
+
+
+def use_offline_model(target: Any, model: Optional[BaseLlm] = None) -> BaseLlm:
+    """Replaces the model of every `LlmAgent` reachable from `target` in place.
+
+    Sub-agents and agents wrapped in an `AgentTool` are visited as well, so a
+    whole pattern can be switched offline with a single call.
+
+    Args:
+        target: A `root_agent`, or an `App` wrapping one.
+        model: The model to install. Defaults to a fresh `OfflineModel()`.
+
+    Returns:
+        The model that was installed, so callers can inspect `call_count`.
+    """
+    model = model or OfflineModel()
+    root = target.root_agent if isinstance(target, App) else target
+    seen = set()
+    pending = [root]
+    while pending:
+        agent = pending.pop()
+        if not isinstance(agent, BaseAgent) or id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        if isinstance(agent, LlmAgent):
+            agent.model = model
+            pending.extend(
+                tool.agent for tool in agent.tools if isinstance(tool, AgentTool)
+            )
+        pending.extend(agent.sub_agents)
+    return model
+
+
+def _request_digest(llm_request: LlmRequest, seed: int) -> int:
+    """Hashes the parts of a request that determine the scripted response."""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(str(seed).encode())
+    digest.update((llm_request.model or "").encode())
+    digest.update(str(llm_request.config.system_instruction or "").encode())
+    for content in llm_request.contents:
+        digest.update((content.role or "").encode())
+        for part in content.parts or []:
+            if part.text:
+                digest.update(part.text.encode())
+            elif part.function_call:
+                digest.update(part.function_call.name.encode())
+            elif part.function_response:
+                digest.update(part.function_response.name.encode())
+    return int.from_bytes(digest.digest(), "big")
+
+
+def _estimate_prompt_tokens(llm_request: LlmRequest) -> int:
+    """Approximates prompt size at four characters per token."""
+    chars = len(str(llm_request.config.system_instruction or ""))
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_response:
+                chars += len(str(part.function_response.response))
+    return max(1, chars // 4)
+
+
+def _usage(prompt_tokens: int, output_tokens: int) -> types.GenerateContentResponseUsageMetadata:
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=output_tokens,
+        total_token_count=prompt_tokens + output_tokens,
+    )
+
+
+def _generate_words(rng: random.Random, count: int) -> list[str]:
+    return [rng.choice(_VOCABULARY) for _ in range(count)]
+
+
+def _synthesize_args(
+    declaration: types.FunctionDeclaration, rng: random.Random
+) -> Dict[str, Any]:
+    """Builds plausible arguments for a function from its declared schema."""
+    if declaration.parameters_json_schema:
+        properties = declaration.parameters_json_schema.get("properties", {})
+        return {
+            name: _value_for_type(str(schema.get("type", "string")), rng)
+            for name, schema in properties.items()
+        }
+    if declaration.parameters and declaration.parameters.properties:
+        return {
+            name: _value_for_type(str(schema.type or "string"), rng)
+            for name, schema in declaration.parameters.properties.items()
+        }
+    return {}
+
+
+def _value_for_type(type_name: str, rng: random.Random) -> Any:
+    type_name = type_name.lower().rsplit(".", 1)[-1]
+    if type_name in ("integer", "number"):
+        return rng.randint(1, 5)
+    if type_name == "boolean":
+        return True
+    if type_name == "array":
+        return []
+    if type_name == "object":
+        return {}
+    return f"offline {rng.choice(_VOCABULARY)}"
@@ -0,0 +1,368 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compact, spill-to-disk snapshots of sessions paused for confirmation.
+
+In a resumable app (`ResumabilityConfig(is_resumable=True)`), a tool that
+calls `tool_context.request_confirmation` pauses its invocation until a
+human answers. `06_human_in_the_loop` does this for every post with a link
+or image. Until then the session sits in `InMemorySessionService` as live
+pydantic objects, and thousands of pending approvals cost a lot of memory
+for data nobody reads.
+
+`SpillingSessionService` is an `InMemorySessionService` that *parks* a
+session once its invocation pauses. The session is encoded as a compact
+binary snapshot and dropped from memory. The encoding is msgpack if
+installed, else compact JSON, compressed with zstd if `zstandard` is
+installed, else zlib. The snapshot is held in a `SnapshotStore`, which
+keeps up to `max_resident_bytes` of snapshots in memory and spills older
+ones to a SQLite file.
+
+Nothing changes for callers. When the confirmation arrives, the runner's
+`get_session` (or an `append_event`, `list_sessions` or `delete_session`)
+restores the session lazily, exactly as it was parked. Parking needs
+`ParkPausedSessionsPlugin` in the app's plugins; it parks after every run
+that ended waiting on a long-running call.
+
+Sample:
+```python
+session_service = SpillingSessionService(SnapshotStore("paused.db"))
+app = App(
+    name="SocialMediaManager",
+    root_agent=agent,
+    plugins=[ParkPausedSessionsPlugin()],
+    resumability_config=ResumabilityConfig(is_resumable=True),
+)
+runner = Runner(app=app, session_service=session_service)
+```
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events.event import Event
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.adk.sessions.session import Session
+
+from shared.metrics_registry import MetricsRegistry
+from shared.metrics_registry import registry as default_registry
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Snapshot header: one byte for the encoding, one for the compression.
+_MSGPACK, _JSON = b"m", b"j"
+_ZSTD, _ZLIB = b"z", b"d"
+
+_Key = Tuple[str, str, str]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS adk_paused_snapshots (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+) WITHOUT ROWID
+"""
+_UPSERT = "INSERT OR REPLACE INTO adk_paused_snapshots VALUES (?, ?, ?, ?)"
+_SELECT = "SELECT data FROM adk_paused_snapshots WHERE app_name = ? AND user_id = ? AND session_id = ?"
+_DELETE = "DELETE FROM adk_paused_snapshots WHERE app_name = ? AND user_id = ? AND session_id = ?"
+
+
+def encode_snapshot(value: Any, level: int = 3) -> bytes:
+    """Encodes a JSON-like value as a compressed binary snapshot."""
+    if msgpack is not None:
+        header, body = _MSGPACK, msgpack.packb(value, use_bin_type=True)
+    else:
+        header, body = _JSON, json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+    if zstandard is not None:
+        return header + _ZSTD + zstandard.ZstdCompressor(level=level).compress(body)
+    return header + _ZLIB + zlib.compress(body, level)
+
+
+def decode_snapshot(data: bytes) -> Any:
+    """Decodes a snapshot written by `encode_snapshot`."""
+    encoding, compression, body = data[:1], data[1:2], data[2:]
+    if compression == _ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Snapshot is zstd-compressed, but zstandard is not installed.")
+        body = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        body = zlib.decompress(body)
+    if encoding == _MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("Snapshot is msgpack-encoded, but msgpack is not installed.")
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+
+def pending_calls(events: List[Event]) -> List[str]:
+    """Returns the ids of long-running function calls still awaiting a response."""
+    answered = {
+        part.function_response.id
+        for event in events
+        for part in (event.content.parts or [] if event.content else [])
+        if part.function_response
+    }
+    return [
+        call_id
+        for event in events
+        for call_id in event.long_running_tool_ids or ()
+        if call_id not in answered
+    ]
+
+
+@dataclass
+class SnapshotStoreStats:
+    """Counters for `SnapshotStore`."""
+
+    resident: int = 0
+    resident_bytes: int = 0
+    spilled: int = 0
+    spills: int = 0
+    disk_reads: int = 0
+
+
+class SnapshotStore:
+    """Holds snapshots in memory up to a byte budget, spilling the oldest to SQLite.
+
+    Args:
+        path: SQLite file for spilled snapshots. A temporary file is created
+            on the first spill if omitted.
+        max_resident_bytes: Snapshot bytes kept in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_resident_bytes: int = 16 * 2**20) -> None:
+        self.path = path
+        self.max_resident_bytes = max_resident_bytes
+        self.stats = SnapshotStoreStats()
+        self._resident: "OrderedDict[_Key, bytes]" = OrderedDict()
+        self._spilled: set = set()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: _Key) -> bool:
+        return key in self._resident or key in self._spilled
+
+    def __len__(self) -> int:
+        return len(self._resident) + len(self._spilled)
+
+    def keys(self) -> List[_Key]:
+        return list(self._resident) + list(self._spilled)
+
+    def put(self, key: _Key, data: bytes) -> None:
+        with self._lock:
+            self._discard(key)
+            self._resident[key] = data
+            self.stats.resident_bytes += len(data)
+            while self.stats.resident_bytes > self.max_resident_bytes and len(self._resident) > 1:
+                old_key, old_data = self._resident.popitem(last=False)
+                self.stats.resident_bytes -= len(old_data)
+                self._db().execute(_UPSERT, (*old_key, old_data))
+                self._spilled.add(old_key)
+                self.stats.spills += 1
+            self._update_counts()
+
+    def get(self, key: _Key) -> Optional[bytes]:
+        with self._lock:
+            data = self._resident.get(key)
+            if data is None and key in self._spilled:
+                self.stats.disk_reads += 1
+                row = self._db().execute(_SELECT, key).fetchone()
+                data = row[0] if row else None
+            return data
+
+    def pop(self, key: _Key) -> Optional[bytes]:
+        data = self.get(key)
+        with self._lock:
+            self._discard(key)
+            self._update_counts()
+        return data
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _discard(self, key: _Key) -> None:
+        data = self._resident.pop(key, None)
+        if data is not None:
+            self.stats.resident_bytes -= len(data)
+        if key in self._spilled:
+            self._spilled.discard(key)
+            self._db().execute(_DELETE, key)
+
+    def _update_counts(self) -> None:
+        self.stats.resident = len(self._resident)
+        self.stats.spilled = len(self._spilled)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            if self.path is None:
+                handle, self.path = tempfile.mkstemp(prefix="paused-snapshots-", suffix=".db")
+                os.close(handle)
+            # Snapshots are a cache of paused work; losing the last few on a
+            # power cut is acceptable, so no fsync per spill.
+            self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=OFF")
+            self._connection.execute(_SCHEMA)
+        return self._connection
+
+
+@dataclass
+class ParkingStats:
+    """Counters for `SpillingSessionService`.
+
+    Attributes:
+        parked: Sessions parked.
+        restored: Sessions restored.
+        snapshot_bytes: Total size of the snapshots written.
+        json_bytes: Total size the same sessions take as `model_dump_json()`.
+    """
+
+    parked: int = 0
+    restored: int = 0
+    snapshot_bytes: int = 0
+    json_bytes: int = 0
+
+
+class SpillingSessionService(InMemorySessionService):
+    """An in-memory session service that parks paused sessions as snapshots.
+
+    Args:
+        store: Where snapshots go; an in-memory store spilling to a temporary
+            file by default.
+        registry: Where metrics are exported; the process-wide registry by default.
+    """
+
+    def __init__(
+        self, store: Optional[SnapshotStore] = None, registry: Optional[MetricsRegistry] = None
+    ) -> None:
+        super().__init__()
+        self.store = store if store is not None else SnapshotStore()
+        self.stats = ParkingStats()
+        registry = registry or default_registry
+        self._parked_gauge = registry.gauge(
+            "adk_paused_sessions", "Sessions parked as snapshots.", ["where"]
+        )
+        self._restore_seconds = registry.histogram(
+            "adk_paused_restore_seconds", "Time to restore a parked session."
+        ).labels()
+
+    async def park(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """Snapshots a stored session and drops it from memory.
+
+        Returns:
+            False if the session is not held by this service.
+        """
+        session = self.sessions.get(app_name, {}).get(user_id, {}).pop(session_id, None)
+        if session is None:
+            return False
+        data = encode_snapshot(session.model_dump(mode="json", exclude_none=True))
+        self.store.put((app_name, user_id, session_id), data)
+        self.stats.parked += 1
+        self.stats.snapshot_bytes += len(data)
+        self.stats.json_bytes += len(session.model_dump_json())
+        self._export()
+        logger.debug("Parked session %s as a %d-byte snapshot.", session_id, len(data))
+        return True
+
+    def is_parked(self, app_name: str, user_id: str, session_id: str) -> bool:
+        return (app_name, user_id, session_id) in self.store
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        self._restore((app_name, user_id, session_id))
+        return await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: Optional[str] = None
+    ) -> ListSessionsResponse:
+        # Listing is rare; restoring the parked sessions it covers keeps it exact.
+        for key in self.store.keys():
+            if key[0] == app_name and (user_id is None or key[1] == user_id):
+                self._restore(key)
+        return await super().list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self.store.pop((app_name, user_id, session_id))
+        self._export()
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if not event.partial:
+            self._restore((session.app_name, session.user_id, session.id))
+        return await super().append_event(session=session, event=event)
+
+    def _restore(self, key: _Key) -> None:
+        if key not in self.store:
+            return
+        started = time.perf_counter()
+        data = self.store.pop(key)
+        if data is None:
+            return
+        session = Session.model_validate(decode_snapshot(data))
+        self.sessions.setdefault(key[0], {}).setdefault(key[1], {})[key[2]] = session
+        self.stats.restored += 1
+        self._restore_seconds.observe(time.perf_counter() - started)
+        self._export()
+
+    def _export(self) -> None:
+        self._parked_gauge.labels(where="memory").set(self.store.stats.resident)
+        self._parked_gauge.labels(where="disk").set(self.store.stats.spilled)
+
+
+class ParkPausedSessionsPlugin(BasePlugin):
+    """Parks the session when a run ends waiting on a long-running call."""
+
+    def __init__(self) -> None:
+        super().__init__(name="park_paused_sessions_plugin")
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        service = invocation_context.session_service
+        session = invocation_context.session
+        if isinstance(service, SpillingSessionService) and pending_calls(session.events):
+            await service.park(session.app_name, session.user_id, session.id)
+        return None
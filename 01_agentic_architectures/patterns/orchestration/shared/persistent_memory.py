@@ -0,0 +1,496 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A persistent memory service: memory-mapped embeddings, SQLite metadata.
+
+Everything in an `InMemoryMemoryService` or `VectorMemoryService` is lost
+on restart, and rebuilding it means re-embedding every session.
+`PersistentMemoryService` keeps memories in a directory:
+
+* `memories.db`, a SQLite database in WAL mode, holds each memory's text,
+  author, timestamp, source event and a deleted flag. It also holds each
+  user's partition: its vector file, and how many of the file's rows are
+  committed.
+* `vectors/<partition>-<generation>.f32` holds the partition's embeddings
+  as raw float32 rows, append-only.
+
+Opening a store only opens the database, so even a multi-GB store opens in
+milliseconds. A partition's file is memory-mapped read-only on its first
+search. Scoring runs straight on the mapped pages, with no copy and no
+parse. Mappings are kept in an LRU of `max_mappings` partitions, so a
+worker serving many users stays under the kernel's map count limit. Every process that opens the store shares those pages through the OS
+page cache, so N workers cost one copy of the embeddings, not N. Search is
+an exact scan; only the top-k rows' metadata is read from SQLite.
+
+Appends are crash-safe. A writer takes SQLite's write lock
+(`BEGIN IMMEDIATE`), which serializes writers across threads and
+processes. It writes the vectors after the partition's committed rows and
+fsyncs them, then inserts the metadata and advances the committed count in
+the same transaction. The commit is the only point of no return. A crash
+before it leaves bytes past the committed count, which readers ignore and
+the next append overwrites.
+
+`delete_memories` only flags rows; searches skip them. `compact` rewrites a
+partition's live rows into a file of the next generation, renumbers them
+and switches over in one transaction, then unlinks the old file. A search
+reads the partition, its deleted rows and the top rows' metadata in one
+read transaction, so it sees one generation throughout, even while another
+process compacts. It maps that generation's file (a search already running
+finishes on its old mapping), and if the file was unlinked before it could
+be mapped, it retries once on the new generation.
+
+Sample:
+```python
+memory_service = PersistentMemoryService(".adk_memory")
+await memory_service.add_session_to_memory(session)
+response = await memory_service.search_memory(
+    app_name="support", user_id="alice", query="printer driver crash"
+)
+```
+"""
+
+import asyncio
+import glob
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from google.adk.events.event import Event
+from google.adk.memory.base_memory_service import BaseMemoryService, SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions.session import Session
+from google.genai import types
+
+from shared.metrics_registry import MetricsRegistry
+from shared.metrics_registry import registry as default_registry
+from shared.vector_memory import SEARCH_BUCKETS, Embedder, HashingEmbedder, _require_numpy, _text, _top_k
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS memory_partitions (
+    id INTEGER PRIMARY KEY,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    generation INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (app_name, user_id)
+);
+CREATE TABLE IF NOT EXISTS memories (
+    partition_id INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    session_id TEXT,
+    event_id TEXT,
+    author TEXT,
+    role TEXT,
+    text TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (partition_id, row)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS memories_by_event
+    ON memories (partition_id, event_id) WHERE event_id IS NOT NULL;
+"""
+_PARTITION = "SELECT id, generation, rows, deleted FROM memory_partitions WHERE app_name = ? AND user_id = ?"
+_INSERT = (
+    "INSERT INTO memories (partition_id, row, session_id, event_id, author, role, text, timestamp)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# SQLite's default limit on host parameters in one statement.
+_MAX_PARAMETERS = 999
+
+# (session_id, event_id, author, role, text, timestamp)
+_Entry = Tuple[Optional[str], Optional[str], Optional[str], Optional[str], str, float]
+
+
+@dataclass
+class PersistentMemoryStats:
+    """Counters for `PersistentMemoryService`, for this process.
+
+    Attributes:
+        appended: Memories appended.
+        duplicates: Memories skipped because their event was already stored.
+        searches: Searches served.
+        maps: Vector files memory-mapped, including remaps after growth.
+        unmaps: Mappings dropped to respect `max_mappings`.
+        compactions: Partitions compacted.
+        reclaimed_rows: Deleted rows dropped by compaction.
+    """
+
+    appended: int = 0
+    duplicates: int = 0
+    searches: int = 0
+    maps: int = 0
+    unmaps: int = 0
+    compactions: int = 0
+    reclaimed_rows: int = 0
+
+
+@dataclass
+class _Mapping:
+    generation: int
+    rows: int
+    vectors: "np.ndarray"
+    deleted_count: int = 0
+    deleted_rows: Optional["np.ndarray"] = None
+
+
+class PersistentMemoryService(BaseMemoryService):
+    """A memory service persisted to a directory, shared by every process opening it.
+
+    Args:
+        path: Directory of the store; created if missing.
+        embedder: Maps texts to an `(n, dim)` array. A `HashingEmbedder` of
+            `dim` dimensions by default. A store keeps the dimension it was
+            created with.
+        dim: Embedding dimension of the default embedder.
+        top_k: Memories returned per search.
+        min_score: Memories scoring at or below this are not returned.
+        registry: Where metrics are exported; the process-wide registry by default.
+        max_mappings: Partitions whose vector file stays mapped; the least
+            recently searched is unmapped beyond this.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embedder: Optional[Embedder] = None,
+        dim: int = 256,
+        top_k: int = 10,
+        min_score: float = 0.1,
+        registry: Optional[MetricsRegistry] = None,
+        max_mappings: int = 1024,
+    ) -> None:
+        _require_numpy()
+        self.path = path
+        self.embedder = embedder or HashingEmbedder(dim)
+        self.top_k = top_k
+        self.min_score = min_score
+        self.stats = PersistentMemoryStats()
+        os.makedirs(os.path.join(path, "vectors"), exist_ok=True)
+        self._local = threading.local()
+        self.max_mappings = max_mappings
+        self._mappings: "OrderedDict[int, _Mapping]" = OrderedDict()
+        self._mappings_lock = threading.Lock()
+
+        connection = self._connection()
+        connection.executescript(_SCHEMA)
+        self.dim = getattr(self.embedder, "dim", None) or len(self.embedder(["probe"])[0])
+        connection.execute("INSERT OR IGNORE INTO memory_meta VALUES ('dim', ?)", (str(self.dim),))
+        stored = int(connection.execute("SELECT value FROM memory_meta WHERE key = 'dim'").fetchone()[0])
+        if stored != self.dim:
+            raise ValueError(f"Store {path!r} holds {stored}-dimensional embeddings, not {self.dim}.")
+        self._row_bytes = self.dim * 4
+
+        registry = registry or default_registry
+        self._search_seconds = registry.histogram(
+            "adk_memory_search_seconds", "Memory search latency.", ["index"], buckets=SEARCH_BUCKETS
+        ).labels(index="mmap")
+
+    async def add_session_to_memory(self, session: Session) -> None:
+        """Appends the session's text events not stored yet."""
+        await self.add_events_to_memory(session, session.events)
+
+    async def add_events_to_memory(self, session: Session, events: Sequence[Event]) -> None:
+        """Appends `events` of `session` not stored yet, e.g. the ones added since the last call."""
+        events = [event for event in events if _text(event)]
+        await asyncio.to_thread(self._append, session.app_name, session.user_id, [
+            (session.id, event.id, event.author, event.content.role, _text(event), event.timestamp)
+            for event in events
+        ])
+
+    async def add_texts(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        texts: Sequence[str],
+        author: Optional[str] = "user",
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """Stores texts as memories directly, e.g. to seed a knowledge base."""
+        timestamp = time.time() if timestamp is None else timestamp
+        await asyncio.to_thread(self._append, app_name, user_id, [
+            (None, None, author, "user", text, timestamp) for text in texts
+        ])
+
+    async def memory_version(self, *, app_name: str, user_id: str) -> Tuple[int, int, int]:
+        """Returns a value that changes whenever the user's memories change, in any process."""
+        return await asyncio.to_thread(self._version, app_name, user_id)
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        return await asyncio.to_thread(self._search, app_name, user_id, query)
+
+    async def delete_memories(
+        self, *, app_name: str, user_id: str, session_id: Optional[str] = None
+    ) -> int:
+        """Flags a user's memories, or one session's, as deleted; returns how many."""
+        return await asyncio.to_thread(self._delete, app_name, user_id, session_id)
+
+    async def compact(self, *, app_name: str, user_id: str) -> int:
+        """Rewrites a partition without its deleted rows; returns the rows reclaimed."""
+        return await asyncio.to_thread(self._compact, app_name, user_id)
+
+    def close(self) -> None:
+        """Closes this thread's connection and drops the mappings."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+        with self._mappings_lock:
+            self._mappings.clear()
+
+    def _append(self, app_name: str, user_id: str, entries: List[_Entry]) -> None:
+        connection = self._connection()
+        partition = connection.execute(_PARTITION, (app_name, user_id)).fetchone()
+        if partition is not None:
+            entries = self._new_entries(connection, partition[0], entries)
+        if not entries:
+            return
+        # Embed before taking the write lock; it is the slow part.
+        vectors = np.ascontiguousarray(self.embedder([entry[4] for entry in entries]), dtype=np.float32)
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            partition = connection.execute(_PARTITION, (app_name, user_id)).fetchone()
+            if partition is None:
+                connection.execute(
+                    "INSERT INTO memory_partitions (app_name, user_id) VALUES (?, ?)", (app_name, user_id)
+                )
+                partition = connection.execute(_PARTITION, (app_name, user_id)).fetchone()
+            partition_id, generation, rows, _ = partition
+            # Another writer may have stored some of these events meanwhile.
+            fresh = self._new_entries(connection, partition_id, entries)
+            if len(fresh) != len(entries):
+                keep = {id(entry) for entry in fresh}
+                vectors = vectors[[index for index, entry in enumerate(entries) if id(entry) in keep]]
+                entries = fresh
+            if entries:
+                with open(self._file(partition_id, generation), "ab") as handle:
+                    # Bytes past `rows` were never committed; overwrite them.
+                    handle.truncate(rows * self._row_bytes)
+                    handle.write(vectors.tobytes())
+                    handle.flush()
+                    os.fsync(handle.fileno())
+                connection.executemany(_INSERT, [
+                    (partition_id, rows + offset, *entry) for offset, entry in enumerate(entries)
+                ])
+                connection.execute(
+                    "UPDATE memory_partitions SET rows = ? WHERE id = ?", (rows + len(entries), partition_id)
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self.stats.appended += len(entries)
+
+    def _new_entries(self, connection: sqlite3.Connection, partition_id: int, entries: List[_Entry]) -> List[_Entry]:
+        event_ids = [entry[1] for entry in entries if entry[1] is not None]
+        stored = set()
+        for start in range(0, len(event_ids), _MAX_PARAMETERS - 1):
+            chunk = event_ids[start:start + _MAX_PARAMETERS - 1]
+            stored.update(row[0] for row in connection.execute(
+                f"SELECT event_id FROM memories WHERE partition_id = ? AND event_id IN ({_marks(chunk)})",
+                (partition_id, *chunk),
+            ))
+        fresh = [entry for entry in entries if entry[1] is None or entry[1] not in stored]
+        self.stats.duplicates += len(entries) - len(fresh)
+        return fresh
+
+    def _version(self, app_name: str, user_id: str) -> Tuple[int, int, int]:
+        partition = self._connection().execute(_PARTITION, (app_name, user_id)).fetchone()
+        return (0, 0, 0) if partition is None else tuple(partition[1:])
+
+    def _search(self, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        started = time.perf_counter()
+        embedding = self.embedder([query])[0]
+        connection = self._connection()
+        for attempt in range(2):
+            # One read transaction: the partition, its deleted rows and the
+            # metadata all come from one WAL snapshot, so a concurrent
+            # compaction cannot renumber rows between scoring and lookup.
+            connection.execute("BEGIN")
+            try:
+                found = self._search_snapshot(connection, app_name, user_id, embedding)
+            except FileNotFoundError:
+                # A compaction committed after the snapshot and unlinked its
+                # generation's file; the next snapshot sees the new one.
+                if attempt:
+                    raise
+                continue
+            finally:
+                connection.execute("COMMIT")
+            break
+        response = SearchMemoryResponse()
+        for author, role, text, timestamp in found:
+            response.memories.append(MemoryEntry(
+                content=types.Content(role=role, parts=[types.Part(text=text)]),
+                author=author,
+                timestamp=datetime.fromtimestamp(timestamp).isoformat(),
+            ))
+        self.stats.searches += 1
+        self._search_seconds.observe(time.perf_counter() - started)
+        return response
+
+    def _search_snapshot(
+        self, connection: sqlite3.Connection, app_name: str, user_id: str, embedding: "np.ndarray"
+    ) -> List[tuple]:
+        """Returns the top memories' (author, role, text, timestamp); runs in a read transaction."""
+        partition = connection.execute(_PARTITION, (app_name, user_id)).fetchone()
+        if partition is None or partition[2] == 0:
+            return []
+        partition_id, generation, rows, deleted = partition
+        mapping = self._mapping(connection, partition_id, generation, rows, deleted)
+
+        scores = mapping.vectors[:rows] @ embedding
+        if mapping.deleted_rows is not None:
+            scores[mapping.deleted_rows[mapping.deleted_rows < rows]] = -np.inf
+        top = [int(row) for row in _top_k(scores, self.top_k) if scores[row] > self.min_score]
+        if not top:
+            return []
+        found = {
+            row: rest
+            for row, *rest in connection.execute(
+                "SELECT row, author, role, text, timestamp FROM memories"
+                f" WHERE partition_id = ? AND row IN ({_marks(top)})",
+                (partition_id, *top),
+            )
+        }
+        return [found[row] for row in top]
+
+    def _mapping(
+        self, connection: sqlite3.Connection, partition_id: int, generation: int, rows: int, deleted: int
+    ) -> _Mapping:
+        with self._mappings_lock:
+            mapping = self._mappings.get(partition_id)
+            if mapping is None or mapping.generation != generation or mapping.rows < rows:
+                file_rows = os.path.getsize(self._file(partition_id, generation)) // self._row_bytes
+                vectors = np.memmap(
+                    self._file(partition_id, generation), dtype=np.float32, mode="r", shape=(file_rows, self.dim)
+                )
+                mapping = self._mappings[partition_id] = _Mapping(generation, file_rows, vectors)
+                self.stats.maps += 1
+            self._mappings.move_to_end(partition_id)
+            while len(self._mappings) > self.max_mappings:
+                # Searches still scoring on an evicted mapping keep it open until they finish.
+                self._mappings.popitem(last=False)
+                self.stats.unmaps += 1
+            if mapping.deleted_count != deleted:
+                mapping.deleted_rows = np.fromiter(
+                    (row for (row,) in connection.execute(
+                        "SELECT row FROM memories WHERE partition_id = ? AND deleted = 1", (partition_id,)
+                    )),
+                    dtype=np.int64,
+                ) if deleted else None
+                mapping.deleted_count = deleted
+            return mapping
+
+    def _delete(self, app_name: str, user_id: str, session_id: Optional[str]) -> int:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            partition = connection.execute(_PARTITION, (app_name, user_id)).fetchone()
+            if partition is None:
+                connection.execute("COMMIT")
+                return 0
+            sql = "UPDATE memories SET deleted = 1 WHERE partition_id = ? AND deleted = 0"
+            parameters: tuple = (partition[0],)
+            if session_id is not None:
+                sql += " AND session_id = ?"
+                parameters += (session_id,)
+            count = connection.execute(sql, parameters).rowcount
+            connection.execute(
+                "UPDATE memory_partitions SET deleted = deleted + ? WHERE id = ?", (count, partition[0])
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return count
+
+    def _compact(self, app_name: str, user_id: str) -> int:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            partition = connection.execute(_PARTITION, (app_name, user_id)).fetchone()
+            if partition is None or partition[3] == 0:
+                connection.execute("COMMIT")
+                return 0
+            partition_id, generation, rows, deleted = partition
+            live = np.fromiter(
+                (row for (row,) in connection.execute(
+                    "SELECT row FROM memories WHERE partition_id = ? AND deleted = 0 ORDER BY row", (partition_id,)
+                )),
+                dtype=np.int64,
+            )
+            old = np.memmap(self._file(partition_id, generation), dtype=np.float32, mode="r", shape=(rows, self.dim))
+            with open(self._file(partition_id, generation + 1), "wb") as handle:
+                for start in range(0, len(live), 65_536):
+                    handle.write(np.ascontiguousarray(old[live[start:start + 65_536]]).tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+            del old
+            connection.execute("DELETE FROM memories WHERE partition_id = ? AND deleted = 1", (partition_id,))
+            # Live rows only move down, and in ascending order, so no key collides.
+            connection.executemany(
+                "UPDATE memories SET row = ? WHERE partition_id = ? AND row = ?",
+                ((new, partition_id, int(old_row)) for new, old_row in enumerate(live) if new != old_row),
+            )
+            connection.execute(
+                "UPDATE memory_partitions SET generation = ?, rows = ?, deleted = 0 WHERE id = ?",
+                (generation + 1, len(live), partition_id),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        # Processes still mapping the old file keep their pages until they remap.
+        for stale in glob.glob(os.path.join(self.path, "vectors", f"{partition_id}-*.f32")):
+            if int(stale.rsplit("-", 1)[1][:-len(".f32")]) <= generation:
+                os.unlink(stale)
+        self.stats.compactions += 1
+        self.stats.reclaimed_rows += rows - len(live)
+        return rows - len(live)
+
+    def _file(self, partition_id: int, generation: int) -> str:
+        return os.path.join(self.path, "vectors", f"{partition_id}-{generation}.f32")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                os.path.join(self.path, "memories.db"), isolation_level=None, check_same_thread=False, timeout=30
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+
+def _marks(values: Sequence) -> str:
+    return ", ".join("?" * len(values))
@@ -0,0 +1,301 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A content-addressed cache of model responses, implemented as an ADK plugin.
+
+Eval runs and repeated user queries send byte-for-byte identical requests to
+the model. `ResponseCachePlugin` hashes the parts of an `LlmRequest` that
+determine the answer (model, system instruction, contents, tools and
+generation config) and, on a hit, returns the stored `LlmResponse` from
+`before_model_callback`, which skips the model call entirely.
+
+Two tiers are consulted in order:
+
+* An in-memory LRU with a TTL, private to the process.
+* An optional SQLite file, shared by every process that points at it, so
+  parallel or repeated eval runs reuse each other's answers. It is read and
+  written on a worker thread, so a process holding its lock stalls only the
+  calls waiting on it, not the event loop.
+
+Agents whose output should vary between calls can be excluded by name.
+
+Sample:
+```python
+runner = InMemoryRunner(
+    agent=root_agent,
+    plugins=[ResponseCachePlugin(disk_path=".adk_cache/responses.sqlite")],
+)
+```
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+
+# Config fields that do not change what the model answers.
+_IGNORED_CONFIG_FIELDS = {"http_options", "labels", "system_instruction", "tools"}
+# Model calls awaiting a response; far more than any process has in flight.
+_MAX_PENDING = 10_000
+
+
+def request_fingerprint(llm_request: LlmRequest) -> str:
+    """Returns a stable hash of everything in `llm_request` that shapes the answer.
+
+    Function call ids are generated per run by ADK, so they are dropped;
+    otherwise two runs of the same tool-using conversation would never match.
+    """
+    config = llm_request.config
+    canonical = {
+        "model": llm_request.model,
+        "system_instruction": _dump(config.system_instruction),
+        "contents": [_strip_call_ids(_dump(content)) for content in llm_request.contents],
+        "tools": [_dump(tool) for tool in config.tools or []],
+        "config": {
+            key: value
+            for key, value in _dump(config).items()
+            if key not in _IGNORED_CONFIG_FIELDS
+        },
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+@dataclass
+class ResponseCacheStats:
+    """Counters for one `ResponseCachePlugin`.
+
+    Attributes:
+        hits: Model calls answered from the cache.
+        memory_hits: Hits served by the in-memory tier.
+        disk_hits: Hits served by the disk tier.
+        misses: Cacheable calls that went to the model.
+        bypassed: Calls from excluded agents.
+        stores: Responses written to the cache.
+        evictions: Entries dropped from memory to respect `max_entries`.
+        expirations: Entries dropped because they outlived the TTL.
+    """
+
+    hits: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class MemoryTier:
+    """An LRU of serialized responses with a time-to-live.
+
+    Args:
+        max_entries: Entries kept before the least recently used is evicted.
+        ttl: Seconds an entry stays valid; `None` keeps entries until evicted.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 3600.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, stats: ResponseCacheStats) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self.ttl is not None and time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            stats.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(
+        self, key: str, value: str, stats: ResponseCacheStats, stored_at: Optional[float] = None
+    ) -> None:
+        self._entries[key] = (stored_at or time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            stats.evictions += 1
+
+
+class SqliteTier:
+    """A response store in a SQLite file that several processes can share.
+
+    Args:
+        path: The database file; created if missing.
+        ttl: Seconds an entry stays valid; `None` keeps entries forever.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30.0)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._connection.commit()
+
+    def get(self, key: str, stats: ResponseCacheStats) -> Optional[Tuple[float, str]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT stored_at, value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and time.time() - row[0] > self.ttl:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                stats.expirations += 1
+                return None
+            return row
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class ResponseCachePlugin(BasePlugin):
+    """Serves repeated model requests from a content-addressed cache.
+
+    Args:
+        max_entries: Size of the in-memory LRU.
+        ttl: Seconds a cached response stays valid, in both tiers.
+        disk_path: Optional SQLite file for a cache shared across processes.
+        excluded_agents: Names of agents whose calls are never cached, e.g.
+            agents that sample with a high temperature on purpose.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = 3600.0,
+        disk_path: Optional[str] = None,
+        excluded_agents: Iterable[str] = (),
+    ) -> None:
+        super().__init__(name="response_cache_plugin")
+        self.memory = MemoryTier(max_entries, ttl)
+        self.disk = SqliteTier(disk_path, ttl) if disk_path else None
+        self.excluded_agents = frozenset(excluded_agents)
+        self.stats = ResponseCacheStats()
+        # Keys of requests that missed, awaiting their response. Bounded so
+        # calls that end without either callback cannot grow it forever.
+        self._pending: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        """Returns the cached response for this request, if there is one."""
+        if callback_context.agent_name in self.excluded_agents:
+            self.stats.bypassed += 1
+            return None
+        key = request_fingerprint(llm_request)
+        value = self.memory.get(key, self.stats)
+        if value is not None:
+            self.stats.memory_hits += 1
+        elif self.disk is not None:
+            row = await asyncio.to_thread(self.disk.get, key, self.stats)
+            if row is not None:
+                stored_at, value = row
+                self.memory.put(key, value, self.stats, stored_at)
+                self.stats.disk_hits += 1
+        if value is None:
+            self.stats.misses += 1
+            self._pending[(callback_context.invocation_id, callback_context.agent_name)] = key
+            while len(self._pending) > _MAX_PENDING:
+                self._pending.popitem(last=False)
+            return None
+        self.stats.hits += 1
+        return LlmResponse.model_validate_json(value)
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> None:
+        """Stores complete, successful responses under their request's key."""
+        if llm_response.partial:
+            return None
+        key = self._pending.pop(
+            (callback_context.invocation_id, callback_context.agent_name), None
+        )
+        if key is None or llm_response.error_code or not llm_response.content:
+            return None
+        data = llm_response.model_dump(mode="json", exclude_none=True)
+        # Let ADK assign fresh function call ids when the response is replayed.
+        _strip_call_ids(data["content"])
+        value = json.dumps(data)
+        self.memory.put(key, value, self.stats)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.put, key, value)
+        self.stats.stores += 1
+        return None
+
+    async def on_model_error_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> Optional[LlmResponse]:
+        """Forgets the failed request's key; errors are never cached."""
+        self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        """Returns the counters plus the current in-memory size."""
+        return {**vars(self.stats), "hit_rate": self.stats.hit_rate, "entries": len(self.memory)}
+
+
+def _dump(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    return str(value)
+
+
+def _strip_call_ids(content: Dict[str, Any]) -> Dict[str, Any]:
+    for part in content.get("parts", []) or []:
+        for field_name in ("function_call", "function_response"):
+            if isinstance(part.get(field_name), dict):
+                part[field_name].pop("id", None)
+    return content
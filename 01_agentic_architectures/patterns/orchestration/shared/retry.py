@@ -0,0 +1,361 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Adaptive, budget-aware retries and client-side rate limiting for any model.
+
+The static policy the patterns used to copy around (`attempts=5, exp_base=7,
+initial_delay=1`) backs off 1s, 7s, 49s, ... and every client that saw the same
+429 retries in lock-step. This module replaces it with four cooperating pieces:
+
+* `RetryPolicy`: capped exponential backoff with full jitter, bounded by a
+  per-request deadline.
+* `RetryBudget`: a process-wide token budget so retries can never exceed a
+  fixed fraction of traffic, which stops retry storms during an outage.
+* `RateLimiter`: a token bucket per model. A 429 with `Retry-After` pauses the
+  whole bucket, so every caller waits once instead of each retrying blindly.
+* `ResilientModel`: a `BaseLlm` wrapper that applies all of the above to any
+  inner model, so it works with any `LlmAgent`.
+
+Sample:
+```python
+from shared.retry import ResilientModel, RetryPolicy
+
+agent = LlmAgent(
+    model=ResilientModel.wrap(Gemini(model="gemini-2.5-flash-lite")),
+    ...
+)
+```
+
+`shared.model_clients.get_model()` applies this wrapper by default.
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Dict, Optional, Tuple
+
+import httpx
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.base_llm_connection import BaseLlmConnection
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import Field
+
+
+class RetryDeadlineExceeded(TimeoutError):
+    """Raised when throttling alone would push a request past its deadline."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How a single request is retried.
+
+    Attributes:
+        max_attempts: Total attempts, including the first one.
+        initial_delay: Backoff ceiling, in seconds, before the first retry.
+        multiplier: Growth factor of the backoff ceiling per retry.
+        max_delay: Upper bound on any single backoff.
+        deadline: Seconds from the first attempt after which no retry starts.
+        max_retry_after: Upper bound on a server-provided `Retry-After`.
+        retryable_status_codes: HTTP status codes worth retrying.
+    """
+
+    max_attempts: int = 4
+    initial_delay: float = 0.5
+    multiplier: float = 2.0
+    max_delay: float = 8.0
+    deadline: float = 30.0
+    max_retry_after: float = 30.0
+    retryable_status_codes: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    def backoff(self, retry_number: int, rng: random.Random) -> float:
+        """Full-jitter backoff: uniform in [0, min(max_delay, initial * mult^n)]."""
+        ceiling = min(self.max_delay, self.initial_delay * self.multiplier ** retry_number)
+        return rng.uniform(0, ceiling)
+
+
+class RetryBudget:
+    """A process-wide cap on retries as a fraction of requests.
+
+    Every request deposits `ratio` tokens and every retry withdraws one. A
+    small time-based allowance (`min_retries_per_second`) keeps low-traffic
+    processes able to retry at all.
+
+    Args:
+        ratio: Retries allowed per request, e.g. 0.2 for 20%.
+        min_retries_per_second: Tokens added per second regardless of traffic.
+        max_tokens: Cap on saved-up tokens so a quiet period cannot fund a storm.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_retries_per_second: float = 1.0,
+        max_tokens: float = 20.0,
+    ) -> None:
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire_retry(self) -> bool:
+        """Withdraws one retry token, returning False when the budget is spent."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.max_tokens,
+            self._tokens + (now - self._updated) * self.min_retries_per_second,
+        )
+        self._updated = now
+
+
+class TokenBucket:
+    """An asyncio token bucket that can also be paused by `Retry-After`.
+
+    Args:
+        rate: Tokens added per second; `None` disables rate limiting but keeps
+            `pause()` working.
+        burst: Bucket capacity.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: float = 1.0) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        """Stops handing out tokens for `seconds`, e.g. after a 429."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, deadline: float) -> float:
+        """Waits for a token and returns the seconds spent waiting.
+
+        Raises:
+            RetryDeadlineExceeded: If the token would arrive after `deadline`.
+        """
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            wait = self._paused_until - now
+            if wait <= 0 and self.rate is not None:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                wait = 0.0 if self._tokens >= 1.0 else (1.0 - self._tokens) / self.rate
+            if wait <= 0:
+                if self.rate is not None:
+                    self._tokens -= 1.0
+                return waited
+            if now + wait > deadline:
+                raise RetryDeadlineExceeded(
+                    f"Rate limit wait of {wait:.2f}s exceeds the request deadline."
+                )
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+@dataclass
+class RetryStats:
+    """Process-wide retry and throttling counters.
+
+    Attributes:
+        requests: Logical model requests started.
+        attempts: Physical attempts sent, including retries.
+        retries: Attempts after the first one.
+        budget_exhausted: Retries refused by the `RetryBudget`.
+        deadline_exceeded: Requests abandoned because of their deadline.
+        retry_after_honored: Retries that waited on a server `Retry-After`.
+        throttled_seconds: Time spent waiting on rate limiters.
+        backoff_seconds: Time spent sleeping between attempts.
+        retries_by_status: Retries broken down by status ("transport" for
+            connection errors).
+    """
+
+    requests: int = 0
+    attempts: int = 0
+    retries: int = 0
+    budget_exhausted: int = 0
+    deadline_exceeded: int = 0
+    retry_after_honored: int = 0
+    throttled_seconds: float = 0.0
+    backoff_seconds: float = 0.0
+    retries_by_status: Dict[str, int] = field(default_factory=dict)
+
+
+class RetryRuntime:
+    """The shared state behind every `ResilientModel`: budget, buckets and counters.
+
+    Args:
+        budget: The process-wide retry budget.
+        seed: Seeds the jitter, for reproducible tests.
+    """
+
+    def __init__(self, budget: Optional[RetryBudget] = None, seed: Optional[int] = None) -> None:
+        self.budget = budget or RetryBudget()
+        self.stats = RetryStats()
+        self.rng = random.Random(seed)
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def set_rate_limit(self, model: str, requests_per_second: float, burst: float = 1.0) -> None:
+        """Limits how fast requests to `model` leave this process."""
+        self._buckets[model] = TokenBucket(requests_per_second, burst)
+
+    def bucket(self, model: str) -> TokenBucket:
+        bucket = self._buckets.get(model)
+        if bucket is None:
+            bucket = self._buckets[model] = TokenBucket()
+        return bucket
+
+    def reset_stats(self) -> None:
+        self.stats = RetryStats()
+
+
+runtime = RetryRuntime()
+"""The process-wide runtime shared by every `ResilientModel` by default."""
+
+
+class ResilientModel(BaseLlm):
+    """Wraps any `BaseLlm` with jittered retries, a retry budget and rate limiting.
+
+    Retries only happen before the first response chunk is yielded, so a
+    streamed response is never duplicated.
+
+    Attributes:
+        inner: The model that performs the actual call. It should not retry on
+            its own.
+        policy: The per-request retry policy.
+        retry_runtime: The shared budget, rate limiters and counters.
+    """
+
+    inner: BaseLlm
+    policy: RetryPolicy = RetryPolicy()
+    retry_runtime: RetryRuntime = Field(default_factory=lambda: runtime, exclude=True)
+
+    @classmethod
+    def wrap(
+        cls,
+        inner: BaseLlm,
+        policy: Optional[RetryPolicy] = None,
+        retry_runtime: Optional[RetryRuntime] = None,
+    ) -> "ResilientModel":
+        """Builds a wrapper that reports the inner model's name to ADK."""
+        return cls(
+            model=inner.model,
+            inner=inner,
+            policy=policy or RetryPolicy(),
+            retry_runtime=retry_runtime or runtime,
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """Calls the inner model, retrying transient failures within the policy."""
+        policy, state, stats = self.policy, self.retry_runtime, self.retry_runtime.stats
+        bucket = state.bucket(self.model)
+        deadline = time.monotonic() + policy.deadline
+        stats.requests += 1
+        state.budget.record_request()
+
+        attempt = 0
+        while True:
+            stats.throttled_seconds += await bucket.acquire(deadline)
+            stats.attempts += 1
+            yielded = False
+            try:
+                async for response in self.inner.generate_content_async(llm_request, stream=stream):
+                    yielded = True
+                    yield response
+                return
+            except Exception as e:
+                status = _status_of(e)
+                if yielded or status is None or (
+                    isinstance(status, int) and status not in policy.retryable_status_codes
+                ):
+                    raise
+                attempt += 1
+                if attempt >= policy.max_attempts:
+                    raise
+                retry_after = _retry_after_seconds(e)
+                if retry_after is not None:
+                    delay = min(retry_after, policy.max_retry_after)
+                    # Every caller of this model waits once, instead of each
+                    # one discovering the 429 on its own.
+                    bucket.pause(delay)
+                    stats.retry_after_honored += 1
+                else:
+                    delay = policy.backoff(attempt - 1, state.rng)
+                if time.monotonic() + delay > deadline:
+                    stats.deadline_exceeded += 1
+                    raise
+                if not state.budget.try_acquire_retry():
+                    stats.budget_exhausted += 1
+                    raise
+                stats.retries += 1
+                key = str(status)
+                stats.retries_by_status[key] = stats.retries_by_status.get(key, 0) + 1
+                if retry_after is None:
+                    stats.backoff_seconds += delay
+                    await asyncio.sleep(delay)
+
+    async def connect(self, llm_request: LlmRequest) -> BaseLlmConnection:
+        """Live connections are not retried; delegate to the inner model."""
+        return await self.inner.connect(llm_request)
+
+
+def _status_of(error: Exception):
+    """Returns the HTTP status of a retryable error, "transport", or None."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    if isinstance(error, (httpx.TransportError, ConnectionError, asyncio.TimeoutError)):
+        return "transport"
+    return None
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Parses `Retry-After` (seconds or HTTP date) from an API error's response."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
@@ -0,0 +1,504 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Expiry, archival and vacuuming for `SqliteSessionService` databases.
+
+Without maintenance, session databases keep every abandoned session forever.
+`SessionMaintenance` applies a `RetentionPolicy` per app:
+
+* Sessions idle longer than `archive_after` move to a compressed archive: one
+  zlib-compressed row per session (state, events and state deltas) in
+  `adk_session_archive`, kept in a sibling `<name>.archive.db` file by default.
+  `restore()` brings a session back.
+* Sessions idle longer than `ttl` are deleted, whether live or archived.
+* Freed pages are returned to the filesystem with `PRAGMA incremental_vacuum`
+  (new databases are created with `auto_vacuum=INCREMENTAL`), and
+  `PRAGMA optimize` keeps the query planner's statistics current.
+
+Maintenance uses its own connection and never blocks readers (WAL). It
+deletes and archives in batches of `batch_size` sessions, each in its own
+short transaction, with a `pause` between batches, so foreground writers
+wait at most one batch. `report.max_lock_ms` is the longest such hold. A
+session that receives an event while being archived is left in place.
+
+`health()` reports page usage, free pages and per-table and per-index page
+fill (from `dbstat`), to spot bloat before it costs query latency.
+
+Sample:
+```python
+maintenance = SessionMaintenance.for_service(
+    session_service, default_policy=RetentionPolicy(archive_after=14 * DAY, ttl=180 * DAY)
+)
+await maintenance.start(interval=3600)
+...
+await maintenance.restore(app_name="app", user_id="user", session_id=session_id)
+```
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from google.adk.sessions.base_session_service import BaseSessionService
+
+from shared.sqlite_sessions import SqliteSessionService
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400.0
+
+_ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {schema}.adk_session_archive (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    update_time REAL NOT NULL,
+    archived_time REAL NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE INDEX IF NOT EXISTS {schema}.adk_session_archive_by_update
+    ON adk_session_archive (app_name, update_time);
+"""
+
+_SELECT_APPS = "SELECT DISTINCT app_name FROM adk_sessions"
+_SELECT_IDLE = (
+    "SELECT user_id, id, update_time FROM adk_sessions"
+    " WHERE app_name = ? AND update_time < ? ORDER BY update_time LIMIT ?"
+)
+_SELECT_SESSION = (
+    "SELECT state, create_time, update_time FROM adk_sessions"
+    " WHERE app_name = ? AND user_id = ? AND id = ?"
+)
+_SELECT_EVENTS = (
+    "SELECT id, invocation_id, timestamp, data, compaction_start FROM adk_events"
+    " WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq"
+)
+_SELECT_DELTAS = (
+    "SELECT ops FROM adk_state_deltas WHERE app_name = ? AND user_id = ? AND session_id = ?"
+    " ORDER BY seq"
+)
+# Deleting only if unchanged: a session that received an event after it was
+# read for archiving stays live.
+_DELETE_IDLE_SESSION = (
+    "DELETE FROM adk_sessions WHERE app_name = ? AND user_id = ? AND id = ? AND update_time = ?"
+)
+_DELETE_EVENTS = "DELETE FROM adk_events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+_DELETE_DELTAS = "DELETE FROM adk_state_deltas WHERE app_name = ? AND user_id = ? AND session_id = ?"
+_INSERT_SESSION = (
+    "INSERT INTO adk_sessions (app_name, user_id, id, state, create_time, update_time)"
+    " VALUES (?, ?, ?, ?, ?, ?)"
+)
+_INSERT_EVENT = (
+    "INSERT INTO adk_events"
+    " (app_name, user_id, session_id, id, invocation_id, timestamp, data, compaction_start)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_DELTA = (
+    "INSERT INTO adk_state_deltas (app_name, user_id, session_id, ops) VALUES (?, ?, ?, ?)"
+)
+
+
+@dataclass
+class RetentionPolicy:
+    """How long an app's idle sessions stay live, and then archived.
+
+    Attributes:
+        archive_after: Seconds idle before a session is archived; None keeps
+            idle sessions live.
+        ttl: Seconds idle before a session is deleted, live or archived;
+            None keeps them forever.
+    """
+
+    archive_after: Optional[float] = None
+    ttl: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        """Reads SESSION_ARCHIVE_AFTER_DAYS (default 30) and SESSION_TTL_DAYS (default 180).
+
+        Set either to 0 to turn it off.
+        """
+        archive_days = float(os.environ.get("SESSION_ARCHIVE_AFTER_DAYS", "30"))
+        ttl_days = float(os.environ.get("SESSION_TTL_DAYS", "180"))
+        return cls(
+            archive_after=archive_days * DAY or None,
+            ttl=ttl_days * DAY or None,
+        )
+
+
+@dataclass
+class MaintenanceReport:
+    """What one maintenance pass did, across every database."""
+
+    archived: int = 0
+    expired: int = 0
+    expired_archived: int = 0
+    skipped: int = 0
+    archived_raw_bytes: int = 0
+    archived_bytes: int = 0
+    pages_freed: int = 0
+    max_lock_ms: float = 0.0
+    duration_ms: float = 0.0
+
+
+@dataclass
+class ObjectHealth:
+    """Page usage of one table or index."""
+
+    name: str
+    kind: str
+    pages: int
+    fill_pct: float
+
+
+@dataclass
+class DatabaseHealth:
+    """Page usage of one session database and its archive."""
+
+    path: str
+    auto_vacuum: str
+    page_size: int
+    pages: int
+    free_pages: int
+    live_sessions: int
+    archived_sessions: int
+    objects: List[ObjectHealth] = field(default_factory=list)
+
+    @property
+    def free_pct(self) -> float:
+        return 100.0 * self.free_pages / self.pages if self.pages else 0.0
+
+
+class SessionMaintenance:
+    """Expires, archives and vacuums `SqliteSessionService` databases.
+
+    Args:
+        paths: The session database files.
+        policies: Retention per app name.
+        default_policy: Retention for apps without an entry in `policies`.
+        archive_to_file: Keep archives in `<name>.archive.db` next to each
+            database, rather than in the database itself.
+        batch_size: Sessions per write transaction.
+        pause: Seconds to yield to foreground writers between transactions.
+        vacuum_pages: Most pages returned to the filesystem per pass.
+        busy_timeout_ms: How long to wait for foreground writers' lock.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        policies: Optional[Dict[str, RetentionPolicy]] = None,
+        default_policy: Optional[RetentionPolicy] = None,
+        archive_to_file: bool = True,
+        batch_size: int = 50,
+        pause: float = 0.005,
+        vacuum_pages: int = 2048,
+        busy_timeout_ms: int = 5000,
+    ) -> None:
+        self.paths = list(paths)
+        self.policies = dict(policies or {})
+        self.default_policy = default_policy
+        self.archive_to_file = archive_to_file
+        self.batch_size = batch_size
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+        self.busy_timeout_ms = busy_timeout_ms
+        self._connections: Dict[str, sqlite3.Connection] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def for_service(cls, service: BaseSessionService, **kwargs: Any) -> "SessionMaintenance":
+        """Maintains the databases behind `service`.
+
+        Sees through `WriteBehindSessionService` and `ShardedSessionService`
+        to the `SqliteSessionService` files they use.
+        """
+        return cls(_database_paths(service), **kwargs)
+
+    async def run_once(self, now: Optional[float] = None) -> MaintenanceReport:
+        """Runs one pass over every database; `now` defaults to the current time."""
+        return await asyncio.to_thread(self._run_once, now or time.time())
+
+    async def start(self, interval: float = 3600.0) -> None:
+        """Runs a pass every `interval` seconds in the background until `stop()`."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run_periodically(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def restore(self, *, app_name: str, user_id: str, session_id: str) -> bool:
+        """Moves an archived session back into its live database.
+
+        Returns False if no database has it archived.
+        """
+        return await asyncio.to_thread(self._restore, (app_name, user_id, session_id))
+
+    async def health(self) -> List[DatabaseHealth]:
+        """Reports page usage for every database. Reads every page; not for hot paths."""
+        return await asyncio.to_thread(lambda: [self._health(path) for path in self.paths])
+
+    def close(self) -> None:
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+    async def _run_periodically(self, interval: float) -> None:
+        while True:
+            try:
+                report = await self.run_once()
+                logger.info("Session maintenance: %s", report)
+            except Exception as e:
+                logger.warning("Session maintenance failed; will retry: %r", e)
+            await asyncio.sleep(interval)
+
+    def _connect(self, path: str) -> sqlite3.Connection:
+        connection = self._connections.get(path)
+        if connection is not None:
+            return connection
+        connection = sqlite3.connect(
+            path,
+            isolation_level=None,
+            check_same_thread=False,  # Passes run on executor threads, one at a time.
+            timeout=self.busy_timeout_ms / 1000,
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        schema = "main"
+        if self.archive_to_file:
+            root, extension = os.path.splitext(path)
+            connection.execute("ATTACH DATABASE ? AS archive", (f"{root}.archive{extension or '.db'}",))
+            connection.execute("PRAGMA archive.auto_vacuum=INCREMENTAL")  # Only takes effect on creation.
+            connection.execute("PRAGMA archive.journal_mode=WAL")
+            schema = "archive"
+        connection.executescript(_ARCHIVE_SCHEMA.format(schema=schema))
+        self._connections[path] = connection
+        return connection
+
+    def _archive_table(self) -> str:
+        return "archive.adk_session_archive" if self.archive_to_file else "adk_session_archive"
+
+    def _run_once(self, now: float) -> MaintenanceReport:
+        started = time.perf_counter()
+        report = MaintenanceReport()
+        for path in self.paths:
+            connection = self._connect(path)
+            apps = {app for (app,) in connection.execute(_SELECT_APPS)}
+            apps.update(app for (app,) in connection.execute(
+                f"SELECT DISTINCT app_name FROM {self._archive_table()}"
+            ))
+            for app_name in sorted(apps):
+                policy = self.policies.get(app_name, self.default_policy)
+                if policy is None:
+                    continue
+                if policy.ttl:
+                    self._expire(connection, app_name, now - policy.ttl, report)
+                if policy.archive_after:
+                    self._archive(connection, app_name, now - policy.archive_after, now, report)
+            # In a write transaction: upgrading a read lock mid-statement
+            # fails at once with "database is locked" instead of waiting.
+            with _transaction(connection, report):
+                connection.execute("PRAGMA optimize").fetchall()
+            self._vacuum(connection, report)
+        report.duration_ms = (time.perf_counter() - started) * 1000
+        return report
+
+    def _expire(self, connection: sqlite3.Connection, app_name: str, cutoff: float, report: MaintenanceReport) -> None:
+        while True:
+            idle = connection.execute(_SELECT_IDLE, (app_name, cutoff, self.batch_size)).fetchall()
+            if not idle:
+                break
+            with _transaction(connection, report):
+                for user_id, session_id, update_time in idle:
+                    key = (app_name, user_id, session_id)
+                    if connection.execute(_DELETE_IDLE_SESSION, key + (update_time,)).rowcount:
+                        connection.execute(_DELETE_EVENTS, key)
+                        connection.execute(_DELETE_DELTAS, key)
+                        report.expired += 1
+            time.sleep(self.pause)
+        table = self._archive_table()
+        while True:
+            with _transaction(connection, report):
+                deleted = connection.execute(
+                    f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table}"
+                    " WHERE app_name = ? AND update_time < ? LIMIT ?)",
+                    (app_name, cutoff, self.batch_size),
+                ).rowcount
+            report.expired_archived += deleted
+            if deleted < self.batch_size:
+                break
+            time.sleep(self.pause)
+
+    def _archive(
+        self,
+        connection: sqlite3.Connection,
+        app_name: str,
+        cutoff: float,
+        now: float,
+        report: MaintenanceReport,
+    ) -> None:
+        table = self._archive_table()
+        while True:
+            idle = connection.execute(_SELECT_IDLE, (app_name, cutoff, self.batch_size)).fetchall()
+            if not idle:
+                break
+            # Read and compress outside any write transaction.
+            rows = []
+            for user_id, session_id, _ in idle:
+                key = (app_name, user_id, session_id)
+                session = connection.execute(_SELECT_SESSION, key).fetchone()
+                if session is None:
+                    continue
+                document = json.dumps({
+                    "state": session[0],
+                    "create_time": session[1],
+                    "update_time": session[2],
+                    "events": connection.execute(_SELECT_EVENTS, key).fetchall(),
+                    "deltas": [ops for (ops,) in connection.execute(_SELECT_DELTAS, key)],
+                }).encode()
+                data = zlib.compress(document, 6)
+                rows.append(key + (session[2], now, len(document), data))
+            # Archive first, then delete from the live tables: a crash in
+            # between leaves a session in both, never in neither.
+            with _transaction(connection, report):
+                connection.executemany(f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            with _transaction(connection, report):
+                for row in rows:
+                    key, update_time = row[:3], row[3]
+                    if connection.execute(_DELETE_IDLE_SESSION, key + (update_time,)).rowcount:
+                        connection.execute(_DELETE_EVENTS, key)
+                        connection.execute(_DELETE_DELTAS, key)
+                        report.archived += 1
+                        report.archived_raw_bytes += row[5]
+                        report.archived_bytes += len(row[6])
+                    else:
+                        # It received an event meanwhile; keep it live.
+                        connection.execute(
+                            f"DELETE FROM {table} WHERE app_name = ? AND user_id = ? AND id = ?", key
+                        )
+                        report.skipped += 1
+            if len(idle) < self.batch_size:
+                break
+            time.sleep(self.pause)
+
+    def _vacuum(self, connection: sqlite3.Connection, report: MaintenanceReport) -> None:
+        schemas = ["main", "archive"] if self.archive_to_file else ["main"]
+        for schema in schemas:
+            if connection.execute(f"PRAGMA {schema}.auto_vacuum").fetchone()[0] != 2:
+                continue  # Needs a one-off VACUUM to switch; see `DatabaseHealth.auto_vacuum`.
+            budget = self.vacuum_pages
+            while budget > 0:
+                free = connection.execute(f"PRAGMA {schema}.freelist_count").fetchone()[0]
+                if not free:
+                    break
+                chunk = min(free, budget, 256)
+                with _transaction(connection, report):
+                    connection.execute(f"PRAGMA {schema}.incremental_vacuum({chunk})").fetchall()
+                report.pages_freed += chunk
+                budget -= chunk
+                time.sleep(self.pause)
+
+    def _restore(self, key: Tuple[str, str, str]) -> bool:
+        table = self._archive_table()
+        for path in self.paths:
+            connection = self._connect(path)
+            row = connection.execute(
+                f"SELECT data FROM {table} WHERE app_name = ? AND user_id = ? AND id = ?", key
+            ).fetchone()
+            if row is None:
+                continue
+            document = json.loads(zlib.decompress(row[0]))
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                if connection.execute(_SELECT_SESSION, key).fetchone() is None:
+                    connection.execute(_INSERT_SESSION, key + (
+                        document["state"], document["create_time"], document["update_time"]
+                    ))
+                    connection.executemany(_INSERT_EVENT, [key + tuple(event) for event in document["events"]])
+                    connection.executemany(_INSERT_DELTA, [key + (ops,) for ops in document["deltas"]])
+                connection.execute(f"DELETE FROM {table} WHERE app_name = ? AND user_id = ? AND id = ?", key)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            return True
+        return False
+
+    def _health(self, path: str) -> DatabaseHealth:
+        connection = self._connect(path)
+        modes = {0: "none", 1: "full", 2: "incremental"}
+        health = DatabaseHealth(
+            path=path,
+            auto_vacuum=modes.get(connection.execute("PRAGMA auto_vacuum").fetchone()[0], "unknown"),
+            page_size=connection.execute("PRAGMA page_size").fetchone()[0],
+            pages=connection.execute("PRAGMA page_count").fetchone()[0],
+            free_pages=connection.execute("PRAGMA freelist_count").fetchone()[0],
+            live_sessions=connection.execute("SELECT COUNT(*) FROM adk_sessions").fetchone()[0],
+            archived_sessions=connection.execute(f"SELECT COUNT(*) FROM {self._archive_table()}").fetchone()[0],
+        )
+        kinds = dict(connection.execute("SELECT name, type FROM sqlite_master"))
+        try:
+            usage = connection.execute(
+                "SELECT name, COUNT(*), SUM(pgsize), SUM(pgsize - unused) FROM dbstat('main')"
+                " GROUP BY name ORDER BY SUM(pgsize) DESC"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            usage = []  # SQLite built without the dbstat table.
+        for name, pages, size, used in usage:
+            health.objects.append(ObjectHealth(
+                name=name,
+                kind=kinds.get(name, "internal"),
+                pages=pages,
+                fill_pct=100.0 * used / size if size else 0.0,
+            ))
+        return health
+
+
+class _transaction:
+    """A short write transaction whose lock hold time is recorded in `report`."""
+
+    def __init__(self, connection: sqlite3.Connection, report: MaintenanceReport) -> None:
+        self.connection = connection
+        self.report = report
+
+    def __enter__(self) -> None:
+        self.connection.execute("BEGIN IMMEDIATE")
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        held = (time.perf_counter() - self.started) * 1000
+        self.report.max_lock_ms = max(self.report.max_lock_ms, held)
+
+
+def _database_paths(service: BaseSessionService) -> List[str]:
+    inner = getattr(service, "inner", None)
+    if inner is not None:
+        return _database_paths(inner)
+    shards = getattr(service, "shards", None)
+    if shards is not None:
+        return [path for shard in shards.values() for path in _database_paths(shard)]
+    if isinstance(service, SqliteSessionService) and service.path != ":memory:":
+        return [service.path]
+    raise ValueError(f"No SQLite session database behind {type(service).__name__}.")
@@ -0,0 +1,575 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Session storage sharded across several SQLite files.
+
+SQLite allows one writer per database file, so every process writing
+`my_project_assistant.db` waits for the same lock. `ShardedSessionService`
+spreads users over several session services (one file each). A consistent
+hash of `(app_name, user_id)` picks the shard, so all of a user's sessions and
+their `user:` state live together. Writes to different shards proceed in
+parallel, each with its own writer thread and lock.
+
+* **Routing** uses a hash ring with `vnodes` points per shard. Adding a shard
+  moves only the users that now hash to it, about 1/N of them.
+* **Resharding** is online. `reshard(shards, app_names)` switches routing to
+  the new shard set and moves users whose shard changed in the background,
+  one user at a time. Calls for a user wait only while that user moves.
+  Sessions not yet moved are served from their old shard. A session is
+  copied with its events and their state deltas, so its history still
+  explains its state and rewinding works. A session copied while a caller
+  holds it keeps working for `moved_grace` seconds after the reshard: the
+  caller's `last_update_time` is mapped to the copy's on its next append.
+* **`list_sessions`** without a user queries every shard concurrently and
+  combines the results.
+* **The shard set is recorded** in a manifest next to the database
+  (`my_project_assistant.shards.json`). `from_url` and
+  `create_session_service` refuse to start with a different shard count, or
+  with sessions still in the unsharded file, rather than routing users to
+  shards that do not hold their sessions. `migrate_sqlite_shards(path, count)`
+  moves the sessions offline (a count of 1 goes back to the single file), and
+  `reshard()` on a service built by `from_url` updates the manifest.
+
+`app:` state is kept per shard: an `app:` key written through one user's
+session is not visible to users on other shards.
+
+Sample:
+```python
+session_service = ShardedSessionService.from_url("sqlite:///my_project_assistant.db", shards=4)
+# my_project_assistant.shard0.db ... my_project_assistant.shard3.db
+...
+await session_service.reshard(
+    ShardedSessionService.sqlite_shards("my_project_assistant.db", 8), app_names=["app"]
+)
+```
+
+`create_session_service(db_url)` returns this service when `SESSION_SHARDS`
+is greater than 1. To change `SESSION_SHARDS` for an existing database:
+
+```python
+await migrate_sqlite_shards("my_project_assistant.db", 8)
+```
+"""
+
+import asyncio
+import bisect
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from google.adk.events.event import Event
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from google.adk.sessions.session import Session
+from google.adk.sessions.state import State
+
+from shared.sqlite_sessions import SqliteSessionService
+
+_UserKey = Tuple[str, str]
+_SessionKey = Tuple[str, str, str]
+
+# The shard name `migrate_sqlite_shards` gives the unsharded database file.
+_UNSHARDED = "unsharded"
+_SHARD_FILE = re.compile(r"\.shard(\d+)$")
+
+
+class ShardLayoutError(RuntimeError):
+    """Raised when the shard files on disk do not match the configured shard count."""
+
+
+class HashRing:
+    """Consistent hashing of `(app_name, user_id)` onto shard names."""
+
+    def __init__(self, names: Sequence[str], vnodes: int = 64) -> None:
+        if not names:
+            raise ValueError("A hash ring needs at least one shard.")
+        points = sorted((_hash(f"{name}#{index}"), name) for name in names for index in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._names = [name for _, name in points]
+
+    def route(self, app_name: str, user_id: str) -> str:
+        index = bisect.bisect(self._hashes, _hash(f"{app_name}\0{user_id}"))
+        return self._names[index % len(self._names)]
+
+
+@dataclass
+class ShardingStats:
+    """Counters for resharding."""
+
+    reshards: int = 0
+    users_moved: int = 0
+    sessions_moved: int = 0
+    events_moved: int = 0
+
+
+class _Migration:
+    """Routing state while a reshard moves users off their old shards."""
+
+    def __init__(self, ring: HashRing, shards: Dict[str, BaseSessionService]) -> None:
+        self.ring = ring
+        self.shards = shards
+        self.moved: Set[_UserKey] = set()
+        # Sessions created during the reshard go straight to their new shard.
+        self.created: Set[_SessionKey] = set()
+        self.moved_sessions: Set[_SessionKey] = set()
+        self.locks: Dict[_UserKey, asyncio.Lock] = {}
+
+
+class ShardedSessionService(BaseSessionService):
+    """A `BaseSessionService` that routes each user to one of several shards.
+
+    Args:
+        shards: Session services by shard name. Names place shards on the
+            hash ring, so keep them stable across restarts and reshards.
+        vnodes: Points per shard on the hash ring; more points spread users
+            more evenly.
+        moved_grace: Seconds after a reshard during which sessions loaded
+            before their move can still be appended to.
+        manifest: Where to record the shard names after each reshard; set by
+            `from_url`.
+    """
+
+    def __init__(
+        self,
+        shards: Dict[str, BaseSessionService],
+        vnodes: int = 64,
+        moved_grace: float = 300.0,
+        manifest: Optional[str] = None,
+    ) -> None:
+        self.shards = dict(shards)
+        self.manifest = manifest
+        self.vnodes = vnodes
+        self.moved_grace = moved_grace
+        self.stats = ShardingStats()
+        self._ring = HashRing(list(self.shards), vnodes)
+        self._migration: Optional[_Migration] = None
+        # (app, user, session) -> (update time on the old shard, on the copy).
+        self._moved_sessions: Dict[_SessionKey, Tuple[float, float]] = {}
+        # (deadline, keys) per finished reshard, oldest first.
+        self._moved_expiry: Deque[Tuple[float, Set[_SessionKey]]] = deque()
+        # Calls in flight that route without a per-user lock, by reshard epoch.
+        self._epoch = 0
+        self._unlocked: Counter = Counter()
+
+    @staticmethod
+    def sqlite_shards(path: str, count: int, **kwargs) -> Dict[str, BaseSessionService]:
+        """Opens `count` `SqliteSessionService` shards next to `path`.
+
+        `app.db` becomes `app.shard0.db`, `app.shard1.db` and so on; the
+        names are stable, so growing from 4 to 8 shards reuses the first four.
+        """
+        if path == ":memory:":
+            return {f"shard{index}": SqliteSessionService(path, **kwargs) for index in range(count)}
+        root, extension = os.path.splitext(path)
+        return {
+            f"shard{index}": SqliteSessionService(f"{root}.shard{index}{extension}", **kwargs)
+            for index in range(count)
+        }
+
+    @classmethod
+    def from_url(cls, db_url: str, shards: int = 4, **kwargs) -> "ShardedSessionService":
+        """Builds `shards` SQLite shards from a `sqlite:///path` URL.
+
+        Raises:
+            ShardLayoutError: The database is split into a different number of
+                shards, or its unsharded file still holds sessions.
+        """
+        path = sqlite_path(db_url)
+        if path == ":memory:":
+            return cls(cls.sqlite_shards(path, shards, **kwargs))
+        check_shard_layout(path, shards)
+        return cls(cls.sqlite_shards(path, shards, **kwargs), manifest=manifest_path(path))
+
+    def shard_for(self, app_name: str, user_id: str) -> str:
+        """Returns the name of the shard that owns the user once any reshard completes."""
+        return self._ring.route(app_name, user_id)
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, object]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        async with self._routing(app_name, user_id):
+            shard = self.shards[self._ring.route(app_name, user_id)]
+            session = await shard.create_session(
+                app_name=app_name, user_id=user_id, state=state, session_id=session_id
+            )
+            migration = self._migration
+            if migration is not None and (app_name, user_id) not in migration.moved:
+                migration.created.add((app_name, user_id, session.id))
+            return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        async with self._routing(app_name, user_id):
+            shard = self._route(app_name, user_id, session_id)
+            return await shard.get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id, config=config
+            )
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: Optional[str] = None
+    ) -> ListSessionsResponse:
+        if user_id is None:
+            shards = list({id(shard): shard for shard in self._all_shards()}.values())
+        else:
+            shards = [self.shards[self._ring.route(app_name, user_id)]]
+            migration = self._migration
+            if migration is not None and (app_name, user_id) not in migration.moved:
+                old = migration.shards[migration.ring.route(app_name, user_id)]
+                if old is not shards[0]:
+                    shards.append(old)
+        responses = await asyncio.gather(
+            *(shard.list_sessions(app_name=app_name, user_id=user_id) for shard in shards)
+        )
+        # A session being moved can briefly exist on both shards.
+        sessions = {}
+        for response in responses:
+            for session in response.sessions:
+                sessions.setdefault((session.user_id, session.id), session)
+        return ListSessionsResponse(sessions=list(sessions.values()))
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        async with self._routing(app_name, user_id):
+            shard = self._route(app_name, user_id, session_id)
+            await shard.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+            self._moved_sessions.pop((app_name, user_id, session_id), None)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        self._expire_moved()
+        async with self._routing(session.app_name, session.user_id):
+            key = (session.app_name, session.user_id, session.id)
+            moved = self._moved_sessions.get(key)
+            if moved is not None and session.last_update_time == moved[0]:
+                # The caller loaded the session before it moved; the copy is
+                # identical, so continue from the copy's update time.
+                session.last_update_time = moved[1]
+            return await self._route(*key).append_event(session, event)
+
+    async def older_events(self, session: Session, page_size: int = 200) -> AsyncIterator[Event]:
+        """Delegates to the owning shard's `older_events` (see `SqliteSessionService`)."""
+        shard = self._route(session.app_name, session.user_id, session.id)
+        async for event in shard.older_events(session, page_size=page_size):
+            yield event
+
+    async def reshard(self, shards: Dict[str, BaseSessionService], app_names: Sequence[str]) -> None:
+        """Routes to `shards` from now on and moves users whose shard changed.
+
+        Shards may be reused from the current set under the same names. Shards
+        left out are drained and can be closed once this returns.
+
+        Args:
+            shards: The new shard set, by name.
+            app_names: The apps whose sessions to move.
+        """
+        if self._migration is not None:
+            raise RuntimeError("A reshard is already in progress.")
+        migration = _Migration(self._ring, self.shards)
+        self._migration = migration
+        self.shards = dict(shards)
+        self._ring = HashRing(list(self.shards), self.vnodes)
+        self._epoch += 1
+        # Wait for calls routed before the switch.
+        while any(count for epoch, count in self._unlocked.items() if epoch < self._epoch):
+            await asyncio.sleep(0.001)
+
+        for source in list({id(shard): shard for shard in migration.shards.values()}.values()):
+            for app_name in app_names:
+                listed = await source.list_sessions(app_name=app_name)
+                for user_id in sorted({session.user_id for session in listed.sessions}):
+                    target = self.shards[self._ring.route(app_name, user_id)]
+                    if not _same_store(target, source):
+                        await self._move_user(migration, app_name, user_id, source, target)
+        self._migration = None
+        if self.manifest is not None:
+            _write_manifest(self.manifest, list(self.shards))
+        self._moved_expiry.append((time.monotonic() + self.moved_grace, migration.moved_sessions))
+        self.stats.reshards += 1
+
+    def close(self) -> None:
+        """Closes every shard that supports it."""
+        for shard in {id(shard): shard for shard in self._all_shards()}.values():
+            close = getattr(shard, "close", None)
+            if close is not None:
+                close()
+
+    async def _move_user(
+        self,
+        migration: _Migration,
+        app_name: str,
+        user_id: str,
+        source: BaseSessionService,
+        target: BaseSessionService,
+    ) -> None:
+        lock = migration.locks.setdefault((app_name, user_id), asyncio.Lock())
+        async with lock:
+            listed = await source.list_sessions(app_name=app_name, user_id=user_id)
+            sessions = []
+            for stub in listed.sessions:
+                # An empty config loads every event, tail-only loading or not.
+                session = await source.get_session(
+                    app_name=app_name, user_id=user_id, session_id=stub.id, config=GetSessionConfig()
+                )
+                if session is not None:
+                    sessions.append(session)
+            # Keys some event wrote start out unset on the copies and are
+            # rebuilt by replaying the events with their deltas. `user:` keys
+            # are shared by the user's sessions, so a key any of them wrote is
+            # left to the replay.
+            written = [_written_keys(session.events) for session in sessions]
+            user_written = {key for keys in written for key in keys if key.startswith(State.USER_PREFIX)}
+            copies = []
+            for session, keys in zip(sessions, written):
+                state = {
+                    key: value for key, value in session.state.items()
+                    if not key.startswith(State.APP_PREFIX) and key not in keys and key not in user_written
+                }
+                copies.append(await target.create_session(
+                    app_name=app_name, user_id=user_id, state=state, session_id=session.id
+                ))
+            # Replayed in time order across sessions, so `user:` keys end at
+            # their latest value.
+            replay = sorted(
+                ((event.timestamp, index, position, event)
+                 for index, session in enumerate(sessions)
+                 for position, event in enumerate(session.events)),
+                key=lambda item: item[:3],
+            )
+            for _, index, _, event in replay:
+                await target.append_event(copies[index], _without_app_state(event))
+            for session, copy in zip(sessions, copies):
+                self._moved_sessions[(app_name, user_id, session.id)] = (
+                    session.last_update_time,
+                    copy.last_update_time,
+                )
+                migration.moved_sessions.add((app_name, user_id, session.id))
+                await source.delete_session(app_name=app_name, user_id=user_id, session_id=session.id)
+                self.stats.sessions_moved += 1
+                self.stats.events_moved += len(session.events)
+            migration.moved.add((app_name, user_id))
+        migration.locks.pop((app_name, user_id), None)
+        self.stats.users_moved += 1
+
+    def _expire_moved(self) -> None:
+        """Forgets the sessions moved by reshards whose grace period has passed."""
+        now = time.monotonic()
+        while self._moved_expiry and self._moved_expiry[0][0] <= now:
+            for key in self._moved_expiry.popleft()[1]:
+                # A later reshard may have moved the session again.
+                if not any(key in keys for _, keys in self._moved_expiry):
+                    self._moved_sessions.pop(key, None)
+
+    def _route(self, app_name: str, user_id: str, session_id: str) -> BaseSessionService:
+        shard = self.shards[self._ring.route(app_name, user_id)]
+        migration = self._migration
+        if (
+            migration is None
+            or (app_name, user_id) in migration.moved
+            or (app_name, user_id, session_id) in migration.created
+        ):
+            return shard
+        return migration.shards[migration.ring.route(app_name, user_id)]
+
+    @contextlib.asynccontextmanager
+    async def _routing(self, app_name: str, user_id: str) -> AsyncIterator[None]:
+        """Holds the user's lock during a reshard, so a call never races its move."""
+        migration = self._migration
+        if migration is not None and (app_name, user_id) not in migration.moved:
+            lock = migration.locks.setdefault((app_name, user_id), asyncio.Lock())
+            async with lock:
+                yield
+            return
+        epoch = self._epoch
+        self._unlocked[epoch] += 1
+        try:
+            yield
+        finally:
+            self._unlocked[epoch] -= 1
+            if not self._unlocked[epoch]:
+                del self._unlocked[epoch]
+
+    def _all_shards(self):
+        yield from self.shards.values()
+        if self._migration is not None:
+            yield from self._migration.shards.values()
+
+
+def sqlite_path(db_url: str) -> str:
+    """Returns the file of a `sqlite:///path` URL, or ":memory:"."""
+    if not db_url.startswith("sqlite://"):
+        raise ValueError(f"Not a SQLite URL: {db_url!r}")
+    path = db_url[len("sqlite://"):]
+    path = path[1:] if path.startswith("/") else path
+    return path or ":memory:"
+
+
+def manifest_path(path: str) -> str:
+    """`app.db` records its shard names in `app.shards.json`."""
+    return os.path.splitext(path)[0] + ".shards.json"
+
+
+def check_shard_layout(path: str, shards: int) -> None:
+    """Checks that the database at `path` is split into `shards` files, recording it if new.
+
+    A count of 1 means the unsharded file. Raises `ShardLayoutError` when the
+    files on disk were written with a different count.
+    """
+    wanted = [_UNSHARDED] if shards <= 1 else [f"shard{index}" for index in range(shards)]
+    recorded = _recorded_shards(path)
+    stray = shards > 1 and bool(_session_apps(path))
+    if recorded == wanted and not stray:
+        return
+    hint = f"run `await migrate_sqlite_shards({path!r}, {shards})` first"
+    if stray:
+        raise ShardLayoutError(f"{path} still holds unsharded sessions; {hint}.")
+    if recorded != [_UNSHARDED]:
+        raise ShardLayoutError(f"{path} is split into {len(recorded)} shard files, not {shards}; {hint}.")
+    if shards > 1:
+        # A new database, or an unsharded one without sessions.
+        _write_manifest(manifest_path(path), wanted)
+
+
+async def migrate_sqlite_shards(path: str, shards: int, **kwargs) -> ShardingStats:
+    """Moves every session stored under `path` into `shards` files and records the layout.
+
+    Sessions are read from the recorded shard files, any stray shard files,
+    and the unsharded file; a count of 1 moves them all back into the
+    unsharded file. Shard files left without sessions are deleted. Run it while no
+    process is serving the database.
+
+    Args:
+        path: The unsharded database file, e.g. "my_project_assistant.db".
+        shards: The shard count to migrate to.
+        **kwargs: Options for every `SqliteSessionService` opened.
+    """
+    current: Dict[str, BaseSessionService] = {}
+    for name in sorted(set(_recorded_shards(path)) | set(_shard_files(path))):
+        file = _shard_file(path, name)
+        if os.path.exists(file):
+            current[name] = SqliteSessionService(file, **kwargs)
+    wanted = [_UNSHARDED] if shards <= 1 else [f"shard{index}" for index in range(shards)]
+    target = {
+        name: current.get(name) or SqliteSessionService(_shard_file(path, name), **kwargs)
+        for name in wanted
+    }
+    app_names = sorted({app for name in current for app in _session_apps(_shard_file(path, name))})
+    service = ShardedSessionService(current or target)
+    try:
+        await service.reshard(target, app_names)
+    finally:
+        for shard in {id(shard): shard for shard in [*current.values(), *target.values()]}.values():
+            shard.close()
+    for name in set(current) - set(target) - {_UNSHARDED}:
+        # Drained by the reshard; left behind, they would read as a shard layout.
+        for suffix in ("", "-wal", "-shm"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(_shard_file(path, name) + suffix)
+    if shards <= 1:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(manifest_path(path))
+    else:
+        _write_manifest(manifest_path(path), wanted)
+    return service.stats
+
+
+def _shard_file(path: str, name: str) -> str:
+    if name == _UNSHARDED:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{name}{extension}"
+
+
+def _shard_files(path: str) -> List[str]:
+    """Names of the shard files next to `path`, whether recorded or not."""
+    root, extension = os.path.splitext(path)
+    names = []
+    for file in glob.glob(f"{glob.escape(root)}.shard*{glob.escape(extension)}"):
+        match = _SHARD_FILE.search(file[:len(file) - len(extension)] if extension else file)
+        if match:
+            names.append(f"shard{match.group(1)}")
+    return sorted(names, key=lambda name: int(name[len("shard"):]))
+
+
+def _recorded_shards(path: str) -> List[str]:
+    """The shard names in the manifest; shard files found, or the unsharded file, without one."""
+    try:
+        with open(manifest_path(path)) as manifest:
+            return json.load(manifest)["shards"]
+    except FileNotFoundError:
+        return _shard_files(path) or [_UNSHARDED]
+
+
+def _write_manifest(path: str, names: List[str]) -> None:
+    partial = f"{path}.tmp"
+    with open(partial, "w") as manifest:
+        json.dump({"shards": names}, manifest)
+    os.replace(partial, path)
+
+
+def _session_apps(path: str) -> List[str]:
+    """The apps with sessions in the SQLite file at `path`, without creating it."""
+    if path == ":memory:" or not os.path.exists(path):
+        return []
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return [app for (app,) in connection.execute("SELECT DISTINCT app_name FROM adk_sessions")]
+    except sqlite3.OperationalError:  # Not a session database yet.
+        return []
+    finally:
+        connection.close()
+
+
+def _same_store(a: BaseSessionService, b: BaseSessionService) -> bool:
+    """Whether two shard services share storage, e.g. two services on one file."""
+    if a is b:
+        return True
+    path = getattr(a, "path", None)
+    return path is not None and path != ":memory:" and path == getattr(b, "path", None)
+
+
+def _written_keys(events: Sequence[Event]) -> Set[str]:
+    return {key for event in events if event.actions for key in event.actions.state_delta or {}}
+
+
+def _without_app_state(event: Event) -> Event:
+    """Drops `app:` keys, which would overwrite the target shard's own app state."""
+    delta = event.actions.state_delta if event.actions else None
+    if not delta or not any(key.startswith(State.APP_PREFIX) for key in delta):
+        return event
+    delta = {key: value for key, value in delta.items() if not key.startswith(State.APP_PREFIX)}
+    return event.model_copy(update={"actions": event.actions.model_copy(update={"state_delta": delta})})
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
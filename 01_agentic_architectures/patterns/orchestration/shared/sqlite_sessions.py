@@ -0,0 +1,769 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A high-throughput SQLite session service.
+
+`DatabaseSessionService` on a `sqlite:///` URL runs every append as its own
+SQLAlchemy transaction in SQLite's default rollback-journal mode. Each event
+costs several queries and an fsync, readers block writers, and concurrent
+processes see `database is locked`. `SqliteSessionService` implements the
+same `BaseSessionService` contract, tuned for SQLite:
+
+* **WAL mode**, so readers never block the writer or each other, with
+  `synchronous=NORMAL` (durable across process crashes; the last commits can
+  be lost on power failure) and a busy timeout instead of immediate
+  `database is locked` errors.
+* **A connection per thread.** Reads run in the default executor, each worker
+  thread with its own connection. All writes go through one writer thread.
+* **Prepared statements.** SQL text is constant, so `sqlite3`'s per-connection
+  statement cache compiles each statement once.
+* **Group commit.** Writes from concurrent invocations queue up while the
+  writer commits, and the writer applies everything queued in one
+  transaction, so many appends share one fsync. Each write runs in its own
+  savepoint, so a rejected write (for example a stale session) does not
+  affect the others in its batch.
+
+Events are stored as the JSON of the `Event` model in tables prefixed with
+`adk_`, so the service can share a database file with the stock service
+without touching its tables.
+
+Sessions load **tail-only** by default. Once context compaction (ADR-009) has
+run, the prompt is built from the compaction summaries and the events after
+the latest one, so `get_session` loads every compaction event and the events
+from the start of the latest one's range onwards (the overlap window the next
+compaction needs). Resume cost then depends on the compaction interval and
+the number of summaries, not on the session's length. Older events stay in
+the database and are paged in on demand with `older_events(session)`.
+Sessions that never compacted load in full. With `SummaryTreeCompactionPlugin`,
+whose latest compaction event carries the whole summary frontier,
+`tail_summaries=1` also skips the superseded summaries.
+
+Session state is **delta-encoded**. An ADK state delta carries whole values,
+so adding one item to a 500-item cart would rewrite the whole cart in the
+session row. Instead, each change is diffed against the stored value (see
+`shared/state_patch.py`) and only the operations are written. The full state
+is rewritten as a snapshot every `snapshot_every` changes, and loads replay
+the operations since the last snapshot. Stored events keep their
+`state_delta` exactly as ADK produced it, since `Runner.rewind_async` and
+other readers replay those values.
+
+Sample:
+```python
+session_service = SqliteSessionService.from_url("sqlite:///my_agent_data.db")
+runner = Runner(agent=root_agent, app_name="app", session_service=session_service)
+```
+
+`create_session_service(db_url)` returns this service for SQLite URLs and the
+stock `DatabaseSessionService` otherwise, or when `SESSION_BACKEND=database`.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from urllib.request import pathname2url
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events.event import Event
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from google.adk.sessions.session import Session
+from google.adk.sessions.state import State
+
+from shared.state_patch import apply, diff_state
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS adk_sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS adk_events (
+    seq INTEGER PRIMARY KEY,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    invocation_id TEXT,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL,
+    compaction_start REAL
+);
+CREATE TABLE IF NOT EXISTS adk_state_deltas (
+    seq INTEGER PRIMARY KEY,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    ops TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS adk_app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS adk_user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+) WITHOUT ROWID;
+"""
+
+# Created after `_migrate()`, since databases from before tail-only loading
+# lack `compaction_start`.
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS adk_events_by_session
+    ON adk_events (app_name, user_id, session_id, seq);
+CREATE INDEX IF NOT EXISTS adk_events_by_time
+    ON adk_events (app_name, user_id, session_id, timestamp);
+CREATE INDEX IF NOT EXISTS adk_events_compactions
+    ON adk_events (app_name, user_id, session_id, seq) WHERE compaction_start IS NOT NULL;
+CREATE INDEX IF NOT EXISTS adk_sessions_by_update
+    ON adk_sessions (app_name, update_time);
+CREATE INDEX IF NOT EXISTS adk_state_deltas_by_session
+    ON adk_state_deltas (app_name, user_id, session_id, seq);
+"""
+
+_SELECT_SESSION = (
+    "SELECT state, update_time FROM adk_sessions WHERE app_name = ? AND user_id = ? AND id = ?"
+)
+_SELECT_SESSIONS = "SELECT user_id, id, state, update_time FROM adk_sessions WHERE app_name = ?"
+_SELECT_USER_SESSIONS = _SELECT_SESSIONS + " AND user_id = ?"
+_INSERT_SESSION = (
+    "INSERT INTO adk_sessions (app_name, user_id, id, state, create_time, update_time)"
+    " VALUES (?, ?, ?, ?, ?, ?)"
+)
+_UPDATE_SESSION = (
+    "UPDATE adk_sessions SET state = ?, update_time = ?"
+    " WHERE app_name = ? AND user_id = ? AND id = ?"
+)
+_TOUCH_SESSION = "UPDATE adk_sessions SET update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?"
+_DELETE_SESSION = "DELETE FROM adk_sessions WHERE app_name = ? AND user_id = ? AND id = ?"
+_SELECT_EVENTS = (
+    "SELECT data FROM adk_events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+    " AND timestamp >= ? ORDER BY seq DESC LIMIT ?"
+)
+_SELECT_COMPACTION_START = (
+    "SELECT MIN(compaction_start) FROM (SELECT compaction_start FROM adk_events"
+    " WHERE app_name = ? AND user_id = ? AND session_id = ? AND compaction_start IS NOT NULL"
+    " ORDER BY seq DESC LIMIT ?)"
+)
+# The events from `timestamp` onwards, and every compaction event before them.
+# `+timestamp` keeps the second half on the partial compactions index.
+_SELECT_TAIL_EVENTS = (
+    "SELECT data, seq FROM adk_events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+    " AND timestamp >= ?"
+    " UNION ALL SELECT data, seq FROM adk_events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+    " AND compaction_start IS NOT NULL AND +timestamp < ?"
+    " ORDER BY seq DESC"
+)
+_SELECT_OLDER_EVENTS = (
+    "SELECT data, timestamp, seq, id FROM adk_events"
+    " WHERE app_name = ? AND user_id = ? AND session_id = ?"
+    " AND (timestamp < ? OR (timestamp = ? AND seq < ?))"
+    " ORDER BY timestamp DESC, seq DESC LIMIT ?"
+)
+_INSERT_EVENT = (
+    "INSERT INTO adk_events"
+    " (app_name, user_id, session_id, id, invocation_id, timestamp, data, compaction_start)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_DELETE_EVENTS = "DELETE FROM adk_events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+_SELECT_STATE_DELTAS = (
+    "SELECT ops FROM adk_state_deltas WHERE app_name = ? AND user_id = ? AND session_id = ?"
+    " ORDER BY seq"
+)
+_SELECT_APP_STATE_DELTAS = (
+    "SELECT user_id, session_id, ops FROM adk_state_deltas WHERE app_name = ? ORDER BY seq"
+)
+_SELECT_USER_STATE_DELTAS = (
+    "SELECT user_id, session_id, ops FROM adk_state_deltas WHERE app_name = ? AND user_id = ?"
+    " ORDER BY seq"
+)
+_INSERT_STATE_DELTA = (
+    "INSERT INTO adk_state_deltas (app_name, user_id, session_id, ops) VALUES (?, ?, ?, ?)"
+)
+_DELETE_STATE_DELTAS = (
+    "DELETE FROM adk_state_deltas WHERE app_name = ? AND user_id = ? AND session_id = ?"
+)
+_SELECT_APP_STATE = "SELECT state FROM adk_app_states WHERE app_name = ?"
+_UPSERT_APP_STATE = (
+    "INSERT INTO adk_app_states (app_name, state) VALUES (?, ?)"
+    " ON CONFLICT (app_name) DO UPDATE SET state = excluded.state"
+)
+_SELECT_USER_STATE = "SELECT state FROM adk_user_states WHERE app_name = ? AND user_id = ?"
+_SELECT_USER_STATES = "SELECT user_id, state FROM adk_user_states WHERE app_name = ?"
+_UPSERT_USER_STATE = (
+    "INSERT INTO adk_user_states (app_name, user_id, state) VALUES (?, ?, ?)"
+    " ON CONFLICT (app_name, user_id) DO UPDATE SET state = excluded.state"
+)
+
+_STOP = object()
+
+# Sessions whose current state the writer keeps decoded.
+_STATE_CACHE_SIZE = 1024
+
+
+@dataclass
+class SqliteSessionStats:
+    """Write-path counters; `mean_batch` is writes per commit (per fsync).
+
+    `bytes_written` counts the event and session state text written by appends.
+    """
+
+    writes: int = 0
+    commits: int = 0
+    rejected: int = 0
+    largest_batch: int = 0
+    bytes_written: int = 0
+    state_deltas: int = 0
+    state_snapshots: int = 0
+
+    @property
+    def mean_batch(self) -> float:
+        return self.writes / self.commits if self.commits else 0.0
+
+
+class SqliteSessionService(BaseSessionService):
+    """A `BaseSessionService` on a local SQLite file, tuned for concurrency.
+
+    Args:
+        path: The database file, or ":memory:" for a private in-memory database.
+        synchronous: SQLite's `synchronous` pragma; "FULL" also survives power loss.
+        busy_timeout_ms: How long to wait on a lock held by another process.
+        max_batch: Most writes committed together.
+        commit_delay: Seconds the writer waits for more writes before
+            committing a batch; 0 batches only what queued during the
+            previous commit.
+        tail_only: Load every compaction event, and the other events from the
+            latest compaction's range onwards. A `GetSessionConfig` passed to
+            `get_session` always takes precedence.
+        tail_summaries: None keeps every compaction summary. A number loads
+            only that many of the latest summaries and the events from the
+            oldest one's range onwards; only for compaction whose latest
+            event carries the whole history, such as `SummaryTreeCompactionPlugin`.
+        snapshot_every: State changes between full state snapshots; 1 turns
+            delta encoding off and rewrites the state on every change.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        synchronous: str = "NORMAL",
+        busy_timeout_ms: int = 5000,
+        max_batch: int = 256,
+        commit_delay: float = 0.0,
+        tail_only: bool = True,
+        tail_summaries: Optional[int] = None,
+        snapshot_every: int = 64,
+    ) -> None:
+        if path == ":memory:":
+            self._database = f"file:adk-sessions-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        else:
+            self._database = "file:" + pathname2url(os.path.abspath(path))
+        self.path = path
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self.max_batch = max_batch
+        self.commit_delay = commit_delay
+        self.tail_only = tail_only
+        self.tail_summaries = tail_summaries
+        self.snapshot_every = snapshot_every
+        self.stats = SqliteSessionStats()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writes: "queue.Queue[Any]" = queue.Queue()
+        # Writer thread only: session key -> [update_time, state, deltas since
+        # snapshot], so appends diff against the stored state without reading it.
+        self._states: "OrderedDict[tuple, list]" = OrderedDict()
+
+        # The writer's connection also keeps a shared in-memory database alive.
+        self._writer_connection = self._connect()
+        self._writer_connection.executescript(_SCHEMA)
+        _migrate(self._writer_connection)
+        self._writer_connection.executescript(_INDEXES)
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-session-writer", daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def from_url(cls, db_url: str, **kwargs: Any) -> "SqliteSessionService":
+        """Builds the service from a SQLAlchemy-style `sqlite:///path` URL."""
+        if not db_url.startswith("sqlite://"):
+            raise ValueError(f"Not a SQLite URL: {db_url!r}")
+        path = db_url[len("sqlite://"):]
+        path = path[1:] if path.startswith("/") else path
+        return cls(path or ":memory:", **kwargs)
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = session_id or str(uuid.uuid4())
+        app_delta, user_delta, session_state = _split_state(state or {})
+
+        def create(connection: sqlite3.Connection) -> Tuple[Dict[str, Any], float]:
+            key = (app_name, user_id, session_id)
+            if connection.execute(_SELECT_SESSION, key).fetchone() is not None:
+                raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+            app_state = _merge_into(connection, _SELECT_APP_STATE, _UPSERT_APP_STATE, (app_name,), app_delta)
+            user_state = _merge_into(
+                connection, _SELECT_USER_STATE, _UPSERT_USER_STATE, (app_name, user_id), user_delta
+            )
+            now = time.time()
+            connection.execute(_INSERT_SESSION, key + (json.dumps(session_state), now, now))
+            return _merge_state(app_state, user_state, session_state), now
+
+        merged, update_time = await self._write(create)
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=merged,
+            last_update_time=update_time,
+        )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        return await asyncio.to_thread(self._read_session, app_name, user_id, session_id, config)
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: Optional[str] = None
+    ) -> ListSessionsResponse:
+        return await asyncio.to_thread(self._read_sessions, app_name, user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        def delete(connection: sqlite3.Connection) -> None:
+            key = (app_name, user_id, session_id)
+            connection.execute(_DELETE_EVENTS, key)
+            connection.execute(_DELETE_STATE_DELTAS, key)
+            connection.execute(_DELETE_SESSION, key)
+            self._states.pop(key, None)
+
+        await self._write(delete)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = self._trim_temp_delta_state(event)
+        key = (session.app_name, session.user_id, session.id)
+        compaction = event.actions.compaction if event.actions else None
+        # Serialize on the caller's thread so the writer's critical section
+        # stays short. The writer diffs a JSON-shaped copy of the state delta,
+        # which also pins values the caller may keep mutating in place.
+        data = event.model_dump_json(exclude_none=True)
+        delta = None
+        if event.actions and event.actions.state_delta:
+            delta = json.loads(data)["actions"]["state_delta"]
+        row = key + (event.id, event.invocation_id, event.timestamp)
+        compaction_start = compaction.start_timestamp if compaction else None
+        last_update_time = session.last_update_time
+
+        def append(connection: sqlite3.Connection) -> float:
+            stored = connection.execute(_SELECT_SESSION, key).fetchone()
+            if stored is None:
+                raise ValueError(f"Session {session.id} not found.")
+            state, update_time = stored
+            if update_time > last_update_time:
+                raise ValueError(
+                    f"Session {session.id} was updated at {update_time}, after the"
+                    f" copy being appended to ({last_update_time}). Reload it with"
+                    " get_session()."
+                )
+            now = max(time.time(), update_time)
+            cached = None
+            if delta is None:
+                connection.execute(_TOUCH_SESSION, (now,) + key)
+            else:
+                app_delta, user_delta, session_delta = _split_state(delta)
+                _merge_into(connection, _SELECT_APP_STATE, _UPSERT_APP_STATE, key[:1], app_delta)
+                _merge_into(connection, _SELECT_USER_STATE, _UPSERT_USER_STATE, key[:2], user_delta)
+                cached = self._write_state(connection, key, state, update_time, session_delta, now)
+            connection.execute(_INSERT_EVENT, row + (data, compaction_start))
+            self.stats.bytes_written += len(data)
+            if cached is not None:
+                self._states[key] = cached
+                if len(self._states) > _STATE_CACHE_SIZE:
+                    self._states.popitem(last=False)
+            return now
+
+        session.last_update_time = await self._write(append)
+        await super().append_event(session=session, event=event)
+        return event
+
+    def _write_state(
+        self,
+        connection: sqlite3.Connection,
+        key: tuple,
+        snapshot: str,
+        update_time: float,
+        delta: Dict[str, Any],
+        now: float,
+    ) -> Optional[list]:
+        """Writes a session state delta; runs on the writer thread.
+
+        Returns the writer's new cache entry for the session, if any.
+        """
+        if not delta:
+            connection.execute(_TOUCH_SESSION, (now,) + key)
+            return None
+        if self.snapshot_every <= 1:
+            text = json.dumps({**json.loads(snapshot), **delta})
+            connection.execute(_UPDATE_SESSION, (text, now) + key)
+            self.stats.bytes_written += len(text)
+            self.stats.state_snapshots += 1
+            return None
+
+        cached = self._states.pop(key, None)
+        if cached is None or cached[0] != update_time:
+            # First write since start-up, or another process wrote the session.
+            state = json.loads(snapshot)
+            rows = connection.execute(_SELECT_STATE_DELTAS, key).fetchall()
+            for (ops,) in rows:
+                state = apply(state, json.loads(ops))
+            cached = [update_time, state, len(rows)]
+        _, state, pending = cached
+        ops = diff_state(state, delta)
+        state = apply(state, ops)
+        if pending + 1 >= self.snapshot_every:
+            text = json.dumps(state)
+            connection.execute(_UPDATE_SESSION, (text, now) + key)
+            connection.execute(_DELETE_STATE_DELTAS, key)
+            pending = 0
+            self.stats.state_snapshots += 1
+        else:
+            text = json.dumps(ops)
+            connection.execute(_INSERT_STATE_DELTA, key + (text,))
+            connection.execute(_TOUCH_SESSION, (now,) + key)
+            pending += 1
+            self.stats.state_deltas += 1
+        self.stats.bytes_written += len(text)
+        return [now, state, pending]
+
+    async def older_events(
+        self, session: Session, page_size: int = 200
+    ) -> AsyncIterator[Event]:
+        """Yields the stored events before the loaded tail of `session`, newest first.
+
+        Compaction events already in `session.events` are skipped. Pages of
+        `page_size` events are read as the iteration reaches them, so a
+        caller that stops early (for example after finding the last mention
+        of a topic) reads only what it used.
+        """
+        if not session.events:
+            return
+        key = (session.app_name, session.user_id, session.id)
+        # Tail loads include compaction events from before the tail; the tail
+        # itself starts at the oldest other event.
+        tail = [event for event in session.events if not event.actions.compaction] or session.events
+        loaded = {event.id for event in session.events if event.actions.compaction}
+        # (timestamp, seq) of the last event read; seq -1 excludes every
+        # event at the tail's oldest timestamp, since those are all loaded.
+        cursor = (min(event.timestamp for event in tail), -1)
+        while True:
+            rows = await asyncio.to_thread(self._read_older, key, cursor, page_size)
+            for data, _, _, event_id in rows:
+                if event_id not in loaded:
+                    yield Event.model_validate_json(data)
+            if len(rows) < page_size:
+                return
+            cursor = rows[-1][1:3]
+
+    def close(self) -> None:
+        """Commits queued writes, stops the writer and closes every connection."""
+        if self._writer.is_alive():
+            self._writes.put(_STOP)
+            self._writer.join()
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+    async def _write(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._writes.put((operation, future))
+        return await asyncio.wrap_future(future)
+
+    def _write_loop(self) -> None:
+        connection = self._writer_connection
+        while True:
+            batch = [self._writes.get()]
+            if self.commit_delay and batch[0] is not _STOP:
+                time.sleep(self.commit_delay)
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            work = [item for item in batch if item is not _STOP]
+            if work:
+                self._commit(connection, work)
+            if stop:
+                return
+
+    def _commit(self, connection: sqlite3.Connection, work: List[Tuple[Callable, Any]]) -> None:
+        # Futures still pending become uncancellable; a caller that already
+        # stopped waiting gets no result, but its write is still applied.
+        waiting = {id(future) for _, future in work if future.set_running_or_notify_cancel()}
+        results = []
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for operation, future in work:
+                connection.execute("SAVEPOINT write")
+                try:
+                    results.append((future, operation(connection), None))
+                    connection.execute("RELEASE write")
+                except Exception as e:
+                    connection.execute("ROLLBACK TO write")
+                    connection.execute("RELEASE write")
+                    results.append((future, None, e))
+            connection.execute("COMMIT")
+        except Exception as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            for _, future in work:
+                if id(future) in waiting:
+                    future.set_exception(e)
+            return
+        self.stats.commits += 1
+        self.stats.writes += len(work)
+        self.stats.largest_batch = max(self.stats.largest_batch, len(work))
+        for future, result, error in results:
+            if error is not None:
+                self.stats.rejected += 1
+            if id(future) not in waiting:
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self._database,
+            uri=True,
+            isolation_level=None,  # Transactions are explicit.
+            check_same_thread=False,
+            cached_statements=256,
+            timeout=self.busy_timeout_ms / 1000,
+        )
+        # Lets `SessionMaintenance` return freed pages. Only takes effect on
+        # a new database, before switching to WAL creates its header.
+        connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={self.synchronous}")
+        connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _read_session(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig],
+    ) -> Optional[Session]:
+        connection = self._reader()
+        # One read transaction, so state and events come from the same snapshot.
+        connection.execute("BEGIN")
+        try:
+            stored = connection.execute(_SELECT_SESSION, (app_name, user_id, session_id)).fetchone()
+            if stored is None:
+                return None
+            state, update_time = stored
+            state = json.loads(state)
+            for (ops,) in connection.execute(_SELECT_STATE_DELTAS, (app_name, user_id, session_id)):
+                state = apply(state, json.loads(ops))
+            app_state = _load_state(connection, _SELECT_APP_STATE, (app_name,))
+            user_state = _load_state(connection, _SELECT_USER_STATE, (app_name, user_id))
+            key = (app_name, user_id, session_id)
+            if self.tail_only and config is None:
+                start = connection.execute(
+                    _SELECT_COMPACTION_START, key + (self.tail_summaries or 1,)
+                ).fetchone()[0] or 0.0
+                if self.tail_summaries is None:
+                    rows = connection.execute(_SELECT_TAIL_EVENTS, key + (start,) + key + (start,)).fetchall()
+                else:
+                    rows = connection.execute(_SELECT_EVENTS, key + (start, -1)).fetchall()
+            else:
+                after = config.after_timestamp if config and config.after_timestamp else 0.0
+                limit = config.num_recent_events if config and config.num_recent_events else -1
+                rows = connection.execute(_SELECT_EVENTS, key + (after, limit)).fetchall()
+        finally:
+            connection.execute("COMMIT")
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=_merge_state(app_state, user_state, state),
+            events=[Event.model_validate_json(row[0]) for row in reversed(rows)],
+            last_update_time=update_time,
+        )
+
+    def _read_older(
+        self, key: tuple, cursor: Tuple[float, int], page_size: int
+    ) -> List[Tuple[str, float, int, str]]:
+        timestamp, seq = cursor
+        return self._reader().execute(
+            _SELECT_OLDER_EVENTS, key + (timestamp, timestamp, seq, page_size)
+        ).fetchall()
+
+    def _read_sessions(self, app_name: str, user_id: Optional[str]) -> ListSessionsResponse:
+        connection = self._reader()
+        connection.execute("BEGIN")
+        try:
+            app_state = _load_state(connection, _SELECT_APP_STATE, (app_name,))
+            if user_id is None:
+                rows = connection.execute(_SELECT_SESSIONS, (app_name,)).fetchall()
+                deltas = connection.execute(_SELECT_APP_STATE_DELTAS, (app_name,)).fetchall()
+                user_states = {
+                    user: json.loads(state)
+                    for user, state in connection.execute(_SELECT_USER_STATES, (app_name,))
+                }
+            else:
+                rows = connection.execute(_SELECT_USER_SESSIONS, (app_name, user_id)).fetchall()
+                deltas = connection.execute(_SELECT_USER_STATE_DELTAS, (app_name, user_id)).fetchall()
+                user_states = {
+                    user_id: _load_state(connection, _SELECT_USER_STATE, (app_name, user_id))
+                }
+        finally:
+            connection.execute("COMMIT")
+        states = {(user, session_id): json.loads(state) for user, session_id, state, _ in rows}
+        for user, session_id, ops in deltas:
+            if (user, session_id) in states:
+                states[user, session_id] = apply(states[user, session_id], json.loads(ops))
+        return ListSessionsResponse(sessions=[
+            Session(
+                app_name=app_name,
+                user_id=user,
+                id=session_id,
+                state=_merge_state(app_state, user_states.get(user, {}), states[user, session_id]),
+                last_update_time=update_time,
+            )
+            for user, session_id, _, update_time in rows
+        ])
+
+
+def create_session_service(db_url: str, **kwargs: Any) -> BaseSessionService:
+    """Returns the session service the patterns use for `db_url`.
+
+    SQLite URLs get `SqliteSessionService`, or a `ShardedSessionService` over
+    `SESSION_SHARDS` files when that is greater than 1. Other databases, or any
+    URL when `SESSION_BACKEND=database`, get the stock `DatabaseSessionService`.
+
+    Args:
+        db_url: The database URL.
+        **kwargs: `SqliteSessionService` options, e.g. `tail_summaries=1`;
+            ignored by `DatabaseSessionService`, which loads every event.
+
+    Raises:
+        ShardLayoutError: The SQLite file was sharded with a different
+            `SESSION_SHARDS`; see `migrate_sqlite_shards`.
+    """
+    if db_url.startswith("sqlite://") and os.environ.get("SESSION_BACKEND", "sqlite") != "database":
+        from shared.sharded_sessions import ShardedSessionService, check_shard_layout, sqlite_path
+
+        shards = int(os.environ.get("SESSION_SHARDS", "1"))
+        if shards > 1:
+            return ShardedSessionService.from_url(db_url, shards=shards, **kwargs)
+        if sqlite_path(db_url) != ":memory:":
+            check_shard_layout(sqlite_path(db_url), 1)
+        return SqliteSessionService.from_url(db_url, **kwargs)
+    from google.adk.sessions import DatabaseSessionService
+
+    return DatabaseSessionService(db_url=db_url)
+
+
+def _migrate(connection: sqlite3.Connection) -> None:
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(adk_events)")}
+    if "compaction_start" not in columns:
+        connection.execute("ALTER TABLE adk_events ADD COLUMN compaction_start REAL")
+        # Backfill from the stored events, so existing sessions load tail-only too.
+        connection.execute(
+            "UPDATE adk_events SET compaction_start ="
+            " json_extract(data, '$.actions.compaction.start_timestamp')"
+            " WHERE json_extract(data, '$.actions.compaction') IS NOT NULL"
+        )
+
+
+def _split_state(state: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    app, user, session = {}, {}, {}
+    for key, value in state.items():
+        if key.startswith(State.APP_PREFIX):
+            app[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+def _merge_state(
+    app_state: Dict[str, Any], user_state: Dict[str, Any], session_state: Dict[str, Any]
+) -> Dict[str, Any]:
+    merged = dict(session_state)
+    merged.update((State.APP_PREFIX + key, value) for key, value in app_state.items())
+    merged.update((State.USER_PREFIX + key, value) for key, value in user_state.items())
+    return merged
+
+
+def _load_state(connection: sqlite3.Connection, select: str, key: tuple) -> Dict[str, Any]:
+    row = connection.execute(select, key).fetchone()
+    return json.loads(row[0]) if row else {}
+
+
+def _merge_into(
+    connection: sqlite3.Connection,
+    select: str,
+    upsert: str,
+    key: tuple,
+    delta: Dict[str, Any],
+) -> Dict[str, Any]:
+    state = _load_state(connection, select, key)
+    if delta:
+        state.update(delta)
+        connection.execute(upsert, key + (json.dumps(state),))
+    return state
@@ -0,0 +1,142 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compact patches between JSON values, for storing state changes as deltas.
+
+ADK state deltas carry whole values: adding one item to a cart of 500 puts
+all 501 items in the event. `diff` turns such a change into a few operations
+relative to the previous value, and `apply` replays them. An operation is a
+JSON list `[op, path, *args]`, where `path` is a list of dict keys and list
+indices:
+
+* `["set", path, value]`: sets `path` to `value`.
+* `["append", path, values]`: extends the list at `path` with `values`.
+* `["remove", path]`: deletes a dict key, or a list element (later elements
+  shift down).
+
+Values must be JSON-shaped (as stored state is): dicts with string keys,
+lists, strings, numbers, booleans and None.
+
+Sample:
+```python
+ops = diff_state({"cart": [apples]}, {"cart": [apples, pears]})
+# [["append", ["cart"], [pears]]]
+apply(state, ops)
+```
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+Op = List[Any]
+
+_MISSING = object()
+
+
+def diff(old: Any, new: Any, path: Optional[List[Any]] = None) -> List[Op]:
+    """Returns operations that turn `old` into `new`; `[]` if they are equal."""
+    path = path or []
+    if _same(old, new):
+        return []
+    if isinstance(old, list) and isinstance(new, list):
+        return _diff_lists(old, new, path)
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: List[Op] = [["remove", path + [key]] for key in old if key not in new]
+        for key, value in new.items():
+            if key in old:
+                ops.extend(diff(old[key], value, path + [key]))
+            else:
+                ops.append(["set", path + [key], value])
+        return ops
+    return [["set", path, new]]
+
+
+def diff_state(state: Dict[str, Any], delta: Dict[str, Any]) -> List[Op]:
+    """Returns operations that apply `delta` (whole values per key) to `state`.
+
+    A key whose operations would serialize larger than its value is written
+    with a single `set` instead.
+    """
+    ops: List[Op] = []
+    for key, value in delta.items():
+        old = state.get(key, _MISSING)
+        if old is _MISSING:
+            ops.append(["set", [key], value])
+            continue
+        key_ops = diff(old, value, [key])
+        if len(json.dumps(key_ops)) > len(json.dumps(value)) + 16:
+            key_ops = [["set", [key], value]]
+        ops.extend(key_ops)
+    return ops
+
+
+def apply(document: Any, ops: List[Op]) -> Any:
+    """Applies `ops` to `document` in place and returns it.
+
+    A `set` with an empty path replaces the document itself, so callers must
+    use the return value.
+    """
+    for op in ops:
+        name, path = op[0], op[1]
+        if name == "append":
+            target = document
+            for part in path:
+                target = target[part]
+            target.extend(op[2])
+            continue
+        if not path:
+            if name != "set":
+                raise ValueError(f"Cannot {name} the whole document.")
+            document = op[2]
+            continue
+        parent = document
+        for part in path[:-1]:
+            parent = parent[part]
+        if name == "set":
+            parent[path[-1]] = op[2]
+        elif name == "remove":
+            del parent[path[-1]]
+        else:
+            raise ValueError(f"Unknown patch operation {name!r}.")
+    return document
+
+
+def _diff_lists(old: List[Any], new: List[Any], path: List[Any]) -> List[Op]:
+    prefix = 0
+    for before, after in zip(old, new):
+        if not _same(before, after):
+            break
+        prefix += 1
+    if prefix == len(old):
+        return [["append", path, new[prefix:]]]
+    removed = len(old) - len(new)
+    if removed > 0 and _same(old[prefix + removed:], new[prefix:]):
+        return [["remove", path + [prefix]] for _ in range(removed)]
+    if removed == 0:
+        ops: List[Op] = []
+        for index in range(prefix, len(old)):
+            ops.extend(diff(old[index], new[index], path + [index]))
+        return ops
+    return [["set", path, new]]
+
+
+def _same(a: Any, b: Any) -> bool:
+    """Equality that also tells `1`, `1.0` and `True` apart at every depth."""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(value, b[key]) for key, value in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
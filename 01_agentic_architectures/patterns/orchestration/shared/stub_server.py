@@ -0,0 +1,208 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A local, fault-injecting stand-in for the Gemini REST endpoint.
+
+Unlike `OfflineModel`, which replaces the model object, this server sits behind
+the real `Gemini` client and HTTP stack. That makes it the right tool for
+exercising connection pooling, retries, rate limiting and hedging end to end.
+It speaks just enough of `generateContent` / `streamGenerateContent` for the
+`google-genai` client, using only the standard library.
+
+Sample:
+```python
+async with StubGeminiServer(FaultPlan(error_rate=0.3, status=429, retry_after=0.2)) as server:
+    os.environ["GOOGLE_GEMINI_BASE_URL"] = server.base_url
+    ...  # run agents as usual
+    print(server.requests, server.faults)
+```
+"""
+
+import asyncio
+import json
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+_REASONS = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error",
+            502: "Bad Gateway", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+@dataclass
+class FaultPlan:
+    """What the stub server does to each request.
+
+    Attributes:
+        error_rate: Probability that a request fails with `status`.
+        status: The HTTP status of injected failures.
+        retry_after: If set, sent as the `Retry-After` header on failures.
+        latency_ms: Base latency added to every request.
+        tail_rate: Probability that a request is slow.
+        tail_latency_ms: Latency of slow requests, replacing `latency_ms`.
+        script: Optional explicit statuses for the first requests, in order;
+            after it is exhausted `error_rate` applies.
+        seed: Seeds fault and latency selection.
+    """
+
+    error_rate: float = 0.0
+    status: int = 503
+    retry_after: Optional[float] = None
+    latency_ms: float = 0.0
+    tail_rate: float = 0.0
+    tail_latency_ms: float = 0.0
+    script: Optional[List[int]] = None
+    seed: int = 0
+
+
+class StubGeminiServer:
+    """Serves canned Gemini responses on localhost with injected faults.
+
+    Args:
+        plan: The fault plan to apply.
+        response_text: The text every successful response carries.
+        host: Interface to bind.
+        port: Port to bind; 0 picks a free one.
+    """
+
+    def __init__(
+        self,
+        plan: Optional[FaultPlan] = None,
+        response_text: str = "stub response",
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.plan = plan or FaultPlan()
+        self.response_text = response_text
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.faults = 0
+        self.connections = 0
+        self._rng = random.Random(self.plan.seed)
+        self._script = list(self.plan.script or [])
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._handlers: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> str:
+        """Starts listening and returns the base URL."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Clients keep idle keep-alive connections open; close them so
+            # their handlers finish before the event loop shuts down.
+            handlers = dict(self._handlers)
+            for task, writer in handlers.items():
+                writer.close()
+                task.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "StubGeminiServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        task = asyncio.current_task()
+        self._handlers[task] = writer
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                _, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", "0"))
+                if length:
+                    await reader.readexactly(length)
+                await self._respond(writer, path)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.pop(task, None)
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, path: str) -> None:
+        self.requests += 1
+        plan = self.plan
+        latency = plan.latency_ms
+        if plan.tail_rate and self._rng.random() < plan.tail_rate:
+            latency = plan.tail_latency_ms
+        if latency:
+            await asyncio.sleep(latency / 1000.0)
+
+        if self._script:
+            status = self._script.pop(0)
+        elif plan.error_rate and self._rng.random() < plan.error_rate:
+            status = plan.status
+        else:
+            status = 200
+
+        extra_headers = ""
+        if status != 200:
+            self.faults += 1
+            if plan.retry_after is not None:
+                extra_headers = f"Retry-After: {plan.retry_after:g}\r\n"
+            body = json.dumps({"error": {"code": status, "message": "injected fault",
+                                         "status": _REASONS.get(status, "ERROR")}})
+            content_type = "application/json"
+        elif "streamGenerateContent" in path:
+            chunks = [self._payload(word + " ", final=False) for word in self.response_text.split()]
+            chunks.append(self._payload("", final=True))
+            body = "".join(f"data: {json.dumps(chunk)}\r\n\r\n" for chunk in chunks)
+            content_type = "text/event-stream"
+        else:
+            body = json.dumps(self._payload(self.response_text, final=True))
+            content_type = "application/json"
+
+        encoded = body.encode()
+        writer.write(
+            (
+                f"HTTP/1.1 {status} {_REASONS.get(status, 'ERROR')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(encoded)}\r\n"
+                f"{extra_headers}"
+                "Connection: keep-alive\r\n\r\n"
+            ).encode()
+            + encoded
+        )
+        await writer.drain()
+
+    @staticmethod
+    def _payload(text: str, final: bool) -> dict:
+        candidate = {"content": {"role": "model", "parts": [{"text": text}]}}
+        if final:
+            candidate["finishReason"] = "STOP"
+        return {
+            "candidates": [candidate],
+            "usageMetadata": {"promptTokenCount": 8, "candidatesTokenCount": 4, "totalTokenCount": 12},
+        }
@@ -0,0 +1,318 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Incremental, hierarchical context compaction with summary reuse.
+
+Flat compaction has two costs that grow with the conversation. Each round
+re-summarizes the overlap with the previous window. And ADK keeps every
+compaction summary in the prompt, so after a hundred rounds the model reads
+a hundred summaries on every turn.
+
+`SummaryTreeCompactionPlugin` keeps a tree of summaries instead:
+
+* When the history crosses `high_water_tokens` (as in
+  `TokenBudgetCompactionPlugin`), only the events since the last compaction
+  are summarized, into a level-0 *chunk*.
+* Whenever `fan_out` consecutive nodes share a level, their summaries (not
+  the events beneath them) are merged into one *rollup* a level up, like
+  carries in a counter.
+* The prompt reads the tree's *frontier*: the nodes no rollup covers yet.
+  There are at most `fan_out - 1` per level, so the summary part of the
+  prompt grows with the logarithm of the conversation length.
+
+Summaries are cached by a hash of what they summarize: the events' content
+for a chunk, the children's hashes for a rollup. The same span is never sent
+to the model twice, whether it comes back after a retry, a rewind or in
+another session.
+
+Each round appends a single compaction event. Its content is the rendered
+frontier, and its range starts at the new chunk, so a
+`SqliteSessionService(tail_summaries=1)` loads only that event and the
+events after it. The frontier
+nodes travel in the event's `custom_metadata`. ADK puts every compaction
+event in the prompt; the plugin's `before_model_callback` removes the
+superseded frontiers.
+
+Sample:
+```python
+compaction = SummaryTreeCompactionPlugin(
+    summarizer=tokens.metered_summarizer(agent.model),
+    high_water_tokens=8_000,
+    fan_out=4,
+)
+app = App(name="financial_analyst_app", root_agent=agent, plugins=[tokens, compaction])
+```
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Set
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.apps.base_events_summarizer import BaseEventsSummarizer
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions, EventCompaction
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.sessions.session import Session
+from google.genai import types
+
+from shared.metrics_registry import MetricsRegistry
+from shared.metrics_registry import registry as default_registry
+from shared.token_compaction import TokenBudgetCompactionPlugin, prompt_events
+
+TREE_KEY = "summary_tree"
+
+
+@dataclass
+class SummaryNode:
+    """One summary in the tree.
+
+    Attributes:
+        level: 0 for a chunk of events, n + 1 for a rollup of level-n nodes.
+        key: Hash of what the node summarizes.
+        start: Timestamp of the first event covered.
+        end: Timestamp of the last event covered.
+        text: The summary.
+    """
+
+    level: int
+    key: str
+    start: float
+    end: float
+    text: str
+
+
+@dataclass
+class SummaryTreeStats:
+    """Counters for the summary tree.
+
+    Attributes:
+        chunks: Level-0 summaries built.
+        rollups: Summaries built from other summaries.
+        cache_hits: Summaries taken from the cache instead of the model.
+        summarizer_calls: Summaries requested from the summarizer.
+    """
+
+    chunks: int = 0
+    rollups: int = 0
+    cache_hits: int = 0
+    summarizer_calls: int = 0
+
+
+class SummaryTreeCompactionPlugin(TokenBudgetCompactionPlugin):
+    """Compacts into a tree of summaries, summarizing each span only once.
+
+    Args:
+        summarizer: Turns a list of events into a compaction event. Rollups
+            pass it one synthetic event per child summary.
+        high_water_tokens: History size, in estimated tokens, that triggers
+            compaction.
+        fan_out: Nodes of one level merged into a rollup.
+        cache_size: Summaries kept in the content-hash cache.
+        calibrate: Correct the estimate with the prompt sizes models report.
+        registry: Where metrics are exported; the process-wide registry by default.
+    """
+
+    def __init__(
+        self,
+        summarizer: Optional[BaseEventsSummarizer] = None,
+        high_water_tokens: int = 8_000,
+        fan_out: int = 4,
+        cache_size: int = 4096,
+        calibrate: bool = True,
+        registry: Optional[MetricsRegistry] = None,
+    ) -> None:
+        super().__init__(
+            summarizer=summarizer,
+            high_water_tokens=high_water_tokens,
+            overlap_tokens=0,
+            calibrate=calibrate,
+            registry=registry,
+        )
+        if fan_out < 2:
+            raise ValueError("fan_out must be at least 2.")
+        self.fan_out = fan_out
+        self.cache_size = cache_size
+        self.tree_stats = SummaryTreeStats()
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._nodes = (registry or default_registry).counter(
+            "adk_summary_tree_nodes", "Summary tree nodes built.", ["kind", "source"]
+        )
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        """Drops superseded frontiers from the prompt; ADK keeps them all."""
+        stale = _stale_texts(callback_context.session.events)
+        if stale:
+            llm_request.contents = [
+                content for content in llm_request.contents if not _is_stale(content, stale)
+            ]
+        return await super().before_model_callback(
+            callback_context=callback_context, llm_request=llm_request
+        )
+
+    def _prompt_events(self, events: List[Event]) -> List[Event]:
+        latest = _latest_frontier_event(events)
+        return [
+            event
+            for event in prompt_events(events)
+            if event is latest or _tree_nodes(event) is None
+        ]
+
+    async def _summarize(
+        self, session: Session, events: List[Event], summarizer: BaseEventsSummarizer
+    ) -> Optional[Event]:
+        """Summarizes `events` into a chunk, rolls up, and renders the frontier."""
+        latest = _latest_frontier_event(session.events)
+        frontier = [SummaryNode(**node) for node in _tree_nodes(latest) or []]
+        chunk = await self._summary(
+            level=0,
+            key=_hash("chunk", *(_event_digest(event) for event in events)),
+            start=events[0].timestamp,
+            end=events[-1].timestamp,
+            events=events,
+            summarizer=summarizer,
+        )
+        if chunk is None:
+            return None
+        frontier.append(chunk)
+
+        while len(frontier) >= self.fan_out and len({node.level for node in frontier[-self.fan_out:]}) == 1:
+            children = frontier[-self.fan_out:]
+            rollup = await self._summary(
+                level=children[0].level + 1,
+                key=_hash("rollup", *(child.key for child in children)),
+                start=children[0].start,
+                end=children[-1].end,
+                events=[_as_event(child) for child in children],
+                summarizer=summarizer,
+            )
+            if rollup is None:
+                break
+            frontier[-self.fan_out:] = [rollup]
+
+        return Event(
+            author="user",
+            invocation_id=Event.new_id(),
+            actions=EventActions(compaction=EventCompaction(
+                start_timestamp=chunk.start,
+                end_timestamp=chunk.end,
+                compacted_content=types.Content(
+                    role="model", parts=[types.Part(text="\n\n".join(node.text for node in frontier))]
+                ),
+            )),
+            custom_metadata={TREE_KEY: [asdict(node) for node in frontier]},
+        )
+
+    async def _summary(
+        self,
+        level: int,
+        key: str,
+        start: float,
+        end: float,
+        events: List[Event],
+        summarizer: BaseEventsSummarizer,
+    ) -> Optional[SummaryNode]:
+        kind = "chunk" if level == 0 else "rollup"
+        text = self._cache.get(key)
+        if text is not None:
+            self._cache.move_to_end(key)
+            self.tree_stats.cache_hits += 1
+            self._nodes.labels(kind=kind, source="cache").inc()
+        else:
+            self.tree_stats.summarizer_calls += 1
+            summary = await summarizer.maybe_summarize_events(events=events)
+            text = _first_text(summary.actions.compaction.compacted_content) if summary else None
+            if not text:
+                return None
+            self._cache[key] = text
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self._nodes.labels(kind=kind, source="model").inc()
+        if level == 0:
+            self.tree_stats.chunks += 1
+        else:
+            self.tree_stats.rollups += 1
+        return SummaryNode(level=level, key=key, start=start, end=end, text=text)
+
+
+def _tree_nodes(event: Optional[Event]) -> Optional[list]:
+    if event is None or not event.custom_metadata:
+        return None
+    return event.custom_metadata.get(TREE_KEY)
+
+
+def _latest_frontier_event(events: List[Event]) -> Optional[Event]:
+    for event in reversed(events):
+        if _tree_nodes(event) is not None:
+            return event
+    return None
+
+
+def _stale_texts(events: List[Event]) -> Set[str]:
+    frontiers = [event for event in events if _tree_nodes(event) is not None]
+    if len(frontiers) < 2:
+        return set()
+    latest = _first_text(frontiers[-1].actions.compaction.compacted_content)
+    return {_first_text(event.actions.compaction.compacted_content) for event in frontiers[:-1]} - {latest}
+
+
+def _is_stale(content: types.Content, stale: Set[str]) -> bool:
+    # ADK presents summaries as another author's message: "[model] said: ...".
+    for part in content.parts or []:
+        if part.text and (part.text in stale or part.text.partition("] said: ")[2] in stale):
+            return True
+    return False
+
+
+def _first_text(content: Optional[types.Content]) -> Optional[str]:
+    if content is None or not content.parts:
+        return None
+    return content.parts[0].text
+
+
+def _as_event(node: SummaryNode) -> Event:
+    """Wraps a child summary as an event the summarizer can read."""
+    return Event(
+        author="summary",
+        invocation_id=f"summary-{node.key}",
+        timestamp=node.end,
+        content=types.Content(role="model", parts=[types.Part(text=node.text)]),
+    )
+
+
+def _event_digest(event: Event) -> str:
+    parts = []
+    for part in (event.content.parts or []) if event.content else []:
+        if part.text:
+            parts.append(part.text)
+        elif part.function_call:
+            parts.append(json.dumps([part.function_call.name, part.function_call.args], default=str))
+        elif part.function_response:
+            parts.append(json.dumps(
+                [part.function_response.name, part.function_response.response], default=str
+            ))
+    return _hash(event.author, *parts)
+
+
+def _hash(*values: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for value in values:
+        digest.update(value.encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
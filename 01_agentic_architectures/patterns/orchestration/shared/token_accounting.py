@@ -0,0 +1,384 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Token and cost accounting, with optional hard budgets, as an ADK plugin.
+
+`TokenAccountingPlugin` reads `usage_metadata` from every model response and
+aggregates prompt, completion, cached and thinking tokens per invocation,
+agent, session and model. It answers questions such as "which stage of
+`BlogPipeline` burns the most prompt tokens?".
+
+Budgets are checked before every model call. When one is exhausted, the call
+is either short-circuited with an error response (the run continues, but no
+further tokens are spent in that scope) or aborted with `TokenBudgetExceeded`.
+The error response has no content, so an agent's `output_key` keeps its last
+real answer instead of the refusal.
+
+Context compaction (ADR-009) calls the model outside the agent's plugin
+callbacks. Pass `plugin.metered_summarizer(model)` as the
+`EventsCompactionConfig.summarizer` to account for those calls under the
+`events_compaction` agent, against the session of the run that triggered
+them.
+
+Totals are also exported to `shared.metrics_registry` counters.
+
+Sample:
+```python
+tokens = TokenAccountingPlugin(budget=TokenBudget(max_tokens_per_session=50_000))
+app = App(name="blog", root_agent=root_agent, plugins=[tokens])
+...
+print(tokens.report()["by_agent"])
+```
+"""
+
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncGenerator, Dict, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.apps.llm_event_summarizer import LlmEventSummarizer
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types
+
+from shared.metrics_registry import MetricsRegistry
+from shared.metrics_registry import registry as default_registry
+
+COMPACTION_AGENT = "events_compaction"
+
+BUDGET_EXCEEDED = "TOKEN_BUDGET_EXCEEDED"
+
+# (session id, invocation id) of the run in progress, for the model calls that
+# compaction makes outside the agent's callbacks.
+_current_run: ContextVar[Optional[Tuple[str, str]]] = ContextVar("token_accounting_run", default=None)
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    """USD per million tokens.
+
+    Attributes:
+        input: Price of uncached prompt tokens.
+        output: Price of completion and thinking tokens.
+        cached_input: Price of prompt tokens served from the context cache.
+    """
+
+    input: float
+    output: float
+    cached_input: float = 0.0
+
+
+# List prices at the time of writing; pass `prices=` to override.
+DEFAULT_PRICES: Dict[str, ModelPrice] = {
+    "gemini-2.5-flash-lite": ModelPrice(input=0.10, output=0.40, cached_input=0.025),
+    "gemini-2.5-flash": ModelPrice(input=0.30, output=2.50, cached_input=0.075),
+    "gemini-2.5-pro": ModelPrice(input=1.25, output=10.00, cached_input=0.31),
+}
+
+
+@dataclass
+class TokenUsage:
+    """Accumulated usage for one scope (invocation, agent, session or model)."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    thoughts_tokens: int = 0
+    total_tokens: int = 0
+    cost_usd: float = 0.0
+
+    def add(self, usage: "TokenUsage") -> None:
+        self.calls += usage.calls
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+        self.cached_tokens += usage.cached_tokens
+        self.thoughts_tokens += usage.thoughts_tokens
+        self.total_tokens += usage.total_tokens
+        self.cost_usd += usage.cost_usd
+
+    @classmethod
+    def from_metadata(
+        cls,
+        metadata: types.GenerateContentResponseUsageMetadata,
+        price: Optional[ModelPrice],
+    ) -> "TokenUsage":
+        prompt = metadata.prompt_token_count or 0
+        completion = metadata.candidates_token_count or 0
+        cached = metadata.cached_content_token_count or 0
+        thoughts = metadata.thoughts_token_count or 0
+        usage = cls(
+            calls=1,
+            prompt_tokens=prompt,
+            completion_tokens=completion,
+            cached_tokens=cached,
+            thoughts_tokens=thoughts,
+            total_tokens=metadata.total_token_count or prompt + completion + thoughts,
+        )
+        if price is not None:
+            usage.cost_usd = (
+                (prompt - cached) * price.input
+                + cached * price.cached_input
+                + (completion + thoughts) * price.output
+            ) / 1_000_000
+        return usage
+
+
+@dataclass(frozen=True)
+class TokenBudget:
+    """Hard limits on total tokens (or cost) per scope; `None` means unlimited.
+
+    Attributes:
+        max_tokens_per_invocation: Limit for one user turn.
+        max_tokens_per_session: Limit for a whole session, across turns.
+        max_tokens_per_agent: Limit per agent within a session.
+        max_cost_per_session: Limit in USD for a whole session.
+        action: "short_circuit" answers further calls with an error response
+            instead of calling the model; "abort" raises `TokenBudgetExceeded`.
+            ADK re-raises plugin errors as `RuntimeError` with the original
+            as `__cause__`, which is what `Runner.run_async` callers see.
+    """
+
+    max_tokens_per_invocation: Optional[int] = None
+    max_tokens_per_session: Optional[int] = None
+    max_tokens_per_agent: Optional[int] = None
+    max_cost_per_session: Optional[float] = None
+    action: str = "short_circuit"
+
+
+class TokenBudgetExceeded(RuntimeError):
+    """Raised by `TokenAccountingPlugin` when a budget with action "abort" is spent."""
+
+
+class TokenAccountingPlugin(BasePlugin):
+    """Aggregates model token usage and enforces optional budgets.
+
+    Args:
+        budget: Optional hard limits.
+        prices: Per-model prices used for `cost_usd`.
+        registry: Where totals are exported; the process-wide registry by default.
+        max_invocations: Per-invocation totals kept; older ones are dropped.
+        max_sessions: Per-session totals kept, least recently used dropped
+            first. A dropped session's budgets start again from zero, so keep
+            this above the number of sessions active at once.
+        max_agents: Per-agent totals kept, least recently used dropped first.
+    """
+
+    def __init__(
+        self,
+        budget: Optional[TokenBudget] = None,
+        prices: Optional[Dict[str, ModelPrice]] = None,
+        registry: Optional[MetricsRegistry] = None,
+        max_invocations: int = 1000,
+        max_sessions: int = 10_000,
+        max_agents: int = 1000,
+    ) -> None:
+        super().__init__(name="token_accounting_plugin")
+        self.budget = budget or TokenBudget()
+        self.prices = DEFAULT_PRICES if prices is None else prices
+        self.max_invocations = max_invocations
+        self.max_sessions = max_sessions
+        self.max_agents = max_agents
+        self.total = TokenUsage()
+        self.by_invocation: "OrderedDict[str, TokenUsage]" = OrderedDict()
+        self.by_agent: "OrderedDict[str, TokenUsage]" = OrderedDict()
+        self.by_session: "OrderedDict[str, TokenUsage]" = OrderedDict()
+        # Session -> agent -> usage, dropped together with the session's total.
+        self.by_session_agent: "OrderedDict[str, Dict[str, TokenUsage]]" = OrderedDict()
+        self.by_model: Dict[str, TokenUsage] = {}
+        self.budget_rejections = 0
+        # The model each in-flight call was sent to, from its `LlmRequest`.
+        self._request_models: "OrderedDict[tuple, str]" = OrderedDict()
+        registry = registry or default_registry
+        self._tokens = registry.counter(
+            "adk_model_tokens", "Model tokens by kind.", ["agent", "model", "kind"]
+        )
+        self._cost = registry.counter("adk_model_cost_usd", "Estimated model cost.", ["agent", "model"])
+        self._rejections = registry.counter(
+            "adk_token_budget_rejections", "Model calls refused by a token budget.", ["scope"]
+        )
+
+    async def before_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        """Remembers the run's session for compaction calls made after it."""
+        _current_run.set((invocation_context.session.id, invocation_context.invocation_id))
+        return None
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        """Refuses the call if any budget for its scope is already spent."""
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        self._request_models[key] = llm_request.model or "unknown"
+        self._request_models.move_to_end(key)
+        while len(self._request_models) > self.max_invocations:
+            self._request_models.popitem(last=False)
+        scope = self._exhausted_scope(callback_context)
+        if scope is None:
+            return None
+        self.budget_rejections += 1
+        self._rejections.labels(scope=scope).inc()
+        message = f"Token budget per {scope} exhausted; the model was not called."
+        if self.budget.action == "abort":
+            raise TokenBudgetExceeded(message)
+        # No content: `output_key` would otherwise store the refusal as the answer.
+        return LlmResponse(
+            error_code=BUDGET_EXCEEDED,
+            error_message=message,
+            turn_complete=True,
+        )
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> None:
+        """Adds the response's usage to every scope it belongs to."""
+        if llm_response.partial or llm_response.usage_metadata is None:
+            return None
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        model = self._request_models.pop(key, "unknown")
+        self.record(
+            llm_response.usage_metadata,
+            model=model,
+            agent=callback_context.agent_name,
+            session_id=callback_context.session.id,
+            invocation_id=callback_context.invocation_id,
+        )
+        return None
+
+    async def on_model_error_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> Optional[LlmResponse]:
+        self._request_models.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        return None
+
+    def record(
+        self,
+        metadata: types.GenerateContentResponseUsageMetadata,
+        model: str,
+        agent: str,
+        session_id: Optional[str] = None,
+        invocation_id: Optional[str] = None,
+    ) -> TokenUsage:
+        """Adds one response's usage; also used for calls made outside callbacks."""
+        usage = TokenUsage.from_metadata(metadata, self.prices.get(model))
+        self.total.add(usage)
+        _bucket(self.by_agent, agent, self.max_agents).add(usage)
+        _bucket(self.by_model, model).add(usage)
+        if session_id is not None:
+            _bucket(self.by_session, session_id, self.max_sessions).add(usage)
+            agents = _lru_get(self.by_session_agent, session_id, dict, self.max_sessions)
+            _bucket(agents, agent).add(usage)
+        if invocation_id is not None:
+            _bucket(self.by_invocation, invocation_id, self.max_invocations).add(usage)
+
+        for kind, count in (
+            ("prompt", usage.prompt_tokens),
+            ("completion", usage.completion_tokens),
+            ("cached", usage.cached_tokens),
+            ("thoughts", usage.thoughts_tokens),
+        ):
+            if count:
+                self._tokens.labels(agent=agent, model=model, kind=kind).inc(count)
+        if usage.cost_usd:
+            self._cost.labels(agent=agent, model=model).inc(usage.cost_usd)
+        return usage
+
+    def metered_summarizer(self, llm: BaseLlm, prompt_template: Optional[str] = None) -> LlmEventSummarizer:
+        """Returns a compaction summarizer whose model calls are accounted here."""
+        return LlmEventSummarizer(
+            llm=_MeteredModel(model=llm.model, inner=llm, accounting=self),
+            prompt_template=prompt_template,
+        )
+
+    def report(self) -> Dict[str, Any]:
+        """Returns totals per scope as plain dictionaries."""
+        return {
+            "total": asdict(self.total),
+            "by_agent": {name: asdict(usage) for name, usage in self.by_agent.items()},
+            "by_model": {name: asdict(usage) for name, usage in self.by_model.items()},
+            "by_session": {name: asdict(usage) for name, usage in self.by_session.items()},
+            "budget_rejections": self.budget_rejections,
+        }
+
+    def _exhausted_scope(self, callback_context: CallbackContext) -> Optional[str]:
+        budget = self.budget
+        session_id = callback_context.session.id
+        invocation = self.by_invocation.get(callback_context.invocation_id)
+        session = self.by_session.get(session_id)
+        agent = self.by_session_agent.get(session_id, {}).get(callback_context.agent_name)
+        if _over(invocation, budget.max_tokens_per_invocation):
+            return "invocation"
+        if _over(session, budget.max_tokens_per_session):
+            return "session"
+        if _over(agent, budget.max_tokens_per_agent):
+            return "agent"
+        if (
+            budget.max_cost_per_session is not None
+            and session is not None
+            and session.cost_usd >= budget.max_cost_per_session
+        ):
+            return "session_cost"
+        return None
+
+
+class _MeteredModel(BaseLlm):
+    """Forwards to `inner` and records usage under the compaction agent.
+
+    The usage counts against the session of the run in progress, if any.
+    """
+
+    inner: BaseLlm
+    accounting: Any
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            if not response.partial and response.usage_metadata is not None:
+                session_id, invocation_id = _current_run.get() or (None, None)
+                self.accounting.record(
+                    response.usage_metadata,
+                    model=self.model,
+                    agent=COMPACTION_AGENT,
+                    session_id=session_id,
+                    invocation_id=invocation_id,
+                )
+            yield response
+
+
+def _bucket(usages: Dict[Any, TokenUsage], key: Any, limit: Optional[int] = None) -> TokenUsage:
+    """Returns the usage for `key`; with `limit`, `usages` is an LRU of that size."""
+    if limit is None:
+        usage = usages.get(key)
+        if usage is None:
+            usage = usages[key] = TokenUsage()
+        return usage
+    return _lru_get(usages, key, TokenUsage, limit)
+
+
+def _lru_get(entries: "OrderedDict[Any, Any]", key: Any, factory, limit: int) -> Any:
+    value = entries.get(key)
+    if value is None:
+        value = entries[key] = factory()
+    entries.move_to_end(key)
+    while len(entries) > limit:
+        entries.popitem(last=False)
+    return value
+
+
+def _over(usage: Optional[TokenUsage], limit: Optional[int]) -> bool:
+    return limit is not None and usage is not None and usage.total_tokens >= limit
@@ -0,0 +1,344 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Context compaction triggered by prompt size instead of turn count.
+
+`EventsCompactionConfig(compaction_interval=5, overlap_size=2)` compacts every
+five turns whatever they contain. Five turns of pasted articles can overflow
+the context window before compaction fires, while fifty one-line turns get
+summarized although they would have fit many times over.
+
+`TokenBudgetCompactionPlugin` compacts when the session's history is large.
+After every run it estimates the history the next prompt will be built from:
+compaction summaries stand in for the events they cover, just as ADK builds
+the prompt. If that estimate crosses `high_water_tokens`, the plugin
+summarizes every event since the last compaction. The overlap with the
+previous window is sized in tokens (`overlap_tokens`) rather than in turns.
+
+The estimate is local and cheap: about four characters per token, counting
+text, function calls and function responses. With `calibrate=True` the ratio
+is corrected as the run goes, from the `prompt_token_count` the model reports
+for the requests the plugin saw; the estimate of a request includes its
+instruction and tool declarations, as the reported count does.
+
+The estimated history size before and after each compaction goes to the
+`adk_compaction_prompt_tokens` histogram, and outcomes to `adk_compactions`.
+
+Compaction runs inside the run's `after_run_callback`. The caller has
+already received the final response by then, and the next turn on the
+session sees the summary. There is no background task to race with.
+
+Sample:
+```python
+compaction = TokenBudgetCompactionPlugin(
+    summarizer=tokens.metered_summarizer(agent.model),
+    high_water_tokens=8_000,
+    overlap_tokens=1_000,
+)
+app = App(name="financial_analyst_app", root_agent=agent, plugins=[tokens, compaction])
+```
+"""
+
+import json
+import logging
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.apps.base_events_summarizer import BaseEventsSummarizer
+from google.adk.apps.llm_event_summarizer import LlmEventSummarizer
+from google.adk.events.event import Event
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.sessions.session import Session
+from google.genai import types
+
+from shared.metrics_registry import MetricsRegistry
+from shared.metrics_registry import registry as default_registry
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4.0
+
+# Role and turn markers the model adds around every content.
+CONTENT_OVERHEAD_TOKENS = 4
+
+TOKEN_BUCKETS = (500, 1_000, 2_000, 4_000, 8_000, 16_000, 32_000, 64_000, 128_000, 256_000, 1_000_000)
+
+_CACHE_SIZE = 10_000
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Approximates the token count of `text` at `CHARS_PER_TOKEN`."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_content_tokens(content: Optional[types.Content]) -> int:
+    """Approximates the tokens one content adds to a prompt."""
+    if content is None or not content.parts:
+        return 0
+    chars = 0
+    for part in content.parts:
+        if part.text:
+            chars += len(part.text)
+        elif part.function_call:
+            chars += len(part.function_call.name or "") + len(_dumps(part.function_call.args))
+        elif part.function_response:
+            chars += len(part.function_response.name or "") + len(_dumps(part.function_response.response))
+    return math.ceil(chars / CHARS_PER_TOKEN) + CONTENT_OVERHEAD_TOKENS
+
+
+def estimate_request_tokens(llm_request: LlmRequest) -> int:
+    """Approximates the prompt tokens of a model request, instruction and tool declarations included."""
+    tokens = estimate_text_tokens(str(llm_request.config.system_instruction or ""))
+    for tool in llm_request.config.tools or []:
+        # The reported `prompt_token_count` includes the declarations, so the
+        # calibration ratio must see them too.
+        tokens += estimate_text_tokens(_dumps(tool.model_dump(mode="json", exclude_none=True)))
+    for content in llm_request.contents:
+        tokens += estimate_content_tokens(content)
+    return tokens
+
+
+def prompt_events(events: List[Event]) -> List[Event]:
+    """Returns the events a prompt is built from.
+
+    Mirrors ADK's content processor: each compaction event stands in for the
+    events from its start timestamp onwards, and the events it covers are
+    dropped.
+    """
+    kept = []
+    boundary = math.inf
+    for event in reversed(events):
+        compaction = _compaction(event)
+        if compaction is not None:
+            if compaction.start_timestamp is not None and compaction.end_timestamp is not None:
+                kept.append(event)
+                boundary = min(boundary, compaction.start_timestamp)
+        elif event.timestamp < boundary:
+            kept.append(event)
+    kept.reverse()
+    return kept
+
+
+@dataclass
+class CompactionStats:
+    """Counters for `TokenBudgetCompactionPlugin`.
+
+    Attributes:
+        checks: Runs whose history was estimated.
+        compactions: Compaction events appended.
+        failures: Summarizer calls that raised or returned nothing.
+        tokens_before: Sum of history estimates just before each compaction.
+        tokens_after: Sum of history estimates just after each compaction.
+        calibration: The current ratio of reported to estimated prompt tokens.
+    """
+
+    checks: int = 0
+    compactions: int = 0
+    failures: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+    calibration: float = 1.0
+
+
+class TokenBudgetCompactionPlugin(BasePlugin):
+    """Compacts a session's events once its estimated history crosses a mark.
+
+    Args:
+        summarizer: Turns a list of events into a compaction event, as
+            `EventsCompactionConfig.summarizer` does. Defaults to an
+            `LlmEventSummarizer` over the running agent's model.
+        high_water_tokens: History size, in estimated tokens, that triggers
+            compaction. Leave headroom below the context window for the
+            instruction, tool declarations and the next user message.
+        overlap_tokens: Up to this many tokens of whole invocations from the
+            previous window are summarized again with the new events, so
+            consecutive summaries share context.
+        calibrate: Correct the estimate with the prompt sizes models report.
+        registry: Where metrics are exported; the process-wide registry by default.
+    """
+
+    def __init__(
+        self,
+        summarizer: Optional[BaseEventsSummarizer] = None,
+        high_water_tokens: int = 8_000,
+        overlap_tokens: int = 1_000,
+        calibrate: bool = True,
+        registry: Optional[MetricsRegistry] = None,
+    ) -> None:
+        super().__init__(name="token_budget_compaction_plugin")
+        if high_water_tokens <= 0:
+            raise ValueError("high_water_tokens must be positive.")
+        if overlap_tokens < 0:
+            raise ValueError("overlap_tokens must not be negative.")
+        self.summarizer = summarizer
+        self.high_water_tokens = high_water_tokens
+        self.overlap_tokens = overlap_tokens
+        self.calibrate = calibrate
+        self.stats = CompactionStats()
+        self._event_tokens: "OrderedDict[str, int]" = OrderedDict()
+        self._pending_requests: Dict[Tuple[str, str], int] = {}
+        self._compacting: Set[str] = set()
+        registry = registry or default_registry
+        self._prompt_tokens = registry.histogram(
+            "adk_compaction_prompt_tokens",
+            "Estimated session history tokens around a compaction.",
+            ["phase"],
+            buckets=TOKEN_BUCKETS,
+        )
+        self._compactions = registry.counter(
+            "adk_compactions", "Token-budget compaction attempts.", ["outcome"]
+        )
+
+    def history_tokens(self, events: List[Event]) -> int:
+        """Estimates the tokens of the history a prompt would be built from."""
+        raw = sum(self._tokens_of(event) for event in self._prompt_events(events))
+        return round(raw * self.stats.calibration)
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        if self.calibrate:
+            key = (callback_context.invocation_id, callback_context.agent_name)
+            self._pending_requests[key] = estimate_request_tokens(llm_request)
+        return None
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        if llm_response.partial:
+            return None
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        estimated = self._pending_requests.pop(key, None)
+        reported = llm_response.usage_metadata and llm_response.usage_metadata.prompt_token_count
+        if estimated and reported:
+            ratio = min(4.0, max(0.25, reported / estimated))
+            self.stats.calibration = 0.8 * self.stats.calibration + 0.2 * ratio
+        return None
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        """Compacts the session if its history has crossed the high-water mark."""
+        session = invocation_context.session
+        self.stats.checks += 1
+        self._pending_requests = {
+            key: tokens
+            for key, tokens in self._pending_requests.items()
+            if key[0] != invocation_context.invocation_id
+        }
+        if session.id in self._compacting:
+            return None
+        before = self.history_tokens(session.events)
+        if before < self.high_water_tokens:
+            return None
+        events = self._events_to_compact(session.events)
+        if not events:
+            return None
+
+        self._compacting.add(session.id)
+        try:
+            summarizer = self.summarizer or LlmEventSummarizer(
+                llm=invocation_context.agent.canonical_model
+            )
+            compaction = await self._summarize(session, events, summarizer)
+        except Exception:
+            logger.warning("Compaction of session %s failed.", session.id, exc_info=True)
+            compaction = None
+        finally:
+            self._compacting.discard(session.id)
+        if compaction is None:
+            self.stats.failures += 1
+            self._compactions.labels(outcome="failed").inc()
+            return None
+
+        await invocation_context.session_service.append_event(session=session, event=compaction)
+        after = self.history_tokens(session.events)
+        self.stats.compactions += 1
+        self.stats.tokens_before += before
+        self.stats.tokens_after += after
+        self._compactions.labels(outcome="compacted").inc()
+        self._prompt_tokens.labels(phase="before").observe(before)
+        self._prompt_tokens.labels(phase="after").observe(after)
+        logger.info(
+            "Compacted %d events of session %s: ~%d -> ~%d history tokens.",
+            len(events), session.id, before, after,
+        )
+        return None
+
+    def _prompt_events(self, events: List[Event]) -> List[Event]:
+        return prompt_events(events)
+
+    async def _summarize(
+        self, session: Session, events: List[Event], summarizer: BaseEventsSummarizer
+    ) -> Optional[Event]:
+        """Returns the compaction event to append to `session` for `events`, or None."""
+        return await summarizer.maybe_summarize_events(events=events)
+
+    def _events_to_compact(self, events: List[Event]) -> List[Event]:
+        """Returns the events since the last compaction, led by the overlap."""
+        last_end = 0.0
+        for event in reversed(events):
+            compaction = _compaction(event)
+            if compaction is not None and compaction.end_timestamp:
+                last_end = compaction.end_timestamp
+                break
+        raw = [event for event in events if event.invocation_id and _compaction(event) is None]
+        new = [event for event in raw if event.timestamp > last_end]
+        if not new:
+            return []
+
+        overlap: List[Event] = []
+        budget = self.overlap_tokens
+        for invocation in reversed(_by_invocation([event for event in raw if event.timestamp <= last_end])):
+            cost = sum(self._tokens_of(event) for event in invocation)
+            if cost > budget:
+                break
+            budget -= cost
+            overlap[:0] = invocation
+        return overlap + new
+
+    def _tokens_of(self, event: Event) -> int:
+        tokens = self._event_tokens.get(event.id)
+        if tokens is None:
+            compaction = _compaction(event)
+            content = compaction.compacted_content if compaction is not None else event.content
+            tokens = self._event_tokens[event.id] = estimate_content_tokens(content)
+            while len(self._event_tokens) > _CACHE_SIZE:
+                self._event_tokens.popitem(last=False)
+        return tokens
+
+
+def _compaction(event: Event):
+    return event.actions.compaction if event.actions else None
+
+
+def _by_invocation(events: List[Event]) -> List[List[Event]]:
+    groups: List[List[Event]] = []
+    for event in events:
+        if groups and groups[-1][0].invocation_id == event.invocation_id:
+            groups[-1].append(event)
+        else:
+            groups.append([event])
+    return groups
+
+
+def _dumps(value) -> str:
+    try:
+        return json.dumps(value, default=str)
+    except (TypeError, ValueError):
+        return str(value)
@@ -0,0 +1,529 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Sampled, span-based tracing for agents, model calls and tools.
+
+`LoggingPlugin` formats and prints several lines on the event loop for every
+callback of every invocation. `TracingPlugin` records the same lifecycle as
+structured spans, and keeps the per-request cost small:
+
+* Sampling is head-based. Each invocation is sampled or not once, in
+  `before_run_callback`, from its trace id (like OpenTelemetry's
+  `TraceIdRatioBased`). Callbacks of an unsampled invocation cost one dict
+  lookup.
+* Spans are never formatted on the event loop. A finished span is put on a
+  bounded queue, and a background thread batches and exports it. If the queue
+  is full the span is dropped and counted rather than blocking the agent.
+
+Spans form one trace per invocation: the invocation span is the root, each
+agent's span is a child of its parent agent's span, and model and tool spans
+are children of the agent that made them.
+
+ADK skips `after_run_callback` when a run raises, so the traces of failed runs
+are never closed there. At most `max_traces` traces are kept open; the oldest
+beyond that is ended with an error status and exported, open spans included.
+
+Exporters write JSON lines to a file (`FileSpanExporter`) or post OTLP/HTTP
+JSON to a collector (`OtlpHttpSpanExporter`). `OtlpCollector` is an in-process
+collector for tests and benchmarks.
+
+Sample:
+```python
+tracing = TracingPlugin(OtlpHttpSpanExporter("http://localhost:4318/v1/traces"), sample_rate=0.1)
+runner = InMemoryRunner(agent=root_agent, plugins=[tracing])
+...
+tracing.shutdown()  # flushes queued spans
+```
+"""
+
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents.base_agent import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds and status codes.
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_RATIO_BITS = 1 << 64
+
+_SHORT_CIRCUITED = "answered before reaching the model"
+
+
+@dataclass
+class Span:
+    """One timed operation. Times are Unix nanoseconds."""
+
+    trace_id: int
+    span_id: int
+    parent_id: Optional[int]
+    name: str
+    kind: int = SPAN_KIND_INTERNAL
+    start_ns: int = 0
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: int = STATUS_OK
+    status_message: str = ""
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Returns the span in OTLP/JSON form."""
+        span = {
+            "traceId": f"{self.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()
+            ],
+            "status": {"code": self.status, "message": self.status_message},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = f"{self.parent_id:016x}"
+        return span
+
+
+class FileSpanExporter:
+    """Appends spans to a file, one OTLP/JSON span per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(span.to_otlp()) + "\n" for span in spans)
+
+    def shutdown(self) -> None:
+        pass
+
+
+class OtlpHttpSpanExporter:
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding.
+
+    Args:
+        endpoint: The collector's traces URL, usually ending in `/v1/traces`.
+        service_name: The `service.name` resource attribute.
+        timeout: Seconds to wait for the collector per batch.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = "http://localhost:4318/v1/traces",
+        service_name: str = "genai-field-guide",
+        timeout: float = 5.0,
+    ) -> None:
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": self.service_name}}
+                    ]
+                },
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+@dataclass
+class TracingStats:
+    """Counters for the tracing pipeline."""
+
+    traces_started: int = 0
+    traces_sampled: int = 0
+    spans_exported: int = 0
+    spans_dropped: int = 0
+    export_failures: int = 0
+    traces_evicted: int = 0
+
+
+class BatchSpanProcessor:
+    """Queues finished spans and exports them in batches from a daemon thread.
+
+    Args:
+        exporter: An object with `export(spans)` and `shutdown()`.
+        max_queue_size: Spans buffered before new ones are dropped.
+        max_batch_size: Spans handed to one `export()` call.
+        schedule_delay: Seconds a partial batch may wait before export.
+        stats: Where drops and exports are counted.
+    """
+
+    def __init__(
+        self,
+        exporter: Any,
+        max_queue_size: int = 2048,
+        max_batch_size: int = 512,
+        schedule_delay: float = 1.0,
+        stats: Optional[TracingStats] = None,
+    ) -> None:
+        self.exporter = exporter
+        self.max_batch_size = max_batch_size
+        self.schedule_delay = schedule_delay
+        self.stats = stats or TracingStats()
+        self._queue: "queue.Queue[Any]" = queue.Queue(max_queue_size)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        """Queues a finished span without blocking."""
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.stats.spans_dropped += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Exports everything queued so far; returns False on timeout."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Flushes, stops the export thread and shuts the exporter down."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self.exporter.shutdown()
+
+    def _run(self) -> None:
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.schedule_delay
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+            if isinstance(item, Span):
+                batch.append(item)
+                if len(batch) < self.max_batch_size:
+                    continue
+            self._export(batch)
+            batch = []
+            deadline = time.monotonic() + self.schedule_delay
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                return
+
+    def _export(self, batch: List[Span]) -> None:
+        if not batch:
+            return
+        try:
+            self.exporter.export(batch)
+            self.stats.spans_exported += len(batch)
+        except Exception as e:  # The agent must not fail because tracing did.
+            self.stats.export_failures += 1
+            self.stats.spans_dropped += len(batch)
+            logger.warning("Dropped %d spans: export failed with %r", len(batch), e)
+
+
+class _Trace:
+    __slots__ = ("root", "open")
+
+    def __init__(self, root: Span) -> None:
+        self.root = root
+        # ("agent", name) / ("model", agent name) / ("tool", call id) -> span
+        self.open: Dict[tuple, Span] = {}
+
+
+class TracingPlugin(BasePlugin):
+    """Records sampled traces of invocations, agents, model calls and tools.
+
+    Args:
+        exporter: Where spans go, e.g. `FileSpanExporter("spans.jsonl")`.
+        sample_rate: Fraction of invocations traced, between 0 and 1.
+        max_traces: Sampled invocations kept open; the oldest beyond that,
+            usually a run that raised, is ended with an error status.
+        processor_options: Extra keyword arguments for `BatchSpanProcessor`.
+    """
+
+    def __init__(
+        self,
+        exporter: Any,
+        sample_rate: float = 1.0,
+        max_traces: int = 10_000,
+        **processor_options: Any,
+    ) -> None:
+        super().__init__(name="tracing_plugin")
+        self.sample_rate = sample_rate
+        self.max_traces = max_traces
+        self.stats = TracingStats()
+        self.processor = BatchSpanProcessor(exporter, stats=self.stats, **processor_options)
+        self._threshold = int(sample_rate * _RATIO_BITS)
+        self._traces: "OrderedDict[str, _Trace]" = OrderedDict()
+
+    async def before_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        """Decides whether to sample the invocation and opens its root span."""
+        self.stats.traces_started += 1
+        trace_id = random.getrandbits(128)
+        if (trace_id & (_RATIO_BITS - 1)) >= self._threshold:
+            return None
+        self.stats.traces_sampled += 1
+        root = self._start(trace_id, None, "invocation", {
+            "app.name": invocation_context.app_name,
+            "session.id": invocation_context.session.id,
+            "invocation.id": invocation_context.invocation_id,
+        })
+        self._traces[invocation_context.invocation_id] = _Trace(root)
+        while len(self._traces) > self.max_traces:
+            self.stats.traces_evicted += 1
+            self._end_trace(self._traces.popitem(last=False)[1], STATUS_ERROR, "run did not finish")
+        return None
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        """Closes the root span, and any span the run left open."""
+        trace = self._traces.pop(invocation_context.invocation_id, None)
+        if trace is not None:
+            self._end_trace(trace)
+        return None
+
+    async def before_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> None:
+        trace = self._traces.get(callback_context.invocation_id)
+        if trace is None:
+            return None
+        parent = trace.root
+        if agent.parent_agent is not None:
+            parent = trace.open.get(("agent", agent.parent_agent.name), parent)
+        trace.open[("agent", agent.name)] = self._start(
+            parent.trace_id, parent.span_id, f"agent {agent.name}", {"agent.name": agent.name}
+        )
+        return None
+
+    async def after_agent_callback(
+        self, *, agent: BaseAgent, callback_context: CallbackContext
+    ) -> None:
+        trace = self._traces.get(callback_context.invocation_id)
+        if trace is not None:
+            # A model call another plugin answered never reaches after_model.
+            self._end_open(trace, ("model", agent.name), message=_SHORT_CIRCUITED)
+            self._end_open(trace, ("agent", agent.name))
+        return None
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        trace = self._traces.get(callback_context.invocation_id)
+        if trace is None:
+            return None
+        agent_name = callback_context.agent_name
+        self._end_open(trace, ("model", agent_name), message=_SHORT_CIRCUITED)
+        parent = trace.open.get(("agent", agent_name), trace.root)
+        span = self._start(
+            parent.trace_id, parent.span_id, f"model {llm_request.model}",
+            {"agent.name": agent_name, "gen_ai.request.model": llm_request.model or ""},
+        )
+        span.kind = SPAN_KIND_CLIENT
+        trace.open[("model", agent_name)] = span
+        return None
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> None:
+        trace = self._traces.get(callback_context.invocation_id)
+        if trace is None:
+            return None
+        key = ("model", callback_context.agent_name)
+        span = trace.open.get(key)
+        if span is None:
+            return None
+        if llm_response.partial:
+            span.attributes.setdefault("gen_ai.first_chunk_ns", time.time_ns() - span.start_ns)
+            return None
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            span.attributes["gen_ai.usage.input_tokens"] = usage.prompt_token_count or 0
+            span.attributes["gen_ai.usage.output_tokens"] = usage.candidates_token_count or 0
+        if llm_response.error_code:
+            span.status, span.status_message = STATUS_ERROR, str(llm_response.error_code)
+        self._end_open(trace, key, span.status, span.status_message)
+        return None
+
+    async def on_model_error_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> None:
+        trace = self._traces.get(callback_context.invocation_id)
+        if trace is not None:
+            self._end_open(
+                trace, ("model", callback_context.agent_name), STATUS_ERROR, type(error).__name__
+            )
+        return None
+
+    async def before_tool_callback(
+        self, *, tool: BaseTool, tool_args: Dict[str, Any], tool_context: ToolContext
+    ) -> None:
+        trace = self._traces.get(tool_context.invocation_id)
+        if trace is None:
+            return None
+        parent = trace.open.get(("agent", tool_context.agent_name), trace.root)
+        trace.open[("tool", tool_context.function_call_id)] = self._start(
+            parent.trace_id, parent.span_id, f"tool {tool.name}",
+            {"agent.name": tool_context.agent_name, "tool.name": tool.name},
+        )
+        return None
+
+    async def after_tool_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: Dict[str, Any],
+        tool_context: ToolContext,
+        result: Dict,
+    ) -> None:
+        trace = self._traces.get(tool_context.invocation_id)
+        if trace is not None:
+            self._end_open(trace, ("tool", tool_context.function_call_id))
+        return None
+
+    async def on_tool_error_callback(
+        self,
+        *,
+        tool: BaseTool,
+        tool_args: Dict[str, Any],
+        tool_context: ToolContext,
+        error: Exception,
+    ) -> None:
+        trace = self._traces.get(tool_context.invocation_id)
+        if trace is not None:
+            self._end_open(
+                trace, ("tool", tool_context.function_call_id), STATUS_ERROR, type(error).__name__
+            )
+        return None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Exports every span finished so far."""
+        return self.processor.flush(timeout)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Flushes and stops the background exporter."""
+        self.processor.shutdown(timeout)
+
+    def _start(
+        self, trace_id: int, parent_id: Optional[int], name: str, attributes: Dict[str, Any]
+    ) -> Span:
+        return Span(
+            trace_id=trace_id,
+            span_id=random.getrandbits(64),
+            parent_id=parent_id,
+            name=name,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+        )
+
+    def _end(self, span: Span, status: int = STATUS_OK, message: str = "") -> None:
+        span.end_ns = time.time_ns()
+        span.status = status
+        span.status_message = message
+        self.processor.on_end(span)
+
+    def _end_trace(self, trace: _Trace, status: int = STATUS_OK, message: str = "") -> None:
+        for span in trace.open.values():
+            self._end(span, STATUS_ERROR, "unfinished")
+        self._end(trace.root, status, message)
+
+    def _end_open(
+        self, trace: _Trace, key: tuple, status: int = STATUS_OK, message: str = ""
+    ) -> None:
+        span = trace.open.pop(key, None)
+        if span is not None:
+            self._end(span, status, message)
+
+
+class OtlpCollector:
+    """A minimal in-process OTLP/HTTP JSON collector for tests and benchmarks.
+
+    Use it as a context manager; `endpoint` is the URL to export to and
+    `spans` holds every span received, in OTLP/JSON form.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.spans: List[Dict[str, Any]] = []
+        self.requests = 0
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                payload = json.loads(body or b"{}")
+                for resource in payload.get("resourceSpans", []):
+                    for scope in resource.get("scopeSpans", []):
+                        collector.spans.extend(scope.get("spans", []))
+                collector.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self.endpoint = f"http://{host}:{self._server.server_address[1]}/v1/traces"
+
+    def __enter__(self) -> "OtlpCollector":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
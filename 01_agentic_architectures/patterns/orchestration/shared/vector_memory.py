@@ -0,0 +1,451 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A memory service that searches embeddings instead of scanning keywords.
+
+`InMemoryMemoryService.search_memory` splits every stored event into words
+on every query, and returns every event sharing any word with it, unranked.
+Latency grows linearly with memory, and a common word matches half of it.
+
+`VectorMemoryService` is a drop-in replacement. Each user's memories are
+embedded once, on ingestion, into one contiguous float32 NumPy matrix, which
+doubles its capacity as it grows. A query is a single matrix-vector product
+followed by a partial sort, so search returns the `top_k` most similar
+memories, best first.
+
+Past `index_threshold` memories a user's matrix also gets an IVF index.
+Spherical k-means groups the rows into about sqrt(n) lists, and a query
+scores only the `n_probe` lists whose centroids are closest. Rows are
+stored grouped by list, so each probed list is scored in place, as one
+slice of the matrix. The index is rebuilt in a worker thread when the
+memory has doubled since the last build. Rows added in between join the list of their closest centroid, so
+nothing is missed while a build runs.
+
+Embeddings come from any callable mapping a list of texts to an
+`(n, dim)` array. `HashingEmbedder` is a local, deterministic default:
+feature-hashed words, no model or network needed. Pass a
+real embedding model for semantic recall.
+
+NumPy is an optional dependency. `create_memory_service()` returns a
+`VectorMemoryService` when it is installed and the stock
+`InMemoryMemoryService` otherwise, or whichever `MEMORY_BACKEND`
+(`vector`, `keyword` or `persistent`, see `shared/persistent_memory.py`)
+asks for.
+
+Sample:
+```python
+memory_service = VectorMemoryService(top_k=5)
+await memory_service.add_session_to_memory(session)
+response = await memory_service.search_memory(
+    app_name="support", user_id="alice", query="printer driver crash"
+)
+```
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from google.adk.events.event import Event
+from google.adk.memory import InMemoryMemoryService
+from google.adk.memory.base_memory_service import BaseMemoryService, SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.sessions.session import Session
+from google.genai import types
+
+from shared.metrics_registry import MetricsRegistry
+from shared.metrics_registry import registry as default_registry
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SEARCH_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+Embedder = Callable[[Sequence[str]], "np.ndarray"]
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have i in is it its me my of on or our so"
+    " that the their them they this to was we were what when which who will with you your".split()
+)
+_KMEANS_ITERATIONS = 8
+_KMEANS_SAMPLE_PER_LIST = 64
+_ASSIGN_BATCH = 65_536
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embeddings by feature hashing.
+
+    Words are hashed into `dim` signed buckets, and each vector is
+    L2-normalized, so a dot product is a cosine similarity. The same text
+    always gets the same vector, in every process.
+
+    Args:
+        dim: Embedding dimension.
+        pairs: Also hash adjacent word pairs. This captures phrases, but at
+            small `dim` the extra collisions cost more precision than it gains.
+    """
+
+    def __init__(self, dim: int = 256, pairs: bool = False) -> None:
+        _require_numpy()
+        self.dim = dim
+        self.pairs = pairs
+        self._slots: Dict[str, Tuple[int, float]] = {}
+
+    def __call__(self, texts: Sequence[str]) -> "np.ndarray":
+        cells: List[int] = []
+        signs: List[float] = []
+        for row, text in enumerate(texts):
+            words = [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])] if self.pairs else words
+            base = row * self.dim
+            for feature in features:
+                slot = self._slots.get(feature) or self._slot(feature)
+                cells.append(base + slot[0])
+                signs.append(slot[1])
+        vectors = np.bincount(cells, weights=signs, minlength=len(texts) * self.dim)
+        vectors = vectors.reshape(len(texts), self.dim).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _slot(self, feature: str) -> Tuple[int, float]:
+        if len(self._slots) >= 1_000_000:
+            self._slots.clear()
+        value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+        slot = self._slots[feature] = (value % self.dim, 1.0 if value >> 63 else -1.0)
+        return slot
+
+
+@dataclass
+class VectorMemoryStats:
+    """Counters for `VectorMemoryService`.
+
+    Attributes:
+        memories: Memories stored, over all users.
+        searches: Searches served.
+        indexed_searches: Searches that went through an IVF index.
+        index_builds: IVF indexes built.
+        rows_scored: Rows scored, over all searches.
+    """
+
+    memories: int = 0
+    searches: int = 0
+    indexed_searches: int = 0
+    index_builds: int = 0
+    rows_scored: int = 0
+
+
+class _IvfIndex:
+    """Inverted lists over the first `size` rows of a partition's matrix.
+
+    The partition stores those rows grouped by list, so list `i` is the
+    contiguous range `offsets[i]:offsets[i + 1]` and scoring it is a slice.
+    """
+
+    def __init__(self, vectors: "np.ndarray", n_lists: int, seed: int = 0) -> None:
+        rng = np.random.default_rng(seed)
+        size = len(vectors)
+        sample = vectors[np.sort(rng.choice(size, min(size, n_lists * _KMEANS_SAMPLE_PER_LIST), replace=False))]
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(_KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind="stable")
+            counts = np.bincount(assignment, minlength=n_lists)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            present = counts > 0
+            sums = np.add.reduceat(sample[order], starts[present], axis=0)
+            centroids[present] = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+        self.size = size
+        self.centroids = centroids
+        assignment = self.assign(vectors)
+        # Row `order[j]` of the unordered matrix becomes row `j`.
+        self.order = np.argsort(assignment, kind="stable")
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=n_lists))))
+
+    def assign(self, vectors: "np.ndarray") -> "np.ndarray":
+        """Returns the list of each row: the index of its closest centroid."""
+        if not len(vectors):
+            return np.zeros(0, dtype=np.int32)
+        return np.concatenate([
+            np.argmax(vectors[start:start + _ASSIGN_BATCH] @ self.centroids.T, axis=1).astype(np.int32)
+            for start in range(0, len(vectors), _ASSIGN_BATCH)
+        ])
+
+    def probe(self, query: "np.ndarray", n_probe: int) -> "np.ndarray":
+        """Returns the `n_probe` lists closest to `query`."""
+        scores = self.centroids @ query
+        n_probe = min(n_probe, len(scores))
+        return np.argpartition(-scores, n_probe - 1)[:n_probe]
+
+
+class _Partition:
+    """One user's memories: a growable matrix and the entries behind its rows."""
+
+    def __init__(self, dim: int) -> None:
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.size = 0
+        # (author, role, text, timestamp) per row.
+        self.entries: List[Tuple[Optional[str], Optional[str], str, float]] = []
+        self.event_ids: Set[str] = set()
+        self.index: Optional[_IvfIndex] = None
+        # Lists of the rows added since the index was built.
+        self.tail_lists = np.zeros(0, dtype=np.int32)
+        self.building = False
+
+    def append(self, vectors: "np.ndarray", entries: list) -> None:
+        needed = self.size + len(vectors)
+        if needed > len(self.vectors):
+            grown = np.zeros((max(needed, 2 * len(self.vectors), 1024), self.vectors.shape[1]), np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        self.vectors[self.size:needed] = vectors
+        self.entries.extend(entries)
+        self.size = needed
+        if self.index is not None:
+            self.tail_lists = np.concatenate((self.tail_lists, self.index.assign(vectors)))
+
+    def build_index(self, size: int) -> Tuple[_IvfIndex, "np.ndarray", list]:
+        """Builds an index over the first `size` rows, and those rows regrouped by list.
+
+        Runs off the event loop; rows below `size` never change, so it needs no lock.
+        """
+        vectors, entries = self.vectors, self.entries
+        index = _IvfIndex(vectors[:size], max(2, int(math.sqrt(size))))
+        regrouped = np.empty_like(vectors)
+        np.take(vectors[:size], index.order, axis=0, out=regrouped[:size])
+        return index, regrouped, [entries[row] for row in index.order]
+
+    def set_index(self, index: _IvfIndex, regrouped: "np.ndarray", entries: list) -> None:
+        """Swaps in a built index; searches in flight keep the arrays they started with."""
+        if len(regrouped) < self.size:
+            grown = np.empty((len(self.vectors), self.vectors.shape[1]), np.float32)
+            grown[:index.size] = regrouped[:index.size]
+            regrouped = grown
+        regrouped[index.size:self.size] = self.vectors[index.size:self.size]
+        self.vectors = regrouped
+        self.entries = entries + self.entries[index.size:]
+        self.index = index
+        self.tail_lists = index.assign(self.vectors[index.size:self.size])
+
+
+class VectorMemoryService(BaseMemoryService):
+    """A memory service that ranks memories by embedding similarity.
+
+    Args:
+        embedder: Maps texts to an `(n, dim)` array. A `HashingEmbedder` of
+            `dim` dimensions by default.
+        dim: Embedding dimension of the default embedder.
+        top_k: Memories returned per search.
+        min_score: Memories scoring at or below this are not returned.
+        index_threshold: Memories a user needs before an IVF index is built.
+            Set to 0 to always search exactly.
+        n_probe: Inverted lists scored per indexed query. Higher is slower
+            and closer to exact; 0 scores every row even when indexed.
+        registry: Where metrics are exported; the process-wide registry by default.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        dim: int = 256,
+        top_k: int = 10,
+        min_score: float = 0.1,
+        index_threshold: int = 20_000,
+        n_probe: int = 32,
+        registry: Optional[MetricsRegistry] = None,
+    ) -> None:
+        _require_numpy()
+        self.embedder = embedder or HashingEmbedder(dim)
+        self.top_k = top_k
+        self.min_score = min_score
+        self.index_threshold = index_threshold
+        self.n_probe = n_probe
+        self.stats = VectorMemoryStats()
+        self._partitions: Dict[Tuple[str, str], _Partition] = {}
+        self._lock = threading.Lock()
+        registry = registry or default_registry
+        self._search_seconds = registry.histogram(
+            "adk_memory_search_seconds", "Memory search latency.", ["index"], buckets=SEARCH_BUCKETS
+        )
+        self._memories = registry.gauge("adk_memory_vectors", "Memories stored as vectors.").labels()
+
+    async def add_session_to_memory(self, session: Session) -> None:
+        """Embeds the session's text events not stored yet.
+
+        Sessions may be added again as they grow; events already stored are
+        recognized by id and skipped.
+        """
+        await self.add_events_to_memory(session, session.events)
+
+    async def add_events_to_memory(self, session: Session, events: Sequence[Event]) -> None:
+        """Embeds `events` of `session` not stored yet, e.g. the ones added since the last call."""
+        partition = self._partition(session.app_name, session.user_id)
+        with self._lock:
+            known = partition.event_ids
+            events = [event for event in events if event.id not in known and _text(event)]
+            known.update(event.id for event in events)
+        await self._add(
+            session.app_name,
+            session.user_id,
+            [(event.author, event.content.role, _text(event), event.timestamp) for event in events],
+        )
+
+    async def add_texts(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        texts: Sequence[str],
+        author: Optional[str] = "user",
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """Stores texts as memories directly, e.g. to seed a knowledge base."""
+        timestamp = time.time() if timestamp is None else timestamp
+        await self._add(app_name, user_id, [(author, "user", text, timestamp) for text in texts])
+
+    async def memory_version(self, *, app_name: str, user_id: str) -> int:
+        """Returns a value that changes whenever the user's memories change."""
+        with self._lock:
+            partition = self._partitions.get((app_name, user_id))
+            return 0 if partition is None else partition.size
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        started = time.perf_counter()
+        response = SearchMemoryResponse()
+        with self._lock:
+            partition = self._partitions.get((app_name, user_id))
+            if partition is None or partition.size == 0:
+                return response
+            vectors, size, entries = partition.vectors, partition.size, partition.entries
+            index, tail_lists = partition.index, partition.tail_lists
+        if self.n_probe <= 0:
+            index = None
+
+        query_vector = self.embedder([query])[0]
+        if index is not None:
+            probed = index.probe(query_vector, self.n_probe)
+            tail = np.flatnonzero(np.isin(tail_lists[:size - index.size], probed)) + index.size
+            bounds = [(index.offsets[i], index.offsets[i + 1]) for i in probed]
+            rows = np.concatenate([np.arange(start, end) for start, end in bounds] + [tail])
+            scores = np.concatenate(
+                [vectors[start:end] @ query_vector for start, end in bounds] + [vectors[tail] @ query_vector]
+            )
+        else:
+            rows = None
+            scores = vectors[:size] @ query_vector
+        top = _top_k(scores, self.top_k)
+
+        for position in top:
+            score = float(scores[position])
+            if score <= self.min_score:
+                break
+            author, role, text, timestamp = entries[rows[position] if rows is not None else position]
+            response.memories.append(MemoryEntry(
+                content=types.Content(role=role, parts=[types.Part(text=text)]),
+                author=author,
+                timestamp=datetime.fromtimestamp(timestamp).isoformat(),
+            ))
+
+        self.stats.searches += 1
+        self.stats.rows_scored += len(scores)
+        if index is not None:
+            self.stats.indexed_searches += 1
+        self._search_seconds.labels(index="ivf" if index is not None else "exact").observe(
+            time.perf_counter() - started
+        )
+        return response
+
+    async def _add(self, app_name: str, user_id: str, entries: list) -> None:
+        if not entries:
+            return
+        vectors = np.asarray(self.embedder([entry[2] for entry in entries]), dtype=np.float32)
+        partition = self._partition(app_name, user_id)
+        with self._lock:
+            partition.append(vectors, entries)
+            self.stats.memories += len(entries)
+            self._memories.set(self.stats.memories)
+            rebuild = (
+                self.index_threshold > 0
+                and partition.size >= self.index_threshold
+                and not partition.building
+                and (partition.index is None or partition.size >= 2 * partition.index.size)
+            )
+            if rebuild:
+                partition.building = True
+                size = partition.size
+        if rebuild:
+            try:
+                built = await asyncio.to_thread(partition.build_index, size)
+                with self._lock:
+                    partition.set_index(*built)
+                    self.stats.index_builds += 1
+            finally:
+                partition.building = False
+
+    def _partition(self, app_name: str, user_id: str) -> _Partition:
+        key = (app_name, user_id)
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is None:
+                dim = getattr(self.embedder, "dim", None) or len(self.embedder(["probe"])[0])
+                partition = self._partitions[key] = _Partition(dim)
+            return partition
+
+
+def create_memory_service() -> BaseMemoryService:
+    """Returns the memory service the patterns use.
+
+    `MEMORY_BACKEND=vector` or `keyword` picks `VectorMemoryService` or the
+    stock `InMemoryMemoryService`. `persistent` picks a
+    `PersistentMemoryService` in the `MEMORY_PATH` directory
+    (`.adk_memory` by default). By default it is the vector service when
+    NumPy is installed.
+    """
+    backend = os.environ.get("MEMORY_BACKEND", "vector" if np is not None else "keyword")
+    if backend == "keyword":
+        return InMemoryMemoryService()
+    if backend == "persistent":
+        from shared.persistent_memory import PersistentMemoryService
+
+        return PersistentMemoryService(os.environ.get("MEMORY_PATH", ".adk_memory"))
+    return VectorMemoryService()
+
+
+def _top_k(scores: "np.ndarray", k: int) -> "np.ndarray":
+    if len(scores) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def _text(event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    return " ".join(part.text for part in event.content.parts if part.text)
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("VectorMemoryService needs NumPy: pip install numpy")
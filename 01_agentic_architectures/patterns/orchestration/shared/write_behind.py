@@ -0,0 +1,339 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Write-behind session persistence with selectable durability.
+
+With a database-backed session service, every event a turn produces (the user
+message, each tool call and response, each state update from a tool such as
+`add_item_to_cart`) waits for its own database write before the agent can
+continue. `WriteBehindSessionService` wraps any session service and
+acknowledges appends in memory; a background task writes them to the wrapped
+service in batches, session by session and in order.
+
+The durability level chooses when an append is known to be persisted:
+
+* `"event"`: `append_event` returns once the event is written. Appends from
+  concurrent sessions are still batched together.
+* `"turn"`: events are written before the turn returns to the caller. This
+  needs `service.turn_plugin()` in the runner's plugins; without it, turns
+  fall back to the timer, so it is never the default. Choose it only where
+  the runner is built with the plugin (not under `adk run` or `adk web`).
+* `"timer"`: events are written at most `flush_interval` seconds after the
+  append. A crash loses at most that window.
+
+Reads see their own writes: `get_session` overlays the events still waiting
+to be written on what the wrapped service returns. After a crash, the wrapped
+store holds a prefix of each session's events (whole turns, with "turn" or
+"event" durability), never a reordering.
+
+Each session's bookkeeping (pending events, last update time, the wrapped
+service's copy) is kept for the `max_sessions` most recently used sessions;
+sessions with nothing pending are dropped beyond that, and reload on their
+next append.
+
+Sample:
+```python
+session_service = WriteBehindSessionService(create_session_service(db_url), durability="turn")
+runner = Runner(
+    agent=root_agent,
+    app_name="app",
+    session_service=session_service,
+    plugins=[session_service.turn_plugin()],
+)
+```
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events.event import Event
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from google.adk.sessions.session import Session
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_LEVELS = ("event", "turn", "timer")
+
+_Key = Tuple[str, str, str]
+
+
+@dataclass
+class WriteBehindStats:
+    """Counters for the write-behind queue."""
+
+    appended: int = 0
+    written: int = 0
+    flushes: int = 0
+    flush_errors: int = 0
+    max_pending: int = 0
+
+
+class _SessionLog:
+    """Events of one session acknowledged but not yet written."""
+
+    def __init__(self, update_time: float) -> None:
+        self.pending: List[Event] = []
+        self.update_time = update_time
+        # The wrapped service's copy of the session, used only for writing.
+        self.shadow: Optional[Session] = None
+        self.lock = asyncio.Lock()
+
+
+class WriteBehindSessionService(BaseSessionService):
+    """Acknowledges session writes in memory and persists them in the background.
+
+    Args:
+        inner: The session service that stores sessions durably.
+        durability: "event", "turn" or "timer"; see the module docstring.
+        flush_interval: Seconds between background flushes.
+        max_pending: Pending events across all sessions before `append_event`
+            waits for a flush, so memory stays bounded if the store falls behind.
+        max_sessions: Sessions whose bookkeeping is kept once flushed, least
+            recently used dropped first.
+    """
+
+    def __init__(
+        self,
+        inner: BaseSessionService,
+        durability: str = "event",
+        flush_interval: float = 0.05,
+        max_pending: int = 10_000,
+        max_sessions: int = 10_000,
+    ) -> None:
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"durability must be one of {DURABILITY_LEVELS}, not {durability!r}")
+        self.inner = inner
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_sessions = max_sessions
+        self.stats = WriteBehindStats()
+        self._logs: "OrderedDict[_Key, _SessionLog]" = OrderedDict()
+        self._dirty: Set[_Key] = set()
+        self._pending = 0
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = await self.inner.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        log = self._log(_key(session), session.last_update_time)
+        log.shadow = session.model_copy(deep=True)
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        log = self._logs.get((app_name, user_id, session_id))
+        # Snapshot before reading: an event written while the read runs is
+        # then either in the snapshot or in what the read returns (or both).
+        pending = list(log.pending) if log else []
+        session = await self.inner.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is None or log is None:
+            return session
+        stored = {event.id for event in session.events}
+        for event in pending:
+            if event.id not in stored:
+                self._update_session_state(session, event)
+                session.events.append(event)
+        if config and config.num_recent_events:
+            session.events = session.events[-config.num_recent_events:]
+        session.last_update_time = max(session.last_update_time, log.update_time)
+        return session
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: Optional[str] = None
+    ) -> ListSessionsResponse:
+        # Listed state reflects written events only.
+        return await self.inner.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        key = (app_name, user_id, session_id)
+        log = self._logs.pop(key, None)
+        if log is not None:
+            async with log.lock:
+                self._pending -= len(log.pending)
+                log.pending.clear()
+        self._dirty.discard(key)
+        await self.inner.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = self._trim_temp_delta_state(event)
+        key = _key(session)
+        log = self._log(key, session.last_update_time)
+        if session.last_update_time < log.update_time:
+            raise ValueError(
+                f"Session {session.id} was updated at {log.update_time}, after the"
+                f" copy being appended to ({session.last_update_time}). Reload it"
+                " with get_session()."
+            )
+        log.pending.append(event)
+        log.update_time = max(time.time(), log.update_time)
+        session.last_update_time = log.update_time
+        self._dirty.add(key)
+        self._pending += 1
+        self.stats.appended += 1
+        self.stats.max_pending = max(self.stats.max_pending, self._pending)
+        await super().append_event(session=session, event=event)
+
+        self._ensure_flusher()
+        if self.durability == "event":
+            await self._flush_session(key)
+        elif self._pending > self.max_pending:
+            await self.flush()
+        return event
+
+    async def flush(self, session: Optional[Session] = None) -> None:
+        """Writes pending events of `session`, or of every session, and waits.
+
+        Raises the first error from the wrapped service; the events that
+        failed stay pending and are retried by the next flush.
+        """
+        keys = [_key(session)] if session is not None else list(self._dirty)
+        results = await asyncio.gather(
+            *(self._flush_session(key) for key in keys), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def aclose(self) -> None:
+        """Stops the background flusher and writes everything pending."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    def turn_plugin(self) -> BasePlugin:
+        """Returns a plugin that writes a session's events before its turn ends."""
+        return FlushOnTurnEndPlugin(self)
+
+    def _log(self, key: _Key, update_time: float) -> _SessionLog:
+        log = self._logs.get(key)
+        if log is None:
+            log = self._logs[key] = _SessionLog(update_time)
+            self._evict()
+        else:
+            self._logs.move_to_end(key)
+        return log
+
+    def _evict(self) -> None:
+        """Drops the least recently used sessions that have nothing left to write."""
+        excess = len(self._logs) - self.max_sessions
+        if excess <= 0:
+            return
+        idle = []
+        for key, log in self._logs.items():
+            if not log.pending and not log.lock.locked():
+                idle.append(key)
+                if len(idle) == excess:
+                    break
+        for key in idle:
+            del self._logs[key]
+
+    def _ensure_flusher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._flusher is None or self._flusher.done() or self._flusher.get_loop() is not loop:
+            self._flusher = loop.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self._dirty:
+                continue
+            try:
+                # Shielded so that `aclose()` cancelling this task never
+                # interrupts a write whose commit is already under way.
+                await asyncio.shield(self.flush())
+            except Exception as e:
+                logger.warning("Write-behind flush failed; will retry: %r", e)
+
+    async def _flush_session(self, key: _Key) -> None:
+        log = self._logs.get(key)
+        if log is None:
+            return
+        async with log.lock:
+            while log.pending:
+                batch = list(log.pending)
+                if log.shadow is None:
+                    log.shadow = await self.inner.get_session(
+                        app_name=key[0],
+                        user_id=key[1],
+                        session_id=key[2],
+                        config=GetSessionConfig(num_recent_events=1),
+                    )
+                    if log.shadow is None:
+                        raise ValueError(f"Session {key[2]} not found.")
+                written = 0
+                try:
+                    for event in batch:
+                        await self.inner.append_event(log.shadow, event)
+                        written += 1
+                except Exception:
+                    self.stats.flush_errors += 1
+                    # Reload the wrapped service's copy before retrying.
+                    log.shadow = None
+                    raise
+                finally:
+                    del log.pending[:written]
+                    self._pending -= written
+                    self.stats.written += written
+                    if log.shadow is not None:
+                        log.shadow.events.clear()
+                self.stats.flushes += 1
+            self._dirty.discard(key)
+        self._evict()
+
+
+class FlushOnTurnEndPlugin(BasePlugin):
+    """Makes "turn" durability hold: flushes the session when a run ends."""
+
+    def __init__(self, service: WriteBehindSessionService) -> None:
+        super().__init__(name="write_behind_flush_plugin")
+        self.service = service
+
+    async def after_run_callback(self, *, invocation_context: InvocationContext) -> None:
+        if self.service.durability == "turn":
+            await self.service.flush(invocation_context.session)
+        return None
+
+
+def _key(session: Session) -> _Key:
+    return (session.app_name, session.user_id, session.id)
@@ -0,0 +1,22 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Puts the orchestration directory on `sys.path`, so tests import `shared.*`."""
+
+import os
+import sys
+
+ORCHESTRATION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ORCHESTRATION_DIR not in sys.path:
+    sys.path.insert(0, ORCHESTRATION_DIR)
@@ -0,0 +1,80 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for `shared/hedging.py`."""
+
+import asyncio
+from typing import List
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+from shared.hedging import HedgedModel, HedgePolicy
+from shared.offline_model import OfflineModel
+
+
+class ScriptedModel(OfflineModel):
+    """Answers each call after the next of `delays`, in seconds."""
+
+    delays: List[float]
+    fail: bool = False
+
+    _next: int = PrivateAttr(default=0)
+
+    async def generate_content_async(self, llm_request, stream=False):
+        delay = self.delays[self._next]
+        self._next += 1
+        await asyncio.sleep(delay)
+        if self.fail:
+            raise ConnectionError("backend unavailable")
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=f"after {delay}")]))
+
+
+def call(model: HedgedModel) -> str:
+    async def run():
+        request = LlmRequest(model=model.model, contents=[
+            types.Content(role="user", parts=[types.Part(text="Research the topic.")])
+        ])
+        return [response async for response in model.generate_content_async(request)]
+
+    return asyncio.run(run())[0].content.parts[0].text
+
+
+def test_hedge_winner_latency_is_measured_from_the_original_request():
+    # The first call primes the window; the second stalls and is hedged at 0.1 s.
+    inner = ScriptedModel(delays=[0.1, 5.0, 0.01])
+    model = HedgedModel.wrap(inner, HedgePolicy(percentile=50, min_samples=1))
+    call(model)
+    assert call(model) == "after 0.01"
+    assert model.stats.hedge_wins == 1
+    samples = model._latencies()._samples
+    assert len(samples) == 2
+    # The caller waited for the hedge delay plus the duplicate, not just the duplicate.
+    assert samples[1] >= 0.1
+    assert model.hedge_delay() >= 0.1
+
+
+def test_failed_calls_do_not_shrink_the_hedge_delay():
+    inner = ScriptedModel(delays=[0.2] + [0.0] * 10)
+    model = HedgedModel.wrap(inner, HedgePolicy(percentile=50, min_samples=1))
+    call(model)
+    inner.fail = True
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            call(model)
+    assert len(model._latencies()) == 1
+    assert model.hedge_delay() >= 0.2
@@ -0,0 +1,111 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the `MetricsPlugin` of `16_metrics_and_monitoring`."""
+
+import asyncio
+import importlib
+from types import SimpleNamespace
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.models.llm_request import LlmRequest
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from shared.metrics_registry import MetricsRegistry
+from shared.offline_model import OfflineModel
+from shared.response_cache import ResponseCachePlugin
+
+
+class FailingModel(OfflineModel):
+    """An `OfflineModel` whose calls raise."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        raise ConnectionError("model unavailable")
+        yield
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "metrics-plugin-test")
+    return importlib.import_module("16_metrics_and_monitoring.agent")
+
+
+def in_flight(plugin, model: str = "gemini-2.5-flash-lite") -> float:
+    return plugin._model_in_flight.labels(model=model).value
+
+
+def ask(runner: InMemoryRunner) -> None:
+    async def run():
+        session = await runner.session_service.create_session(app_name=runner.app_name, user_id="user")
+        message = types.Content(role="user", parts=[types.Part(text="Is A123 in stock?")])
+        async for _ in runner.run_async(user_id="user", session_id=session.id, new_message=message):
+            pass
+
+    asyncio.run(run())
+
+
+def test_agent_runs_are_timed(metrics):
+    plugin = metrics.MetricsPlugin(MetricsRegistry())
+    agent = LlmAgent(name="inventory", model=OfflineModel(), tools=[metrics.check_inventory])
+    runner = InMemoryRunner(agent=agent, plugins=[plugin])
+    ask(runner)
+    assert plugin.latency_summary()["agent"]["inventory"]["count"] == 1
+    assert not plugin._agent_starts
+
+
+def test_agents_that_raise_do_not_grow_the_start_times(metrics, monkeypatch):
+    monkeypatch.setattr(metrics, "MAX_AGENTS_IN_FLIGHT", 3)
+    plugin = metrics.MetricsPlugin(MetricsRegistry())
+    runner = InMemoryRunner(agent=LlmAgent(name="inventory", model=FailingModel()), plugins=[plugin])
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            ask(runner)
+    assert plugin.agent_run_count == 5
+    assert len(plugin._agent_starts) == 3
+    assert not plugin._model_calls
+    assert in_flight(plugin) == 0
+
+
+def test_in_flight_model_calls_are_bounded(metrics, monkeypatch):
+    monkeypatch.setattr(metrics, "MAX_AGENTS_IN_FLIGHT", 3)
+    plugin = metrics.MetricsPlugin(MetricsRegistry())
+
+    async def start(index):
+        # Calls whose run raised before any after or error callback.
+        context = SimpleNamespace(invocation_id=f"inv-{index}", agent_name="inventory")
+        await plugin.before_model_callback(
+            callback_context=context, llm_request=LlmRequest(model="gemini-2.5-flash-lite")
+        )
+
+    for index in range(5):
+        asyncio.run(start(index))
+    assert list(plugin._model_calls) == [(f"inv-{index}", "inventory") for index in range(2, 5)]
+    assert in_flight(plugin) == 3
+
+
+def test_short_circuited_model_calls_leave_the_in_flight_gauge(metrics):
+    plugin = metrics.MetricsPlugin(MetricsRegistry())
+    model = OfflineModel(call_tools=False)
+    # The second run is answered by the cache, so `after_model_callback` never runs.
+    runner = InMemoryRunner(
+        agent=LlmAgent(name="inventory", model=model), plugins=[plugin, ResponseCachePlugin()]
+    )
+    ask(runner)
+    ask(runner)
+    assert model.call_count == 1
+    assert plugin.model_request_count == 2
+    assert not plugin._model_calls
+    assert in_flight(plugin) == 0
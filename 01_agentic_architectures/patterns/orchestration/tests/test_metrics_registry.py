@@ -0,0 +1,36 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Tests for `shared/metrics_registry.py`."""
+
+import math
+
+from shared.metrics_registry import MetricsRegistry
+
+
+def test_non_finite_values_render_as_openmetrics_specials():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("adk_ratio", "A ratio that can be undefined.", ["kind"])
+    gauge.labels(kind="nan").set(math.nan)
+    gauge.labels(kind="high").set(math.inf)
+    gauge.labels(kind="low").set(-math.inf)
+    registry.counter("adk_tokens", "Tokens seen.").labels().inc(math.inf)
+    registry.histogram("adk_seconds", "Durations.").labels().observe(math.inf)
+    lines = registry.render().splitlines()
+    assert 'adk_ratio{kind="nan"} NaN' in lines
+    assert 'adk_ratio{kind="high"} +Inf' in lines
+    assert 'adk_ratio{kind="low"} -Inf' in lines
+    assert "adk_tokens_total +Inf" in lines
+    assert "adk_seconds_sum +Inf" in lines
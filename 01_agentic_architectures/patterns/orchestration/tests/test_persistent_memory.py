@@ -0,0 +1,40 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Tests for `shared/persistent_memory.py`."""
+
+import asyncio
+
+from shared.persistent_memory import PersistentMemoryService
+
+APP_NAME = "persistent_memory_test"
+
+
+def test_mappings_are_bounded(tmp_path):
+    store = PersistentMemoryService(str(tmp_path), max_mappings=3)
+
+    async def run():
+        for index in range(5):
+            user_id = f"user-{index}"
+            await store.add_texts(app_name=APP_NAME, user_id=user_id, texts=[f"{user_id} likes tea"])
+            await store.search_memory(app_name=APP_NAME, user_id=user_id, query="tea")
+        # A search maps the partition again after its mapping was dropped.
+        return await store.search_memory(app_name=APP_NAME, user_id="user-0", query="tea")
+
+    response = asyncio.run(run())
+    assert [memory.content.parts[0].text for memory in response.memories] == ["user-0 likes tea"]
+    assert len(store._mappings) == 3
+    assert (store.stats.maps, store.stats.unmaps) == (6, 3)
+    store.close()
@@ -0,0 +1,122 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for `shared/response_cache.py`."""
+
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from shared import response_cache
+from shared.offline_model import OfflineModel
+from shared.response_cache import ResponseCachePlugin
+
+
+class FailingModel(OfflineModel):
+    """An `OfflineModel` whose calls raise."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        raise ConnectionError("model unavailable")
+        yield
+
+
+def ask(runner: InMemoryRunner, text: str) -> None:
+    async def run():
+        session = await runner.session_service.create_session(app_name=runner.app_name, user_id="user")
+        message = types.Content(role="user", parts=[types.Part(text=text)])
+        async for _ in runner.run_async(user_id="user", session_id=session.id, new_message=message):
+            pass
+
+    asyncio.run(run())
+
+
+def test_repeated_request_is_served_from_cache():
+    cache = ResponseCachePlugin()
+    model = OfflineModel()
+    runner = InMemoryRunner(agent=LlmAgent(name="judge", model=model), plugins=[cache])
+    ask(runner, "Rate this answer.")
+    ask(runner, "Rate this answer.")
+    assert model.call_count == 1
+    assert (cache.stats.misses, cache.stats.hits, cache.stats.stores) == (1, 1, 1)
+    assert not cache._pending
+
+
+def test_model_error_is_not_cached_or_kept_pending():
+    cache = ResponseCachePlugin()
+    runner = InMemoryRunner(agent=LlmAgent(name="judge", model=FailingModel()), plugins=[cache])
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            ask(runner, "Rate this answer.")
+    assert cache.stats.misses == 3
+    assert cache.stats.stores == 0
+    assert not cache._pending
+
+
+def test_pending_requests_are_bounded(monkeypatch):
+    monkeypatch.setattr(response_cache, "_MAX_PENDING", 5)
+    cache = ResponseCachePlugin()
+
+    async def miss(index):
+        # Calls whose response never arrives, e.g. cancelled invocations.
+        context = SimpleNamespace(invocation_id=f"inv-{index}", agent_name="judge")
+        request = LlmRequest(model="gemini-2.5-flash-lite", contents=[
+            types.Content(role="user", parts=[types.Part(text=f"Rate answer {index}.")])
+        ])
+        await cache.before_model_callback(callback_context=context, llm_request=request)
+
+    for index in range(8):
+        asyncio.run(miss(index))
+    assert list(cache._pending) == [(f"inv-{index}", "judge") for index in range(3, 8)]
+
+
+def test_locked_disk_tier_does_not_block_the_event_loop(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    cache = ResponseCachePlugin(disk_path=path)
+    other = sqlite3.connect(path, isolation_level=None)
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(None)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        context = SimpleNamespace(invocation_id="inv", agent_name="judge")
+        request = LlmRequest(model="gemini-2.5-flash-lite", contents=[
+            types.Content(role="user", parts=[types.Part(text="Rate this answer.")])
+        ])
+        await cache.before_model_callback(callback_context=context, llm_request=request)
+        # Another process holds the file's write lock; the store waits for it on a worker thread.
+        other.execute("BEGIN IMMEDIATE")
+        ticker = asyncio.create_task(tick())
+        response = LlmResponse(content=types.Content(role="model", parts=[types.Part(text="7/10")]))
+        store = asyncio.create_task(cache.after_model_callback(callback_context=context, llm_response=response))
+        await asyncio.sleep(0.3)
+        waited = len(ticks)
+        other.execute("COMMIT")
+        await store
+        ticker.cancel()
+        return waited
+
+    assert asyncio.run(run()) >= 10
+    assert cache.stats.stores == 1
+    other.close()
+    cache.disk.close()
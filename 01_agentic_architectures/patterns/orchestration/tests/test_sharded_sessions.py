@@ -0,0 +1,206 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Resharding tests for `shared/sharded_sessions.py`."""
+
+import asyncio
+import time
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.runners import Runner
+from google.genai import types
+
+from shared.sharded_sessions import (
+    HashRing,
+    ShardedSessionService,
+    ShardLayoutError,
+    migrate_sqlite_shards,
+)
+from shared.sqlite_sessions import SqliteSessionService, create_session_service
+
+APP_NAME = "sharded_sessions_test"
+
+# Session, invocation and state delta of each event, in order. `user:lang` is
+# shared by both sessions, and its latest value was written by `second`.
+SCRIPT = [
+    ("first", "inv-0", {"turn": 0, "user:lang": "en"}),
+    ("second", "inv-1", {"step": 1, "user:lang": "fr"}),
+    ("first", "inv-2", {"turn": 1, "app:flag": True}),
+    ("first", "inv-3", {"turn": 2, "cart": ["pen"]}),
+    ("second", "inv-4", {"step": 2}),
+]
+
+
+def moving_user() -> str:
+    """A user that `shard0` owns alone and `shard1` owns once it is added."""
+    ring = HashRing(["shard0", "shard1"])
+    return next(
+        f"user-{index}" for index in range(100) if ring.route(APP_NAME, f"user-{index}") == "shard1"
+    )
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def without_app_state(state):
+    return {key: value for key, value in state.items() if not key.startswith("app:")}
+
+
+async def populate(service, user_id):
+    sessions = {
+        "first": await service.create_session(
+            app_name=APP_NAME, user_id=user_id, state={"topic": "stationery"}, session_id="first"
+        ),
+        "second": await service.create_session(app_name=APP_NAME, user_id=user_id, session_id="second"),
+    }
+    for name, invocation_id, delta in SCRIPT:
+        await service.append_event(sessions[name], Event(
+            author="user",
+            invocation_id=invocation_id,
+            content=types.Content(role="user", parts=[types.Part(text=invocation_id)]),
+            actions=EventActions(state_delta=delta),
+        ))
+    return sessions
+
+
+async def load(service, user_id, session_id):
+    return await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+
+
+def test_reshard_keeps_history_and_state(path):
+    service = ShardedSessionService(ShardedSessionService.sqlite_shards(path, 1))
+    user_id = moving_user()
+
+    async def run():
+        await populate(service, user_id)
+        before = {name: await load(service, user_id, name) for name in ("first", "second")}
+        await service.reshard(ShardedSessionService.sqlite_shards(path, 2), [APP_NAME])
+        return before, {name: await load(service, user_id, name) for name in before}
+
+    before, after = asyncio.run(run())
+    assert service.stats.sessions_moved == 2
+    for name in before:
+        assert after[name].state == without_app_state(before[name].state)
+        assert [event.id for event in after[name].events] == [event.id for event in before[name].events]
+        assert [event.actions.state_delta for event in after[name].events] == [
+            without_app_state(event.actions.state_delta) for event in before[name].events
+        ]
+    assert after["first"].state["user:lang"] == after["second"].state["user:lang"] == "fr"
+    assert after["first"].state["topic"] == "stationery"
+    service.close()
+
+
+def test_moved_session_can_be_rewound(path):
+    service = ShardedSessionService(ShardedSessionService.sqlite_shards(path, 1))
+    user_id = moving_user()
+    runner = Runner(
+        app_name=APP_NAME, agent=LlmAgent(name="assistant", model="gemini-2.0-flash"),
+        session_service=service,
+    )
+
+    async def run():
+        await populate(service, user_id)
+        await service.reshard(ShardedSessionService.sqlite_shards(path, 2), [APP_NAME])
+        await runner.rewind_async(user_id=user_id, session_id="first", rewind_before_invocation_id="inv-2")
+        return await load(service, user_id, "first")
+
+    state = asyncio.run(run()).state
+    assert state["turn"] == 0
+    # ADK's rewind sets keys written after the rewind point to None.
+    assert state["cart"] is None
+    service.close()
+
+
+def test_moved_sessions_are_forgotten_after_the_grace_period(path):
+    service = ShardedSessionService(ShardedSessionService.sqlite_shards(path, 1), moved_grace=0.2)
+    user_id = moving_user()
+
+    async def append(session, text):
+        await service.append_event(session, Event(
+            author="user", invocation_id=text,
+            content=types.Content(role="user", parts=[types.Part(text=text)]),
+        ))
+
+    async def run():
+        held = (await populate(service, user_id))["second"]
+        await service.reshard(ShardedSessionService.sqlite_shards(path, 2), [APP_NAME])
+        # Loaded before the move, and still usable within the grace period.
+        await append(held, "inv-5")
+        assert len(service._moved_sessions) == 2
+        time.sleep(0.3)
+        await append(await load(service, user_id, "second"), "inv-6")
+        assert not service._moved_sessions
+        return await load(service, user_id, "second")
+
+    assert [event.invocation_id for event in asyncio.run(run()).events][-2:] == ["inv-5", "inv-6"]
+    service.close()
+
+
+def sqlite_url(path):
+    return f"sqlite:///{path}"
+
+
+def users_by_session(service):
+    async def run():
+        listed = await service.list_sessions(app_name=APP_NAME)
+        return sorted((session.user_id, session.id) for session in listed.sessions)
+
+    return asyncio.run(run())
+
+
+def test_sharding_an_unsharded_database_is_refused(path, monkeypatch):
+    service = SqliteSessionService(path)
+    asyncio.run(populate(service, "user-0"))
+    service.close()
+    monkeypatch.setenv("SESSION_SHARDS", "2")
+    with pytest.raises(ShardLayoutError, match="unsharded sessions"):
+        create_session_service(sqlite_url(path))
+
+
+def test_changing_the_shard_count_is_refused(path, monkeypatch):
+    ShardedSessionService.from_url(sqlite_url(path), shards=3).close()
+    with pytest.raises(ShardLayoutError, match="3 shard files, not 2"):
+        ShardedSessionService.from_url(sqlite_url(path), shards=2)
+    monkeypatch.delenv("SESSION_SHARDS", raising=False)
+    with pytest.raises(ShardLayoutError, match="3 shard files, not 1"):
+        create_session_service(sqlite_url(path))
+
+
+def test_migration_keeps_every_session(path, monkeypatch):
+    service = SqliteSessionService(path)
+    for index in range(6):
+        asyncio.run(populate(service, f"user-{index}"))
+    expected = users_by_session(service)
+    service.close()
+    for shards in (3, 2, 1):
+        asyncio.run(migrate_sqlite_shards(path, shards))
+        monkeypatch.setenv("SESSION_SHARDS", str(shards))
+        service = create_session_service(sqlite_url(path))
+        assert users_by_session(service) == expected
+        service.close()
+
+
+def test_online_reshard_updates_the_manifest(path):
+    service = ShardedSessionService.from_url(sqlite_url(path), shards=1)
+    asyncio.run(populate(service, moving_user()))
+    asyncio.run(service.reshard(ShardedSessionService.sqlite_shards(path, 2), [APP_NAME]))
+    service.close()
+    restarted = ShardedSessionService.from_url(sqlite_url(path), shards=2)
+    assert users_by_session(restarted) == [(moving_user(), "first"), (moving_user(), "second")]
+    restarted.close()
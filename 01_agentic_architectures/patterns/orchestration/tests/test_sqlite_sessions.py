@@ -0,0 +1,178 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for `shared/sqlite_sessions.py`."""
+
+import asyncio
+import importlib
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions, EventCompaction
+from google.adk.runners import Runner
+from google.genai import types
+
+from google.adk.sessions.base_session_service import GetSessionConfig
+
+from shared.sqlite_sessions import SqliteSessionService
+
+APP_NAME = "sqlite_sessions_test"
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = SqliteSessionService(str(tmp_path / "sessions.db"), snapshot_every=4)
+    yield service
+    service.close()
+
+
+def cart(size):
+    return [{"item": f"item number {index}", "quantity": index % 5 + 1} for index in range(size)]
+
+
+async def add_items(service, session, sizes):
+    for turn, size in enumerate(sizes):
+        await service.append_event(session, Event(
+            author="user",
+            invocation_id=f"inv-{turn}",
+            content=types.Content(role="user", parts=[types.Part(text="Add one more.")]),
+            actions=EventActions(state_delta={"cart": cart(size), "turn": turn}),
+        ))
+
+
+def text(event):
+    return event.content.parts[0].text if event.content else None
+
+
+async def compacted_session(service, turns=12, interval=4, overlap=1):
+    """A session compacted flatly every `interval` turns, each summary covering its own window."""
+    session = await service.create_session(app_name=APP_NAME, user_id="user")
+    start = 0
+    for turn in range(turns):
+        await service.append_event(session, Event(
+            author="user", timestamp=float(turn), content=types.Content(parts=[types.Part(text=f"e{turn}")])
+        ))
+        if (turn + 1) % interval == 0:
+            summary = f"C{(turn + 1) // interval}"
+            await service.append_event(session, Event(
+                author="user",
+                timestamp=turn + 0.5,
+                actions=EventActions(compaction=EventCompaction(
+                    start_timestamp=float(start),
+                    end_timestamp=float(turn),
+                    compacted_content=types.Content(role="model", parts=[types.Part(text=summary)]),
+                )),
+            ))
+            start = turn + 1 - overlap
+    return session
+
+
+async def load(service, session, **config):
+    loaded = await service.get_session(
+        app_name=APP_NAME, user_id="user", session_id=session.id,
+        config=GetSessionConfig(**config) if config else None,
+    )
+    older = [event async for event in service.older_events(loaded, page_size=2)]
+    return loaded, older
+
+
+def test_tail_load_keeps_every_summary(service):
+    async def run():
+        session = await compacted_session(service)
+        return await load(service, session), await load(service, session, after_timestamp=-1)
+
+    (tail, older), (full, _) = asyncio.run(run())
+    assert [text(event) or event.actions.compaction.compacted_content.parts[0].text
+            for event in tail.events] == ["C1", "e7", "C2", "e8", "e9", "e10", "e11", "C3"]
+    # The tail and the older pages together are the full session, each event once.
+    assert sorted(event.id for event in tail.events + older) == sorted(event.id for event in full.events)
+    assert [text(event) for event in older] == ["e6", "e5", "e4", "e3", "e2", "e1", "e0"]
+
+
+def test_tail_summaries_opts_into_the_latest_summary_only(tmp_path):
+    service = SqliteSessionService(str(tmp_path / "sessions.db"), tail_summaries=1)
+
+    async def run():
+        return await load(service, await compacted_session(service))
+
+    try:
+        tail, older = asyncio.run(run())
+    finally:
+        service.close()
+    assert [text(event) or event.actions.compaction.compacted_content.parts[0].text
+            for event in tail.events] == ["e7", "C2", "e8", "e9", "e10", "e11", "C3"]
+    assert len(tail.events) + len(older) == 15
+
+
+@pytest.mark.parametrize("shards", ["1", "2"])
+def test_summary_tree_pattern_loads_the_latest_summary_only(tmp_path, monkeypatch, shards):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GOOGLE_API_KEY", "sqlite-sessions-test")
+    monkeypatch.setenv("SESSION_SHARDS", shards)
+    service = importlib.import_module("09_context_compaction.agent")._build_session_service()
+    try:
+        stores = getattr(service, "shards", {"": service}).values()
+        assert [store.tail_summaries for store in stores] == [1] * len(stores)
+    finally:
+        service.close()
+
+
+def test_stored_events_keep_their_state_delta(service):
+    async def run():
+        session = await service.create_session(app_name=APP_NAME, user_id="user")
+        await add_items(service, session, [20, 21, 22, 21, 30])
+        loaded = await service.get_session(app_name=APP_NAME, user_id="user", session_id=session.id)
+        return session, loaded
+
+    session, loaded = asyncio.run(run())
+    assert loaded.state == {"cart": cart(30), "turn": 4}
+    assert [event.actions.state_delta for event in loaded.events] == [
+        event.actions.state_delta for event in session.events
+    ]
+
+
+def test_rewind_restores_earlier_state(service):
+    agent = LlmAgent(name="assistant", model="gemini-2.0-flash")
+    runner = Runner(app_name=APP_NAME, agent=agent, session_service=service)
+
+    async def run():
+        session = await service.create_session(app_name=APP_NAME, user_id="user")
+        await add_items(service, session, [20, 21, 22])
+        await runner.rewind_async(
+            user_id="user", session_id=session.id, rewind_before_invocation_id="inv-2"
+        )
+        return await service.get_session(app_name=APP_NAME, user_id="user", session_id=session.id)
+
+    assert asyncio.run(run()).state == {"cart": cart(21), "turn": 1}
+
+
+def test_state_survives_restart(tmp_path):
+    path = str(tmp_path / "sessions.db")
+
+    async def write():
+        service = SqliteSessionService(path, snapshot_every=3)
+        session = await service.create_session(app_name=APP_NAME, user_id="user", state={"turn": -1})
+        await add_items(service, session, range(10, 17))
+        service.close()
+        return session.id
+
+    async def read(session_id):
+        service = SqliteSessionService(path)
+        try:
+            return await service.get_session(app_name=APP_NAME, user_id="user", session_id=session_id)
+        finally:
+            service.close()
+
+    assert asyncio.run(read(asyncio.run(write()))).state == {"cart": cart(16), "turn": 6}
@@ -0,0 +1,121 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Round-trip tests for `shared/state_patch.py`."""
+
+import copy
+import json
+import random
+
+import pytest
+
+from shared.state_patch import apply, diff, diff_state
+
+ITEM = {"item": "apples", "quantity": 2}
+
+CASES = [
+    ({"a": 1}, {"a": 1}),
+    ([ITEM], [ITEM, {"item": "pears", "quantity": 1}]),
+    ([ITEM, {"item": "pears"}], [ITEM]),
+    ([1, 2, 3, 4], [1, 4]),
+    ([1, 2, 3], [1, 5, 3]),
+    ([1, 2, 3], [3, 2]),
+    ({"a": 1, "b": 2}, {"b": 3, "c": [4]}),
+    ({"a": {"b": {"c": 1}}}, {"a": {"b": {"c": 2, "d": None}}}),
+    ("text", ["now", "a", "list"]),
+    (None, {"a": 1}),
+    ([], []),
+    ({}, {"a": []}),
+]
+
+NESTED_TYPE_CHANGES = [
+    ({"a": 1}, {"a": True}),
+    ({"a": {"b": 0}}, {"a": {"b": False}}),
+    ([1, 2], [True, 2]),
+    ([[1]], [[True]]),
+    ({"a": [1.0]}, {"a": [1]}),
+    ([1, 2, 3], [1, 3.0]),
+]
+
+
+def roundtrip(old, new):
+    ops = diff(old, new)
+    # Ops must survive storage as JSON, and must not alias `old`.
+    patched = apply(copy.deepcopy(old), json.loads(json.dumps(ops)))
+    assert patched == new
+    assert json.dumps(patched, sort_keys=True) == json.dumps(new, sort_keys=True)
+    return ops
+
+
+@pytest.mark.parametrize("old, new", CASES)
+def test_diff_then_apply_reproduces_new(old, new):
+    roundtrip(old, new)
+
+
+def test_equal_values_need_no_ops():
+    assert diff({"cart": [ITEM]}, {"cart": [dict(ITEM)]}) == []
+
+
+def test_append_is_a_single_op():
+    assert diff([ITEM], [ITEM, ITEM]) == [["append", [], [ITEM]]]
+
+
+@pytest.mark.parametrize("old, new", NESTED_TYPE_CHANGES)
+def test_nested_type_changes_are_not_lost(old, new):
+    assert roundtrip(old, new)
+
+
+def test_top_level_type_change_is_a_set():
+    assert diff(1, True) == [["set", [], True]]
+
+
+def test_diff_state_patches_each_key():
+    state = {"cart": [ITEM], "user": "ada"}
+    delta = {"cart": [ITEM, ITEM], "count": 2}
+    ops = diff_state(state, delta)
+    assert ops == [["append", ["cart"], [ITEM]], ["set", ["count"], 2]]
+    assert apply(copy.deepcopy(state), ops) == {**state, **delta}
+
+
+def test_diff_state_sets_when_ops_are_larger_than_the_value():
+    ops = diff_state({"tags": ["a", "b", "c"]}, {"tags": ["x", "y", "z"]})
+    assert ops == [["set", ["tags"], ["x", "y", "z"]]]
+
+
+def test_random_documents_round_trip():
+    rng = random.Random(7)
+
+    def value(depth):
+        kind = rng.choice(["int", "bool", "float", "str", "none", "list", "dict"][: 7 if depth else 5])
+        if kind == "int":
+            return rng.randint(0, 2)
+        if kind == "bool":
+            return rng.random() < 0.5
+        if kind == "float":
+            return float(rng.randint(0, 2))
+        if kind == "str":
+            return rng.choice("abc")
+        if kind == "none":
+            return None
+        if kind == "list":
+            return [value(depth - 1) for _ in range(rng.randint(0, 4))]
+        return {rng.choice("pqrs"): value(depth - 1) for _ in range(rng.randint(0, 3))}
+
+    for _ in range(2000):
+        roundtrip(value(3), value(3))
+
+
+def test_apply_rejects_unknown_ops():
+    with pytest.raises(ValueError):
+        apply({"a": 1}, [["move", ["a"], 2]])
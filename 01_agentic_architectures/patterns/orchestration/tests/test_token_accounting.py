@@ -0,0 +1,92 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for `shared/token_accounting.py`."""
+
+import asyncio
+import importlib
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from shared.metrics_registry import MetricsRegistry
+from shared.offline_model import OfflineModel, use_offline_model
+from shared.token_accounting import COMPACTION_AGENT, TokenAccountingPlugin, TokenBudget
+from shared.token_compaction import TokenBudgetCompactionPlugin
+
+
+def run_turns(app: App, texts, session_id=None):
+    runner = Runner(app=app, session_service=InMemorySessionService())
+
+    async def run():
+        session = await runner.session_service.create_session(app_name=app.name, user_id="user")
+        events = []
+        for text in texts:
+            message = types.Content(role="user", parts=[types.Part(text=text)])
+            async for event in runner.run_async(user_id="user", session_id=session.id, new_message=message):
+                events.append(event)
+        session = await runner.session_service.get_session(
+            app_name=app.name, user_id="user", session_id=session.id
+        )
+        return session, events
+
+    return asyncio.run(run())
+
+
+def test_feedback_loop_past_its_budget_keeps_the_story(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "token-accounting-test")
+    module = importlib.import_module("04_feedback_loop.agent")
+    use_offline_model(module.root_agent, OfflineModel())
+    tokens = TokenAccountingPlugin(budget=TokenBudget(max_tokens_per_session=1), registry=MetricsRegistry())
+    app = App(name="04_feedback_loop", root_agent=module.root_agent, plugins=[tokens])
+
+    # The writer's call spends the budget; the loop's critic and refiner calls are refused.
+    session, events = run_turns(app, ["A story about a lighthouse."])
+    refusals = [event for event in events if event.error_code == "TOKEN_BUDGET_EXCEEDED"]
+    assert tokens.budget_rejections == len(refusals) == 4
+    assert all(event.content is None for event in refusals)
+    draft = next(event for event in events if event.author == "InitialWriterAgent")
+    assert session.state["current_story"] == draft.content.parts[0].text
+    assert "critique" not in session.state
+
+
+def test_session_totals_are_bounded():
+    tokens = TokenAccountingPlugin(max_sessions=2, max_agents=2, registry=MetricsRegistry())
+    metadata = types.GenerateContentResponseUsageMetadata(prompt_token_count=10, candidates_token_count=5)
+    for index in range(4):
+        tokens.record(metadata, model="gemini-2.5-flash", agent=f"agent-{index}", session_id=f"s{index}")
+    assert list(tokens.by_session) == ["s2", "s3"]
+    assert list(tokens.by_session_agent) == ["s2", "s3"]
+    assert list(tokens.by_agent) == ["agent-2", "agent-3"]
+    assert tokens.total.calls == 4
+
+
+def test_compaction_counts_against_the_session():
+    tokens = TokenAccountingPlugin(registry=MetricsRegistry())
+    model = OfflineModel(call_tools=False)
+    compaction = TokenBudgetCompactionPlugin(
+        summarizer=tokens.metered_summarizer(model), high_water_tokens=50, overlap_tokens=0,
+        registry=MetricsRegistry(),
+    )
+    agent = LlmAgent(name="assistant", model=model)
+    app = App(name="compaction_accounting", root_agent=agent, plugins=[tokens, compaction])
+    session, _ = run_turns(app, [f"Tell me about topic {index} in some detail." for index in range(4)])
+    assert compaction.stats.compactions
+    compacted = tokens.by_session_agent[session.id][COMPACTION_AGENT]
+    assert compacted.calls == compaction.stats.compactions
+    assert tokens.by_session[session.id].total_tokens == tokens.total.total_tokens
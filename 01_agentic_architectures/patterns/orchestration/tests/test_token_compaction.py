@@ -0,0 +1,55 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Tests for `shared/token_compaction.py`."""
+
+import asyncio
+from types import SimpleNamespace
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from shared.metrics_registry import MetricsRegistry
+from shared.token_compaction import TokenBudgetCompactionPlugin, estimate_content_tokens
+
+
+def test_tool_declarations_do_not_inflate_the_calibration():
+    plugin = TokenBudgetCompactionPlugin(registry=MetricsRegistry())
+    question = types.Content(role="user", parts=[types.Part(text="What is the price of GOOG?")])
+    declarations = [
+        types.FunctionDeclaration(name=f"lookup_{index}", description="Looks up a price. " * 20)
+        for index in range(10)
+    ]
+    request = LlmRequest(
+        model="gemini-2.5-flash",
+        contents=[question],
+        config=types.GenerateContentConfig(tools=[types.Tool(function_declarations=declarations)]),
+    )
+    tool_tokens = len(str(request.config.tools[0].model_dump(mode="json", exclude_none=True))) // 4
+
+    async def run():
+        context = SimpleNamespace(invocation_id="inv", agent_name="analyst")
+        await plugin.before_model_callback(callback_context=context, llm_request=request)
+        # The model counts the declarations as prompt tokens.
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=estimate_content_tokens(question) + tool_tokens
+        )
+        await plugin.after_model_callback(
+            callback_context=context, llm_response=LlmResponse(usage_metadata=usage)
+        )
+
+    asyncio.run(run())
+    assert 0.95 < plugin.stats.calibration < 1.05
@@ -0,0 +1,90 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for `shared/tracing.py`."""
+
+import asyncio
+from typing import List
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from shared.offline_model import OfflineModel
+from shared.tracing import STATUS_ERROR, STATUS_OK, Span, TracingPlugin
+
+
+class ListExporter:
+    """Keeps exported spans in memory."""
+
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]) -> None:
+        self.spans.extend(spans)
+
+    def shutdown(self) -> None:
+        pass
+
+
+class FailingModel(OfflineModel):
+    """An `OfflineModel` whose calls raise."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        raise ConnectionError("model unavailable")
+        yield
+
+
+def ask(runner: InMemoryRunner) -> None:
+    async def run():
+        session = await runner.session_service.create_session(app_name=runner.app_name, user_id="user")
+        message = types.Content(role="user", parts=[types.Part(text="Check order 42.")])
+        async for _ in runner.run_async(user_id="user", session_id=session.id, new_message=message):
+            pass
+
+    asyncio.run(run())
+
+
+def test_traces_of_failed_runs_are_ended_and_exported():
+    exporter = ListExporter()
+    tracing = TracingPlugin(exporter, max_traces=2)
+    failing = InMemoryRunner(agent=LlmAgent(name="orders", model=FailingModel()), plugins=[tracing])
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            ask(failing)
+    assert len(tracing._traces) == 2
+    assert tracing.stats.traces_evicted == 1
+    tracing.shutdown()
+
+    roots = [span for span in exporter.spans if span.name == "invocation"]
+    assert [(root.status, root.status_message) for root in roots] == [(STATUS_ERROR, "run did not finish")]
+    trace = {span.name: span for span in exporter.spans if span.trace_id == roots[0].trace_id}
+    assert (trace["agent orders"].status, trace["agent orders"].status_message) == (STATUS_ERROR, "unfinished")
+    model = trace[f"model {OfflineModel().model}"]
+    assert (model.status, model.status_message) == (STATUS_ERROR, "ConnectionError")
+    assert all(span.end_ns for span in trace.values())
+
+
+def test_finished_runs_end_their_root_span():
+    exporter = ListExporter()
+    tracing = TracingPlugin(exporter, max_traces=2)
+    runner = InMemoryRunner(agent=LlmAgent(name="orders", model=OfflineModel()), plugins=[tracing])
+    for _ in range(3):
+        ask(runner)
+    assert not tracing._traces
+    tracing.shutdown()
+    roots = [span for span in exporter.spans if span.name == "invocation"]
+    assert [root.status for root in roots] == [STATUS_OK] * 3
+    assert tracing.stats.traces_evicted == 0
@@ -0,0 +1,31 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Tests for `shared/vector_memory.py`."""
+
+import asyncio
+
+from shared.metrics_registry import MetricsRegistry
+from shared.vector_memory import VectorMemoryService
+
+
+def test_partitions_of_slashed_names_stay_apart():
+    memory = VectorMemoryService(registry=MetricsRegistry())
+
+    async def run():
+        await memory.add_texts(app_name="a/b", user_id="c", texts=["c keeps the spare key under the mat"])
+        return await memory.search_memory(app_name="a", user_id="b/c", query="spare key mat")
+
+    assert asyncio.run(run()).memories == []
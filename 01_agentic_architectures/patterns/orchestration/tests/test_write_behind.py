@@ -0,0 +1,169 @@
+# Copyright 2025 Emmanuel Awa
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Crash-recovery tests for `shared/write_behind.py`.
+
+A crash is simulated by abandoning the write-behind service without
+flushing it: its background flusher is cancelled and its pending events are
+dropped, and only what the wrapped `SqliteSessionService` committed is read
+back, through a new service on the same file.
+"""
+
+import asyncio
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.runners import Runner
+from google.genai import types
+
+from shared.offline_model import OfflineModel
+from shared.sqlite_sessions import SqliteSessionService
+from shared.write_behind import WriteBehindSessionService
+
+APP_NAME = "write_behind_test"
+
+
+def add_item(item: str) -> dict:
+    """Adds an item to the cart."""
+    return {"status": "success", "item": item}
+
+
+def crash(service: WriteBehindSessionService) -> None:
+    """Stops the service as a killed process would: nothing pending is written."""
+    if service._flusher is not None:
+        service._flusher.cancel()
+    service.inner.close()
+
+
+def persisted(path: str, session_id: str):
+    service = SqliteSessionService(path, tail_only=False)
+    try:
+        return asyncio.run(service.get_session(app_name=APP_NAME, user_id="user", session_id=session_id))
+    finally:
+        service.close()
+
+
+def ids(session):
+    return [event.id for event in session.events]
+
+
+async def append(service, session, count):
+    for index in range(count):
+        await service.append_event(session, Event(
+            author="user",
+            invocation_id=f"inv-{index}",
+            content=types.Content(role="user", parts=[types.Part(text=f"event {index}")]),
+            actions=EventActions(state_delta={"count": index}),
+        ))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def test_event_durability_persists_every_acknowledged_event(path):
+    # A long interval, so only the durability level can have written them.
+    service = WriteBehindSessionService(SqliteSessionService(path), durability="event", flush_interval=60)
+
+    async def run():
+        sessions = [await service.create_session(app_name=APP_NAME, user_id="user") for _ in range(4)]
+        await asyncio.gather(*(append(service, session, 10) for session in sessions))
+        acknowledged = [
+            await service.get_session(app_name=APP_NAME, user_id="user", session_id=session.id)
+            for session in sessions
+        ]
+        crash(service)
+        return acknowledged
+
+    for session in asyncio.run(run()):
+        stored = persisted(path, session.id)
+        assert ids(stored) == ids(session)
+        assert stored.state == {"count": 9}
+
+
+def run_turns(path, plugin, turns=3):
+    service = WriteBehindSessionService(SqliteSessionService(path), durability="turn", flush_interval=60)
+    agent = LlmAgent(name="cart", model=OfflineModel(), tools=[add_item])
+    runner = Runner(
+        app_name=APP_NAME, agent=agent, session_service=service,
+        plugins=[service.turn_plugin()] if plugin else [],
+    )
+
+    async def run():
+        session = await service.create_session(app_name=APP_NAME, user_id="user")
+        for turn in range(turns):
+            message = types.Content(role="user", parts=[types.Part(text=f"Add item {turn}.")])
+            async for _ in runner.run_async(user_id="user", session_id=session.id, new_message=message):
+                pass
+        acknowledged = await service.get_session(app_name=APP_NAME, user_id="user", session_id=session.id)
+        crash(service)
+        return acknowledged
+
+    acknowledged = asyncio.run(run())
+    return acknowledged, persisted(path, acknowledged.id)
+
+
+def test_turn_durability_persists_every_finished_turn(path):
+    acknowledged, stored = run_turns(path, plugin=True)
+    # A user message, a tool call, its response and a reply per turn.
+    assert len(acknowledged.events) == 12
+    assert ids(stored) == ids(acknowledged)
+
+
+def test_turn_durability_without_the_plugin_waits_for_the_timer(path):
+    acknowledged, stored = run_turns(path, plugin=False)
+    assert len(stored.events) < len(acknowledged.events)
+    assert ids(stored) == ids(acknowledged)[:len(stored.events)]
+
+
+@pytest.mark.parametrize("interval, wait, complete", [(60, 0.0, False), (0.05, 0.5, True)])
+def test_timer_durability_loses_at_most_the_interval(path, interval, wait, complete):
+    service = WriteBehindSessionService(SqliteSessionService(path), durability="timer", flush_interval=interval)
+
+    async def run():
+        session = await service.create_session(app_name=APP_NAME, user_id="user")
+        await append(service, session, 20)
+        acknowledged = await service.get_session(app_name=APP_NAME, user_id="user", session_id=session.id)
+        await asyncio.sleep(wait)
+        crash(service)
+        return acknowledged
+
+    acknowledged = asyncio.run(run())
+    stored = persisted(path, acknowledged.id)
+    # Whatever survived is a prefix of what was acknowledged, never a reordering.
+    assert ids(stored) == ids(acknowledged)[:len(stored.events)]
+    assert (ids(stored) == ids(acknowledged)) is complete
+
+
+def test_flushed_sessions_are_evicted_beyond_max_sessions(path):
+    service = WriteBehindSessionService(SqliteSessionService(path), durability="event", max_sessions=2)
+
+    async def run():
+        sessions = [await service.create_session(app_name=APP_NAME, user_id="user") for _ in range(5)]
+        for session in sessions:
+            await append(service, session, 3)
+        assert len(service._logs) == 2
+        # An evicted session reloads the wrapped service's copy on its next append.
+        first = await service.get_session(app_name=APP_NAME, user_id="user", session_id=sessions[0].id)
+        await service.append_event(first, Event(author="user", invocation_id="late"))
+        reloaded = await service.get_session(app_name=APP_NAME, user_id="user", session_id=first.id)
+        await service.aclose()
+        service.inner.close()
+        return reloaded
+
+    reloaded = asyncio.run(run())
+    assert [event.invocation_id for event in reloaded.events] == ["inv-0", "inv-1", "inv-2", "late"]